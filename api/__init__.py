@@ -136,7 +136,10 @@ def create_app():
         response.headers['Cache-Control'] = 'no-store, max-age=0, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
         response.headers['Expires'] = '0'
-        response.headers['Content-Type'] = 'application/json; charset=utf-8'
+        # EventSource rejects streams that are not served as text/event-stream,
+        # Prometheus expects /metrics as text/plain
+        if response.mimetype not in ('text/event-stream', 'text/plain'):
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
         response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
         return response
 
@@ -189,6 +192,9 @@ def create_app():
     from api.email_templates import email_templates_views
     from api.surveys import surveys_views
     from api.feedback import feedback_views
+    from api.cache import cache_views
+    from api.perf import perf_views
+    from api.perf import metrics_views
 
     app.register_blueprint(messages_views.bp)
     app.register_blueprint(exception_views.bp)
@@ -213,5 +219,14 @@ def create_app():
     app.register_blueprint(email_templates_views.bp)
     app.register_blueprint(surveys_views.bp)
     app.register_blueprint(feedback_views.bp)
+    app.register_blueprint(cache_views.bp)
+    app.register_blueprint(perf_views.bp)
+    app.register_blueprint(metrics_views.bp)
+
+    from common.utils import request_loader
+    request_loader.init_app(app)
+
+    from common.utils import request_metrics
+    request_metrics.init_app(app)
 
     return app
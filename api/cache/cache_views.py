@@ -0,0 +1,19 @@
+from flask import Blueprint, jsonify
+
+from common.log import get_logger
+from common.auth import auth, getOrgId
+from common.utils.redis_cache import get_cache_stats
+
+logger = get_logger(__name__)
+bp = Blueprint("cache_admin", __name__, url_prefix="/api")
+
+
+@bp.route("/admin/cache/stats", methods=["GET"])
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def admin_cache_stats():
+    """Admin: per-tier (L1 / Redis / local fallback) hit and miss counters for this worker."""
+    try:
+        return jsonify(get_cache_stats()), 200
+    except Exception as e:
+        logger.exception("Error reading cache stats: %s", str(e))
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -1,33 +1,68 @@
 from typing import *
 from PIL import Image, ImageFont, ImageDraw, ImageEnhance
 import base64
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
+import multiprocessing
 import os
+import textwrap
+import threading
 import openai
 import urllib
 
+from api.certificates.qr_code import generate_qr_code
+
 CERTIFICATE_MASK_PATH: str = "./api/certificates/assets/cert_mask_1024.png"
 BACKGROUND_SAVE_LOC: str   = "/tmp/generated_image.png"
 BACKUP_BACKGROUND_LOC: str = "./api/certificates/assets/generated_image.png"
+FONT_PATH: str             = "./api/certificates/assets/Gidole-Regular.ttf"
 
 FONT_DEFAULT: ImageFont = ImageFont.load_default()
 FONT_COLOR_DEFAULT: str = "#000000"
 
+LARGE_FONT: ImageFont   = ImageFont.truetype(FONT_PATH, size=25)
+SMALL_FONT: ImageFont   = ImageFont.truetype(FONT_PATH, size=19)
+SMALLER_FONT: ImageFont = ImageFont.truetype(FONT_PATH, size=12)
+HEADER_FONT: ImageFont  = ImageFont.truetype(FONT_PATH, size=40)
+
+WHITE_COLOR: Tuple[int, int, int] = (255, 255, 255)
+GOLD_COLOR:  Tuple[int, int, int] = (255, 215, 0)
+BLACK_COLOR: Tuple[int, int, int] = (0, 0, 0)
+
+BACKGROUND_BRIGHTNESS: float = 0.35
+
+# The backgrounds are photographic, so zlib level 1 is ~10% bigger than the
+# default level 6 but encodes 3-4x faster (~0.15s vs ~0.6s at 1024x1024)
+PNG_COMPRESS_LEVEL: int = 1
+
+# Below this many certificates, starting worker processes costs more than it saves
+POOL_MIN_CERTIFICATES: int = 4
+
 OUT_DIRECTORY: str = "./certificates"
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
 
-class CertificateGenerator:
+@dataclass
+class CertificateTemplate:
+    """Decoded, dimmed background and mask shared by every certificate drawn from it."""
+    background: Image.Image
+    mask: Image.Image
 
-    def __init__(self):
-        self.certificateTemplate: Image = self._get_background_image()
-        enhancer = ImageEnhance.Brightness(self.certificateTemplate)
-        self.certificateTemplate = enhancer.enhance(0.35)
-        self.certificateMask: Image = Image.open(CERTIFICATE_MASK_PATH)
-        self.imageDrawer: ImageDraw = ImageDraw.Draw(self.certificateTemplate)
 
-    def _get_background_image(self) -> Image:
+@dataclass
+class CertificateContent:
+    """Everything that is drawn on one certificate."""
+    username: str
+    stats: List[Tuple[str, str]]
+    teamTotals: str
+    verifyUrl: str
+    date: str
+
+
+def _get_background_image(offline: bool = False) -> Image:
+    if not offline:
         try:
             response = openai.Image.create(
                 prompt="without text a mesmerizing background with geometric shapes and fireworks no text high resolution 4k",
@@ -38,13 +73,43 @@ class CertificateGenerator:
             urllib.request.urlretrieve(image_url, BACKGROUND_SAVE_LOC)
         except:
             ...
-        
+
         if (os.path.exists(BACKGROUND_SAVE_LOC)):
             return Image.open(BACKGROUND_SAVE_LOC)
-    
-        return Image.open(BACKUP_BACKGROUND_LOC)
+
+    return Image.open(BACKUP_BACKGROUND_LOC)
 
 
+def load_template(offline: bool = False) -> CertificateTemplate:
+    """Fetch (or, offline, use the bundled) background and decode it with the mask."""
+    background = ImageEnhance.Brightness(_get_background_image(offline)).enhance(BACKGROUND_BRIGHTNESS)
+    mask = Image.open(CERTIFICATE_MASK_PATH)
+    mask.load()
+    return CertificateTemplate(background, mask)
+
+
+_template: Optional[CertificateTemplate] = None
+_template_lock = threading.Lock()
+
+
+def get_template(offline: bool = False) -> CertificateTemplate:
+    """The process-wide template, loaded on first use."""
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = load_template(offline)
+    return _template
+
+
+class CertificateGenerator:
+
+    def __init__(self, template: CertificateTemplate = None):
+        template = template or get_template()
+        self.certificateTemplate: Image = template.background.copy()
+        self.certificateMask: Image = template.mask
+        self.imageDrawer: ImageDraw = ImageDraw.Draw(self.certificateTemplate)
+
     def draw_multiline_text_relative(self, text: str, xPosPercentage: float, yPosPercentage: float, fontColor: str = FONT_COLOR_DEFAULT, font: ImageFont = FONT_DEFAULT, align: str = "center") -> None:
         xPosition, yPosition = self.percentageToPixelCoords(xPosPercentage, yPosPercentage)
         self.draw_multiline_text_absolute(text, xPosition, yPosition, fontColor=fontColor, font=font, align=align)
@@ -91,10 +156,113 @@ class CertificateGenerator:
     def toBytes(self) -> bytes:
         self.certificateTemplate.paste(self.certificateMask, (0, 0), mask=self.certificateMask)
         imgBuff: BytesIO = BytesIO()
-        self.certificateTemplate.save(imgBuff, format="png")
+        self.certificateTemplate.save(imgBuff, format="png", compress_level=PNG_COMPRESS_LEVEL)
         imgBytes: bytes = imgBuff.getvalue()
         return imgBytes
         
     def toBase64(self) -> bytes:
         imgBytes: bytes = self.toBytes()
-        return base64.b64encode(imgBytes)
\ No newline at end of file
+        return base64.b64encode(imgBytes)
+
+
+def _get_stat_text_info(certGen: CertificateGenerator, stats: List[Tuple[Union[int, Any]]], font: ImageFont) -> Dict[str, Union[int, List[str]]]:
+    maxStatWidth: int = 0
+    maxStatHeight: int = 0
+    maxValWidth: int = 0
+    maxValHeight: int = 0
+    statStrs: List[str] = []
+    valStrs: List[str] = []
+
+    for statName, statVal in stats:
+        statStrs.append(statName)
+        statWidth, statHeight = certGen.get_text_size(statName, font=font)
+        maxStatWidth = max(maxStatWidth, statWidth)
+        maxStatHeight = max(maxStatHeight, statHeight)
+
+        valStr: str = f": {statVal}"
+        valStrs.append(valStr)
+        valWidth, valHeight = certGen.get_text_size(valStr, font=font)
+        maxValWidth = max(maxValWidth, valWidth)
+        maxValHeight = max(maxValHeight, valHeight)
+
+    return {
+        "maxStatWidth": maxStatWidth,
+        "maxStatHeight": maxStatHeight,
+        "statStrs": statStrs,
+        "maxValWidth": maxValWidth,
+        "maxValHeight": maxValHeight,
+        "valStrs": valStrs
+    }
+
+
+def _write_stat_to_certificate(certGen: CertificateGenerator, statTextInfo: Dict[str, Union[int, List[str]]], startY: int, font: ImageFont, maxY: int = None) -> None:
+    if (maxY is None):
+        maxY = 999999
+    
+    textBoxWidth: int = statTextInfo["maxStatWidth"] + statTextInfo["maxValWidth"]
+    leftEdge: int = (1024 - textBoxWidth) // 2
+
+    dy: int = max(statTextInfo["maxStatHeight"], statTextInfo["maxValHeight"])
+
+    for statName, valStr in zip(statTextInfo["statStrs"], statTextInfo["valStrs"]):
+        certGen.draw_text_absolute(statName, leftEdge, startY, WHITE_COLOR, font=font, align="left")
+        certGen.draw_text_absolute(valStr, leftEdge + statTextInfo["maxStatWidth"], startY, WHITE_COLOR, font=font, align="left")
+        startY += dy
+        if (startY >= maxY):
+            break
+
+
+def render_certificate(content: CertificateContent, template: CertificateTemplate = None) -> bytes:
+    """Draw one certificate and return it PNG encoded."""
+    certGen: CertificateGenerator = CertificateGenerator(template)
+
+    certGen.draw_multiline_text_absolute("Certificate of Achievement", 1024 // 2, 360, GOLD_COLOR, HEADER_FONT, "center")
+    certGen.draw_multiline_text_absolute("Congratulations", 1024 // 2, 405, GOLD_COLOR, LARGE_FONT, "center")
+    certGen.draw_multiline_text_absolute(content.username, 1024 // 2, 450, WHITE_COLOR, HEADER_FONT, "center")
+
+    exText = "This certifies that hard work, determination, and extreme learning are innate in this person as they volunteered their summer to help non-profits. They could have been doing anything else, but they chose to do something for their community!"
+    wrappedText: str = "\n".join(textwrap.wrap(exText, width=85))
+    certGen.draw_multiline_text_absolute(wrappedText, 1024 // 2, 540, WHITE_COLOR, SMALL_FONT, "center")
+
+    certGen.draw_text_absolute("Stats", 1024 // 2, 620, WHITE_COLOR, HEADER_FONT, "center")
+
+    statsInfo: Dict[str, int | List[str]] = _get_stat_text_info(certGen, content.stats, LARGE_FONT)
+    _write_stat_to_certificate(certGen, statsInfo, 660, LARGE_FONT, None)
+
+    certGen.draw_text_absolute(content.teamTotals, 1024 // 2, 820, WHITE_COLOR, SMALL_FONT, "center")
+
+    certGen.draw_multiline_text_absolute("Write code for social good @ ohack.dev\nFollow us on Facebook, Instagram, and Linkedin @opportunityhack", 1024 // 2, 890, WHITE_COLOR, SMALL_FONT, "center")
+
+    qr_code = generate_qr_code(content.verifyUrl)
+    certGen.draw_image(qr_code, 1024 - 125, 1024 - 125)
+
+    bottom_text = content.date + " | " + content.verifyUrl
+    certGen.draw_text_absolute(bottom_text, 1024 // 2, 1024 - 25, WHITE_COLOR, SMALLER_FONT, "center")
+
+    return certGen.toBytes()
+
+
+_worker_template: Optional[CertificateTemplate] = None
+
+
+def _init_render_worker(template: CertificateTemplate) -> None:
+    global _worker_template
+    _worker_template = template
+
+
+def _render_in_worker(content: CertificateContent) -> bytes:
+    return render_certificate(content, _worker_template)
+
+
+def render_certificates(contents: List[CertificateContent], template: CertificateTemplate = None, maxWorkers: int = None) -> List[bytes]:
+    """Render many certificates from one template, across worker processes for larger batches."""
+    template = template or get_template()
+    maxWorkers = min(maxWorkers or os.cpu_count() or 1, len(contents))
+    if len(contents) < POOL_MIN_CERTIFICATES or maxWorkers <= 1:
+        return [render_certificate(content, template) for content in contents]
+
+    # spawn, not fork: the web process holds gRPC/Firestore threads that do not survive a fork.
+    # Each worker receives the decoded template once.
+    with ProcessPoolExecutor(max_workers=maxWorkers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_render_worker, initargs=(template,)) as pool:
+        return list(pool.map(_render_in_worker, contents))
@@ -12,33 +12,31 @@ import pytz
 import base64
 import hashlib
 import resend
+from concurrent.futures import ThreadPoolExecutor
 
 # Import get_team_by_slack_channel
 from common.utils.firebase import get_team_by_slack_channel, save_certificate, get_certficate_by_file_id, get_recent_certs_from_db
-from common.utils.cdn import upload_to_cdn
+from common.utils.cdn import upload_bytes_to_cdn
 from common.utils.slack import async_send_slack
 from common.log import get_logger
 
 logger = get_logger("certificate_service")
 
-# Import QR code generator
-from api.certificates.qr_code import generate_qr_code
-
-from api.certificates.certificate import CertificateGenerator
-from api.certificates.scan_repo import GitFameRow, getGitFameData, GitFameTableCombined
+from api.certificates.certificate import (
+    CertificateContent,
+    CertificateTemplate,
+    load_template,
+    render_certificate,
+    render_certificates,
+)
+from api.certificates.scan_repo import GitFameRow, getGitFameData, getGitFameDataForRepos, GitFameTableCombined
 from api.certificates.certificate_cryptography import signCertificate, verifyCertificate
 load_dotenv()
 
 CDN_SERVER = getenv("CDN_SERVER")
 
-LARGE_FONT: ImageFont   = ImageFont.truetype("./api/certificates/assets/Gidole-Regular.ttf", size=25)
-SMALL_FONT: ImageFont   = ImageFont.truetype("./api/certificates/assets/Gidole-Regular.ttf", size=19)
-SMALLER_FONT: ImageFont = ImageFont.truetype("./api/certificates/assets/Gidole-Regular.ttf", size=12)
-HEADER_FONT: ImageFont  = ImageFont.truetype("./api/certificates/assets/Gidole-Regular.ttf", size=40)
-
-WHITE_COLOR: Tuple[int, int, int] = (255, 255, 255)
-GOLD_COLOR:  Tuple[int, int, int] = (255, 215, 0)
-BLACK_COLOR: Tuple[int, int, int] = (0, 0, 0)
+# Certificate uploads run in parallel; rendering is CPU bound and uses processes
+UPLOAD_WORKERS = 4
 
 # Organizer names/usernames excluded from certificate generation (lowercase)
 EXCLUDED_AUTHORS = {"gregv", "greg v"}
@@ -50,58 +48,14 @@ def get_cert_info(id):
 def get_recent_certs():
     return get_recent_certs_from_db()
 
-def _get_stat_text_info(certGen: CertificateGenerator, stats: List[Tuple[Union[int, Any]]], font: ImageFont) -> Dict[str, Union[int, List[str]]]:
-    maxStatWidth: int = 0
-    maxStatHeight: int = 0
-    maxValWidth: int = 0
-    maxValHeight: int = 0
-    statStrs: List[str] = []
-    valStrs: List[str] = []
-
-    for statName, statVal in stats:
-        statStrs.append(statName)
-        statWidth, statHeight = certGen.get_text_size(statName, font=font)
-        maxStatWidth = max(maxStatWidth, statWidth)
-        maxStatHeight = max(maxStatHeight, statHeight)
-
-        valStr: str = f": {statVal}"
-        valStrs.append(valStr)
-        valWidth, valHeight = certGen.get_text_size(valStr, font=font)
-        maxValWidth = max(maxValWidth, valWidth)
-        maxValHeight = max(maxValHeight, valHeight)
-
-    return {
-        "maxStatWidth": maxStatWidth,
-        "maxStatHeight": maxStatHeight,
-        "statStrs": statStrs,
-        "maxValWidth": maxValWidth,
-        "maxValHeight": maxValHeight,
-        "valStrs": valStrs
-    }
-
-
-def _write_stat_to_certificate(certGen: CertificateGenerator, statTextInfo: Dict[str, Union[int, List[str]]], startY: int, font: ImageFont, maxY: int = None) -> None:
-    if (maxY is None):
-        maxY = 999999
-    
-    textBoxWidth: int = statTextInfo["maxStatWidth"] + statTextInfo["maxValWidth"]
-    leftEdge: int = (1024 - textBoxWidth) // 2
-
-    dy: int = max(statTextInfo["maxStatHeight"], statTextInfo["maxValHeight"])
-
-    for statName, valStr in zip(statTextInfo["statStrs"], statTextInfo["valStrs"]):
-        certGen.draw_text_absolute(statName, leftEdge, startY, WHITE_COLOR, font=font, align="left")
-        certGen.draw_text_absolute(valStr, leftEdge + statTextInfo["maxStatWidth"], startY, WHITE_COLOR, font=font, align="left")
-        startY += dy
-        if (startY >= maxY):
-            break
-
 def generate_certificate_from_slack(slack_channel: str) -> List[str]:
     team = get_team_by_slack_channel(slack_channel)
     if (team is None): return []
 
     if "github_links" in team:
         github_links = team["github_links"]
+        # Scan the team's repositories side by side; the per-repo batches below then hit the scan cache
+        getGitFameDataForRepos([link["link"] for link in github_links])
         all_results = [generate_certificate_for_all_authors(link["link"]) for link in github_links]
 
         # Send notifications for all generated certificates
@@ -113,15 +67,33 @@ def generate_certificate_from_slack(slack_channel: str) -> List[str]:
     return []
 
 
-def generate_certificate_for_all_authors(repositoryURL: str) -> str:
-   """ Generate certificate for each GitFameData.authors """
-   gitFameData: GitFameTableCombined = getGitFameData(repositoryURL)
+def generate_certificate_for_all_authors(repositoryURL: str) -> List[Dict[str, Any]]:
+    """ Generate certificate for each GitFameData.authors
 
-   logger.info(f"Generating certificates for {len(gitFameData.authors)} authors from {repositoryURL}")
+    The repository is scanned once, a fresh background is fetched once for the
+    whole batch, and the certificates are rendered across worker processes.
+    """
+    gitFameData: GitFameTableCombined = getGitFameData(repositoryURL)
 
-   gitFameData.authors = [row for row in gitFameData.authors if row.author.lower() not in EXCLUDED_AUTHORS]
+    logger.info(f"Generating certificates for {len(gitFameData.authors)} authors from {repositoryURL}")
 
-   return [generate_certificate(repositoryURL, row.author) for row in gitFameData.authors]
+    authors = [
+        (row, emailRow) for row, emailRow in zip(gitFameData.authors, gitFameData.authorsEmails)
+        if row.author.lower() not in EXCLUDED_AUTHORS
+    ]
+    if not authors:
+        return []
+
+    template: CertificateTemplate = load_template()
+    contents = [_certificate_content(repositoryURL, gitFameData, row) for row, _ in authors]
+    images: List[bytes] = render_certificates([content for content, _ in contents], template)
+
+    with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+        return list(pool.map(
+            lambda args: _publish_certificate(repositoryURL, gitFameData, *args),
+            [(row, emailRow, content, fileIdHash, image)
+             for (row, emailRow), (content, fileIdHash), image in zip(authors, contents, images)]
+        ))
 
 
 def _notify_team_certificates(slack_channel, team_name, all_results):
@@ -233,89 +205,43 @@ def generate_hash(data: str) -> str:
     return hash_object.hexdigest()
 
 
-def generate_certificate(repositoryURL: str, username: str) -> str:
-    """ Automatically generate a certificate and returns the base64 representation of it"""
-    if username.lower() in EXCLUDED_AUTHORS:
-        logger.info(f"Skipping certificate for excluded author: {username}")
-        return ""
-
-    certGen: CertificateGenerator = CertificateGenerator()
-
-    gitFameData: GitFameTableCombined = getGitFameData(repositoryURL)
-    logger.debug(f"generate_certificate: {len(gitFameData.authors)} authors for {repositoryURL}")
-
-    authorWithEmailData: GitFameRow = None
-    authorData: GitFameRow = None
-
-    index = 0   
-    for row in gitFameData.authors:
-
+def _find_author(gitFameData: GitFameTableCombined, username: str) -> Tuple[GitFameRow, GitFameRow]:
+    """The author's row and the matching row of the email table (same index)."""
+    for index, row in enumerate(gitFameData.authors):
         if (row.author == username):
-            authorData = row                 
-            # Get the same index from authorsEmails
-            authorWithEmailData = gitFameData.authorsEmails[index]
-            break
-
-        index += 1
-
-    if (not authorData): return ""
-
-    certGen.draw_multiline_text_absolute("Certificate of Achievement", 1024 // 2, 360, GOLD_COLOR, HEADER_FONT, "center")
-    certGen.draw_multiline_text_absolute("Congratulations", 1024 // 2, 405, GOLD_COLOR, LARGE_FONT, "center")
-    certGen.draw_multiline_text_absolute(username, 1024 // 2, 450, WHITE_COLOR, HEADER_FONT, "center")
-
-    exText = "This certifies that hard work, determination, and extreme learning are innate in this person as they volunteered their summer to help non-profits. They could have been doing anything else, but they chose to do something for their community!"
-    wrappedText: str = "\n".join(textwrap.wrap(exText, width=85))
-    certGen.draw_multiline_text_absolute(wrappedText, 1024 // 2, 540, WHITE_COLOR, SMALL_FONT, "center")
-
-    certGen.draw_text_absolute("Stats", 1024 // 2, 620, WHITE_COLOR, HEADER_FONT, "center")
-
-    stats = [
-        ["Hours", f"{authorData.hours}"],
-        ["Commits", f"{authorData.commits}"],
-        ["Lines of Code", f"{authorData.linesOfCode }"],
-        ["Files", f"{authorData.files }"],
-    ]
-
-    statsInfo: Dict[str, int | List[str]] = _get_stat_text_info(certGen, stats, LARGE_FONT)
-    _write_stat_to_certificate(certGen, statsInfo, 660, LARGE_FONT, None)
+            return row, gitFameData.authorsEmails[index]
+    return None, None
 
-    certGen.draw_text_absolute(f"∑ Team Totals | Hours: { gitFameData.totalHours } Commits: { gitFameData.totalCommits } LOC: {gitFameData.totalLinesOfCode} Files: {gitFameData.totalFiles}", 1024 // 2, 820, WHITE_COLOR, SMALL_FONT, "center")
-    
 
-
-    certGen.draw_multiline_text_absolute("Write code for social good @ ohack.dev\nFollow us on Facebook, Instagram, and Linkedin @opportunityhack", 1024 // 2, 890, WHITE_COLOR, SMALL_FONT, "center")
+def _certificate_content(repositoryURL: str, gitFameData: GitFameTableCombined, authorData: GitFameRow) -> Tuple[CertificateContent, str]:
+    """What to draw on an author's certificate, and the hash its file_id is derived from."""
     # Make a short SHA file_id a hash of authorData.author, repositoryURL, authorData.commits, authorData.linesOfCode, authorData.files
-
     file_id_hash = f"{authorData.author}{repositoryURL}{authorData.commits}{authorData.linesOfCode}{authorData.files}"
     file_id = generate_hash(file_id_hash)
     az_time = datetime.now(pytz.timezone('US/Arizona'))
     iso_date = az_time.isoformat()  # Using ISO 8601 format
-    
-
-    # Generate QR code
-    qr_code_text = f"https://ohack.dev/cert/{file_id}"
-    qr_code = generate_qr_code(qr_code_text)
-    # Draw image on certificate
-    certGen.draw_image(qr_code, 1024 - 125, 1024 - 125)
-
-    bottom_text = iso_date + " | " + qr_code_text
-    certGen.draw_text_absolute(bottom_text, 1024 // 2, 1024 - 25, WHITE_COLOR, SMALLER_FONT, "center")
-    
 
-    certificateBytes: bytes = certGen.toBytes()
-    signedCertificate: bytes = signCertificate(certificateBytes)
-    certificateBase64Bytes: bytes = base64.b64encode(signedCertificate)
-    
-    # Save bytes to file
-    with open(f"certificate_{file_id}.png", "wb") as f:
-        f.write(certificateBytes)    
+    content = CertificateContent(
+        username=authorData.author,
+        stats=[
+            ["Hours", f"{authorData.hours}"],
+            ["Commits", f"{authorData.commits}"],
+            ["Lines of Code", f"{authorData.linesOfCode }"],
+            ["Files", f"{authorData.files }"],
+        ],
+        teamTotals=f"∑ Team Totals | Hours: { gitFameData.totalHours } Commits: { gitFameData.totalCommits } LOC: {gitFameData.totalLinesOfCode} Files: {gitFameData.totalFiles}",
+        verifyUrl=f"https://ohack.dev/cert/{file_id}",
+        date=iso_date,
+    )
+    return content, file_id_hash
 
-    # Save certificate to CDN
-    file_url = upload_to_cdn("certificates", f"certificate_{file_id}.png")
 
-    # Delete file
-    remove(f"certificate_{file_id}.png")
+def _publish_certificate(repositoryURL: str, gitFameData: GitFameTableCombined, authorData: GitFameRow,
+                         authorWithEmailData: GitFameRow, content: CertificateContent, file_id_hash: str,
+                         certificateBytes: bytes) -> Dict[str, Any]:
+    """Upload a rendered certificate straight from memory and record it."""
+    file_id = generate_hash(file_id_hash)
+    file_url = upload_bytes_to_cdn("certificates", f"certificate_{file_id}.png", certificateBytes)
 
     stats_json = {
         "hours": authorData.hours,
@@ -332,19 +258,38 @@ def generate_certificate(repositoryURL: str, username: str) -> str:
 
     result = {
         "certificate_url" : file_url,
-        "author_name": username,
+        "author_name": content.username,
         "author_email" : authorWithEmailData.author,
         "stats": stats_json,
         "totals": totals_json,
         "file_id": file_id,
         "file_id_hash": file_id_hash,
-        "date": iso_date,
+        "date": content.date,
         "repository_url": repositoryURL        
     }
 
     save_certificate(result)
     return result
 
+
+def generate_certificate(repositoryURL: str, username: str) -> str:
+    """ Automatically generate a certificate and returns the base64 representation of it"""
+    if username.lower() in EXCLUDED_AUTHORS:
+        logger.info(f"Skipping certificate for excluded author: {username}")
+        return ""
+
+    gitFameData: GitFameTableCombined = getGitFameData(repositoryURL)
+    logger.debug(f"generate_certificate: {len(gitFameData.authors)} authors for {repositoryURL}")
+
+    authorData, authorWithEmailData = _find_author(gitFameData, username)
+    if (not authorData): return ""
+
+    content, file_id_hash = _certificate_content(repositoryURL, gitFameData, authorData)
+    certificateBytes: bytes = render_certificate(content)
+
+    return _publish_certificate(repositoryURL, gitFameData, authorData, authorWithEmailData,
+                                content, file_id_hash, certificateBytes)
+
 def validateCertificate(certificateBase64Str: str) -> bool:
     certificateBytes = base64.b64decode(certificateBase64Str)
     return verifyCertificate(certificateBytes)
\ No newline at end of file
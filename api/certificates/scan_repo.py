@@ -2,13 +2,28 @@ import os
 import re
 import shutil
 import subprocess
+import threading
 import uuid
-from dataclasses import dataclass
-from typing import List
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from git import Repo
 import json
 
+from common.log import get_logger, info, warning
+from common.utils.redis_cache import get_cached, set_cached
+
+logger = get_logger("scan_repo")
+
+# A scan is keyed by the remote HEAD commit, so a cached one never goes stale;
+# the TTL only bounds how long scans of old commits take up space
+SCAN_CACHE_TTL = 30 * 24 * 3600
+SCAN_WORKERS = 4
+LS_REMOTE_TIMEOUT_SECONDS = 30
+
 
 @dataclass
 class GitFameRow:
@@ -108,7 +123,10 @@ def _pullRepository(repoUrl: str) -> str:
     """Downloads a remote Github repository locally."""
     saveLoc: str = os.path.join("/tmp", f"GitPull-{uuid.uuid4()}")
     # WARNING: Possible command injection, testing needed!
-    repo: Repo = Repo.clone_from(repoUrl, saveLoc)    
+    # Only the default branch, no tags. History and blobs are still needed:
+    # hours come from commit times and lines from per-commit numstat, so a
+    # shallow or blobless clone would change (or lazily re-fetch) the stats.
+    repo: Repo = Repo.clone_from(repoUrl, saveLoc, single_branch=True, no_tags=True)
     return saveLoc if (repo is not None) else ""
 
 
@@ -127,29 +145,71 @@ def _runGitFame(repoLoc: str, showEmail: bool) -> GitFameTable:
     return _parseGitFameResults(result.stdout)
 
 
+def _authorEmails(repoLoc: str) -> Dict[str, str]:
+    """Each author name's most used email, from one pass over the commit log."""
+    output: bytes = subprocess.run(
+        ["git", "-C", repoLoc, "log", "--format=%aN%x00%aE"], stdout=subprocess.PIPE, check=True).stdout
+    emails: Dict[str, Counter] = defaultdict(Counter)
+    for line in output.decode("UTF-8", errors="replace").splitlines():
+        name, _, email = line.partition("\0")
+        emails[name][email] += 1
+    return {name: counts.most_common(1)[0][0] for name, counts in emails.items()}
+
+
 def _removePulledRepo(repoLoc: str) -> None:
     """Helper function that deletes a directory and all subfolders."""
     shutil.rmtree(repoLoc)
 
 
-def getGitFameData(repositoryURL: str) -> GitFameTable:
-    """Pull and scan a GitHub repository using the Gitfame tool.
+def _normalizeRepoUrl(repositoryURL: str) -> str:
+    url: str = repositoryURL.strip().rstrip("/")
+    if url.endswith(".git"):
+        url = url[:-len(".git")]
+    return url.lower()
+
+
+def _remoteHead(repositoryURL: str) -> Optional[str]:
+    """The commit the remote HEAD points at, without cloning; None if unreachable."""
+    try:
+        result: subprocess.CompletedProcess[bytes] = subprocess.run(
+            ["git", "ls-remote", repositoryURL, "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            timeout=LS_REMOTE_TIMEOUT_SECONDS, check=True)
+    except (subprocess.SubprocessError, OSError) as e:
+        warning(logger, "Could not resolve remote HEAD", repository=repositoryURL, exc_info=e)
+        return None
+    line: str = result.stdout.decode("UTF-8").strip()
+    return line.split()[0] if line else None
 
-    Parameters:
-        repositoryURL (str): a string representation of the GitHub URL to be scraped
-    
-    Returns:
-        A GitFameTable dataclass object containing the parsed GitFame output
-    """
-    saveLoc: str = _pullRepository(repositoryURL)
-    results: GitFameTable = _runGitFame(saveLoc, False)
 
-    # FIXME: This is pretty hacky to get the email address along with the name 
-    # We run this again, but with the email flag set to True
-    # As of 12FEB2024: There is no current way to get this as a single output with git-fame
-    resultsWithEmail: GitFameTable = _runGitFame(saveLoc, True)
+def _scanCacheKey(repositoryURL: str, head: str) -> str:
+    urlHash: str = hashlib.sha256(_normalizeRepoUrl(repositoryURL).encode()).hexdigest()[:16]
+    return f"repo_scan:{urlHash}:{head}"
+
+
+def _toCached(table: GitFameTableCombined) -> dict:
+    return asdict(table)
+
+
+def _fromCached(data: dict) -> GitFameTableCombined:
+    return GitFameTableCombined(
+        **{k: v for k, v in data.items() if k not in ("authors", "authorsEmails")},
+        authors=[GitFameRow(**row) for row in data["authors"]],
+        authorsEmails=[GitFameRow(**row) for row in data["authorsEmails"]],
+    )
 
-    # Combine results and resultsWithEmail into GitFameTableCombined    
+
+def _scanRepository(repositoryURL: str) -> Tuple[GitFameTableCombined, str]:
+    """Clone once, scan once; returns the table and the scanned HEAD commit."""
+    saveLoc: str = _pullRepository(repositoryURL)
+    try:
+        head: str = Repo(saveLoc).head.commit.hexsha
+        results: GitFameTable = _runGitFame(saveLoc, False)
+        emails: Dict[str, str] = _authorEmails(saveLoc)
+    finally:
+        _removePulledRepo(saveLoc)
+
+    # authorsEmails lines up with authors row for row, the author field
+    # holding the email (git-fame can only key a run by name or by email)
     resultsCombined: GitFameTableCombined = GitFameTableCombined(
         results.totalCommits,
         results.totalCtimes,
@@ -157,9 +217,57 @@ def getGitFameData(repositoryURL: str) -> GitFameTable:
         results.totalLinesOfCode,
         results.totalHours,
         results.authors,
-        resultsWithEmail.authors
+        [replace(row, author=emails.get(row.author, "")) for row in results.authors]
     )
+    return resultsCombined, head
+
+
+_scanLocks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+_scanLocksGuard = threading.Lock()
+
+
+def getGitFameData(repositoryURL: str) -> GitFameTableCombined:
+    """Pull and scan a GitHub repository using the Gitfame tool.
+
+    Scans are cached by repository and HEAD commit, so the repository is
+    only cloned again once it has new commits. Concurrent calls for the same
+    repository wait for one scan.
+
+    Parameters:
+        repositoryURL (str): a string representation of the GitHub URL to be scraped
+    
+    Returns:
+        A GitFameTableCombined dataclass object containing the parsed GitFame output
+    """
+    head: Optional[str] = _remoteHead(repositoryURL)
+    with _scanLocksGuard:
+        lock: threading.Lock = _scanLocks[_normalizeRepoUrl(repositoryURL)]
+
+    with lock:
+        if head:
+            cached = get_cached(_scanCacheKey(repositoryURL, head))
+            if cached is not None:
+                return _fromCached(cached)
+
+        results, scannedHead = _scanRepository(repositoryURL)
+        set_cached(_scanCacheKey(repositoryURL, scannedHead), _toCached(results), ttl=SCAN_CACHE_TTL)
+        info(logger, "Scanned repository", repository=repositoryURL, head=scannedHead,
+             authors=len(results.authors))
+        return results
+
+
+def getGitFameDataForRepos(repositoryURLs: Iterable[str], maxWorkers: int = SCAN_WORKERS) -> Dict[str, Optional[GitFameTableCombined]]:
+    """Scan many repositories, at most maxWorkers clones at a time; failed scans map to None."""
+    repositoryURLs = list(dict.fromkeys(repositoryURLs))
 
+    def scan(repositoryURL: str) -> Optional[GitFameTableCombined]:
+        try:
+            return getGitFameData(repositoryURL)
+        except Exception as e:
+            warning(logger, "Repository scan failed", repository=repositoryURL, exc_info=e)
+            return None
 
-    _removePulledRepo(saveLoc)
-    return resultsCombined
\ No newline at end of file
+    if not repositoryURLs:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(maxWorkers, len(repositoryURLs)))) as pool:
+        return dict(zip(repositoryURLs, pool.map(scan, repositoryURLs)))
@@ -0,0 +1,64 @@
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from api.certificates.certificate import CertificateContent, load_template, render_certificate, render_certificates
+from api.certificates.scan_repo import GitFameRow, GitFameTableCombined
+
+
+def make_content(username="Squibb"):
+    return CertificateContent(
+        username=username,
+        stats=[["Hours", "4.5"], ["Commits", "12"], ["Lines of Code", "900"], ["Files", "7"]],
+        teamTotals="∑ Team Totals | Hours: 10 Commits: 30 LOC: 2000 Files: 20",
+        verifyUrl="https://ohack.dev/cert/abc",
+        date="2024-10-06T18:00:00-07:00",
+    )
+
+
+def test_render_certificate_offline():
+    template = load_template(offline=True)
+    image = Image.open(BytesIO(render_certificate(make_content(), template)))
+    assert image.format == "PNG"
+    assert image.size == (1024, 1024)
+    # Drawing works on a copy; the template stays blank for the next certificate
+    assert template.background.getpixel((512, 450)) == load_template(offline=True).background.getpixel((512, 450))
+
+
+def test_render_certificates_inline_for_small_batches():
+    template = load_template(offline=True)
+    with patch("api.certificates.certificate.ProcessPoolExecutor") as pool:
+        images = render_certificates([make_content("a"), make_content("b")], template, maxWorkers=4)
+    pool.assert_not_called()
+    assert len(images) == 2 and images[0] != images[1]
+
+
+def _row(author, commits):
+    return GitFameRow(author, 2.0, 100, commits, 3, 10.0, 10.0, 10.0)
+
+
+@patch("api.certificates.certificate_service.save_certificate")
+@patch("api.certificates.certificate_service.upload_bytes_to_cdn")
+@patch("api.certificates.certificate_service.getGitFameData")
+@patch("api.certificates.certificate_service.load_template")
+def test_all_authors_scan_once_and_upload_from_memory(mock_template, mock_scan, mock_upload, mock_save):
+    from api.certificates.certificate_service import generate_certificate_for_all_authors
+
+    mock_template.return_value = load_template(offline=True)
+    mock_scan.return_value = GitFameTableCombined(
+        30, 0, 20, 2000, 10.0,
+        [_row("Ann", 5), _row("Greg V", 1), _row("Bob", 7)],
+        [_row("ann@example.com", 5), _row("greg@example.com", 1), _row("bob@example.com", 7)],
+    )
+    mock_upload.side_effect = lambda directory, name, data: f"https://cdn/{directory}/{name}"
+
+    results = generate_certificate_for_all_authors("https://github.com/org/repo")
+
+    mock_scan.assert_called_once()
+    mock_template.assert_called_once()
+    assert [(r["author_name"], r["author_email"]) for r in results] == \
+        [("Ann", "ann@example.com"), ("Bob", "bob@example.com")]
+    assert results[0]["certificate_url"] == f"https://cdn/certificates/certificate_{results[0]['file_id']}.png"
+    assert all(call.args[2].startswith(b"\x89PNG") for call in mock_upload.call_args_list)
+    assert mock_save.call_count == 2
@@ -0,0 +1,56 @@
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from api.certificates import scan_repo
+from api.certificates.scan_repo import getGitFameData, getGitFameDataForRepos
+
+
+def _git(repo, *args, author=None):
+    env = None
+    if author:
+        name, email = author
+        env = {"GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email,
+               "GIT_COMMITTER_NAME": name, "GIT_COMMITTER_EMAIL": email, "PATH": "/usr/bin:/bin"}
+    subprocess.run(["git", "-C", str(repo), *args], check=True, capture_output=True, env=env)
+
+
+@pytest.fixture
+def local_repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q")
+    for i, author in enumerate([("Ann", "ann@example.com"), ("Bob", "bob@example.com"),
+                                ("Bob", "bob@old.example.com"), ("Ann", "ann@example.com"),
+                                ("Bob", "bob@example.com")]):
+        (repo / f"file{i}.py").write_text("print('hi')\n" * (i + 1))
+        _git(repo, "add", ".")
+        _git(repo, "commit", "-q", "-m", f"commit {i}", author=author)
+    return repo
+
+
+def test_one_clone_per_head_and_emails_line_up(local_repo):
+    url = f"file://{local_repo}"
+    with patch.object(scan_repo, "_pullRepository", wraps=scan_repo._pullRepository) as pull, \
+         patch.object(scan_repo, "_runGitFame", wraps=scan_repo._runGitFame) as fame:
+        first = getGitFameData(url)
+        second = getGitFameData(url + "/")
+        assert pull.call_count == 1
+        assert fame.call_count == 1
+
+        assert second == first
+        # The email an author used most
+        emails = {row.author: email.author for row, email in zip(first.authors, first.authorsEmails)}
+        assert emails == {"Ann": "ann@example.com", "Bob": "bob@example.com"}
+        assert [row.commits for row in first.authorsEmails] == [row.commits for row in first.authors]
+
+        _git(local_repo, "commit", "-q", "--allow-empty", "-m", "more", author=("Ann", "ann@example.com"))
+        getGitFameData(url)
+        assert pull.call_count == 2
+
+
+def test_bulk_scan_reports_failures(local_repo):
+    results = getGitFameDataForRepos([f"file://{local_repo}", f"file://{local_repo}/missing"], maxWorkers=2)
+    assert results[f"file://{local_repo}"].totalCommits == 5
+    assert results[f"file://{local_repo}/missing"] is None
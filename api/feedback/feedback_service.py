@@ -13,8 +13,9 @@ onboarding keeps the user-agent but drops the IP address.
 """
 from typing import Any, Dict, Optional
 
-from db.db import get_db, fetch_users
+from db.db import get_db
 from common.log import get_logger, warning
+from common.utils.user_directory import get_user_directory
 
 logger = get_logger(__name__)
 
@@ -29,19 +30,15 @@ _TIMESTAMP_PREFIX = "__Timestamp__"
 def _user_directory() -> Dict[str, Dict[str, Any]]:
     """db_id -> light public identity, best-effort.
 
-    One users-collection scan. The admin dashboard isn't a hot path, and
-    peer-feedback giver/receiver ids are arbitrary user doc ids, so a single
-    map is cheaper than N point reads.
+    Built from the shared user directory; peer-feedback giver/receiver ids
+    are arbitrary user doc ids, so a single map is cheaper than N point reads.
     """
     directory: Dict[str, Dict[str, Any]] = {}
     try:
-        for u in fetch_users() or []:
-            uid = getattr(u, "id", None)
-            if not uid:
-                continue
-            directory[uid] = {
-                "name": getattr(u, "name", "") or getattr(u, "nickname", "") or "",
-                "profile_image": getattr(u, "profile_image", None),
+        for record in get_user_directory().records():
+            directory[record["id"]] = {
+                "name": record["name"] or record["nickname"],
+                "profile_image": record["image"] or None,
             }
     except Exception as e:  # pragma: no cover - defensive
         warning(logger, "feedback-admin: user directory build failed", exc_info=e)
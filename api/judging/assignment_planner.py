@@ -0,0 +1,151 @@
+"""
+Balanced judge assignments for a judging round.
+
+plan_assignments() spreads the teams over the rooms of the event's panels,
+one demo slot after another in each room, and gives every team
+`judges_per_team` judges:
+
+  - never a judge who mentored the team (or is listed as conflicted),
+  - never a judge already judging another team in the same slot,
+  - least-loaded judges first, nobody above ceil(teams * k / judges) while
+    another eligible judge still has room,
+  - among equally loaded judges, those whose home panel is the team's room,
+    so most judges stay in one room (judges are dealt over panels up front).
+
+Only as many rooms run at once as there are judges for (judges // k), so a
+slot never needs more judges than exist; extra panels are left unused.
+
+The solver is a single greedy pass in slot order with a k-smallest pick per
+team, so 500 teams and 100 judges plan in tens of milliseconds. Teams that
+cannot get k eligible judges are listed in `unfilled` instead of failing the
+whole plan. Assignments that already exist for the round count towards a
+team's k and the judge's load, and book the judge for the slot they were
+scheduled in, so re-planning only fills the gaps.
+"""
+import heapq
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_JUDGES_PER_TEAM = 3
+DEFAULT_SLOT_MINUTES = 10
+
+
+def _slots_at(demo_time, start_time: Optional[datetime], slot_minutes: int) -> Optional[Tuple[int, ...]]:
+    """Slots of this plan overlapped by a demo at demo_time, or None if it cannot be placed."""
+    if not demo_time or not start_time or slot_minutes <= 0:
+        return None
+    try:
+        if isinstance(demo_time, str):
+            demo_time = datetime.fromisoformat(demo_time)
+        offset = (demo_time - start_time).total_seconds() / (slot_minutes * 60)
+    except (TypeError, ValueError):
+        return None
+    first = math.floor(offset)
+    # A demo that starts off the slot grid runs into the next slot too
+    return (first,) if offset == first else (first, first + 1)
+
+
+def plan_assignments(teams: List[Dict], judges: List[Dict], panels: List[Dict],
+                     judges_per_team: int = DEFAULT_JUDGES_PER_TEAM,
+                     start_time: Optional[datetime] = None,
+                     slot_minutes: int = DEFAULT_SLOT_MINUTES,
+                     conflicts: Optional[Dict[str, Iterable[str]]] = None,
+                     existing: Iterable[Tuple] = ()) -> Dict:
+    """
+    Plan assignments for teams ({"id", "name", "mentor_ids"}) and judges
+    ({"user_id", "name"}) over panels ({"panel_id" or "id", "room"}).
+
+    conflicts maps judge ids to team ids they must not judge; existing holds
+    (judge_id, team_id) or (judge_id, team_id, demo_time) tuples already
+    assigned in this round. Without a usable demo_time the judge is taken to
+    be busy in the slot this plan gives that team.
+    """
+    started = time.perf_counter()
+    judge_ids = [j["user_id"] for j in judges]
+    judge_names = {j["user_id"]: j.get("name", "") for j in judges}
+    k = max(0, judges_per_team)
+    num_judges = len(judge_ids)
+    rooms = [{"panel_id": p.get("panel_id") or p.get("id"), "room": p.get("room")} for p in panels] \
+        or [{"panel_id": None, "room": None}]
+    if k:
+        rooms = rooms[:max(1, num_judges // k)]
+    num_rooms = len(rooms)
+
+    blocked: Dict[str, Set[int]] = {}  # team id -> judge indexes that may not judge it
+    index_of = {judge_id: i for i, judge_id in enumerate(judge_ids)}
+    for judge_id, team_ids in (conflicts or {}).items():
+        if judge_id in index_of:
+            for team_id in team_ids:
+                blocked.setdefault(team_id, set()).add(index_of[judge_id])
+    for team in teams:
+        for judge_id in team.get("mentor_ids") or ():
+            if judge_id in index_of:
+                blocked.setdefault(team["id"], set()).add(index_of[judge_id])
+
+    load = [0] * num_judges
+    assigned: Dict[str, Set[int]] = {}
+    busy: Set[Tuple[int, int]] = set()  # (judge index, slot)
+    team_slot = {team["id"]: position // num_rooms for position, team in enumerate(teams)}
+    for judge_id, team_id, *rest in existing:
+        if judge_id not in index_of:
+            continue
+        j = index_of[judge_id]
+        assigned.setdefault(team_id, set()).add(j)
+        load[j] += 1
+        slots = _slots_at(rest[0] if rest else None, start_time, slot_minutes)
+        if slots is None and team_id in team_slot:
+            slots = (team_slot[team_id],)
+        busy.update((j, slot) for slot in slots or ())
+    cap = math.ceil(len(teams) * k / num_judges) if num_judges else 0
+    home = [i % num_rooms for i in range(num_judges)]
+
+    planned, unfilled = [], []
+    for position, team in enumerate(teams):
+        room_index, slot = position % num_rooms, position // num_rooms
+        room = rooms[room_index]
+        demo_time = (start_time + timedelta(minutes=slot * slot_minutes)).isoformat() if start_time else None
+        taken = assigned.setdefault(team["id"], set())
+        need = k - len(taken)
+        if need > 0:
+            excluded = blocked.get(team["id"], set()) | taken
+            eligible = (j for j in range(num_judges) if j not in excluded and (j, slot) not in busy)
+            picks = heapq.nsmallest(
+                need, eligible, key=lambda j: (load[j] >= cap, load[j], home[j] != room_index, j)
+            )
+            for j in picks:
+                load[j] += 1
+                taken.add(j)
+                busy.add((j, slot))
+                planned.append({
+                    "judge_id": judge_ids[j],
+                    "judge_name": judge_names[judge_ids[j]],
+                    "team_id": team["id"],
+                    "team_name": team.get("name", ""),
+                    "panel_id": room["panel_id"],
+                    "room": room["room"],
+                    "slot": slot,
+                    "demo_time": demo_time,
+                })
+            if len(picks) < need:
+                unfilled.append({"team_id": team["id"], "team_name": team.get("name", ""),
+                                 "judges": len(taken), "needed": k})
+
+    loads = {judge_ids[j]: load[j] for j in range(num_judges)}
+    return {
+        "assignments": planned,
+        "unfilled": unfilled,
+        "judge_loads": loads,
+        "stats": {
+            "teams": len(teams),
+            "judges": num_judges,
+            "rooms": num_rooms if panels else 0,
+            "slots": math.ceil(len(teams) / num_rooms) if teams else 0,
+            "judges_per_team": k,
+            "new_assignments": len(planned),
+            "max_load": max(load, default=0),
+            "min_load": min(load, default=0),
+            "solver_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
@@ -0,0 +1,121 @@
+"""
+Team rankings from judge scores, corrected for harsh and lenient judges.
+
+All submitted scores for an event round go into one teams x judges x criteria
+array (NaN where a judge did not score a team). From it:
+
+  - criterion averages and the raw average total per team,
+  - per-judge z-scores: each judge's scores on a criterion are centered and
+    scaled by that judge's own mean and spread, so a judge who gives
+    everyone 5s moves teams as much as one who gives everyone 2s,
+  - the criterion-weighted normalized score: the mean over a team's judges
+    of their weighted z-scores,
+  - ranks by normalized score, then raw average, then number of judges.
+
+A judge who scored a single team (or gave identical scores) has no spread;
+their z-scores are 0 and the team is ordered by the raw average.
+"""
+import warnings
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from model.judge_score import JudgeScore
+
+# (JudgeScore attribute, API name). Accessibility is left out: it is a
+# special category prize and not part of the total, like calculate_total_score
+CRITERIA = [
+    ("scope_impact", "scopeImpact"),
+    ("scope_complexity", "scopeComplexity"),
+    ("documentation_code", "documentationCode"),
+    ("documentation_ease", "documentationEase"),
+    ("polish_work_remaining", "polishWorkRemaining"),
+    ("polish_can_use_today", "polishCanUseToday"),
+    ("security_data", "securityData"),
+    ("security_role", "securityRole"),
+]
+
+DEFAULT_WEIGHTS = {api_name: 1.0 for _, api_name in CRITERIA}
+
+
+def _round(value, digits: int = 3) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def score_array(scores: Iterable[JudgeScore]):
+    """(team_ids, judge_ids, array[team, judge, criterion]) with NaN for gaps."""
+    scores = list(scores)
+    team_ids = sorted({s.team_id for s in scores})
+    judge_ids = sorted({s.judge_id for s in scores})
+    team_index = {t: i for i, t in enumerate(team_ids)}
+    judge_index = {j: i for i, j in enumerate(judge_ids)}
+    values = np.full((len(team_ids), len(judge_ids), len(CRITERIA)), np.nan)
+    for s in scores:
+        row = [getattr(s, attr) for attr, _ in CRITERIA]
+        values[team_index[s.team_id], judge_index[s.judge_id]] = [np.nan if v is None else v for v in row]
+    return team_ids, judge_ids, values
+
+
+def rank_teams(scores: Iterable[JudgeScore], weights: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Rank the teams in scores.
+
+    weights maps API criterion names to weights (missing ones count 1.0).
+    Returns {"teams": [...] best first, "judges": [...], "criteria": [...]}.
+    """
+    team_ids, judge_ids, values = score_array(scores)
+    criteria = [api_name for _, api_name in CRITERIA]
+    w = np.array([(weights or DEFAULT_WEIGHTS).get(name, 1.0) for name in criteria], dtype=float)
+    if not team_ids:
+        return {"teams": [], "judges": [], "criteria": criteria}
+
+    scored = ~np.isnan(values).all(axis=2)  # [team, judge]
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        # all-NaN slices (a criterion nobody scored) average to NaN quietly
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # Missing criteria are skipped in the averages and count 0 in weighted totals
+        criterion_avg = np.nanmean(values, axis=1)  # [team, criterion]
+        raw_total = np.nansum(np.nan_to_num(criterion_avg) * w, axis=1)
+
+        judge_mean = np.nanmean(values, axis=0)  # [judge, criterion]
+        judge_std = np.nanstd(values, axis=0)
+        z = (values - judge_mean) / judge_std
+        z = np.where(judge_std > 0, z, 0.0)
+        z = np.where(np.isnan(values), 0.0, z)
+        z_total = (z * w).sum(axis=2)  # [team, judge]
+        judge_count = scored.sum(axis=1)
+        normalized = np.where(scored, z_total, 0.0).sum(axis=1) / np.maximum(judge_count, 1)
+
+        judge_totals = np.where(scored, np.nansum(np.nan_to_num(values) * w, axis=2), np.nan)  # [team, judge]
+        judge_avg_total = np.nanmean(judge_totals, axis=0)
+        overall_avg_total = np.nanmean(judge_totals)
+
+    # lexsort: last key is primary; team id keeps equal teams in a stable order
+    order = np.lexsort((
+        np.arange(len(team_ids)),
+        -judge_count,
+        -np.round(raw_total, 9),
+        -np.round(normalized, 9),
+    ))
+    teams = []
+    for rank, t in enumerate(order, start=1):
+        teams.append({
+            "team_id": team_ids[t],
+            "rank": rank,
+            "normalized_score": _round(normalized[t]),
+            "average_total": _round(raw_total[t], 2),
+            "judge_count": int(judge_count[t]),
+            "criteria_averages": {name: _round(criterion_avg[t, c], 2) for c, name in enumerate(criteria)},
+        })
+
+    judges = []
+    for j, judge_id in enumerate(judge_ids):
+        judges.append({
+            "judge_id": judge_id,
+            "teams_scored": int(scored[:, j].sum()),
+            "average_total": _round(judge_avg_total[j], 2),
+            # Positive: this judge scores above the panel average (lenient)
+            "leniency": _round(judge_avg_total[j] - overall_avg_total, 2),
+        })
+    return {"teams": teams, "judges": judges, "criteria": criteria}
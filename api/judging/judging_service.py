@@ -8,6 +8,7 @@ from db.db import (
     fetch_judge_scores_by_judge_and_event,
     fetch_judge_score,
     insert_judge_assignment,
+    insert_judge_assignments,
     update_judge_assignment,
     delete_judge_assignment,
     fetch_judge_panels_by_event,
@@ -27,15 +28,27 @@ from db.db import (
 from model.judge_assignment import JudgeAssignment
 from model.judge_score import JudgeScore
 from model.judge_panel import JudgePanel
-from services.hackathons_service import get_single_hackathon_event
+from common.utils.request_loader import get_loader
+from common.utils.redis_cache import get_cached, set_cached, delete_cached
+from api.judging.judge_ranking import rank_teams
+from api.judging.assignment_planner import plan_assignments
 from services.teams_service import (
     get_team,
-    get_teams_batch
+    get_teams_batch,
+    get_teams_by_event_id
 )
 from common.utils.firebase import get_nonprofit_by_id, get_volunteer_from_db_by_event
 
 logger = get_logger("judging_service")
 
+# Rankings are dropped when a score for the round is submitted; the TTL only
+# bounds how long a missed invalidation could linger
+RANKINGS_CACHE_TTL = 6 * 3600
+
+
+def _rankings_cache_key(event_id: str, round_name: str) -> str:
+    return f"judge_rankings:{event_id}:{round_name}"
+
 
 def get_judge_assignments(judge_id: str) -> Dict:
     """Get all hackathon assignments for a specific judge."""
@@ -62,11 +75,13 @@ def get_judge_assignments(judge_id: str) -> Dict:
                 hackathon_assignments[event_id]['round2_teams'].append(
                     assignment.team_id)
 
-        # Fetch hackathon details and judge scores for each event
+        # Fetch hackathon details for every event at once, then judge scores per event.
+        # Only title and dates are shown, so the nonprofit/team expansion is skipped.
+        hackathon_docs = get_loader().hackathons_by_event_ids(hackathon_assignments)
         hackathons = []
         for event_id, data in hackathon_assignments.items():
             try:
-                hackathon_info = get_single_hackathon_event(event_id)
+                hackathon_info = hackathon_docs.get(event_id)
                 if hackathon_info:
                     # Get judging progress
                     scores = fetch_judge_scores_by_judge_and_event(
@@ -320,6 +335,7 @@ def submit_judge_score(judge_id: str, team_id: str, event_id: str,
 
         # Save to database
         saved_score = upsert_judge_score(score)
+        delete_cached(_rankings_cache_key(event_id, round_name))
 
         return {
             "success": True,
@@ -849,6 +865,33 @@ def remove_judge_panel(panel_id: str) -> Dict:
         return {"success": False, "error": "Failed to remove panel"}
 
 
+def _team_details(team_ids) -> Dict:
+    """{team_id: {"name", "team_number"}} for team_ids."""
+    teams_data = {}
+    if team_ids:
+        try:
+            for team in get_teams_batch({"team_ids": list(team_ids)}):
+                teams_data[team.get('id')] = {
+                    "name": team.get('name', ''),
+                    "team_number": team.get('team_number', '')
+                }
+        except Exception as e:
+            warning(logger, "Error fetching teams batch", error=str(e))
+    return teams_data
+
+
+def _judge_names(event_id: str) -> Dict:
+    """{judge user_id: name} for every judge of the event, in one query."""
+    result = get_volunteer_from_db_by_event(event_id, "judge", admin=True)
+    if "error" in result:
+        warning(logger, "Error fetching judges for event", event_id=event_id, error=result["error"])
+    return {
+        judge["user_id"]: judge.get("name", "")
+        for judge in result.get("data", [])
+        if judge.get("user_id")
+    }
+
+
 def get_bulk_judge_scores(event_id: str, round_name: str) -> Dict:
     """Get all judge scores for a specific event and round."""
     try:
@@ -866,44 +909,16 @@ def get_bulk_judge_scores(event_id: str, round_name: str) -> Dict:
               unique_teams=len(team_ids), 
               unique_judges=len(judge_ids))
 
-        # Get team details in batch if needed
-        teams_data = {}
-        if team_ids:
-            try:
-                teams_batch = get_teams_batch({"team_ids": team_ids})
-                for team in teams_batch:
-                    teams_data[team.get('id')] = {
-                        "name": team.get('name', ''),
-                        "team_number": team.get('team_number', '')
-                    }
-            except Exception as e:
-                warning(logger, "Error fetching teams batch", error=str(e))
-
-        # Get judge details in batch
-        judges_data = {}
-        for judge_id in judge_ids:
-            try:
-                # Get basic judge info
-                judge_info = get_volunteer_from_db_by_user_id_volunteer_type_and_event_id(
-                    judge_id, "judge", event_id
-                )
-                if judge_info:
-                    judges_data[judge_id] = {
-                        "name": judge_info.get('name', ''),
-                        "id": judge_id
-                    }
-            except Exception as e:
-                warning(logger, "Error fetching judge details", 
-                       judge_id=judge_id, error=str(e))
+        teams_data = _team_details(team_ids)
+        judge_names = _judge_names(event_id) if judge_ids else {}
 
         # Format the scores
         formatted_scores = []
         for score in scores:
-            logger.info(f"Processing score: {score.id} for team {score.team_id} by judge {score.judge_id}")
             formatted_score = {
                 "id": score.id,
                 "judge_id": score.judge_id,
-                "judge_name": judges_data.get(score.judge_id, {}).get('name', 'Unknown'),
+                "judge_name": judge_names.get(score.judge_id) or 'Unknown',
                 "team_id": score.team_id,
                 "team_name": teams_data.get(score.team_id, {}).get('name', 'Unknown'),
                 "team_number": teams_data.get(score.team_id, {}).get('team_number', ''),
@@ -943,20 +958,59 @@ def get_bulk_judge_scores(event_id: str, round_name: str) -> Dict:
         return {"scores": [], "summary": {}, "error": "Failed to fetch bulk scores"}
 
 
+def get_judge_rankings(event_id: str, round_name: str) -> Dict:
+    """Rank the teams of an event round, normalizing each judge's scores.
+
+    Cached until a score for the round is submitted.
+    """
+    cache_key = _rankings_cache_key(event_id, round_name)
+    cached = get_cached(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        debug(logger, "Computing judge rankings",
+              event_id=event_id, round_name=round_name)
+
+        scores = fetch_judge_scores_by_event_and_round(event_id, round_name)
+        ranking = rank_teams(scores)
+
+        teams_data = _team_details([t["team_id"] for t in ranking["teams"]])
+        judge_names = _judge_names(event_id) if ranking["judges"] else {}
+        for team in ranking["teams"]:
+            details = teams_data.get(team["team_id"], {})
+            team["team_name"] = details.get("name", "Unknown")
+            team["team_number"] = details.get("team_number", "")
+        for judge in ranking["judges"]:
+            judge["judge_name"] = judge_names.get(judge["judge_id"]) or "Unknown"
+
+        result = {
+            **ranking,
+            "summary": {
+                "total_scores": len(scores),
+                "unique_teams": len(ranking["teams"]),
+                "unique_judges": len(ranking["judges"]),
+                "event_id": event_id,
+                "round": round_name,
+            }
+        }
+        set_cached(cache_key, result, ttl=RANKINGS_CACHE_TTL)
+        return result
+
+    except Exception as e:
+        error(logger, "Error computing judge rankings",
+              event_id=event_id, round_name=round_name, error=str(e))
+        return {"teams": [], "judges": [], "summary": {}, "error": "Failed to compute rankings"}
+
+
 def get_bulk_judge_details(event_id: str) -> Dict:
     """Get all judge details for a specific event in one request."""
     try:
         logger.debug("Fetching bulk judge details for event %s", event_id)
 
         # Get all judges for the event
-        judges_result = get_volunteer_from_db_by_event(event_id, "judge")
-
-        # Get all assignments for the event
-        assignments = fetch_judge_assignments_by_event_id(event_id)
-
-        # Get all of the scores for the event
-        scores = fetch_judge_scores_by_event(event_id)
-        
+        # admin=True: the public view strips user_id, which assignments key on
+        judges_result = get_volunteer_from_db_by_event(event_id, "judge", admin=True)
 
         if "error" in judges_result:
             error(logger, "Error fetching judges for event", event_id=event_id)
@@ -998,3 +1052,88 @@ def get_bulk_judge_details(event_id: str) -> Dict:
         import traceback
         traceback.print_exc()
         return {"judges": [], "total_count": 0, "error": "Failed to fetch judge details"}
+
+
+def plan_judge_assignments(event_id: str, round_name: str, judges_per_team: int = 3,
+                           start_time: datetime = None, slot_minutes: int = 10,
+                           conflicts: Dict = None, team_ids: list = None,
+                           commit: bool = False) -> Dict:
+    """Plan balanced judge assignments for an event round; write them when commit is set.
+
+    Judges who mentored a team (or are listed in conflicts) are not assigned to
+    it, and assignments that already exist for the round are kept and counted.
+    Without commit this is a preview.
+    """
+    try:
+        debug(logger, "Planning judge assignments",
+              event_id=event_id, round_name=round_name, commit=commit)
+
+        judges_result = get_bulk_judge_details(event_id)
+        if "error" in judges_result:
+            return {"success": False, "error": judges_result["error"]}
+        judges = [j for j in judges_result.get("judges", []) if j.get("user_id")]
+
+        teams_result = get_teams_by_event_id(event_id)
+        if "error" in teams_result:
+            return {"success": False, "error": teams_result["error"]}
+        teams = teams_result.get("teams", [])
+        if team_ids:
+            wanted = set(team_ids)
+            teams = [t for t in teams if t["id"] in wanted]
+
+        panels = get_event_judge_panels(event_id).get("panels", [])
+        existing = [
+            (a.get("judge_id"), a.get("team_id"), a.get("demo_time"))
+            for a in fetch_judge_assignments_by_event_id(event_id).get("data", [])
+            if a.get("round") == round_name
+        ]
+
+        plan = plan_assignments(
+            teams, judges, panels,
+            judges_per_team=judges_per_team,
+            start_time=start_time,
+            slot_minutes=slot_minutes,
+            conflicts=conflicts,
+            existing=existing,
+        )
+        debug(logger, "Planned judge assignments", event_id=event_id, **plan["stats"])
+
+        result = {"success": True, "event_id": event_id, "round": round_name,
+                  "committed": False, **plan}
+        if not commit or not plan["assignments"]:
+            return result
+
+        assignments = []
+        for planned in plan["assignments"]:
+            assignment = JudgeAssignment()
+            assignment.judge_id = planned["judge_id"]
+            assignment.event_id = event_id
+            assignment.team_id = planned["team_id"]
+            assignment.round = round_name
+            assignment.panel_id = planned["panel_id"]
+            assignment.room = planned["room"]
+            assignment.demo_time = planned["demo_time"]
+            assignments.append(assignment)
+
+        write_stats = insert_judge_assignments(assignments)
+        for planned, assignment in zip(plan["assignments"], assignments):
+            planned["id"] = assignment.id
+        if write_stats["failed"]:
+            error(logger, "Some judge assignments were not written",
+                  event_id=event_id, failed=write_stats["failed"], errors=write_stats["errors"][:5])
+        result["committed"] = True
+        result["write_stats"] = {
+            "written": write_stats["written"],
+            "failed": write_stats["failed"],
+            "batches": write_stats["batches"],
+            "seconds": write_stats["seconds"],
+        }
+        result["success"] = not write_stats["failed"]
+        if write_stats["failed"]:
+            result["error"] = "Some assignments could not be saved"
+        return result
+
+    except Exception as e:
+        error(logger, "Error planning judge assignments",
+              event_id=event_id, round_name=round_name, error=str(e))
+        return {"success": False, "error": "Failed to plan assignments"}
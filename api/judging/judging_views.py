@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from flask import Blueprint, request
 from common.auth import auth, auth_user, getOrgId
 from common.log import get_logger, debug, error, info
@@ -22,7 +24,9 @@ from api.judging.judging_service import (
     get_judge_assignments_for_panel,
     get_judge_event_details,    
     get_bulk_judge_scores,
-    get_bulk_judge_details
+    get_bulk_judge_details,
+    get_judge_rankings,
+    plan_judge_assignments
 )
 
 logger = get_logger("judging_views")
@@ -551,3 +555,63 @@ def get_bulk_scores_admin(event_id, round_name):
         return result, 500
 
     return result
+
+
+@bp.route("/admin/rankings/<event_id>/<round_name>", methods=["GET"])
+@auth.require_org_member_with_permission("judge.admin", req_to_org_id=getOrgId)
+def get_rankings_admin(event_id, round_name):
+    """Get team rankings for an event round, normalized per judge (admin only)."""
+    info(logger, "API called: GET /admin/rankings/{event_id}/{round_name}",
+         event_id=event_id, round_name=round_name)
+
+    result = get_judge_rankings(event_id, round_name)
+
+    if "error" in result:
+        return result, 500
+
+    return result
+
+
+@bp.route("/admin/assignments/plan", methods=["POST"])
+@auth.require_org_member_with_permission("judge.admin", req_to_org_id=getOrgId)
+def plan_assignments_admin():
+    """Plan balanced judge assignments for an event round; saves them when commit is true."""
+    info(logger, "API called: POST /admin/assignments/plan")
+    data = request.get_json()
+    if not data:
+        return {"error": "Missing request body"}, 400
+
+    for field in ['event_id', 'round']:
+        if field not in data:
+            return {"error": f"Missing required field: {field}"}, 400
+
+    start_time = None
+    if data.get('start_time'):
+        try:
+            start_time = datetime.fromisoformat(data['start_time'].replace('Z', '+00:00'))
+        except (TypeError, ValueError):
+            return {"error": "start_time must be an ISO 8601 date-time"}, 400
+
+    try:
+        judges_per_team = int(data.get('judges_per_team', 3))
+        slot_minutes = int(data.get('slot_minutes', 10))
+    except (TypeError, ValueError):
+        return {"error": "judges_per_team and slot_minutes must be integers"}, 400
+    if judges_per_team < 1 or slot_minutes < 1:
+        return {"error": "judges_per_team and slot_minutes must be positive"}, 400
+
+    result = plan_judge_assignments(
+        event_id=data['event_id'],
+        round_name=data['round'],
+        judges_per_team=judges_per_team,
+        start_time=start_time,
+        slot_minutes=slot_minutes,
+        conflicts=data.get('conflicts'),
+        team_ids=data.get('team_ids'),
+        commit=bool(data.get('commit', False))
+    )
+
+    if not result.get('success', False):
+        return result, 500
+
+    return result, 201 if result.get('committed') else 200
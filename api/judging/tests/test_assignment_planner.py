@@ -0,0 +1,156 @@
+from collections import Counter
+from datetime import datetime
+from unittest.mock import patch
+
+from api.judging.assignment_planner import plan_assignments
+
+
+def make_teams(n, mentors=None):
+    return [{"id": f"t{i}", "name": f"Team {i}", "mentor_ids": (mentors or {}).get(f"t{i}", [])}
+            for i in range(n)]
+
+
+def make_judges(n):
+    return [{"user_id": f"j{i}", "name": f"Judge {i}"} for i in range(n)]
+
+
+def make_panels(n):
+    return [{"id": f"doc{i}", "panel_id": f"p{i}", "room": f"Room {i}"} for i in range(n)]
+
+
+def judges_by_team(plan):
+    teams = {}
+    for a in plan["assignments"]:
+        teams.setdefault(a["team_id"], []).append(a["judge_id"])
+    return teams
+
+
+class TestPlanAssignments:
+    """Test cases for the judge assignment planner."""
+
+    def test_every_team_gets_k_distinct_judges(self):
+        plan = plan_assignments(make_teams(12), make_judges(9), make_panels(3), judges_per_team=3)
+        teams = judges_by_team(plan)
+        assert len(teams) == 12
+        assert all(len(set(judges)) == 3 for judges in teams.values())
+        assert plan["unfilled"] == []
+        assert plan["stats"]["new_assignments"] == 36
+
+    def test_loads_are_balanced(self):
+        plan = plan_assignments(make_teams(25), make_judges(10), make_panels(4), judges_per_team=3)
+        loads = plan["judge_loads"].values()
+        assert max(loads) - min(loads) <= 1
+        assert sum(loads) == 75
+        # 10 judges can staff three rooms of three at once, not four
+        assert plan["stats"]["rooms"] == 3
+        assert plan["unfilled"] == []
+
+    def test_mentors_and_conflicts_are_not_assigned(self):
+        teams = make_teams(6, mentors={"t0": ["j0", "j1"], "t3": ["j2"]})
+        plan = plan_assignments(teams, make_judges(6), make_panels(2), judges_per_team=3,
+                                conflicts={"j4": ["t0", "t5"], "nobody": ["t1"]})
+        teams = judges_by_team(plan)
+        assert not {"j0", "j1", "j4"} & set(teams["t0"])
+        assert "j2" not in teams["t3"]
+        assert "j4" not in teams["t5"]
+        assert plan["unfilled"] == []
+
+    def test_no_judge_is_in_two_rooms_at_once(self):
+        plan = plan_assignments(make_teams(30), make_judges(12), make_panels(3), judges_per_team=3)
+        slots = Counter((a["judge_id"], a["slot"]) for a in plan["assignments"])
+        assert max(slots.values()) == 1
+
+    def test_rooms_slots_and_demo_times(self):
+        start = datetime(2024, 1, 15, 14, 0)
+        plan = plan_assignments(make_teams(5), make_judges(6), make_panels(2), judges_per_team=2,
+                                start_time=start, slot_minutes=15)
+        by_team = {a["team_id"]: a for a in plan["assignments"]}
+        assert (by_team["t0"]["room"], by_team["t1"]["room"], by_team["t2"]["room"]) == \
+            ("Room 0", "Room 1", "Room 0")
+        assert by_team["t2"]["panel_id"] == "p0"
+        assert by_team["t4"]["slot"] == 2
+        assert by_team["t4"]["demo_time"] == "2024-01-15T14:30:00"
+        assert plan["stats"]["slots"] == 3
+
+    def test_judges_stay_with_their_panel_room(self):
+        plan = plan_assignments(make_teams(20), make_judges(6), make_panels(2), judges_per_team=3)
+        rooms = {}
+        for a in plan["assignments"]:
+            rooms.setdefault(a["judge_id"], set()).add(a["room"])
+        assert all(len(r) == 1 for r in rooms.values())
+
+    def test_existing_assignments_count(self):
+        existing = [("j0", "t0"), ("j1", "t0"), ("j0", "t1")]
+        plan = plan_assignments(make_teams(2), make_judges(4), [], judges_per_team=2, existing=existing)
+        teams = judges_by_team(plan)
+        assert "t0" not in teams
+        assert len(teams["t1"]) == 1 and "j0" not in teams["t1"]
+        assert plan["judge_loads"]["j0"] == 2
+
+    def test_existing_assignments_book_their_slot(self):
+        start = datetime(2024, 1, 15, 9, 0)
+        existing = [("j0", "t9", "2024-01-15T09:00:00"), ("j1", "t8", start.replace(minute=10))]
+        plan = plan_assignments(make_teams(2), make_judges(2), [], judges_per_team=1,
+                                start_time=start, existing=existing)
+        assert judges_by_team(plan) == {"t0": ["j1"], "t1": ["j0"]}
+
+        # A demo off the slot grid keeps the judge out of both slots it overlaps
+        plan = plan_assignments(make_teams(2), make_judges(2), [], judges_per_team=1,
+                                start_time=start, existing=[("j0", "t9", "2024-01-15T09:05:00")])
+        assert judges_by_team(plan) == {"t0": ["j1"], "t1": ["j1"]}
+
+    def test_unfilled_teams_are_reported(self):
+        teams = make_teams(2, mentors={"t1": ["j0", "j1"]})
+        plan = plan_assignments(teams, make_judges(2), [], judges_per_team=2)
+        assert plan["unfilled"] == [{"team_id": "t1", "team_name": "Team 1", "judges": 0, "needed": 2}]
+        assert plan["assignments"][0]["room"] is None
+
+    def test_500_teams_plan_fast(self):
+        mentors = {f"t{i}": [f"j{i % 100}", f"j{(i * 7) % 100}"] for i in range(500)}
+        plan = plan_assignments(make_teams(500, mentors), make_judges(100), make_panels(10),
+                                judges_per_team=3, start_time=datetime(2024, 1, 15, 9, 0))
+        assert plan["stats"]["new_assignments"] == 1500
+        assert plan["unfilled"] == []
+        assert plan["stats"]["max_load"] - plan["stats"]["min_load"] <= 1
+        assert plan["stats"]["solver_ms"] < 1000
+
+
+class TestPlanJudgeAssignmentsService:
+    """Preview vs commit through the judging service."""
+
+    @patch("api.judging.judging_service.insert_judge_assignments")
+    @patch("api.judging.judging_service.fetch_judge_assignments_by_event_id")
+    @patch("api.judging.judging_service.get_event_judge_panels")
+    @patch("api.judging.judging_service.get_teams_by_event_id")
+    @patch("api.judging.judging_service.get_bulk_judge_details")
+    def test_preview_then_commit(self, mock_judges, mock_teams, mock_panels, mock_existing, mock_insert):
+        from api.judging.judging_service import plan_judge_assignments
+
+        mock_judges.return_value = {"judges": make_judges(4) + [{"user_id": "", "name": "No account"}]}
+        mock_teams.return_value = {"teams": make_teams(3, mentors={"t0": ["j0"]})}
+        mock_panels.return_value = {"panels": make_panels(1)}
+        mock_existing.return_value = {"data": [
+            {"judge_id": "j1", "team_id": "t0", "round": "round1"},
+            {"judge_id": "j2", "team_id": "t0", "round": "round2"},
+        ]}
+
+        preview = plan_judge_assignments("e1", "round1", judges_per_team=2, team_ids=["t0", "t1"])
+        assert preview["success"] and not preview["committed"]
+        assert preview["stats"]["teams"] == 2
+        assert preview["stats"]["new_assignments"] == 3
+        mock_insert.assert_not_called()
+
+        def insert(assignments):
+            for i, assignment in enumerate(assignments):
+                assignment.id = f"a{i}"
+            return {"written": len(assignments), "failed": 0, "batches": 1, "seconds": 0.01, "errors": []}
+
+        mock_insert.side_effect = insert
+        result = plan_judge_assignments("e1", "round1", judges_per_team=2, team_ids=["t0", "t1"], commit=True)
+        assert result["success"] and result["committed"]
+        assert result["write_stats"]["written"] == 3
+        saved = mock_insert.call_args[0][0]
+        assert {(a.team_id, a.round, a.event_id, a.panel_id) for a in saved} == \
+            {("t0", "round1", "e1", "p0"), ("t1", "round1", "e1", "p0")}
+        assert all("j0" != a.judge_id for a in saved if a.team_id == "t0")
+        assert [a["id"] for a in result["assignments"]] == ["a0", "a1", "a2"]
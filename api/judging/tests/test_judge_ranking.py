@@ -0,0 +1,114 @@
+from unittest.mock import patch
+
+import pytest
+
+from api.judging.judge_ranking import CRITERIA, rank_teams
+from model.judge_score import JudgeScore
+
+
+def make_score(judge_id, team_id, value, **overrides):
+    score = JudgeScore()
+    score.judge_id = judge_id
+    score.team_id = team_id
+    for attr, _ in CRITERIA:
+        setattr(score, attr, overrides.get(attr, value))
+    score.calculate_total_score()
+    return score
+
+
+class TestRankTeams:
+    """Test cases for the judge score ranking engine."""
+
+    def test_empty(self):
+        assert rank_teams([])["teams"] == []
+
+    def test_raw_averages_and_weights(self):
+        scores = [
+            make_score("j1", "t1", 4, scope_impact=2),
+            make_score("j2", "t1", 2),
+        ]
+        ranking = rank_teams(scores)
+        team = ranking["teams"][0]
+        assert team["average_total"] == 23.0
+        assert team["criteria_averages"]["scopeImpact"] == 2.0
+        assert team["criteria_averages"]["scopeComplexity"] == 3.0
+
+        weighted = rank_teams(scores, weights={"scopeImpact": 3.0})
+        assert weighted["teams"][0]["average_total"] == 27.0
+
+    def test_normalization_corrects_for_harsh_judges(self):
+        # j1 is harsh, j2 lenient. Raw averages put t2 (seen only by j2) first,
+        # but t1 is j1's best team and tied for j2's best.
+        scores = [
+            make_score("j1", "t1", 3), make_score("j1", "t4", 1),
+            make_score("j2", "t2", 5), make_score("j2", "t3", 4),
+            make_score("j2", "t1", 5),
+        ]
+        teams = {t["team_id"]: t for t in rank_teams(scores)["teams"]}
+        assert teams["t2"]["average_total"] > teams["t1"]["average_total"]
+        assert [teams[t]["rank"] for t in ("t1", "t2", "t4", "t3")] == [1, 2, 3, 4]
+
+    def test_ties_break_on_raw_average_then_judge_count(self):
+        # Every judge gives every team the same score: no spread, z-scores are 0
+        scores = [
+            make_score("j1", "a", 3), make_score("j2", "b", 4),
+            make_score("j3", "c", 4), make_score("j4", "c", 4),
+        ]
+        ranking = rank_teams(scores)
+        assert [t["team_id"] for t in ranking["teams"]] == ["c", "b", "a"]
+        assert [t["rank"] for t in ranking["teams"]] == [1, 2, 3]
+
+    def test_judge_leniency(self):
+        scores = [
+            make_score("harsh", "t1", 2), make_score("harsh", "t2", 2),
+            make_score("kind", "t1", 4), make_score("kind", "t2", 4),
+        ]
+        judges = {j["judge_id"]: j for j in rank_teams(scores)["judges"]}
+        assert judges["harsh"]["leniency"] == -8.0
+        assert judges["kind"]["leniency"] == 8.0
+        assert judges["kind"]["teams_scored"] == 2
+
+    def test_missing_criteria_are_skipped(self):
+        scores = [make_score("j1", "t1", 4, security_role=None), make_score("j2", "t1", 2)]
+        team = rank_teams(scores)["teams"][0]
+        assert team["criteria_averages"]["securityRole"] == 2.0
+        assert team["judge_count"] == 2
+
+
+class TestJudgeRankingsService:
+    """Rankings are cached until a score for the round is submitted."""
+
+    @pytest.fixture
+    def cache(self):
+        store = {}
+        with patch("api.judging.judging_service.get_cached", side_effect=store.get), \
+             patch("api.judging.judging_service.set_cached",
+                   side_effect=lambda key, value, ttl=None: store.__setitem__(key, value)), \
+             patch("api.judging.judging_service.delete_cached",
+                   side_effect=lambda key: store.pop(key, None)):
+            yield store
+
+    @patch("api.judging.judging_service.get_volunteer_from_db_by_event")
+    @patch("api.judging.judging_service.get_teams_batch")
+    @patch("api.judging.judging_service.fetch_judge_scores_by_event_and_round")
+    def test_rankings_cached_until_score_submitted(self, mock_fetch, mock_teams, mock_judges, cache):
+        from api.judging.judging_service import get_judge_rankings, submit_judge_score
+
+        mock_fetch.return_value = [make_score("u1", "t1", 4), make_score("u1", "t2", 3)]
+        mock_teams.return_value = [{"id": "t1", "name": "Alpha", "team_number": "1"}]
+        mock_judges.return_value = {"data": [{"user_id": "u1", "name": "Jane"}]}
+
+        result = get_judge_rankings("e1", "round1")
+        assert [t["team_name"] for t in result["teams"]] == ["Alpha", "Unknown"]
+        assert result["judges"][0]["judge_name"] == "Jane"
+        mock_judges.assert_called_once_with("e1", "judge", admin=True)
+
+        get_judge_rankings("e1", "round1")
+        assert mock_fetch.call_count == 1
+
+        with patch("api.judging.judging_service.upsert_judge_score", side_effect=lambda s: s):
+            scores = {api_name: 5 for _, api_name in CRITERIA}
+            assert submit_judge_score("u1", "t2", "e1", "round1", scores)["success"]
+
+        get_judge_rankings("e1", "round1")
+        assert mock_fetch.call_count == 2
@@ -8,6 +8,7 @@ from cachetools import TTLCache, cached
 from db.db import get_db
 from common.utils.github import get_all_repos
 from common.utils.firebase import get_hackathon_by_event_id
+from common.utils.request_loader import get_loader
 from common.utils.redis_cache import get_cached, set_cached
 
 logger = logging.getLogger("myapp")
@@ -384,13 +385,13 @@ def collect_mentor_panel_opportunities(event_id: str) -> List[Dict]:
     is not in its live window (start_date <= now <= end_date + 1 day).
     """
     from datetime import datetime, timedelta
-    from common.utils.firebase import get_hackathon_by_event_id
     from db.db import get_db
 
     opportunities: List[Dict] = []
 
     try:
-        hackathon = get_hackathon_by_event_id(event_id) or {}
+        # Within get_github_leaderboard this is served from the request loader
+        hackathon = get_loader().hackathon_by_event_id(event_id) or {}
     except Exception as e:
         logger.warning("collect_mentor_panel_opportunities: hackathon lookup failed: %s", e)
         hackathon = {}
@@ -524,8 +525,10 @@ def get_github_leaderboard(event_id: str) -> Dict[str, Any]:
     start_time = time.time()
     logger.debug("Getting GitHub leaderboard for event ID: %s", event_id)
 
-    # Fetch hackathon ONCE and pass down to all helpers.
+    # Fetch hackathon ONCE and pass down to all helpers; helpers that only
+    # take an event_id pick it up from the request loader.
     hackathon = get_hackathon_by_event_id(event_id)
+    get_loader().prime_hackathon(event_id, hackathon)
 
     org_data = get_github_organizations(event_id, hackathon=hackathon)
 
@@ -1,10 +1,11 @@
 from flask import Blueprint, request, jsonify
 from common.auth import auth 
 from services import llm_service
-import threading
 
 bp = Blueprint("llm", __name__, url_prefix="/api/llm")
 
+MAX_BATCH_APPLICATIONS = 200
+
 def getOrgId(req):
     # Get the org_id from the req
     return req.headers.get("X-Org-Id")
@@ -56,6 +57,30 @@ def get_similar_projects():
     similar_projects = llm_service.find_similar_projects(application_data)
     return jsonify({"similar_projects": similar_projects})
 
+@bp.route("/similar-projects/batch", methods=["POST"])
+@auth.require_user
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def get_similar_projects_batch():
+    """
+    Endpoint to find similar projects for many applications in one call.
+    Expects { "applications": [{...}, ...], "top_n": 3 } in the request body and
+    returns { "similar_projects": { <application id>: [...] } }.
+    """
+    data = request.get_json() or {}
+    applications = data.get('applications')
+    if not applications or not isinstance(applications, list):
+        return jsonify({"error": "Request must include a non-empty 'applications' list."}), 400
+    if len(applications) > MAX_BATCH_APPLICATIONS:
+        return jsonify({"error": f"At most {MAX_BATCH_APPLICATIONS} applications per request."}), 400
+
+    try:
+        top_n = int(data.get('top_n', 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'top_n' must be an integer."}), 400
+
+    similar_projects = llm_service.find_similar_projects_batch(applications, top_n=max(1, min(top_n, 20)))
+    return jsonify({"similar_projects": similar_projects})
+
 @bp.route("/similarity-reasoning", methods=["POST"])
 @auth.require_user
 @auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
@@ -101,17 +126,34 @@ def refresh_embedding_endpoint():
 @auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
 def populate_embedding_map_endpoint():
     """
-    Triggers a background process to (re)generate embeddings for all NPO
-    applications and populate the embedding map collection.
+    Triggers a background job to (re)generate embeddings for changed NPO
+    applications and populate the embedding map collection. Only one job runs
+    at a time; poll /embedding-map/status for progress.
     """
     try:
-        thread = threading.Thread(target=llm_service.populate_embedding_map)
-        thread.start()
-        return jsonify({
-            "status": "processing",
-            "message": "Embedding map population process has been started in the background. Check server logs for progress. Please wait for a minute or two for this to complete and then proceed with opening the applications."
-        })
+        job_id = llm_service.start_populate_embedding_map()
     except Exception as e:
-        # Log the exception e
-        print(f"ERROR: Failed to start embedding population thread. Reason: {e}")
-        return jsonify({"status": "error", "message": "An unexpected error occurred."}), 500
\ No newline at end of file
+        print(f"ERROR: Failed to start embedding population job. Reason: {e}")
+        return jsonify({"status": "error", "message": "An unexpected error occurred."}), 500
+
+    if job_id is None:
+        return jsonify({
+            "status": "already_running",
+            "message": "An embedding map population job is already running.",
+            "job": llm_service.get_embedding_job_status()
+        }), 409
+
+    return jsonify({
+        "status": "processing",
+        "job_id": job_id,
+        "message": "Embedding map population has been started in the background. Unchanged applications are skipped; check /api/llm/embedding-map/status for progress."
+    })
+
+@bp.route("/embedding-map/status", methods=["GET"])
+@auth.require_user
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def embedding_map_status_endpoint():
+    """
+    Returns progress of the most recent embedding map population job.
+    """
+    return jsonify({"job": llm_service.get_embedding_job_status()})
@@ -22,6 +22,8 @@ from ratelimit import limits
 import os
 
 from db.db import fetch_user_by_user_id, get_db
+from common.utils.request_loader import get_loader
+from common.utils.user_directory import refresh_user_in_directory
 
 
 logger = get_logger("messages_service")
@@ -452,8 +454,9 @@ def get_history_old(db_id):
 
     _badges=[]
     if "badges" in res:
-        for h in res["badges"]:
-            _badges.append(h.get().to_dict())
+        # Badge refs repeat across users; one get_all, memoized for the request
+        for snap in get_loader().load_many(res["badges"]):
+            _badges.append(snap.to_dict() if snap is not None else None)
 
     result = {
         "id": doc.id,
@@ -530,6 +533,7 @@ def save_user_old(
                     "propel_id": propel_id,
             })
             logger.debug(f"Update Result: {update_res}")
+            refresh_user_in_directory(doc.id)
 
         logger.debug("User Save End")
         return doc.id # Should only have 1 record, but break just for safety 
@@ -551,6 +555,7 @@ def save_user_old(
         "propel_id": propel_id,
     })
     logger.debug(f"Insert Result: {insert_res}")
+    refresh_user_in_directory(doc_id)
     return doc_id
 
 def save_profile_metadata_old(propel_id, json):
@@ -589,6 +594,7 @@ def save_profile_metadata_old(propel_id, json):
     update_res = db.collection("users").document(user.id).set( d, merge=True)
 
     logger.info(f"Update Result: {update_res}")
+    refresh_user_in_directory(user.id)
 
     # Clear cache for get_profile_metadata
     get_profile_metadata_old.cache_clear()
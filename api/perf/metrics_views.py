@@ -0,0 +1,31 @@
+import hmac
+import os
+
+from flask import Blueprint, Response, jsonify, request
+
+from common.utils import metrics
+
+# Prometheus scrapers expect /metrics at the root
+bp = Blueprint("perf_metrics", __name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _metrics_allowed() -> bool:
+    """
+    Scrapes over the private network (Fly's metrics collector, a sidecar)
+    reach the machine directly; requests through the public proxy carry
+    Fly-Client-IP / X-Forwarded-For and need METRICS_TOKEN as a bearer token.
+    """
+    token = os.getenv("METRICS_TOKEN")
+    if token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return True
+    return not (request.headers.get("Fly-Client-IP") or request.headers.get("X-Forwarded-For"))
+
+
+@bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Request, cache, queue and upstream metrics of every worker, in the Prometheus text format."""
+    if not _metrics_allowed():
+        return jsonify({"success": False, "error": "Forbidden"}), 403
+    return Response(metrics.render(), status=200, content_type=PROMETHEUS_CONTENT_TYPE)
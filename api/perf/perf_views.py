@@ -0,0 +1,34 @@
+from flask import Blueprint, jsonify, request
+
+from common.log import get_logger
+from common.auth import auth, getOrgId
+from common.utils.request_metrics import reset_route_stats, route_stats
+
+logger = get_logger(__name__)
+bp = Blueprint("perf_admin", __name__, url_prefix="/api")
+
+
+@bp.route("/admin/perf/routes", methods=["GET"])
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def admin_route_stats():
+    """
+    Admin: p50/p95 latency and mean Firestore reads, writes and queries per
+    request for each route, over its recent requests on this worker.
+    Sorted by mean reads unless ?sort=p95_ms (or another stat) is given.
+    """
+    try:
+        stats = route_stats()
+        sort = request.args.get("sort", "mean_reads")
+        routes = sorted(stats.items(), key=lambda item: item[1].get(sort, 0), reverse=True)
+        return jsonify({"routes": [{"route": route, **values} for route, values in routes]}), 200
+    except Exception as e:
+        logger.exception("Error reading route stats: %s", str(e))
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@bp.route("/admin/perf/routes", methods=["DELETE"])
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def admin_reset_route_stats():
+    """Admin: start the per-route samples over, e.g. before measuring a fix."""
+    reset_route_stats()
+    return jsonify({"success": True}), 200
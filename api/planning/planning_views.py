@@ -13,13 +13,17 @@ Firestore layout (subcollections under hackathons/{hid}):
 import hashlib
 import json
 import logging
+import time
 import uuid
 from datetime import datetime, timezone
 
-from flask import Blueprint, g, jsonify, request
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 
 from common.auth import auth, auth_user
 from common.utils.firebase import get_db, get_hackathon_by_event_id
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
+from common.utils.user_directory import get_user_directory
+from common.utils.user_search import get_user_search_index
 from model.planning import (
     ALLOWED_BUDGET_BUCKETS,
     ALLOWED_BUDGET_STATES,
@@ -40,6 +44,20 @@ from model.planning import (
     MAX_PLANNING_LISTS,
     PLANNING_FIELD,
 )
+from services.planning_board_events import (
+    EVENT_COMMENT,
+    EVENT_PRESENCE,
+    broker as board_events,
+    publish_board_event,
+)
+from services.planning_board_sync import (
+    OP_SET,
+    OP_UPDATE,
+    REVISION_FIELD,
+    bump_board_revision,
+    commit_board_writes,
+    get_board_meta,
+)
 from services.hackathon_planning_service import (
     can_comment,
     is_admin,
@@ -58,6 +76,11 @@ bp = Blueprint("planning", __name__, url_prefix="/api/planning")
 # ---------------------------------------------------------------------------
 
 INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+REVISION_HEADER = "X-Board-Revision"
+DIGEST_CHECK_INTERVAL_SECONDS = 15
+
+# hackathon id -> monotonic time of the last read-driven digest check
+_digest_checked_at = {}
 
 
 def _now_iso() -> str:
@@ -148,18 +171,72 @@ def _check_comment_rate_limit(user_id: str):
 # Board snapshot
 # ---------------------------------------------------------------------------
 
+def _docs_changed_since(href, subcollection: str, since: int):
+    """Docs stamped with a board revision newer than since, archived ones included."""
+    return [
+        {**d.to_dict(), "id": d.id}
+        for d in href.collection(subcollection).where(REVISION_FIELD, ">", since).stream()
+    ]
+
+
 @bp.route("/<event_id>", methods=["GET"])
 def get_board(event_id):
-    """Public board snapshot: lists + cards + labels. ETag-based caching."""
+    """Public board snapshot: lists + cards + labels. ETag-based caching.
+
+    With ``?since=<revision>`` only lists/cards/labels written after that board
+    revision are returned (archived ones included, so clients can drop them).
+    A cursor equal to the current revision gets a 304 after reading only the
+    board's metadata doc. Every response carries the current ``revision`` to
+    use as the next cursor.
+    """
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "since must be an integer revision"}), 400
+
+    # Read the revision before any board docs so the snapshot is never older than its cursor
+    meta = get_board_meta(event_id) or {}
+    revision = int(meta.get(REVISION_FIELD) or 0)
     hackathon = load_hackathon_or_404(event_id)
     planning = hackathon.get(PLANNING_FIELD) or {}
     if not planning.get("enabled"):
         return jsonify({"enabled": False}), 200
 
+    # Lazy Slack digest flush when past deadline; polling clients mostly take
+    # the early returns below, so it runs before them
+    _maybe_flush_digests_read_driven(hackathon)
+
+    if since is not None and meta.get("enabled") and since == revision:
+        resp = current_app.response_class(status=304)
+        resp.headers[REVISION_HEADER] = str(revision)
+        return resp
+
     hid = hackathon["id"]
     db = get_db()
     href = db.collection("hackathons").document(hid)
 
+    if since is not None and 0 <= since < revision:
+        cards_docs = _docs_changed_since(href, "planning_cards", since)
+        referenced_ids = set()
+        for c in cards_docs:
+            referenced_ids.update(c.get("assignees") or [])
+        referenced_ids.update(planning.get("editors") or [])
+        resp = jsonify({
+            "event_id": event_id,
+            "delta": True,
+            "since": since,
+            "revision": revision,
+            "planning": planning,
+            "lists": _docs_changed_since(href, "planning_lists", since),
+            "cards": cards_docs,
+            "labels": _docs_changed_since(href, "planning_labels", since),
+            "users": _resolve_public_user_profiles(referenced_ids),
+        })
+        resp.headers[REVISION_HEADER] = str(revision)
+        return resp, 200
+
     lists_docs = sorted(
         [{**d.to_dict(), "id": d.id} for d in href.collection("planning_lists").where("archived", "==", False).stream()],
         key=lambda x: x.get("position", ""),
@@ -177,9 +254,6 @@ def get_board(event_id):
     if request.headers.get("If-None-Match") == etag:
         return "", 304
 
-    # Lazy Slack digest flush when past deadline
-    _maybe_flush_digests_read_driven(hackathon)
-
     # Resolve display profiles for everyone referenced in cards.assignees + planning.editors
     # so the frontend can render avatars without per-user round-trips.
     referenced_ids = set()
@@ -191,19 +265,25 @@ def get_board(event_id):
     resp = jsonify({
         "event_id": event_id,
         "planning": planning,
+        "revision": revision,
         "lists": lists_docs,
         "cards": cards_docs,
         "labels": labels_docs,
         "users": users_map,
     })
     resp.headers["ETag"] = etag
+    resp.headers[REVISION_HEADER] = str(revision)
     return resp, 200
 
 
-# Cache resolved user profiles briefly so the board snapshot doesn't pay for
-# fetch_users() on every poll. 60s is short enough that name/avatar changes
-# show up quickly while cutting the read load by ~10x for an active board.
-_USER_PROFILES_CACHE = {"profiles": None, "expires_at": 0}
+def _public_profile(record):
+    """Public-safe fields of a user directory record."""
+    return {
+        "name": record["name"] or record["nickname"],
+        "nickname": record["nickname"],
+        "profile_image": record["image"],
+        "db_id": record["id"],
+    }
 
 
 _PROPEL_FALLBACK_CACHE = {}  # propel_id -> {profile dict, expires_at}
@@ -227,10 +307,10 @@ def _seed_firestore_user_from_oauth(propel_id, oauth):
     the OAuth dict we already have in hand. Best-effort — failures are
     logged but don't break the caller.
 
-    Calling this after a successful PropelAuth fallback means the user
-    appears in fetch_users() on the next 60s refresh, so subsequent
-    board fetches get them from the cached index instead of the slower
-    PropelAuth fallback path. Permanent self-heal.
+    Calling this after a successful PropelAuth fallback adds the user to
+    the shared user directory, so subsequent board fetches resolve them
+    there instead of through the slower PropelAuth fallback path.
+    Permanent self-heal.
     """
     try:
         from db.db import fetch_user_by_user_id, insert_user, update_user
@@ -253,8 +333,8 @@ def _seed_firestore_user_from_oauth(propel_id, oauth):
             u.last_login = last_login
             insert_user(u)
             logger.info("Self-heal: inserted Firestore user record for propel_id=%s", propel_id)
-        # If the record already exists we don't touch it — fetch_users() will
-        # pick up our positive lookup via the cached index, no write needed.
+        # If the record already exists we don't touch it — it is already in
+        # the user directory, no write needed.
     except Exception:
         logger.exception("Self-heal user-seed failed for propel_id=%s", propel_id)
 
@@ -267,40 +347,26 @@ def _resolve_public_user_profiles(propel_ids):
     record yet (just authenticated, never triggered profile save).
 
     Falls back to a one-shot PropelAuth OAuth lookup when a propel_id isn't
-    in the cached Firestore user index — covers users who logged in but
-    haven't yet been auto-saved to the users collection.
+    in the user directory — covers users who logged in but haven't yet been
+    auto-saved to the users collection.
     """
     import time
     if not propel_ids:
         return {}
 
     now = time.time()
-    if not _USER_PROFILES_CACHE["profiles"] or _USER_PROFILES_CACHE["expires_at"] < now:
-        try:
-            from db.db import fetch_users
-            all_users = fetch_users() or []
-            indexed = {}
-            for u in all_users:
-                pid = getattr(u, "user_id", None)
-                if not pid:
-                    continue
-                indexed[pid] = {
-                    "name": getattr(u, "name", "") or getattr(u, "nickname", "") or "",
-                    "nickname": getattr(u, "nickname", "") or "",
-                    "profile_image": getattr(u, "profile_image", "") or "",
-                    "db_id": getattr(u, "id", None),
-                }
-            _USER_PROFILES_CACHE["profiles"] = indexed
-            _USER_PROFILES_CACHE["expires_at"] = now + 60
-        except Exception:
-            logger.exception("Failed to resolve user profiles for board snapshot")
-            return {}
+    directory = get_user_directory()
+    try:
+        directory.ensure_loaded()
+    except Exception:
+        logger.exception("Failed to resolve user profiles for board snapshot")
+        return {}
 
-    indexed = _USER_PROFILES_CACHE["profiles"] or {}
     out = {}
     for pid in propel_ids:
-        if pid in indexed:
-            out[pid] = indexed[pid]
+        record = directory.by_user_id(pid)
+        if record is not None:
+            out[pid] = _public_profile(record)
             continue
         # Fallback for users who have never been saved to the users collection.
         # We cache BOTH positive and negative results — without negative
@@ -329,9 +395,9 @@ def _resolve_public_user_profiles(propel_ids):
                 }
                 _PROPEL_FALLBACK_CACHE[pid] = {"profile": profile, "expires_at": now + _PROPEL_FALLBACK_TTL}
                 out[pid] = profile
-                # Self-heal: seed a Firestore user record so the next 60s
-                # refresh of _USER_PROFILES_CACHE picks them up via the
-                # fast cached index instead of the slower PropelAuth path.
+                # Self-heal: seed a Firestore user record so the next board
+                # fetch finds them in the user directory instead of taking
+                # the slower PropelAuth path.
                 _seed_firestore_user_from_oauth(pid, oauth)
             else:
                 # PropelAuth returned no OAuth profile. Log ONCE per TTL with
@@ -351,7 +417,16 @@ def _resolve_public_user_profiles(propel_ids):
 
 
 def _maybe_flush_digests_read_driven(hackathon_doc):
-    """Best-effort read-driven Slack digest flush (runs on GET board)."""
+    """Best-effort read-driven Slack digest flush (runs on GET board).
+
+    Checked at most once per DIGEST_CHECK_INTERVAL_SECONDS per board and
+    worker: the check reads the hackathon doc, and boards are polled often.
+    """
+    now = time.monotonic()
+    hid = hackathon_doc.get("id")
+    if now - _digest_checked_at.get(hid, float("-inf")) < DIGEST_CHECK_INTERVAL_SECONDS:
+        return
+    _digest_checked_at[hid] = now
     try:
         from services.planning_slack_notifier import flush_digests_if_due
         flush_digests_if_due(hackathon_doc)
@@ -386,9 +461,9 @@ def create_list(event_id):
         "created_at": now,
         "updated_at": now,
     }
-    doc_ref.set(doc)
+    revision = commit_board_writes(g.hackathon, [(OP_SET, doc_ref, doc)])
     _record_activity(g.hackathon, "list_created", f'Created list "{title}"', g.propel_user_id, list_id=doc_ref.id)
-    return jsonify({"id": doc_ref.id, **doc}), 201
+    return jsonify({"id": doc_ref.id, **doc, "revision": revision}), 201
 
 
 @bp.route("/<event_id>/lists/<list_id>", methods=["PATCH"])
@@ -418,8 +493,8 @@ def update_list(event_id, list_id):
     if "is_run_of_show" in data:
         updates["is_run_of_show"] = bool(data["is_run_of_show"])
 
-    list_ref.update(updates)
-    return jsonify({"id": list_id, **existing, **updates}), 200
+    revision = commit_board_writes(g.hackathon, [(OP_UPDATE, list_ref, updates)])
+    return jsonify({"id": list_id, **existing, **updates, "revision": revision}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -484,10 +559,10 @@ def create_card(event_id):
         "target_count": data.get("target_count"),
         "sponsor": _validate_sponsor(data.get("sponsor")) if kind == "sponsor_prospect" else None,
     }
-    doc_ref.set(doc)
+    revision = commit_board_writes(g.hackathon, [(OP_SET, doc_ref, doc)])
     _record_activity(g.hackathon, "card_created", f'Created card "{title}"', g.propel_user_id, card_id=doc_ref.id, list_id=list_id)
     _enqueue_slack_digest(g.hackathon, {"kind": "card_created", "card_id": doc_ref.id, "card_title": title, "list_id": list_id})
-    return jsonify({"id": doc_ref.id, **doc}), 201
+    return jsonify({"id": doc_ref.id, **doc, "revision": revision}), 201
 
 
 def _validate_budget(budget):
@@ -656,14 +731,14 @@ def update_card(event_id, card_id):
     if "sync_to_countdowns" in data:
         updates["sync_to_countdowns"] = bool(data["sync_to_countdowns"])
 
-    card_ref.update(updates)
+    revision = commit_board_writes(g.hackathon, [(OP_UPDATE, card_ref, updates)])
     _enqueue_slack_digest(g.hackathon, {
         "kind": "card_updated",
         "card_id": card_id,
         "card_title": updates.get("title", existing.get("title", "")),
         "list_id": updates.get("list_id", existing.get("list_id", "")),
     })
-    return jsonify({"id": card_id, **existing, **updates}), 200
+    return jsonify({"id": card_id, **existing, **updates, "revision": revision}), 200
 
 
 @bp.route("/<event_id>/cards/<card_id>", methods=["DELETE"])
@@ -674,9 +749,9 @@ def archive_card(event_id, card_id):
     if not snap.exists:
         return jsonify({"error": "Card not found"}), 404
     now = _now_iso()
-    card_ref.update({"archived": True, "updated_at": now})
+    revision = commit_board_writes(g.hackathon, [(OP_UPDATE, card_ref, {"archived": True, "updated_at": now})])
     _record_activity(g.hackathon, "card_archived", f'Archived card "{snap.to_dict().get("title", "")}"', g.propel_user_id, card_id=card_id)
-    return jsonify({"id": card_id, "archived": True}), 200
+    return jsonify({"id": card_id, "archived": True, "revision": revision}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -742,9 +817,10 @@ def create_comment(event_id, card_id):
 
     # Increment comment_count
     from google.cloud.firestore import Increment
-    card_ref.update({"comment_count": Increment(1), "last_activity_at": now})
+    commit_board_writes(g.hackathon, [(OP_UPDATE, card_ref, {"comment_count": Increment(1), "last_activity_at": now})])
 
     _record_activity(g.hackathon, "comment_added", "Added a comment", g.propel_user_id, card_id=card_id)
+    publish_board_event(event_id, {"type": EVENT_COMMENT, "op": "created", "id": doc_ref.id, **comment})
 
     # Best-effort @-mention notifications. Failures here must not break the
     # comment write; the comment is already persisted above.
@@ -798,6 +874,10 @@ def delete_comment(event_id, comment_id):
 
     now = _now_iso()
     comment_ref.update({"deleted_at": now, "body": "[deleted]"})
+    publish_board_event(event_id, {
+        "type": EVENT_COMMENT, "op": "deleted", "id": comment_id,
+        "card_id": comment.get("card_id"), "deleted_at": now,
+    })
     return jsonify({"id": comment_id, "deleted_at": now}), 200
 
 
@@ -821,8 +901,8 @@ def create_label(event_id):
     now = _now_iso()
     doc_ref = _subcol(g.hackathon, "planning_labels").document()
     label = {"name": name, "color": color, "created_at": now, "updated_at": now}
-    doc_ref.set(label)
-    return jsonify({"id": doc_ref.id, **label}), 201
+    revision = commit_board_writes(g.hackathon, [(OP_SET, doc_ref, label)])
+    return jsonify({"id": doc_ref.id, **label, "revision": revision}), 201
 
 
 @bp.route("/<event_id>/labels/<label_id>", methods=["PATCH"])
@@ -840,8 +920,8 @@ def update_label(event_id, label_id):
     if "color" in data:
         updates["color"] = (data["color"] or "").strip()
 
-    label_ref.update(updates)
-    return jsonify({"id": label_id, **snap.to_dict(), **updates}), 200
+    revision = commit_board_writes(g.hackathon, [(OP_UPDATE, label_ref, updates)])
+    return jsonify({"id": label_id, **snap.to_dict(), **updates, "revision": revision}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -874,6 +954,8 @@ def update_editors(event_id):
 
     planning["editors"] = editors
     href.update({PLANNING_FIELD: planning})
+    invalidate_hackathon_catalog(g.hackathon["id"])
+    bump_board_revision(g.hackathon, enabled=bool(planning.get("enabled")))
     return jsonify({"editors": editors}), 200
 
 
@@ -906,6 +988,8 @@ def update_planning_config(event_id):
             planning["slack"] = current_slack
 
     href.update({PLANNING_FIELD: planning})
+    invalidate_hackathon_catalog(g.hackathon["id"])
+    bump_board_revision(g.hackathon, enabled=bool(planning.get("enabled")))
     return jsonify({"planning": planning}), 200
 
 
@@ -926,6 +1010,8 @@ def seed_template(event_id):
     href = _get_hackathon_ref(g.hackathon)
     planning["template_seeded"] = True
     href.update({PLANNING_FIELD: planning})
+    invalidate_hackathon_catalog(g.hackathon["id"])
+    bump_board_revision(g.hackathon)
 
     _record_activity(g.hackathon, "template_seeded", "Applied OHack default template", g.propel_user_id)
     return jsonify({"message": "Template applied"}), 200
@@ -962,32 +1048,29 @@ def resolve_users_by_ids():
 @bp.route("/_users/mention-search", methods=["GET"])
 @auth.require_user
 def mention_search_users():
-    """Substring match across cached user list. Public-safe fields only.
+    """Name/nickname match from the user search index. Public-safe fields only.
 
-    Min 2 chars (avoids dumping the user table). Capped at 10 results.
-    Reuses the same 60s cache as the board snapshot's user resolver.
+    Min 2 chars (avoids dumping the user table). Capped at 10 results,
+    word-prefix matches first, then most recent login.
     """
     q = (request.args.get("q") or "").strip().lower()
     if len(q) < 2:
         return jsonify({"users": []}), 200
 
-    # Force a populate of _USER_PROFILES_CACHE if cold by calling with a
-    # placeholder — cheaper than duplicating the fetch logic.
-    _resolve_public_user_profiles({"__warm__"})  # noqa
-    indexed = _USER_PROFILES_CACHE.get("profiles") or {}
-
-    out = []
-    for pid, profile in indexed.items():
-        name = (profile.get("name") or "").lower()
-        nickname = (profile.get("nickname") or "").lower()
-        if q in name or q in nickname:
-            out.append({
-                "user_id": pid,
-                "name": profile.get("name") or profile.get("nickname") or "",
-                "profile_image": profile.get("profile_image") or "",
-            })
-            if len(out) >= 10:
-                break
+    try:
+        matches = get_user_search_index().search(q, limit=10)
+    except Exception:
+        logger.exception("User search index unavailable for mention search")
+        return jsonify({"users": []}), 200
+
+    out = [
+        {
+            "user_id": record["user_id"],
+            "name": record["name"] or record["nickname"],
+            "profile_image": record["image"],
+        }
+        for record in matches
+    ]
 
     return jsonify({"users": out}), 200
 
@@ -999,7 +1082,7 @@ def mention_search_users():
 @bp.route("/_users/search", methods=["GET"])
 @auth.require_user
 def search_users_for_editor_picker():
-    """Substring match across Firestore users by name/email/nickname.
+    """Name/email/nickname match from the user search index.
 
     Admin-only. Returns up to 25 candidates with the propel user_id needed
     by the editors[] list. Q is required and at least 2 chars to avoid
@@ -1012,34 +1095,104 @@ def search_users_for_editor_picker():
     if len(q) < 2:
         return jsonify({"users": []}), 200
 
-    from db.db import fetch_users
     try:
-        all_users = fetch_users() or []
+        matches = get_user_search_index().search(q, limit=25, include_email=True)
     except Exception:
-        logger.exception("fetch_users failed")
+        logger.exception("User search index unavailable for editor picker")
         return jsonify({"users": []}), 200
 
-    results = []
-    for u in all_users:
-        propel_id = getattr(u, "user_id", None)
-        if not propel_id:
-            continue
-        name = (getattr(u, "name", None) or "").lower()
-        nickname = (getattr(u, "nickname", None) or "").lower()
-        email = (getattr(u, "email_address", None) or "").lower()
-        if q in name or q in nickname or q in email:
-            results.append({
-                "user_id": propel_id,
-                "name": getattr(u, "name", None) or getattr(u, "nickname", None) or "",
-                "email": getattr(u, "email_address", None) or "",
-                "profile_image": getattr(u, "profile_image", None) or "",
-            })
-            if len(results) >= 25:
-                break
+    results = [
+        {
+            "user_id": record["user_id"],
+            "name": record["name"] or record["nickname"],
+            "email": record["email"],
+            "profile_image": record["image"],
+        }
+        for record in matches
+    ]
 
     return jsonify({"users": results}), 200
 
 
+# ---------------------------------------------------------------------------
+# Push channel (SSE with long-poll fallback)
+# ---------------------------------------------------------------------------
+
+STREAM_KEEPALIVE_SECONDS = 15
+# Streams end periodically so held threads are recycled; EventSource reconnects
+STREAM_MAX_SECONDS = 300
+STREAM_RETRY_MS = 3000
+LONG_POLL_TIMEOUT_SECONDS = 25
+
+
+def _sse(event: dict) -> str:
+    lines = []
+    if event.get("type") == "change":
+        lines.append(f"id: {event['revision']}")
+    lines.append(f"event: {event.get('type', 'message')}")
+    lines.append(f"data: {json.dumps(event)}")
+    return "\n".join(lines) + "\n\n"
+
+
+@bp.route("/<event_id>/stream", methods=["GET"])
+def stream_board(event_id):
+    """Push board changes as they are committed.
+
+    Server-Sent Events by default; ``?transport=poll`` holds the request up to
+    LONG_POLL_TIMEOUT_SECONDS and returns the events seen so far. The first
+    event is ``hello`` with the current revision: a client whose cursor is
+    older fetches ``GET /<event_id>?since=<cursor>`` once and then applies
+    ``change``, ``comment`` and ``presence`` events. Each worker serves a
+    bounded number of streams; past that the response is 503 and the client
+    keeps polling ``?since=``.
+    """
+    since = request.args.get("since") or request.headers.get("Last-Event-ID")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "since must be an integer revision"}), 400
+
+    hackathon = load_hackathon_or_404(event_id)
+    if not (hackathon.get(PLANNING_FIELD) or {}).get("enabled"):
+        return jsonify({"error": "Planning board not enabled"}), 404
+
+    subscription = board_events.subscribe(event_id)
+    if subscription is None:
+        resp = jsonify({"error": "Too many open board streams; poll with ?since= instead"})
+        resp.headers["Retry-After"] = "30"
+        return resp, 503
+
+    # Subscribed before reading the revision, so no commit can fall in between
+    revision = int((get_board_meta(event_id) or {}).get(REVISION_FIELD) or 0)
+    hello = {"type": "hello", "revision": revision, "resync": since is None or since < revision}
+
+    if request.args.get("transport") == "poll":
+        with subscription:
+            if hello["resync"]:
+                return jsonify({"revision": revision, "events": [hello]}), 200
+            event = subscription.get(timeout=LONG_POLL_TIMEOUT_SECONDS)
+            events = [event] + subscription.drain() if event else []
+        for event in events:
+            revision = max(revision, event.get("revision") or 0)
+        return jsonify({"revision": revision, "events": events}), 200
+
+    def generate():
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        yield _sse(hello)
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            yield _sse(event) if event else ": keepalive\n\n"
+
+    resp = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    # Runs whether or not the generator was ever started
+    resp.call_on_close(subscription.close)
+    return resp
+
+
 # ---------------------------------------------------------------------------
 # Advisory editing heartbeat (Redis-backed, gracefully degraded)
 # ---------------------------------------------------------------------------
@@ -1052,6 +1205,7 @@ def editing_heartbeat(event_id, card_id):
     if not planning.get("enabled"):
         return jsonify({"error": "Planning board not enabled"}), 404
 
+    editors = []
     try:
         from common.utils.redis_cache import get_redis_client
         rc = get_redis_client()
@@ -1060,12 +1214,18 @@ def editing_heartbeat(event_id, card_id):
             rc.set(key, 1, ex=30)
             # Collect all editors of this card
             pattern = f"planning:card:editing:{card_id}:*"
-            editors = [k.decode().split(":")[-1] for k in rc.keys(pattern)]
-            return jsonify({"editors": editors}), 200
+            editors = [k.decode().split(":")[-1] for k in rc.scan_iter(match=pattern, count=500)]
     except Exception:
         pass
 
-    return jsonify({"editors": []}), 200
+    # Stream clients learn who is editing without polling this endpoint
+    publish_board_event(event_id, {
+        "type": EVENT_PRESENCE,
+        "card_id": card_id,
+        "user_id": auth_user.user_id,
+        "editors": editors or [auth_user.user_id],
+    })
+    return jsonify({"editors": editors}), 200
 
 
 # ---------------------------------------------------------------------------
@@ -1130,13 +1290,12 @@ def rebalance_list(event_id, list_id):
     """Reissue evenly-spaced positions for all cards in a list (batch write).
 
     Called when the client detects position gap exhaustion. Each card in the
-    list gets a new position string; the batch commits atomically so concurrent
-    readers always see a consistent sort order.
+    list gets a new position string; the writes commit atomically with the
+    board revision bump so concurrent readers always see a consistent sort order.
 
     Cross-event safety: the parent list is fetched from g.hackathon (stashed by
     the decorator from the URL's event_id), not from the request body.
     """
-    db = get_db()
     href = _get_hackathon_ref(g.hackathon)
 
     # Verify the list belongs to this hackathon
@@ -1162,15 +1321,15 @@ def rebalance_list(event_id, list_id):
     step = max(1, 9998000 // (n + 1))
     now = _now_iso()
 
-    batch = db.batch()
+    writes = []
     new_positions = []
     for i, (card_id, _) in enumerate(cards):
         new_pos = f"p{(step * (i + 1)):07d}"
         new_positions.append(new_pos)
         card_ref = href.collection("planning_cards").document(card_id)
-        batch.update(card_ref, {"position": new_pos, "updated_at": now})
+        writes.append((OP_UPDATE, card_ref, {"position": new_pos, "updated_at": now}))
 
-    batch.commit()
+    revision = commit_board_writes(g.hackathon, writes)
 
     _record_activity(
         g.hackathon,
@@ -1179,7 +1338,7 @@ def rebalance_list(event_id, list_id):
         g.propel_user_id,
         list_id=list_id,
     )
-    return jsonify({"rebalanced": n, "positions": new_positions}), 200
+    return jsonify({"rebalanced": n, "positions": new_positions, "revision": revision}), 200
 
 
 @bp.route("/<event_id>/run-of-show/preview", methods=["GET"])
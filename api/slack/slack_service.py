@@ -2,7 +2,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from common.log import get_logger, info, warning, error
 from common.utils.slack import (
-    get_client, userlist, get_user_info, rate_limited_get_user_info, presence
+    get_client, userlist, get_user_info, rate_limited_get_user_info, get_slack_directory,
+    get_presence_tracker
 )
 from common.utils.redis_cache import redis_cached, clear_pattern
 from common.utils.oauth_providers import normalize_slack_user_id
@@ -11,7 +12,7 @@ from services.users_service import save_user
 
 logger = get_logger(__name__)
 
-@redis_cached(prefix="slack:active_users", ttl=10)  # Cache for 10 seconds
+@redis_cached(prefix="slack:active_users", ttl=10, stale_ttl=300, single_flight=True, early_expiration=1.0)
 def get_active_users(days: int = 30, include_presence: bool = False, minimum_presence: str = None, admin: bool = False) -> List[Dict[str, Any]]:
     """
     Get active Slack users based on their activity within the specified time period.
@@ -21,6 +22,10 @@ def get_active_users(days: int = 30, include_presence: bool = False, minimum_pre
         include_presence: Whether to include current presence information (default: False)
         minimum_presence: Filter by minimum presence status ('active' or 'away')
         
+    Presence comes from the background presence tracker (see
+    common/utils/slack_presence.py), so it costs no Slack calls here; members
+    it has not looked up yet are "unknown".
+
     Returns:
         List of active users with relevant information
     """
@@ -66,26 +71,21 @@ def get_active_users(days: int = 30, include_presence: bool = False, minimum_pre
             if admin:
                 user_info["email"] = member["profile"].get("email", "")
 
-            # Add presence information if requested
-            if include_presence and not member.get("deleted", False):
-                try:
-                    user_presence = presence(user_id=member["id"])
-                    user_info["presence"] = user_presence.get("presence", "unknown")
-                    print(f"User presence: {user_presence}")
-                    
-                    # Filter by minimum presence if specified
-                    if minimum_presence and user_info.get("presence") != minimum_presence:
-                        continue
-                except Exception as e:
-                    logger.warning(f"Failed to get presence for user {member['id']}: {str(e)}")
-                    user_info["presence"] = "unknown"
-            
             active_users.append(user_info)
-    
+
+    # Add presence information if requested
+    if include_presence:
+        presences = get_presence_tracker().get_many(user["id"] for user in active_users)
+        for user_info in active_users:
+            user_info["presence"] = presences[user_info["id"]]
+        # Filter by minimum presence if specified
+        if minimum_presence:
+            active_users = [user for user in active_users if user["presence"] == minimum_presence]
+
     logger.info(f"Found {len(active_users)} active users")
     return active_users
 
-@redis_cached(prefix="slack:user_details", ttl=10)  # Cache for 10 seconds
+@redis_cached(prefix="slack:user_details", ttl=10, stale_ttl=300, single_flight=True)
 def get_user_details(user_id: str) -> Optional[Dict[str, Any]]:
     """
     Get detailed information about a specific Slack user.
@@ -105,7 +105,11 @@ def get_user_details(user_id: str) -> Optional[Dict[str, Any]]:
             return None
         
         # Get presence information
-        user_presence = presence(user_id=user_id)
+        try:
+            user_presence = get_presence_tracker().get(user_id)
+        except Exception as e:
+            logger.warning(f"Failed to get presence for user {user_id}: {str(e)}")
+            user_presence = "unknown"
         
         # Format the response
         result = {
@@ -119,7 +123,7 @@ def get_user_details(user_id: str) -> Optional[Dict[str, Any]]:
             "image": user_info["profile"].get("image_192", ""),
             "status_text": user_info["profile"].get("status_text", ""),
             "status_emoji": user_info["profile"].get("status_emoji", ""),
-            "presence": user_presence.get("presence", "unknown"),
+            "presence": user_presence,
             "updated": user_info.get("updated", 0),
             "is_admin": user_info.get("is_admin", False),
             "is_owner": user_info.get("is_owner", False),
@@ -144,6 +148,7 @@ def clear_slack_cache() -> Dict[str, Any]:
     # Clear all Slack caches
     active_users_cleared = clear_pattern("slack:active_users:*")
     user_details_cleared = clear_pattern("slack:user_details:*")
+    get_slack_directory().invalidate()
     
     return {
         "success": active_users_cleared and user_details_cleared,
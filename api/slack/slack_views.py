@@ -8,7 +8,7 @@ from common.utils.slack import invite_user_to_channel
 from common.auth import auth
 from common.exceptions import AuthorizationError, ValidationError
 from common.log import get_logger
-from common.utils.slack import send_slack
+from common.utils.slack import send_slack, get_slack_queue_stats
 import logging
 
 logger = get_logger("slack_views")
@@ -192,6 +192,16 @@ def clear_cache():
             "error": "Failed to clear Slack cache"
         }), 500
 
+@bp.route("/slack/admin/queue/stats", methods=["GET"])
+@auth.require_user
+@auth.require_org_member_with_permission("volunteer.admin", req_to_org_id=getOrgId)
+def admin_queue_stats():
+    """
+    API endpoint for this worker's outbound Slack queue: depth, delivery
+    counters and enqueue-to-post latency.
+    """
+    return jsonify(get_slack_queue_stats())
+
 @bp.route("/slack/message", methods=["POST"])
 @auth.require_user
 @auth.require_org_member_with_permission("volunteer.admin", 
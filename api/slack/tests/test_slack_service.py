@@ -69,10 +69,6 @@ def mock_userlist_response():
         ]
     }
 
-@pytest.fixture
-def mock_presence_response():
-    return {"presence": "active"}
-
 @pytest.fixture
 def mock_user_info_response():
     return {
@@ -96,11 +92,10 @@ def mock_user_info_response():
     }
 
 @patch('api.slack.slack_service.userlist')
-@patch('api.slack.slack_service.presence')
-def test_get_active_users_default_params(mock_presence, mock_userlist, mock_userlist_response, mock_presence_response):
+@patch('api.slack.slack_service.get_presence_tracker')
+def test_get_active_users_default_params(mock_tracker, mock_userlist, mock_userlist_response):
     # Setup
     mock_userlist.return_value = mock_userlist_response
-    mock_presence.return_value = mock_presence_response
     
     # Execute
     result = get_active_users()
@@ -114,14 +109,14 @@ def test_get_active_users_default_params(mock_presence, mock_userlist, mock_user
     
     # Verify mocks
     mock_userlist.assert_called_once()
-    mock_presence.assert_not_called()
+    mock_tracker.assert_not_called()
 
 @patch('api.slack.slack_service.userlist')
-@patch('api.slack.slack_service.presence')
-def test_get_active_users_with_presence(mock_presence, mock_userlist, mock_userlist_response, mock_presence_response):
+@patch('api.slack.slack_service.get_presence_tracker')
+def test_get_active_users_with_presence(mock_tracker, mock_userlist, mock_userlist_response):
     # Setup
     mock_userlist.return_value = mock_userlist_response
-    mock_presence.return_value = mock_presence_response
+    mock_tracker.return_value.get_many.side_effect = lambda ids: {user_id: "active" for user_id in ids}
     
     # Execute
     result = get_active_users(include_presence=True)
@@ -133,7 +128,19 @@ def test_get_active_users_with_presence(mock_presence, mock_userlist, mock_userl
     
     # Verify mocks
     mock_userlist.assert_called_once()
-    mock_presence.assert_called_once_with(user_id="U123456")
+    # One lookup in the presence map for all active users, no per-member calls
+    mock_tracker.return_value.get_many.assert_called_once()
+
+@patch('api.slack.slack_service.userlist')
+@patch('api.slack.slack_service.get_presence_tracker')
+def test_get_active_users_minimum_presence(mock_tracker, mock_userlist, mock_userlist_response):
+    mock_userlist.return_value = mock_userlist_response
+    mock_tracker.return_value.get_many.side_effect = \
+        lambda ids: {user_id: ("active" if user_id == "U234567" else "away") for user_id in ids}
+
+    result = get_active_users(days=60, include_presence=True, minimum_presence="active")
+
+    assert [user["id"] for user in result] == ["U234567"]
 
 @patch('api.slack.slack_service.userlist')
 def test_get_active_users_with_longer_timeframe(mock_userlist, mock_userlist_response):
@@ -153,11 +160,11 @@ def test_get_active_users_with_longer_timeframe(mock_userlist, mock_userlist_res
     mock_userlist.assert_called_once()
 
 @patch('api.slack.slack_service.rate_limited_get_user_info')
-@patch('api.slack.slack_service.presence')
-def test_get_user_details(mock_presence, mock_get_user_info, mock_user_info_response, mock_presence_response):
+@patch('api.slack.slack_service.get_presence_tracker')
+def test_get_user_details(mock_tracker, mock_get_user_info, mock_user_info_response):
     # Setup
     mock_get_user_info.return_value = mock_user_info_response
-    mock_presence.return_value = mock_presence_response
+    mock_tracker.return_value.get.return_value = "active"
     
     # Execute
     result = get_user_details("U123456")
@@ -172,7 +179,7 @@ def test_get_user_details(mock_presence, mock_get_user_info, mock_user_info_resp
     
     # Verify mocks
     mock_get_user_info.assert_called_once_with("U123456")
-    mock_presence.assert_called_once_with(user_id="U123456")
+    mock_tracker.return_value.get.assert_called_once_with("U123456")
 
 @patch('api.slack.slack_service.rate_limited_get_user_info')
 def test_get_user_details_not_found(mock_get_user_info):
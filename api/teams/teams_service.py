@@ -5,7 +5,9 @@ from db.db import get_db, get_user_doc_reference
 from api.messages.messages_service import get_problem_statement_from_id_old
 from services.teams_service import get_teams_list, get_team
 from services.nonprofits_service import get_single_npo
+from services.funnel_rollup_service import refresh_event_rollup
 from common.utils.firestore_helpers import clear_all_caches as clear_cache
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
 from services.users_service import (
     get_propel_user_details_by_id,
     save_user,
@@ -239,10 +241,12 @@ def remove_team(team_id):
         event_collection.set({
             "teams": new_teams
         }, merge=True)
+        invalidate_hackathon_catalog(hackathon_db_id)
 
     # Delete the team document
     team_doc.delete()
     logger.info("Deleted team document")
+    refresh_event_rollup(hackathon_event_id)
 
     logger.info("Team %s removed", team_data["name"])
 
@@ -325,6 +329,9 @@ def edit_team(json):
     if len(update_data) > 0:
         team_doc.set(update_data, merge=True)
         clear_cache()  # Clear the cache to ensure updated data is reflected
+
+        if "status" in update_data and update_data["status"] != team_data.get("status"):
+            refresh_event_rollup(update_data.get("hackathon_event_id") or team_data.get("hackathon_event_id"))
         
         return {
             "message": "Team updated successfully",
@@ -507,11 +514,13 @@ Let's make a difference! :muscle: :heart:
     event_collection.set({
         "teams": new_teams
     }, merge=True)
+    invalidate_hackathon_catalog(hackathon_db_id)
 
     # Clear the cache
     logger.info("Clearing cache for event_id=%s doc_id=%s",
                 hackathon_db_id, doc_id)
     clear_cache()
+    refresh_event_rollup(hackathon_event_id)
 
     # Get the team
     team = get_teams_list(doc_id)
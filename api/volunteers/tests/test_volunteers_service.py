@@ -8,7 +8,9 @@ from services.volunteers_service import (
     get_volunteers_by_event,
     get_user_hackathon_attendance,
     _did_volunteer_attend,
+    _clear_volunteer_caches,
     generate_qr_code,
+    get_resend_email_statuses,
 )
 
 # Mock data for tests
@@ -184,8 +186,9 @@ def test_did_volunteer_attend_filter_rules():
     assert _did_volunteer_attend({"volunteer_type": ""}) is False
 
 
+@patch('common.utils.request_loader.get_catalog', return_value=None)
 @patch('services.volunteers_service.get_db')
-def test_get_user_hackathon_attendance_filters_and_groups(mock_get_db):
+def test_get_user_hackathon_attendance_filters_and_groups(mock_get_db, mock_catalog):
     mock_db = MagicMock()
     mock_get_db.return_value = mock_db
 
@@ -257,6 +260,7 @@ def test_get_user_hackathon_attendance_filters_and_groups(mock_get_db):
     hackathon_collection = MagicMock()
     hackathon_where = MagicMock()
     hackathon_where.limit.return_value = hackathon_evt_a_query
+    hackathon_where.stream.return_value = [hackathon_snap]
     hackathon_collection.where.return_value = hackathon_where
 
     def collection_router(name):
@@ -316,4 +320,38 @@ def test_generate_qr_code_special_characters():
     # Assertions
     assert qr_image_bytes is not None
     assert isinstance(qr_image_bytes, bytes)
-    assert len(qr_image_bytes) > 0
\ No newline at end of file
+    assert len(qr_image_bytes) > 0
+
+@patch('services.volunteers_service.set_many')
+@patch('services.volunteers_service.get_many')
+@patch('services.volunteers_service.resend.Emails.get')
+def test_resend_statuses_batch_cache_reads_and_writes(mock_emails_get, mock_get_many, mock_set_many, monkeypatch):
+    """Cached statuses come from one get_many; fresh ones are written back per TTL."""
+    monkeypatch.setenv('RESEND_EMAIL_STATUS_KEY', 'test-key')
+    mock_get_many.return_value = {"resend:status:e1": {"id": "e1", "last_event": "delivered"}}
+    mock_emails_get.side_effect = lambda eid: {
+        "e2": {"to": ["a@b.c"], "subject": "Hi", "created_at": "", "last_event": "delivered"},
+        "e3": {"to": ["d@e.f"], "subject": "Yo", "created_at": "", "last_event": "sent"},
+    }[eid]
+
+    with patch('services.volunteers_service.time.sleep'):
+        result = get_resend_email_statuses(["e1", "e2", "e3"])
+
+    assert result['success'] is True
+    assert set(result['statuses']) == {"e1", "e2", "e3"}
+    mock_get_many.assert_called_once()
+    assert mock_emails_get.call_count == 2
+    written = {ttl: set(mapping) for (mapping,), kwargs in mock_set_many.call_args_list for ttl in [kwargs['ttl']]}
+    assert written == {7 * 24 * 3600: {"resend:status:e2"}, 120: {"resend:status:e3"}}
+
+
+@patch('services.volunteers_service.clear_namespace')
+@patch('services.volunteers_service.delete_many')
+def test_clear_volunteer_caches_batches_deletes(mock_delete_many, mock_clear_namespace):
+    _clear_volunteer_caches("u1", "a@b.c", "evt", "mentor")
+
+    mock_delete_many.assert_called_once_with([
+        "volunteer:by_user_id:u1:evt:mentor",
+        "volunteer:by_email:a@b.c:evt:mentor",
+    ])
+    mock_clear_namespace.assert_called_once_with("volunteer:by_event:evt:mentor")
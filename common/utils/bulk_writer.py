@@ -0,0 +1,387 @@
+"""
+Batched, concurrent Firestore writes for the import and backfill scripts.
+
+Scripts queue set/update/delete operations on a BulkWriter instead of writing
+row by row. Operations are committed in batches of up to MAX_BATCH_OPS (the
+Firestore limit per commit) on a small thread pool, so a large Devpost export
+is a few dozen commits instead of thousands of sequential round-trips.
+Transient commit errors are retried with exponential backoff; a batch that
+still fails is counted and logged while the others carry on.
+
+Batches commit concurrently and in no particular order. Queue at most one
+write per document, or call flush() between writes that depend on each other.
+
+With dry_run=True nothing is written: every operation is compared with the
+current document (and with earlier operations on the same document) and the
+field-level changes are kept in `changes` for printing.
+
+resolve_users_by_email() looks users up with chunked `in` queries, run on the
+same kind of pool, instead of one query per email.
+
+Clients without batch() (MockFirestore in tests) get the same operations
+applied one document at a time.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional
+
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+
+from common.log import get_logger, info, warning
+
+logger = get_logger("bulk_writer")
+
+MAX_BATCH_OPS = 500
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 16.0
+GET_ALL_CHUNK = 300
+
+# Firestore allows up to 30 values in an `in` filter
+IN_QUERY_CHUNK = 30
+USERS_COLLECTION = "users"
+EMAIL_FIELD = "email_address"
+
+RETRYABLE_ERRORS = (
+    gexc.Aborted,
+    gexc.DeadlineExceeded,
+    gexc.InternalServerError,
+    gexc.ResourceExhausted,
+    gexc.ServiceUnavailable,
+    gexc.TooManyRequests,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def ref_path(ref) -> str:
+    """'collection/doc' for a DocumentReference (or MockFirestore's stand-in)."""
+    path = getattr(ref, "path", None)
+    if isinstance(path, str):
+        return path
+    return "/".join(ref._path)
+
+
+def _comparable(value: Any) -> Any:
+    # DocumentReferences compare by path; MockFirestore's only by identity
+    if hasattr(value, "collection") and hasattr(value, "parent") and hasattr(value, "id"):
+        return ("ref", ref_path(value))
+    if isinstance(value, list):
+        return [_comparable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _comparable(v) for k, v in value.items()}
+    return value
+
+
+def _merge(current: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    # What set(merge=True) leaves behind: nested maps merge, the rest replaces
+    merged = dict(current)
+    for key, value in data.items():
+        if value is firestore.DELETE_FIELD:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _update(current: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
+    # What update() leaves behind: keys are dotted field paths
+    updated = dict(current)
+    for path, value in data.items():
+        *parents, leaf = path.split(".")
+        node = updated
+        for part in parents:
+            child = node.get(part)
+            node[part] = dict(child) if isinstance(child, dict) else {}
+            node = node[part]
+        if value is firestore.DELETE_FIELD:
+            node.pop(leaf, None)
+        else:
+            node[leaf] = value
+    return updated
+
+
+def field_changes(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Dict[str, tuple]:
+    """{field: (old, new)} for top-level fields that differ; missing fields are None."""
+    before, after = before or {}, after or {}
+    changes = {}
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key), after.get(key)
+        if _comparable(old) != _comparable(new):
+            changes[key] = (old, new)
+    return changes
+
+
+class _Op:
+    __slots__ = ("kind", "ref", "data", "merge")
+
+    def __init__(self, kind: str, ref, data: Optional[Dict[str, Any]] = None, merge: bool = False):
+        self.kind = kind
+        self.ref = ref
+        self.data = data
+        self.merge = merge
+
+
+class BulkWriter:
+    """
+    Queue Firestore writes and commit them in concurrent batches.
+
+    Use as a context manager (or call close()) so the last partial batch is
+    committed and the pool shut down:
+
+        with BulkWriter(db, dry_run=not args.apply, label="users") as writer:
+            for row in rows:
+                writer.set(db.collection("users").document(row["id"]), row, merge=True)
+        writer.report()
+    """
+
+    def __init__(self, db, dry_run: bool = False, batch_size: int = MAX_BATCH_OPS,
+                 max_workers: int = DEFAULT_MAX_WORKERS, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 label: str = "writes"):
+        self.db = db
+        self.dry_run = dry_run
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_OPS))
+        self.max_attempts = max(1, max_attempts)
+        self.label = label
+        self.changes: List[Dict[str, Any]] = []  # dry run: {path, action, fields}
+        self._pending: List[_Op] = []
+        self._shadow: Dict[str, Optional[Dict[str, Any]]] = {}  # dry run: path -> planned doc
+        self._executor = None if dry_run else ThreadPoolExecutor(max_workers=max(1, max_workers))
+        # At most two batches waiting per worker, so queueing cannot outrun the commits
+        self._slots = threading.BoundedSemaphore(max(1, max_workers) * 2)
+        self._futures = []
+        self._lock = threading.Lock()
+        self._started = None
+        self._elapsed = 0.0
+        self._stats = {"queued": 0, "written": 0, "failed": 0, "batches": 0, "retries": 0}
+        self.errors: List[str] = []
+
+    # -- queueing ----------------------------------------------------------
+
+    def set(self, ref, data: Dict[str, Any], merge: bool = False) -> None:
+        self._add(_Op("set", ref, data, merge))
+
+    def update(self, ref, data: Dict[str, Any]) -> None:
+        self._add(_Op("update", ref, data))
+
+    def delete(self, ref) -> None:
+        self._add(_Op("delete", ref))
+
+    def _add(self, op: _Op) -> None:
+        if self._started is None:
+            self._started = time.monotonic()
+        self._stats["queued"] += 1
+        self._pending.append(op)
+        if len(self._pending) >= self.batch_size:
+            self._submit()
+
+    def _submit(self) -> None:
+        ops, self._pending = self._pending, []
+        if not ops:
+            return
+        if self.dry_run:
+            self._diff(ops)
+            return
+        self._slots.acquire()
+        future = self._executor.submit(self._commit_with_retry, ops)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def flush(self) -> Dict[str, Any]:
+        """Commit everything queued so far and wait for it; returns stats()."""
+        self._submit()
+        futures, self._futures = self._futures, []
+        wait(futures)
+        if self._started is not None:
+            self._elapsed = time.monotonic() - self._started
+        return self.stats()
+
+    def close(self) -> Dict[str, Any]:
+        stats = self.flush()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        return stats
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            # Do not start new batches after a failure; finish the ones in flight
+            self._pending = []
+        self.close()
+
+    # -- committing --------------------------------------------------------
+
+    def _commit(self, ops: List[_Op]) -> None:
+        if not hasattr(self.db, "batch"):
+            for op in ops:
+                if op.kind == "set":
+                    op.ref.set(op.data, merge=op.merge)
+                elif op.kind == "update":
+                    op.ref.update(op.data)
+                else:
+                    op.ref.delete()
+            return
+        batch = self.db.batch()
+        for op in ops:
+            if op.kind == "set":
+                batch.set(op.ref, op.data, merge=op.merge)
+            elif op.kind == "update":
+                batch.update(op.ref, op.data)
+            else:
+                batch.delete(op.ref)
+        batch.commit()
+
+    def _commit_with_retry(self, ops: List[_Op]) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self._commit(ops)
+            except Exception as e:
+                if attempt == self.max_attempts or not isinstance(e, RETRYABLE_ERRORS):
+                    with self._lock:
+                        self._stats["failed"] += len(ops)
+                        self.errors.append(f"{len(ops)} ops starting at {ref_path(ops[0].ref)}: {e}")
+                    warning(logger, "Bulk write batch failed", label=self.label, ops=len(ops),
+                            attempts=attempt, exc_info=e)
+                    return
+                with self._lock:
+                    self._stats["retries"] += 1
+                delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+            else:
+                with self._lock:
+                    self._stats["written"] += len(ops)
+                    self._stats["batches"] += 1
+                return
+
+    # -- dry run -----------------------------------------------------------
+
+    def _diff(self, ops: List[_Op]) -> None:
+        unseen = {}
+        for op in ops:
+            path = ref_path(op.ref)
+            if path not in self._shadow:
+                unseen[path] = op.ref
+        for path, snap in zip(unseen, get_snapshots(self.db, unseen.values())):
+            self._shadow[path] = snap.to_dict() if snap.exists else None
+
+        for op in ops:
+            path = ref_path(op.ref)
+            before = self._shadow[path]
+            if op.kind == "delete":
+                after = None
+            elif op.kind == "update":
+                if before is None:
+                    self.changes.append({"path": path, "action": "error", "fields": {}})
+                    continue
+                after = _update(before, op.data)
+            elif op.merge and before is not None:
+                after = _merge(before, op.data)
+            else:
+                after = _merge({}, op.data)
+            self._shadow[path] = after
+
+            if before is None and after is None:
+                action = "unchanged"
+            elif before is None:
+                action = "create"
+            elif after is None:
+                action = "delete"
+            else:
+                action = "update"
+            fields = field_changes(before, after)
+            if action == "update" and not fields:
+                action = "unchanged"
+            self.changes.append({"path": path, "action": action, "fields": fields})
+
+    # -- reporting ---------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["seconds"] = round(self._elapsed, 3)
+        stats["per_second"] = round(stats["written"] / self._elapsed, 1) if self._elapsed else 0.0
+        if self.dry_run:
+            for change in self.changes:
+                stats[change["action"]] = stats.get(change["action"], 0) + 1
+        return stats
+
+    def report(self, limit: int = 20) -> None:
+        """Print throughput (or, in a dry run, the planned changes)."""
+        stats = self.stats()
+        if not self.dry_run:
+            print(f"{self.label}: wrote {stats['written']}/{stats['queued']} in {stats['batches']} batch(es), "
+                  f"{stats['seconds']:.2f}s ({stats['per_second']:.0f} writes/s), "
+                  f"{stats['retries']} retries, {stats['failed']} failed")
+            for error in self.errors[:limit]:
+                print(f"  FAILED {error}")
+            info(logger, "Bulk write finished", label=self.label, **stats)
+            return
+
+        counts = ", ".join(f"{stats.get(a, 0)} {a}" for a in ("create", "update", "delete", "unchanged", "error"))
+        print(f"{self.label}: DRY-RUN {stats['queued']} operation(s): {counts}")
+        shown = [c for c in self.changes if c["action"] != "unchanged"][:limit]
+        for change in shown:
+            print(f"  {change['action'].upper():7} {change['path']}")
+            for field, (old, new) in change["fields"].items():
+                print(f"      {field}: {_short(old)}  ->  {_short(new)}")
+
+
+def _short(value: Any, n: int = 80) -> str:
+    s = repr(_comparable(value))
+    return s if len(s) <= n else s[: n - 3] + "..."
+
+
+def get_snapshots(db, refs: Iterable[Any]) -> List[Any]:
+    """Snapshots for refs in the same order, read with chunked get_all."""
+    refs = list(refs)
+    by_path = {}
+    for start in range(0, len(refs), GET_ALL_CHUNK):
+        for snap in db.get_all(refs[start:start + GET_ALL_CHUNK]):
+            by_path[ref_path(snap.reference)] = snap
+    return [by_path[ref_path(ref)] for ref in refs]
+
+
+def resolve_users_by_email(db, emails: Iterable[str], max_workers: int = DEFAULT_MAX_WORKERS,
+                           scan_threshold: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    {lowercase email: {"id": doc_id, **user_doc}} for users with those emails.
+
+    Emails are matched exactly (lowercased) with chunked `in` queries run
+    concurrently. User docs store emails as typed, so with scan_threshold set
+    and at least that many misses, one streaming pass over users matches the
+    remaining emails case-insensitively.
+    """
+    unique = sorted({(e or "").strip().lower() for e in emails} - {""})
+    found: Dict[str, Dict[str, Any]] = {}
+    if not unique:
+        return found
+
+    def query(chunk):
+        docs = db.collection(USERS_COLLECTION).where(EMAIL_FIELD, "in", chunk).stream()
+        return [(d.id, d.to_dict() or {}) for d in docs]
+
+    chunks = [unique[i:i + IN_QUERY_CHUNK] for i in range(0, len(unique), IN_QUERY_CHUNK)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        for rows in pool.map(query, chunks):
+            for doc_id, data in rows:
+                email = (data.get(EMAIL_FIELD) or "").strip().lower()
+                if email:
+                    found.setdefault(email, {"id": doc_id, **data})
+
+    misses = set(unique) - set(found)
+    if scan_threshold is not None and len(misses) >= scan_threshold:
+        for d in db.collection(USERS_COLLECTION).stream():
+            data = d.to_dict() or {}
+            email = (data.get(EMAIL_FIELD) or "").strip().lower()
+            if email in misses:
+                found[email] = {"id": d.id, **data}
+                misses.discard(email)
+    return found
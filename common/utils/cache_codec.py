@@ -0,0 +1,129 @@
+"""
+Serialization for values stored in Redis by common.utils.redis_cache.
+
+Every encoded payload starts with a one-byte header naming its codec, so the
+format can change without flushing Redis. Entries written before headers
+existed are plain JSON and always start with an ASCII character, which never
+collides with a header byte. Releases from before this module cannot read
+headers at all, so redis_cache stores these payloads under its versioned
+KEY_PREFIX, where those releases never look.
+"""
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+# Header bytes. Anything else is treated as a legacy, header-less JSON entry.
+HEADER_MSGPACK = b"\x01"
+HEADER_MSGPACK_ZLIB = b"\x02"
+HEADER_JSON = b"\x03"
+HEADER_JSON_ZLIB = b"\x04"
+
+# Payloads at least this large are zlib-compressed before storage
+COMPRESSION_THRESHOLD_BYTES = 4096
+# Level 1 trades a little ratio for much cheaper compression on the hot path
+COMPRESSION_LEVEL = 1
+
+# msgpack extension type codes
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+
+CODEC_MSGPACK = "msgpack"
+CODEC_JSON = "json"
+
+
+def _to_serializable(obj: Any) -> Any:
+    """Flatten types that neither msgpack nor json handle natively."""
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Firestore DocumentReference (duck-typed to avoid importing firebase here)
+    path = getattr(obj, "path", None)
+    if isinstance(path, str) and hasattr(obj, "collection"):
+        return path
+    raise TypeError(f"Object of type {type(obj).__name__} is not cache serializable")
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    return _to_serializable(obj)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return _to_serializable(obj)
+
+
+def default_codec() -> str:
+    """Codec used for new writes: msgpack when installed, JSON otherwise."""
+    return CODEC_MSGPACK if HAS_MSGPACK else CODEC_JSON
+
+
+def encode(value: Any, codec: str = None) -> bytes:
+    """
+    Serialize a value for Redis.
+
+    datetimes and dates round-trip through the msgpack codec (the JSON codec
+    stores them as ISO strings); sets become lists and Firestore
+    DocumentReferences are stored as their document path.
+
+    Args:
+        value: Value to encode
+        codec: "msgpack" or "json"; defaults to default_codec()
+
+    Returns:
+        Header byte followed by the (possibly compressed) payload
+    """
+    codec = codec or default_codec()
+    if codec == CODEC_MSGPACK:
+        body = msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+        header, compressed_header = HEADER_MSGPACK, HEADER_MSGPACK_ZLIB
+    elif codec == CODEC_JSON:
+        body = json.dumps(value, default=_json_default, separators=(",", ":")).encode()
+        header, compressed_header = HEADER_JSON, HEADER_JSON_ZLIB
+    else:
+        raise ValueError(f"Unknown cache codec: {codec}")
+
+    if len(body) >= COMPRESSION_THRESHOLD_BYTES:
+        return compressed_header + zlib.compress(body, COMPRESSION_LEVEL)
+    return header + body
+
+
+def decode(raw: bytes) -> Any:
+    """Deserialize a value written by encode() or by the legacy json.dumps path."""
+    if isinstance(raw, str):
+        return json.loads(raw)
+
+    header, body = raw[:1], raw[1:]
+    if header == HEADER_MSGPACK:
+        return msgpack.unpackb(body, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+    if header == HEADER_MSGPACK_ZLIB:
+        return msgpack.unpackb(zlib.decompress(body), ext_hook=_msgpack_ext_hook,
+                               raw=False, strict_map_key=False)
+    if header == HEADER_JSON:
+        return json.loads(body)
+    if header == HEADER_JSON_ZLIB:
+        return json.loads(zlib.decompress(body))
+    # Legacy entry written by json.dumps before codecs existed
+    return json.loads(raw)
+
+
+def is_compressed(raw: bytes) -> bool:
+    return raw[:1] in (HEADER_MSGPACK_ZLIB, HEADER_JSON_ZLIB)
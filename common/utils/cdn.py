@@ -6,6 +6,7 @@ import os
 import sys
 import logging
 import json
+from functools import lru_cache
 
 # add logger
 logger = logging.getLogger(__name__)
@@ -25,13 +26,19 @@ CDN_SERVER = os.getenv("CDN_SERVER")
 GCLOUD_CDN_BUCKET = os.getenv("GCLOUD_CDN_BUCKET")
 GOOGLE_APPLICATION_CREDENTIALS = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 
-def upload_to_cdn(directory, source_file_name, destination_file_name=None):
-    """Uploads a file to the bucket."""
+@lru_cache(maxsize=1)
+def _get_bucket():
+    """The CDN bucket; the storage client is created once per process."""
     gcp_json_credentials_dict = json.loads(GOOGLE_APPLICATION_CREDENTIALS)
     creds = service_account.Credentials.from_service_account_info(gcp_json_credentials_dict)
     project_name = GCLOUD_CDN_BUCKET.split("_")[0]
     storage_client = storage.Client(project=project_name,credentials=creds)
-    bucket = storage_client.bucket(GCLOUD_CDN_BUCKET)
+    return storage_client.bucket(GCLOUD_CDN_BUCKET)
+
+
+def upload_to_cdn(directory, source_file_name, destination_file_name=None):
+    """Uploads a file to the bucket."""
+    bucket = _get_bucket()
     
     # Use destination_file_name if provided, otherwise use source_file_name
     blob_filename = destination_file_name if destination_file_name else source_file_name
@@ -58,4 +65,12 @@ def upload_to_cdn(directory, source_file_name, destination_file_name=None):
         f"File {source_file_name} uploaded to {directory}/{blob_filename}."
     )
 
-    return f"{CDN_SERVER}/{directory}/{blob_filename}"
\ No newline at end of file
+    return f"{CDN_SERVER}/{directory}/{blob_filename}"
+
+
+def upload_bytes_to_cdn(directory, destination_file_name, data, content_type="image/png"):
+    """Uploads in-memory data to the bucket (overwriting) and returns its CDN URL."""
+    blob = _get_bucket().blob(f"{directory}/{destination_file_name}")
+    blob.upload_from_string(data, content_type=content_type)
+    logger.info(f"{len(data)} bytes uploaded to {directory}/{destination_file_name}.")
+    return f"{CDN_SERVER}/{directory}/{destination_file_name}"
@@ -8,6 +8,9 @@ import re
 from google.cloud.firestore import FieldFilter
 # Import OAuth utilities for handling multiple providers (Slack, Google, etc.)
 from common.utils.oauth_providers import SLACK_PREFIX, normalize_slack_user_id, is_oauth_user_id
+from common.utils.hackathon_catalog import get_catalog, invalidate_hackathon_catalog
+from common.utils.user_directory import hearts_fields, refresh_user_in_directory
+from common.utils.request_metrics import instrument_firestore
 
 
 cert_env = json.loads(safe_get_env_var("FIREBASE_CERT_CONFIG"))
@@ -53,7 +56,7 @@ def get_db():
     if safe_get_env_var("ENVIRONMENT") == "test":
         return mockfirestore
     
-    return firestore.client()
+    return instrument_firestore(firestore.client())
 
 def get_team_by_name(team_name):
     db = get_db()  # this connects to our Firestore database
@@ -207,7 +210,8 @@ def create_user(name, email_address, slack_id):
             "user_id": slack_id
         }
         logger.info(f"Adding user {user}")
-        db.collection("users").add(user)
+        _, user_ref = db.collection("users").add(user)
+        refresh_user_in_directory(user_ref.id)
         return user
 
 def add_user_to_team(userid, teamid):
@@ -325,6 +329,7 @@ def delete_user_by_id(userid):
 
     # Delete user
     db.collection("users").document(userid).delete()
+    refresh_user_in_directory(userid)
 
 def add_user_by_email_to_team(email_address, team_name):
     db = get_db()  # this connects to our Firestore database
@@ -438,6 +443,7 @@ def add_team_to_hackathon(team_id, hackathon_id):
     else:
         hackathon_teams.append(team.reference)
         db.collection("hackathons").document(hackathon_id).set({"teams": hackathon_teams}, merge=True)
+        invalidate_hackathon_catalog(hackathon_id)
 
     
 
@@ -672,6 +678,7 @@ def create_new_hackathon(title, type, links, teams, donation_current, donation_g
     }
     logger.info(f"Adding hackathon {hackathon}")
     db.collection("hackathons").add(hackathon)
+    invalidate_hackathon_catalog()
     return hackathon
 
 def add_hackathon_to_user_and_teams(hackathon_id):
@@ -718,7 +725,21 @@ def add_hackathon_to_user_and_teams(hackathon_id):
             # Commit all updates in a single batch
             batch.commit()
 
+def _catalog_hackathon(field, value, return_reference):
+    """Serve a hackathon lookup from the in-memory catalog; None when disabled or not found."""
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    hackathon = catalog.by_event_id(value) if field == "event_id" else catalog.by_title(value)
+    if hackathon is not None and return_reference:
+        return get_db().collection('hackathons').document(hackathon["id"])
+    return hackathon
+
+
 def get_hackathon_by_event_id(event_id, return_reference=False):
+    if get_catalog() is not None:
+        return _catalog_hackathon("event_id", event_id, return_reference)
+
     db = get_db()  # this connects to our Firestore database
     docs = db.collection('hackathons').where("event_id", "==", event_id).stream()
 
@@ -731,6 +752,9 @@ def get_hackathon_by_event_id(event_id, return_reference=False):
         return adict
     
 def get_hackathon_by_title(hackathon_title, return_reference=False):
+    if get_catalog() is not None:
+        return _catalog_hackathon("title", hackathon_title, return_reference)
+
     db = get_db()  # this connects to our Firestore database
     docs = db.collection('hackathons').where("title", "==", hackathon_title).stream()
 
@@ -743,6 +767,9 @@ def get_hackathon_by_title(hackathon_title, return_reference=False):
         return adict
 
 def get_hackathon_reference_by_title(hackathon_title):
+    if get_catalog() is not None:
+        return _catalog_hackathon("title", hackathon_title, True)
+
     db = get_db()  # this connects to our Firestore database
     docs = db.collection('hackathons').where("title", "==", hackathon_title).stream()
 
@@ -943,6 +970,7 @@ def add_nonprofit_to_hackathon(nonprofit_name, hackathon_event_id):
     else:
         hackathon_nonprofits.append(nonprofit_doc.reference)
         db.collection("hackathons").document(hackathon["id"]).set({"nonprofits": hackathon_nonprofits}, merge=True)
+        invalidate_hackathon_catalog(hackathon["id"])
         #log result
         logger.info(f"Nonprofit {nonprofit_name} added to hackathon {hackathon_event_id}")
 
@@ -1001,7 +1029,8 @@ def add_certificate(user_id, certificate, timestamp=None, reasons=None, hearts=N
         user_history["certificates"].append(certificate)
 
     # Update user
-    db.collection("users").document(user_id).set({"history": user_history}, merge=True)    
+    db.collection("users").document(user_id).set({"history": user_history, **hearts_fields(user_history)}, merge=True)    
+    refresh_user_in_directory(user_id)
    
 
 def add_hearts_for_user(user_id, hearts, reason):
@@ -1092,8 +1121,9 @@ def add_hearts_for_user(user_id, hearts, reason):
     else:
         raise Exception(f"Invalid reason: {reason}")                
 
-    # Update user history
-    db.collection("users").document(user_id).set({"history": user_history}, merge=True)
+    # Update user history along with its denormalized totals
+    db.collection("users").document(user_id).set({"history": user_history, **hearts_fields(user_history)}, merge=True)
+    refresh_user_in_directory(user_id)
 
 
 # Get all project_applications
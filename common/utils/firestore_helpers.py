@@ -8,16 +8,58 @@ from firebase_admin import firestore
 from firebase_admin.firestore import DocumentReference, DocumentSnapshot
 
 from common.log import get_logger
+from common.utils import metrics
 
 logger = get_logger("firestore_helpers")
 
-# Registry of caches to clear
+# Registry of caches to clear, as (name, cache) pairs
 _cache_registry = []
 
 
-def register_cache(cache_obj):
-    """Register a cache for bulk clearing via clear_all_caches()."""
-    _cache_registry.append(cache_obj)
+class CountingTTLCache(TTLCache):
+    """TTLCache that counts lookups, for the hit ratios on /metrics.
+
+    Counts are per process and not locked; an occasional lost increment
+    does not matter for a ratio.
+    """
+
+    def __init__(self, maxsize, ttl, **kwargs):
+        super().__init__(maxsize, ttl, **kwargs)
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.hits += 1
+        return value
+
+    def __missing__(self, key):
+        self.misses += 1
+        raise KeyError(key)
+
+
+def register_cache(cache_obj, name=None):
+    """Register a cache for bulk clearing via clear_all_caches() and for /metrics.
+
+    Caches are reported under `name` (by default the function or class
+    name); hit and miss counts are only available for CountingTTLCache.
+    """
+    name = name or getattr(cache_obj, "__name__", type(cache_obj).__name__)
+    _cache_registry.append((name, cache_obj))
+
+
+def _collect_cache_metrics():
+    for name, cache_obj in [("doc_to_json", doc_to_json)] + _cache_registry:
+        # @cached functions expose their cache object as .cache
+        cache = getattr(cache_obj, "cache", cache_obj)
+        if isinstance(cache, CountingTTLCache):
+            yield "ohack_cache_hits_total", {"cache": name}, cache.hits
+            yield "ohack_cache_misses_total", {"cache": name}, cache.misses
+        if hasattr(cache, "__len__"):
+            yield "ohack_cache_entries", {"cache": name}, len(cache)
+
+
+metrics.register_collector(_collect_cache_metrics)
 
 
 def clear_all_caches():
@@ -28,7 +70,7 @@ def clear_all_caches():
     as a TTLCache (which uses `.clear()`). Try both.
     """
     doc_to_json.cache_clear()
-    for cache_obj in _cache_registry:
+    for _, cache_obj in _cache_registry:
         try:
             if hasattr(cache_obj, "cache_clear"):
                 cache_obj.cache_clear()
@@ -58,7 +100,7 @@ def log_execution_time(func):
     return wrapper
 
 
-@cached(cache=TTLCache(maxsize=2000, ttl=3600), lock=threading.Lock(), key=hash_key)
+@cached(cache=CountingTTLCache(maxsize=2000, ttl=3600), lock=threading.Lock(), key=hash_key)
 def doc_to_json(docid=None, doc=None, depth=0):
     if not docid:
         logger.debug("docid is NoneType")
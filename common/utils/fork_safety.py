@@ -0,0 +1,65 @@
+"""
+Per-process start of background threads and pools.
+
+gunicorn --preload imports the app once and then forks the workers, and
+threads (listeners, publishers, executor workers) do not survive a fork:
+a worker inherits the parent's objects but none of their threads. Anything
+that owns a thread starts it lazily through a OncePerProcess, which
+os.register_at_fork resets in every child so the child starts its own on
+first use.
+"""
+import os
+import threading
+import weakref
+from typing import Callable, Optional
+
+_instances = weakref.WeakSet()
+
+
+class OncePerProcess:
+    """
+    Run start() once per process, on first ensure().
+
+    start() may return False when it could not start (Redis is down, say);
+    the next ensure() tries again. after_fork runs in the child right after a
+    fork, before anything else, to drop state that belonged to the parent.
+    """
+
+    def __init__(self, start: Callable[[], Optional[bool]], after_fork: Optional[Callable[[], None]] = None):
+        self._start = start
+        self._after_fork = after_fork
+        self._lock = threading.Lock()
+        self._started = False
+        _instances.add(self)
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def ensure(self) -> None:
+        if self._started:
+            return
+        with self._lock:
+            if not self._started:
+                self._started = self._start() is not False
+
+    def reset(self) -> None:
+        """Call when the thread stops on its own, so the next ensure() restarts it."""
+        with self._lock:
+            self._started = False
+
+    def _reset_in_child(self) -> None:
+        # The parent's lock may have been held by a thread that is gone here
+        self._lock = threading.Lock()
+        self._started = False
+        if self._after_fork is not None:
+            self._after_fork()
+
+
+def _after_fork_in_child() -> None:
+    for instance in list(_instances):
+        instance._reset_in_child()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,253 @@
+"""
+Process-wide catalog of hackathon documents.
+
+Hackathon docs are read on almost every hot path but change rarely. The
+catalog keeps every doc in memory keyed by event_id, doc id and title, so
+get_hackathon_by_event_id() and friends are dictionary hits with no
+Firestore reads in the steady state.
+
+Freshness:
+  - With a real Firestore client a snapshot listener on the collection applies
+    changes as they land, from any writer.
+  - Otherwise (emulator without watch support, MockFirestore, or a listener
+    that stopped) the catalog reloads the collection when the shared version
+    in Redis changes or after max_age_seconds.
+  - Write paths call invalidate(), which bumps that version so every worker
+    reloads on its next lookup.
+
+An event_id or title that is not in the catalog falls through to a direct
+query, so a doc created out of band is found before the catalog catches up.
+"""
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Optional
+
+from common.log import get_logger, info, warning
+from common.utils.fork_safety import OncePerProcess
+from common.utils.redis_cache import get_cached, set_cached
+
+logger = get_logger("hackathon_catalog")
+
+COLLECTION = "hackathons"
+
+# Bounds the negative cache against lookups for made-up event ids
+MAX_MISSING_ENTRIES = 1000
+
+
+def _enabled() -> bool:
+    return os.environ.get("HACKATHON_CATALOG_ENABLED", "true").lower() not in ("0", "false", "no")
+
+
+def _copy_containers(value):
+    """Copy nested dicts/lists so callers can mutate results; document refs are shared."""
+    if isinstance(value, dict):
+        return {k: _copy_containers(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_containers(v) for v in value]
+    return value
+
+
+class HackathonCatalog:
+    """In-memory index of the hackathons collection."""
+
+    VERSION_CACHE_KEY = "hackathon_catalog:version"
+    VERSION_TTL = 7 * 24 * 3600
+
+    def __init__(self, max_age_seconds: int = 600, use_listener: bool = True):
+        self.max_age_seconds = max_age_seconds
+        self.use_listener = use_listener
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._by_event_id: Dict[str, str] = {}
+        self._by_title: Dict[str, str] = {}
+        self._version = None
+        self._loaded_at = None
+        self._watch = None
+        # (field, value) lookups that missed both the catalog and a direct query
+        self._missing = set()
+        self._listener = OncePerProcess(self._start_in_process, after_fork=self._forget_listener)
+
+    @staticmethod
+    def _get_db():
+        from common.utils.firebase import get_db
+        return get_db()
+
+    # -- loading -----------------------------------------------------------
+
+    def _replace(self, docs: Iterable[Any]) -> None:
+        by_id = {}
+        for doc in docs:
+            by_id[doc.id] = {**(doc.to_dict() or {}), "id": doc.id}
+        with self._lock:
+            self._by_id = by_id
+            self._missing = set()
+            self._reindex()
+            self._loaded_at = time.monotonic()
+
+    def _reindex(self) -> None:
+        # Callers hold self._lock. On duplicate keys the first doc wins, like a
+        # where(...).stream() lookup would.
+        by_event_id, by_title = {}, {}
+        for doc_id, data in self._by_id.items():
+            if data.get("event_id"):
+                by_event_id.setdefault(data["event_id"], doc_id)
+            if data.get("title"):
+                by_title.setdefault(data["title"], doc_id)
+        self._by_event_id, self._by_title = by_event_id, by_title
+
+    def _on_snapshot(self, col_snapshot, changes, read_time) -> None:
+        if self._loaded_at is None:
+            self._replace(col_snapshot)
+            info(logger, "Hackathon catalog loaded from listener", docs=len(self._by_id))
+            return
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                if getattr(change.type, "name", "") == "REMOVED":
+                    self._by_id.pop(doc.id, None)
+                else:
+                    self._by_id[doc.id] = {**(doc.to_dict() or {}), "id": doc.id}
+            self._missing = set()
+            self._reindex()
+            self._loaded_at = time.monotonic()
+
+    def _start_listener(self, db) -> bool:
+        # Only the real client can watch; MockFirestore and test doubles poll
+        if not self.use_listener or not type(db).__module__.startswith("google.cloud.firestore"):
+            return False
+        try:
+            self._watch = db.collection(COLLECTION).on_snapshot(self._on_snapshot)
+        except Exception as e:
+            warning(logger, "Hackathon catalog listener unavailable; polling instead", error=str(e))
+            self._watch = None
+            return False
+        return True
+
+    def _start_in_process(self) -> None:
+        if self._start_listener(self._get_db()):
+            # The listener's first snapshot loads the catalog; poll until it arrives
+            deadline = time.monotonic() + 10
+            while self._loaded_at is None and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+    def _forget_listener(self) -> None:
+        # The parent's watch is gone in a forked worker; reload there
+        self._watch, self._loaded_at = None, None
+
+    def _listening(self) -> bool:
+        return self._watch is not None and getattr(self._watch, "is_active", True)
+
+    def load(self) -> None:
+        """Read the whole collection (polling mode)."""
+        started = time.monotonic()
+        self._replace(self._get_db().collection(COLLECTION).stream())
+        shared = get_cached(self.VERSION_CACHE_KEY)
+        self._version = shared or self._publish_version()
+        info(logger, "Loaded hackathon catalog", docs=len(self._by_id),
+             elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+
+    def _publish_version(self) -> str:
+        version = uuid.uuid4().hex
+        set_cached(self.VERSION_CACHE_KEY, version, ttl=self.VERSION_TTL)
+        return version
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        if time.monotonic() - self._loaded_at > self.max_age_seconds:
+            return True
+        shared = get_cached(self.VERSION_CACHE_KEY)
+        return shared is not None and shared != self._version
+
+    def _ready(self) -> bool:
+        if self._listening() and self._loaded_at is not None:
+            return True
+        return not self._is_stale()
+
+    def ensure_loaded(self) -> None:
+        self._listener.ensure()
+        if self._ready():
+            return
+        # One thread reloads; the others wait and re-check
+        with self._load_lock:
+            if not self._ready():
+                self.load()
+
+    def invalidate(self, doc_id: Optional[str] = None) -> None:
+        """
+        Call after writing hackathon docs; other workers reload on their next lookup.
+
+        With doc_id this process re-reads just that doc, so the writer sees its
+        own write immediately; without it this process reloads too.
+        """
+        version = self._publish_version()
+        if doc_id is None:
+            self._version = None
+            return
+        if self._loaded_at is None:
+            return
+        snap = self._get_db().collection(COLLECTION).document(doc_id).get()
+        with self._lock:
+            if snap.exists:
+                self._by_id[doc_id] = {**(snap.to_dict() or {}), "id": doc_id}
+            else:
+                self._by_id.pop(doc_id, None)
+            self._missing = set()
+            self._reindex()
+        if self._version is not None:
+            self._version = version
+
+    # -- lookups -----------------------------------------------------------
+
+    def _copy(self, doc_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        data = self._by_id.get(doc_id) if doc_id else None
+        return _copy_containers(data) if data is not None else None
+
+    def _query(self, field: str, value: str) -> Optional[Dict[str, Any]]:
+        if not value or (field, value) in self._missing:
+            return None
+        for doc in self._get_db().collection(COLLECTION).where(field, "==", value).stream():
+            data = {**(doc.to_dict() or {}), "id": doc.id}
+            with self._lock:
+                self._by_id[doc.id] = data
+                self._reindex()
+            return _copy_containers(data)
+        with self._lock:
+            if len(self._missing) >= MAX_MISSING_ENTRIES:
+                self._missing.clear()
+            self._missing.add((field, value))
+        return None
+
+    def by_event_id(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Hackathon dict (with "id") for an event_id, or None."""
+        self.ensure_loaded()
+        return self._copy(self._by_event_id.get(event_id)) or self._query("event_id", event_id)
+
+    def by_title(self, title: str) -> Optional[Dict[str, Any]]:
+        """Hackathon dict (with "id") for a title, or None."""
+        self.ensure_loaded()
+        return self._copy(self._by_title.get(title)) or self._query("title", title)
+
+    def by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Hackathon dict for a document id, or None; never queries."""
+        self.ensure_loaded()
+        return self._copy(doc_id)
+
+
+catalog = HackathonCatalog()
+
+
+def get_catalog() -> Optional[HackathonCatalog]:
+    """The process-wide catalog, or None when HACKATHON_CATALOG_ENABLED is off."""
+    return catalog if _enabled() else None
+
+
+def invalidate_hackathon_catalog(doc_id: Optional[str] = None) -> None:
+    """Best-effort invalidation for hackathon write paths."""
+    try:
+        catalog.invalidate(doc_id)
+    except Exception as e:
+        warning(logger, "Failed to invalidate hackathon catalog", error=str(e))
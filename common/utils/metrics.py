@@ -0,0 +1,282 @@
+"""
+Process metrics in the Prometheus text format, aggregated across workers.
+
+Hot paths only touch in-process counters under one lock: observe() for
+histograms, inc() for counters. Gauges and counters owned by other modules
+(cache tiers, thread pools, the Slack queue, registered caches) are read
+when a snapshot is taken, through collectors added with register_collector().
+
+gunicorn runs several workers, each with its own counters. Every worker
+writes a snapshot of its counters to METRICS_DIR/<pid>.json every
+PUBLISH_INTERVAL_SECONDS; /metrics merges its own fresh snapshot with the
+other workers' files, summing series with the same labels. Snapshots older
+than WORKER_STALE_SECONDS belong to workers that are gone and are removed,
+so counters drop when a worker restarts, which Prometheus handles as a
+counter reset.
+"""
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from common.log import get_logger, warning
+from common.utils.fork_safety import OncePerProcess
+
+logger = get_logger("metrics")
+
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(tempfile.gettempdir(), "ohack-metrics")
+PUBLISH_INTERVAL_SECONDS = 15
+WORKER_STALE_SECONDS = 120
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, Any], float]
+
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Labels], float] = {}
+# (name, labels) -> [count per bucket..., +Inf count, sum]
+_histograms: Dict[Tuple[str, Labels], List[float]] = {}
+_in_flight = 0
+_collectors: List[Callable[[], Iterable[Sample]]] = []
+_descriptions: Dict[str, Tuple[str, str]] = {}
+
+
+def describe(name: str, kind: str, help_text: str) -> None:
+    """Declare a metric's type ("counter", "gauge" or "histogram") and help line."""
+    _descriptions[name] = (kind, help_text)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def inc(name: str, labels: Dict[str, Any], value: float = 1) -> None:
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, labels: Dict[str, Any], seconds: float) -> None:
+    key = (name, _labels(labels))
+    index = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        histogram[index] += 1
+        histogram[-1] += seconds
+
+
+def request_started() -> None:
+    global _in_flight
+    with _lock:
+        _in_flight += 1
+
+
+def request_finished() -> None:
+    global _in_flight
+    with _lock:
+        _in_flight -= 1
+
+
+def register_collector(collector: Callable[[], Iterable[Sample]]) -> None:
+    """Add a callable returning (name, labels, value) samples, read at each snapshot."""
+    _collectors.append(collector)
+
+
+def observe_upstream(service: str, seconds: float, error: bool) -> None:
+    """Count one call to an upstream API (Firestore, Slack, GitHub, ...)."""
+    observe("ohack_upstream_request_duration_seconds", {"service": service}, seconds)
+    if error:
+        inc("ohack_upstream_errors_total", {"service": service})
+
+
+# -- snapshots ---------------------------------------------------------------
+
+def _request_threads() -> Iterable[Sample]:
+    # Set by gunicorn.conf.py's post_worker_init
+    threads = os.environ.get("GUNICORN_THREADS")
+    if threads:
+        yield "ohack_thread_pool_max", {"pool": "requests"}, int(threads)
+    yield "ohack_thread_pool_active", {"pool": "requests"}, _in_flight
+
+
+register_collector(_request_threads)
+
+
+def snapshot() -> Dict[str, Any]:
+    """This process's counters, histograms and collected gauges, JSON-ready."""
+    with _lock:
+        counters = [[name, list(labels), value] for (name, labels), value in _counters.items()]
+        histograms = [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()]
+        in_flight = _in_flight
+    samples = [["ohack_http_requests_in_flight", [], in_flight]]
+    for collector in list(_collectors):
+        try:
+            samples.extend([name, list(_labels(labels)), value] for name, labels, value in collector())
+        except Exception as e:
+            warning(logger, "Metrics collector failed", collector=getattr(collector, "__name__", "?"), exc_info=e)
+    return {"pid": os.getpid(), "at": time.time(), "counters": counters, "histograms": histograms,
+            "samples": samples}
+
+
+def _path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def publish() -> None:
+    """Write this worker's snapshot for the other workers' /metrics."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _path(os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp, path)
+
+
+def remove_worker(pid: int) -> None:
+    """Drop a dead worker's snapshot (gunicorn child_exit hook)."""
+    try:
+        os.remove(_path(pid))
+    except OSError:
+        pass
+
+
+def _publish_loop() -> None:
+    while True:
+        time.sleep(PUBLISH_INTERVAL_SECONDS)
+        try:
+            publish()
+        except Exception as e:
+            warning(logger, "Could not publish metrics snapshot", metrics_dir=METRICS_DIR, exc_info=e)
+
+
+def _start_publisher() -> None:
+    threading.Thread(target=_publish_loop, name="metrics-publish", daemon=True).start()
+
+
+_publisher = OncePerProcess(_start_publisher)
+
+
+def ensure_publisher() -> None:
+    """Start this worker's publisher thread."""
+    _publisher.ensure()
+
+
+def _worker_snapshots() -> List[Dict[str, Any]]:
+    own = snapshot()
+    snapshots = [own]
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        return snapshots
+    now = time.time()
+    for name in names:
+        if not name.endswith(".json") or name == f"{own['pid']}.json":
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > WORKER_STALE_SECONDS:
+                os.remove(path)
+                continue
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def collect() -> Dict[str, Any]:
+    """Every live worker's series, summed by name and labels."""
+    snapshots = _worker_snapshots()
+    series: Dict[Tuple[str, Labels], float] = {}
+    histograms: Dict[Tuple[str, Labels], List[float]] = {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"] + snap["samples"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            series[key] = series.get(key, 0) + value
+        for name, labels, values in snap["histograms"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.get(key)
+            histograms[key] = values if merged is None else [a + b for a, b in zip(merged, values)]
+    return {"workers": len(snapshots), "series": series, "histograms": histograms}
+
+
+def _hit_ratios(series: Dict[Tuple[str, Labels], float]) -> Dict[Tuple[str, Labels], float]:
+    ratios = {}
+    for (name, labels), hits in series.items():
+        if name != "ohack_cache_hits_total":
+            continue
+        lookups = hits + series.get(("ohack_cache_misses_total", labels), 0)
+        if lookups:
+            ratios[("ohack_cache_hit_ratio", labels)] = round(hits / lookups, 4)
+    return ratios
+
+
+# -- exposition --------------------------------------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{key}="{_escape(value)}"' for key, value in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _header(lines: List[str], name: str, default_kind: str) -> None:
+    kind, help_text = _descriptions.get(name, (default_kind, ""))
+    if help_text:
+        lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def render(collected: Optional[Dict[str, Any]] = None) -> str:
+    collected = collected or collect()
+    lines = ["# HELP ohack_workers Workers whose metrics are included.", "# TYPE ohack_workers gauge",
+             f"ohack_workers {collected['workers']}"]
+
+    series = dict(collected["series"])
+    series.update(_hit_ratios(series))
+    by_name: Dict[str, List] = {}
+    for (name, labels), value in sorted(series.items()):
+        by_name.setdefault(name, []).append((labels, value))
+    for name, rows in by_name.items():
+        _header(lines, name, "gauge")
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in rows)
+
+    by_name = {}
+    for (name, labels), values in sorted(collected["histograms"].items()):
+        by_name.setdefault(name, []).append((labels, values))
+    for name, rows in by_name.items():
+        _header(lines, name, "histogram")
+        for labels, values in rows:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {int(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {round(values[-1], 6)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {int(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+describe("ohack_http_requests_total", "counter", "HTTP requests by blueprint, route, method and status.")
+describe("ohack_http_request_duration_seconds", "histogram", "HTTP request wall time by blueprint and route.")
+describe("ohack_http_requests_in_flight", "gauge", "HTTP requests being served.")
+describe("ohack_thread_pool_active", "gauge", "Busy (or queued) tasks per thread pool.")
+describe("ohack_thread_pool_max", "gauge", "Worker threads per thread pool.")
+describe("ohack_upstream_request_duration_seconds", "histogram", "Calls to upstream APIs by service.")
+describe("ohack_upstream_errors_total", "counter", "Upstream API calls that raised or returned HTTP >= 400.")
+describe("ohack_cache_hits_total", "counter", "Cache lookups answered from the cache, per cache.")
+describe("ohack_cache_misses_total", "counter", "Cache lookups that missed, per cache.")
+describe("ohack_cache_hit_ratio", "gauge", "Hits / (hits + misses) per cache since the workers started.")
+describe("ohack_cache_entries", "gauge", "Entries held per in-process cache.")
@@ -1,12 +1,21 @@
 import os
 import json
+import math
+import time
+import uuid
+import random
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Dict, Iterable, Optional, TypeVar
 from urllib.parse import urlparse, urlunparse
 
 from cachetools import TTLCache
 
 from common.log import get_logger, info, warning
+from common.utils import cache_codec, metrics, request_metrics
+from common.utils.fork_safety import OncePerProcess
 
 T = TypeVar('T')
 
@@ -15,6 +24,49 @@ logger = get_logger("redis_cache")
 LOCAL_CACHE_MAXSIZE = 1000
 LOCAL_CACHE_TTL_SECONDS = 600
 
+# In-process L1 tier in front of Redis. Kept small and short-lived so that a
+# missed invalidation message can only serve stale data for a few seconds.
+L1_CACHE_MAXSIZE = 256
+L1_CACHE_TTL_SECONDS = 5
+
+# Pub/sub channel used to evict keys from every worker's L1 tier
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Every key this module stores in Redis starts with this version. Bump it when
+# values become unreadable to the previous release: during a rolling deploy the
+# old workers keep reading and writing their own keys and never fetch an entry
+# they cannot decode (the release before cache_codec only understands JSON).
+KEY_PREFIX = "v2:"
+
+# Redis sets tracking the members of each cache namespace live under this prefix
+NAMESPACE_INDEX_PREFIX = "cache:ns:"
+
+# Keys fetched per SCAN step / deleted per round-trip in clear_pattern
+SCAN_BATCH_SIZE = 500
+
+# Background refresh pool used by redis_cached(stale_ttl=...). Refreshes are
+# dropped (and retried by a later reader) once REFRESH_QUEUE_MAXSIZE are queued.
+REFRESH_POOL_MAX_WORKERS = 4
+REFRESH_QUEUE_MAXSIZE = 64
+
+# How long a caller that lost the single-flight race polls for the winner's result
+SINGLE_FLIGHT_WAIT_SECONDS = 5
+SINGLE_FLIGHT_POLL_SECONDS = 0.05
+
+# Serialization codec for Redis values ("msgpack" or "json"); see cache_codec
+CACHE_CODEC = os.environ.get("CACHE_CODEC") or cache_codec.default_codec()
+
+# Upper bound on distinct key prefixes tracked in codec stats
+CODEC_STATS_MAX_PREFIXES = 200
+
+# Compare-and-delete so a lock is only released by the holder that set it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 
 def _redact_redis_url(redis_url: str) -> str:
     """Remove credentials from Redis URLs before logging them."""
@@ -42,6 +94,9 @@ def _disable_redis(operation: str, exc: Exception) -> None:
 
     REDIS_ENABLED = False
     REDIS_CLIENT = None
+    # Local cache is the only tier from here on; drop anything L1 still holds
+    with _l1_lock:
+        _l1_cache.clear()
 
 # Check if Redis is available and import if it is
 REDIS_ENABLED = False
@@ -95,9 +150,461 @@ else:
         local_ttl_seconds=LOCAL_CACHE_TTL_SECONDS,
     )
 
+if CACHE_CODEC == cache_codec.CODEC_MSGPACK and not cache_codec.HAS_MSGPACK:
+    warning(logger, "msgpack not installed; cache values will be stored as JSON", cache_codec=CACHE_CODEC)
+    CACHE_CODEC = cache_codec.CODEC_JSON
+
 # Fallback local cache with 10 minute TTL
 local_cache = TTLCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=LOCAL_CACHE_TTL_SECONDS)
 
+# L1 entries are (expires_at, encoded bytes) so a key never outlives its Redis
+# TTL even when that TTL is shorter than L1_CACHE_TTL_SECONDS. Every hit
+# decodes a fresh copy, as a Redis read would, so callers that annotate a
+# cached dict in place cannot change what other readers see.
+_l1_cache = TTLCache(maxsize=L1_CACHE_MAXSIZE, ttl=L1_CACHE_TTL_SECONDS)
+_l1_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_cache_stats = {
+    "l1_hits": 0,
+    "l1_misses": 0,
+    "l2_hits": 0,
+    "l2_misses": 0,
+    "local_hits": 0,
+    "local_misses": 0,
+    "invalidations_received": 0,
+    "stale_served": 0,
+    "early_refreshes": 0,
+    "background_refreshes": 0,
+    "refreshes_dropped": 0,
+    "single_flight_waits": 0,
+    "decode_errors": 0,
+}
+
+# Local-backend equivalent of the Redis namespace sets
+_local_namespaces = TTLCache(maxsize=LOCAL_CACHE_MAXSIZE, ttl=LOCAL_CACHE_TTL_SECONDS)
+_local_namespaces_lock = threading.Lock()
+
+# Per key-prefix encode/decode counters, see _key_prefix()
+_codec_stats = {}
+
+# Local-backend equivalent of Redis SET NX locks: name -> (expires_at, token)
+_local_locks = {}
+_local_locks_lock = threading.Lock()
+
+_refresh_pool = None
+_refresh_inflight = set()
+_refresh_lock = threading.Lock()
+
+# topic -> handlers for publish_event() messages on the invalidation channel
+_event_handlers: Dict[str, list] = {}
+_event_handlers_lock = threading.Lock()
+
+
+def get_redis_client():
+    """Return the shared Redis client, or None when Redis is unavailable."""
+    return REDIS_CLIENT if REDIS_ENABLED else None
+
+
+def _incr_stat(name: str) -> None:
+    with _stats_lock:
+        _cache_stats[name] += 1
+    request_metrics.count("cache." + name)
+
+
+def get_cache_stats() -> dict:
+    """
+    Return hit/miss counters for each cache tier in this process.
+
+    Tiers:
+        l1: in-process LRU+TTL tier in front of Redis
+        l2: Redis
+        local: TTLCache fallback used when Redis is not available
+    """
+    with _stats_lock:
+        stats = dict(_cache_stats)
+
+    for tier in ("l1", "l2", "local"):
+        lookups = stats[f"{tier}_hits"] + stats[f"{tier}_misses"]
+        stats[f"{tier}_hit_ratio"] = round(stats[f"{tier}_hits"] / lookups, 4) if lookups else None
+
+    with _l1_lock:
+        stats["l1_size"] = len(_l1_cache)
+    stats["l1_maxsize"] = L1_CACHE_MAXSIZE
+    stats["l1_ttl_seconds"] = L1_CACHE_TTL_SECONDS
+    stats["local_size"] = len(local_cache)
+    stats["backend"] = "redis" if REDIS_ENABLED else "local_ttl"
+    stats["invalidation_listener"] = _invalidation_listener.started
+    stats["codec"] = get_codec_stats()
+    return stats
+
+
+def _collect_metrics():
+    """Cache tier and refresh pool samples for /metrics (see common/utils/metrics.py)."""
+    with _stats_lock:
+        stats = dict(_cache_stats)
+    for tier in ("l1", "l2", "local"):
+        yield "ohack_cache_hits_total", {"cache": f"tier:{tier}"}, stats[f"{tier}_hits"]
+        yield "ohack_cache_misses_total", {"cache": f"tier:{tier}"}, stats[f"{tier}_misses"]
+    for name in ("stale_served", "early_refreshes", "background_refreshes", "refreshes_dropped",
+                 "single_flight_waits", "decode_errors"):
+        yield "ohack_cache_events_total", {"event": name}, stats[name]
+    yield "ohack_cache_entries", {"cache": "tier:l1"}, len(_l1_cache)
+    yield "ohack_cache_entries", {"cache": "tier:local"}, len(local_cache)
+    with _refresh_lock:
+        inflight = len(_refresh_inflight) if _refresh_pool_started.started else 0
+    yield "ohack_thread_pool_active", {"pool": "cache_refresh"}, inflight
+    yield "ohack_thread_pool_max", {"pool": "cache_refresh"}, REFRESH_POOL_MAX_WORKERS
+
+
+metrics.register_collector(_collect_metrics)
+metrics.describe("ohack_cache_events_total", "counter", "Stale reads, background refreshes and single-flight waits.")
+
+
+def _key_prefix(key: str) -> str:
+    """
+    Group keys for codec stats: "leaderboard:2025_fall" -> "leaderboard",
+    "resend:status:<id>" -> "resend:status".
+    """
+    parts = key.split(":", 2)
+    return ":".join(parts[:2]) if len(parts) > 2 else parts[0]
+
+
+def _record_codec_stat(key: str, op: str, seconds: float, size: int, compressed: bool) -> None:
+    prefix = _key_prefix(key)
+    with _stats_lock:
+        entry = _codec_stats.get(prefix)
+        if entry is None:
+            if len(_codec_stats) >= CODEC_STATS_MAX_PREFIXES:
+                prefix = "other"
+                entry = _codec_stats.get(prefix)
+            if entry is None:
+                entry = _codec_stats[prefix] = {
+                    "encodes": 0, "encode_seconds": 0.0, "encoded_bytes": 0, "max_encoded_bytes": 0,
+                    "compressed": 0, "decodes": 0, "decode_seconds": 0.0,
+                }
+        if op == "encode":
+            entry["encodes"] += 1
+            entry["encode_seconds"] += seconds
+            entry["encoded_bytes"] += size
+            entry["max_encoded_bytes"] = max(entry["max_encoded_bytes"], size)
+            entry["compressed"] += int(compressed)
+        else:
+            entry["decodes"] += 1
+            entry["decode_seconds"] += seconds
+
+
+def get_codec_stats() -> dict:
+    """
+    Return encoded size and encode/decode time per key prefix for this process.
+
+    Averages are in bytes and milliseconds.
+    """
+    with _stats_lock:
+        snapshot = {prefix: dict(entry) for prefix, entry in _codec_stats.items()}
+
+    for entry in snapshot.values():
+        encodes, decodes = entry["encodes"], entry["decodes"]
+        entry["avg_encoded_bytes"] = round(entry["encoded_bytes"] / encodes) if encodes else None
+        entry["avg_encode_ms"] = round(entry["encode_seconds"] * 1000 / encodes, 3) if encodes else None
+        entry["avg_decode_ms"] = round(entry["decode_seconds"] * 1000 / decodes, 3) if decodes else None
+    return {"codec": CACHE_CODEC, "prefixes": snapshot}
+
+
+def _encode(key: str, value: Any) -> bytes:
+    start = time.perf_counter()
+    raw = cache_codec.encode(value, CACHE_CODEC)
+    _record_codec_stat(key, "encode", time.perf_counter() - start, len(raw), cache_codec.is_compressed(raw))
+    return raw
+
+
+def _decode(key: str, raw: bytes) -> Any:
+    start = time.perf_counter()
+    value = cache_codec.decode(raw)
+    _record_codec_stat(key, "decode", time.perf_counter() - start, len(raw), False)
+    return value
+
+
+_UNDECODABLE = object()
+
+
+def _decode_or_miss(key: str, raw: bytes) -> Any:
+    """Decode a value read from Redis; an entry this release cannot read is a miss, not an outage."""
+    try:
+        return _decode(key, raw)
+    except Exception as exc:
+        _incr_stat("decode_errors")
+        warning(logger, "Skipping cache entry that could not be decoded", key=key, error=str(exc))
+        return _UNDECODABLE
+
+
+def _redis_key(key: str) -> str:
+    return f"{KEY_PREFIX}{key}"
+
+
+def _cache_key(redis_key) -> str:
+    """Inverse of _redis_key() for keys returned by SMEMBERS/SCAN."""
+    redis_key = redis_key.decode() if isinstance(redis_key, bytes) else redis_key
+    return redis_key[len(KEY_PREFIX):] if redis_key.startswith(KEY_PREFIX) else redis_key
+
+
+def _l1_get(key: str) -> Optional[bytes]:
+    """Return the encoded L1 value for key, or None when absent or expired."""
+    with _l1_lock:
+        entry = _l1_cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            _l1_cache.pop(key, None)
+            return None
+        return value
+
+
+def _l1_set(key: str, raw: bytes, ttl: float) -> None:
+    ttl = min(ttl, L1_CACHE_TTL_SECONDS)
+    if ttl <= 0:
+        return
+    with _l1_lock:
+        _l1_cache[key] = (time.monotonic() + ttl, raw)
+
+
+def _glob_match(key: str, pattern: str) -> bool:
+    """Redis MATCH semantics for in-process tiers (case-sensitive glob)."""
+    return fnmatch.fnmatchcase(key, pattern)
+
+
+def _l1_evict(key: str = None, pattern: str = None, keys: Iterable[str] = None) -> None:
+    with _l1_lock:
+        if key is not None:
+            _l1_cache.pop(key, None)
+        for k in keys or ():
+            _l1_cache.pop(k, None)
+        if pattern is not None:
+            for k in [k for k in _l1_cache if _glob_match(k, pattern)]:
+                _l1_cache.pop(k, None)
+
+
+def subscribe_events(topic: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+    """
+    Call handler with the payload of every publish_event(topic, ...) from any
+    worker, this one included. Delivery is best effort: messages sent while a
+    worker's listener is reconnecting are lost, so subscribers need another
+    way to catch up (a periodic reload).
+    """
+    with _event_handlers_lock:
+        _event_handlers.setdefault(topic, []).append(handler)
+
+
+def publish_event(topic: str, payload: Dict[str, Any]) -> None:
+    """Broadcast a small JSON payload on the invalidation channel; a no-op without Redis."""
+    if not REDIS_ENABLED:
+        return
+    try:
+        REDIS_CLIENT.publish(INVALIDATION_CHANNEL, json.dumps({"topic": topic, "payload": payload}))
+    except Exception as exc:
+        _disable_redis("publish_event", exc)
+
+
+def _dispatch_event(topic: str, payload: Dict[str, Any]) -> None:
+    with _event_handlers_lock:
+        handlers = list(_event_handlers.get(topic, ()))
+    for handler in handlers:
+        try:
+            handler(payload)
+        except Exception as exc:
+            warning(logger, "Cache event handler failed", topic=topic, error=str(exc))
+
+
+def _handle_invalidation(raw: Any) -> None:
+    """Apply an invalidation message (or dispatch an event) published by any worker."""
+    try:
+        message = json.loads(raw)
+    except (TypeError, ValueError):
+        return
+    if "topic" in message:
+        _dispatch_event(message["topic"], message.get("payload") or {})
+        return
+    _incr_stat("invalidations_received")
+    _l1_evict(key=message.get("key"), pattern=message.get("pattern"), keys=message.get("keys"))
+
+
+def _listen_for_invalidations(client) -> None:
+    try:
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(INVALIDATION_CHANNEL)
+        for message in pubsub.listen():
+            if message.get("type") == "message":
+                _handle_invalidation(message.get("data"))
+    except Exception as exc:
+        warning(
+            logger,
+            "Cache invalidation listener stopped; L1 entries will expire by TTL",
+            channel=INVALIDATION_CHANNEL,
+            error=str(exc),
+        )
+    finally:
+        # Drop anything we might have missed and allow a restart on next use
+        with _l1_lock:
+            _l1_cache.clear()
+        _invalidation_listener.reset()
+
+
+def _start_invalidation_listener() -> bool:
+    if not REDIS_ENABLED:
+        return False
+    # A fresh connection pool per process; pooled sockets are not fork-safe
+    client = redis.from_url(redis_url)
+    with _l1_lock:
+        _l1_cache.clear()
+    threading.Thread(
+        target=_listen_for_invalidations,
+        args=(client,),
+        name="redis-cache-invalidation",
+        daemon=True,
+    ).start()
+    return True
+
+
+_invalidation_listener = OncePerProcess(_start_invalidation_listener)
+
+
+def _ensure_invalidation_listener() -> None:
+    """Start the pub/sub listener for this process if it is not running."""
+    _invalidation_listener.ensure()
+
+
+def _publish_invalidation(key: str = None, pattern: str = None, keys: list = None) -> None:
+    """Tell every worker (including this one) to evict key/pattern/keys from L1."""
+    _l1_evict(key=key, pattern=pattern, keys=keys)
+    if REDIS_ENABLED:
+        message = {"key": key, "pattern": pattern}
+        if keys:
+            message["keys"] = keys
+        REDIS_CLIENT.publish(INVALIDATION_CHANNEL, json.dumps(message))
+
+
+def _namespace_index_key(namespace: str) -> str:
+    return _redis_key(f"{NAMESPACE_INDEX_PREFIX}{namespace}")
+
+
+def _track_local_namespace(namespace: str, key: str) -> None:
+    with _local_namespaces_lock:
+        members = _local_namespaces.get(namespace) or set()
+        if len(members) >= LOCAL_CACHE_MAXSIZE:
+            # Drop members the local cache has already expired or evicted
+            members = {k for k in members if k in local_cache}
+        members.add(key)
+        # Re-assign so the index lives as long as its newest member
+        _local_namespaces[namespace] = members
+
+def acquire_lock(name: str, ttl: int) -> Optional[str]:
+    """
+    Try to take a short-lived lock shared by every worker.
+
+    Args:
+        name: Lock key
+        ttl: Seconds after which the lock expires if never released
+
+    Returns:
+        An ownership token to pass to release_lock(), or None if the lock is held
+    """
+    token = uuid.uuid4().hex
+    if REDIS_ENABLED:
+        try:
+            return token if REDIS_CLIENT.set(name, token, nx=True, ex=ttl) else None
+        except Exception as exc:
+            _disable_redis("acquire_lock", exc)
+
+    now = time.monotonic()
+    with _local_locks_lock:
+        held = _local_locks.get(name)
+        if held is not None and held[0] > now:
+            return None
+        _local_locks[name] = (now + ttl, token)
+    return token
+
+def release_lock(name: str, token: Optional[str]) -> None:
+    """Release a lock taken with acquire_lock(); a no-op if ownership was lost."""
+    if not token:
+        return
+    if REDIS_ENABLED:
+        try:
+            REDIS_CLIENT.eval(_RELEASE_LOCK_SCRIPT, 1, name, token)
+            return
+        except Exception as exc:
+            _disable_redis("release_lock", exc)
+
+    with _local_locks_lock:
+        held = _local_locks.get(name)
+        if held is not None and held[1] == token:
+            del _local_locks[name]
+
+def is_locked(name: str) -> bool:
+    """Return True if some worker currently holds the lock."""
+    if REDIS_ENABLED:
+        try:
+            return bool(REDIS_CLIENT.exists(name))
+        except Exception as exc:
+            _disable_redis("is_locked", exc)
+
+    with _local_locks_lock:
+        held = _local_locks.get(name)
+        return held is not None and held[0] > time.monotonic()
+
+def _start_refresh_pool() -> None:
+    global _refresh_pool
+    _refresh_pool = ThreadPoolExecutor(
+        max_workers=REFRESH_POOL_MAX_WORKERS,
+        thread_name_prefix="cache-refresh",
+    )
+
+
+# The parent's queued tasks never run in a forked worker
+_refresh_pool_started = OncePerProcess(_start_refresh_pool, after_fork=_refresh_inflight.clear)
+
+
+def _get_refresh_pool() -> ThreadPoolExecutor:
+    _refresh_pool_started.ensure()
+    return _refresh_pool
+
+def submit_background(task_key: str, fn: Callable[[], Any]) -> bool:
+    """
+    Run fn on the shared background refresh pool.
+
+    At most one task per task_key is queued per process, and at most
+    REFRESH_QUEUE_MAXSIZE tasks are queued in total.
+
+    Returns:
+        True if the task was queued, False if it was deduplicated or dropped
+    """
+    with _refresh_lock:
+        pool = _get_refresh_pool()
+        if task_key in _refresh_inflight:
+            return False
+        if len(_refresh_inflight) >= REFRESH_QUEUE_MAXSIZE:
+            _incr_stat("refreshes_dropped")
+            return False
+        _refresh_inflight.add(task_key)
+
+    def run():
+        try:
+            fn()
+        except Exception as exc:
+            warning(logger, "Background cache refresh failed", task_key=task_key, error=str(exc))
+        finally:
+            with _refresh_lock:
+                _refresh_inflight.discard(task_key)
+
+    try:
+        pool.submit(run)
+    except RuntimeError:
+        # Interpreter shutdown
+        with _refresh_lock:
+            _refresh_inflight.discard(task_key)
+        return False
+    return True
+
 def cache_key(*args, **kwargs) -> str:
     """Generate a consistent cache key from arguments."""
     key_parts = [str(arg) for arg in args]
@@ -118,16 +625,34 @@ def get_cached(key: str, default: Any = None) -> Any:
     """
     if REDIS_ENABLED:
         try:
-            value = REDIS_CLIENT.get(key)
-            if value:
-                return json.loads(value)
+            _ensure_invalidation_listener()
+            raw = _l1_get(key)
+            if raw is not None:
+                _incr_stat("l1_hits")
+                return _decode(key, raw)
+            _incr_stat("l1_misses")
+
+            # GET and PTTL in one round-trip so L1 never outlives the Redis TTL
+            redis_key = _redis_key(key)
+            raw, pttl = REDIS_CLIENT.pipeline(transaction=False).get(redis_key).pttl(redis_key).execute()
+            value = _decode_or_miss(key, raw) if raw else _UNDECODABLE
+            if value is not _UNDECODABLE:
+                _incr_stat("l2_hits")
+                _l1_set(key, raw, pttl / 1000 if pttl and pttl > 0 else L1_CACHE_TTL_SECONDS)
+                return value
+            _incr_stat("l2_misses")
             return default
         except Exception as exc:
             _disable_redis("get", exc)
     
-    return local_cache.get(key, default)
+    value = local_cache.get(key)
+    if value is None:
+        _incr_stat("local_misses")
+        return default
+    _incr_stat("local_hits")
+    return value
 
-def set_cached(key: str, value: Any, ttl: int = 600) -> bool:
+def set_cached(key: str, value: Any, ttl: int = 600, namespace: Optional[str] = None) -> bool:
     """
     Set a value in the cache.
     
@@ -135,23 +660,39 @@ def set_cached(key: str, value: Any, ttl: int = 600) -> bool:
         key: The cache key
         value: Value to cache
         ttl: Time to live in seconds (default: 10 minutes)
+        namespace: Optional namespace to register the key under so that
+            clear_namespace() can drop it without a keyspace scan. Keys in
+            one namespace are expected to share a TTL; the index expires
+            together with its most recently written member.
         
     Returns:
         True if successful, False otherwise
     """
     try:
-        # Convert value to JSON string for storage
-        json_value = json.dumps(value)
+        # Serialize up front so unsupported values fail the same way on both backends
+        encoded_value = _encode(key, value)
         
         if REDIS_ENABLED:
             try:
-                REDIS_CLIENT.setex(key, ttl, json_value)
+                if namespace:
+                    index_key = _namespace_index_key(namespace)
+                    pipe = REDIS_CLIENT.pipeline(transaction=False)
+                    pipe.setex(_redis_key(key), ttl, encoded_value)
+                    pipe.sadd(index_key, _redis_key(key))
+                    pipe.expire(index_key, ttl)
+                    pipe.execute()
+                else:
+                    REDIS_CLIENT.setex(_redis_key(key), ttl, encoded_value)
+                # Other workers may still hold the previous value in L1
+                _publish_invalidation(key=key)
                 return True
             except Exception as exc:
                 _disable_redis("set", exc)
         
         # Use local cache
         local_cache[key] = value
+        if namespace:
+            _track_local_namespace(namespace, key)
         return True
     except Exception:
         return False
@@ -169,7 +710,8 @@ def delete_cached(key: str) -> bool:
     try:
         if REDIS_ENABLED:
             try:
-                REDIS_CLIENT.delete(key)
+                REDIS_CLIENT.delete(_redis_key(key))
+                _publish_invalidation(key=key)
             except Exception as exc:
                 _disable_redis("delete", exc)
         
@@ -181,9 +723,178 @@ def delete_cached(key: str) -> bool:
     except Exception:
         return False
 
+def get_many(keys: Iterable[str]) -> Dict[str, Any]:
+    """
+    Get several values from the cache in one round-trip.
+
+    Keys held in L1 are served from memory; the rest are fetched with a
+    single pipelined MGET (plus PTTL per key to bound their L1 lifetime).
+
+    Args:
+        keys: The cache keys
+
+    Returns:
+        Dict of key -> value for the keys that were found; misses are omitted
+    """
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    if not keys:
+        return found
+
+    if REDIS_ENABLED:
+        try:
+            _ensure_invalidation_listener()
+            missing = []
+            for key in keys:
+                raw = _l1_get(key)
+                if raw is not None:
+                    _incr_stat("l1_hits")
+                    found[key] = _decode(key, raw)
+                else:
+                    _incr_stat("l1_misses")
+                    missing.append(key)
+
+            if missing:
+                pipe = REDIS_CLIENT.pipeline(transaction=False)
+                pipe.mget([_redis_key(key) for key in missing])
+                for key in missing:
+                    pipe.pttl(_redis_key(key))
+                raw_values, *pttls = pipe.execute()
+                for key, raw, pttl in zip(missing, raw_values, pttls):
+                    value = _decode_or_miss(key, raw) if raw else _UNDECODABLE
+                    if value is _UNDECODABLE:
+                        _incr_stat("l2_misses")
+                        continue
+                    _incr_stat("l2_hits")
+                    _l1_set(key, raw, pttl / 1000 if pttl and pttl > 0 else L1_CACHE_TTL_SECONDS)
+                    found[key] = value
+            return found
+        except Exception as exc:
+            _disable_redis("get_many", exc)
+            found = {}
+
+    for key in keys:
+        value = local_cache.get(key)
+        if value is None:
+            _incr_stat("local_misses")
+        else:
+            _incr_stat("local_hits")
+            found[key] = value
+    return found
+
+def set_many(mapping: Dict[str, Any], ttl: int = 600, namespace: Optional[str] = None) -> bool:
+    """
+    Set several values with the same TTL in one pipelined round-trip.
+
+    Args:
+        mapping: Dict of key -> value to cache
+        ttl: Time to live in seconds (default: 10 minutes)
+        namespace: Optional namespace to register every key under (see set_cached)
+
+    Returns:
+        True if successful, False otherwise
+    """
+    if not mapping:
+        return True
+    try:
+        encoded = {key: _encode(key, value) for key, value in mapping.items()}
+
+        if REDIS_ENABLED:
+            try:
+                pipe = REDIS_CLIENT.pipeline(transaction=False)
+                for key, raw in encoded.items():
+                    pipe.setex(_redis_key(key), ttl, raw)
+                if namespace:
+                    index_key = _namespace_index_key(namespace)
+                    pipe.sadd(index_key, *(_redis_key(key) for key in encoded))
+                    pipe.expire(index_key, ttl)
+                pipe.execute()
+                _publish_invalidation(keys=list(encoded))
+                return True
+            except Exception as exc:
+                _disable_redis("set_many", exc)
+
+        for key, value in mapping.items():
+            local_cache[key] = value
+            if namespace:
+                _track_local_namespace(namespace, key)
+        return True
+    except Exception:
+        return False
+
+def delete_many(keys: Iterable[str]) -> bool:
+    """
+    Delete several values from the cache with a single DEL.
+
+    Args:
+        keys: The cache keys
+
+    Returns:
+        True if successful, False otherwise
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return True
+    try:
+        if REDIS_ENABLED:
+            try:
+                REDIS_CLIENT.delete(*(_redis_key(key) for key in keys))
+                _publish_invalidation(keys=keys)
+            except Exception as exc:
+                _disable_redis("delete_many", exc)
+
+        for key in keys:
+            local_cache.pop(key, None)
+        return True
+    except Exception:
+        return False
+
+def clear_namespace(namespace: str) -> bool:
+    """
+    Clear every key registered under a namespace via set_cached(namespace=...).
+
+    Cost is proportional to the number of keys in the namespace, not to the
+    size of the keyspace.
+
+    Args:
+        namespace: Namespace name (e.g., "volunteer:by_event:2025_fall:mentor")
+
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        if REDIS_ENABLED:
+            try:
+                index_key = _namespace_index_key(namespace)
+                members = [
+                    k.decode() if isinstance(k, bytes) else k
+                    for k in REDIS_CLIENT.smembers(index_key)
+                ]
+                for start in range(0, len(members), SCAN_BATCH_SIZE):
+                    REDIS_CLIENT.delete(*members[start:start + SCAN_BATCH_SIZE])
+                REDIS_CLIENT.delete(index_key)
+                if members:
+                    _publish_invalidation(keys=[_cache_key(k) for k in members])
+            except Exception as exc:
+                _disable_redis("clear_namespace", exc)
+
+        with _local_namespaces_lock:
+            members = _local_namespaces.pop(namespace, None) or set()
+        for k in members:
+            local_cache.pop(k, None)
+
+        return True
+    except Exception:
+        return False
+
 def clear_pattern(pattern: str) -> bool:
     """
-    Clear all keys matching a pattern.
+    Clear all keys matching a glob pattern.
+
+    Uses incremental SCAN rather than KEYS so Redis is never blocked for the
+    whole keyspace. Prefer clear_namespace() on hot write paths; this is the
+    fallback for ad-hoc patterns. Glob semantics (``*``, ``?``, ``[...]``)
+    are the same for Redis, the L1 tier and the local fallback cache.
     
     Args:
         pattern: Redis key pattern (e.g., "volunteer:*")
@@ -194,34 +905,131 @@ def clear_pattern(pattern: str) -> bool:
     try:
         if REDIS_ENABLED:
             try:
-                keys = REDIS_CLIENT.keys(pattern)
-                if keys:
-                    REDIS_CLIENT.delete(*keys)
+                batch = []
+                for k in REDIS_CLIENT.scan_iter(match=_redis_key(pattern), count=SCAN_BATCH_SIZE):
+                    batch.append(k)
+                    if len(batch) >= SCAN_BATCH_SIZE:
+                        REDIS_CLIENT.delete(*batch)
+                        batch = []
+                if batch:
+                    REDIS_CLIENT.delete(*batch)
+                _publish_invalidation(pattern=pattern)
             except Exception as exc:
                 _disable_redis("clear_pattern", exc)
         
         # For local cache, scan and remove matching keys
-        keys_to_delete = [k for k in local_cache if k.startswith(pattern)]
+        keys_to_delete = [k for k in list(local_cache.keys()) if _glob_match(k, pattern)]
         for k in keys_to_delete:
-            if k in local_cache:
-                del local_cache[k]
+            local_cache.pop(k, None)
         
         return True
     except Exception:
         return False
 
-def redis_cached(prefix: str, ttl: int = 600):
+_ENVELOPE_MARKER = "__redis_cached__"
+
+
+def _wrap_envelope(value: Any, ttl: int, compute_seconds: float) -> dict:
+    return {
+        _ENVELOPE_MARKER: 1,
+        "value": value,
+        "fresh_until": time.time() + ttl,
+        "delta": compute_seconds,
+    }
+
+
+def _should_refresh_early(fresh_until: float, delta: float, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): the closer an entry is to
+    expiring and the more expensive it was to compute, the more likely a
+    reader is to refresh it ahead of time.
+    """
+    if beta <= 0 or delta <= 0:
+        return False
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= fresh_until
+
+
+def redis_cached(
+    prefix: str,
+    ttl: int = 600,
+    namespace: Optional[Callable[..., str]] = None,
+    stale_ttl: Optional[int] = None,
+    single_flight: bool = False,
+    early_expiration: float = 0.0,
+    lock_ttl: int = 30,
+):
     """
     Decorator for caching function results.
     
     Args:
         prefix: Prefix for the cache key
         ttl: Time to live in seconds
+        namespace: Optional callable receiving the function's arguments and
+            returning the namespace each result is registered under, so a
+            subset of results can be dropped with clear_namespace(). When
+            omitted nothing is registered (a namespace set per prefix would
+            grow with every distinct argument) and cache_clear() SCANs for
+            ``prefix:*``.
+        stale_ttl: If set, results stay cached this many seconds past ``ttl``.
+            A stale hit is returned immediately while one worker refreshes it
+            on the background pool (stale-while-revalidate).
+        single_flight: On a miss, only the caller holding a lock shared by all
+            workers recomputes; the others wait briefly for its result.
+        early_expiration: XFetch beta. Values > 0 let readers refresh a fresh
+            entry in the background shortly before it expires, weighted by how
+            long the last computation took. 1.0 is a sensible default.
+        lock_ttl: Upper bound in seconds on how long a recompute may hold the lock
         
     Returns:
         Decorated function
     """
+    coordinated = bool(stale_ttl or single_flight or early_expiration)
+
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        def compute_and_store(key: str, args: tuple, kwargs: dict) -> Any:
+            start = time.monotonic()
+            result = func(*args, **kwargs)
+            key_namespace = namespace(*args, **kwargs) if namespace else None
+            if coordinated:
+                envelope = _wrap_envelope(result, ttl, time.monotonic() - start)
+                set_cached(key, envelope, ttl + (stale_ttl or 0), namespace=key_namespace)
+            else:
+                set_cached(key, result, ttl, namespace=key_namespace)
+            return result
+
+        def refresh_in_background(key: str, args: tuple, kwargs: dict) -> None:
+            def refresh():
+                token = acquire_lock(f"lock:{key}", lock_ttl)
+                if token is None:
+                    return  # another worker is already refreshing this key
+                try:
+                    compute_and_store(key, args, kwargs)
+                finally:
+                    release_lock(f"lock:{key}", token)
+
+            if submit_background(key, refresh):
+                _incr_stat("background_refreshes")
+
+        def compute_single_flight(key: str, args: tuple, kwargs: dict) -> Any:
+            token = acquire_lock(f"lock:{key}", lock_ttl)
+            if token is not None:
+                try:
+                    return compute_and_store(key, args, kwargs)
+                finally:
+                    release_lock(f"lock:{key}", token)
+
+            # Someone else is computing; wait for their result rather than piling on
+            _incr_stat("single_flight_waits")
+            deadline = time.monotonic() + min(SINGLE_FLIGHT_WAIT_SECONDS, lock_ttl)
+            while time.monotonic() < deadline:
+                time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+                cached = get_cached(key)
+                if cached is not None:
+                    return cached["value"] if isinstance(cached, dict) and cached.get(_ENVELOPE_MARKER) else cached
+            return compute_and_store(key, args, kwargs)
+
+        cache_labels = {"cache": prefix}
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
@@ -229,19 +1037,32 @@ def redis_cached(prefix: str, ttl: int = 600):
             
             # Try to get from cache
             cached_result = get_cached(key)
+            metrics.inc("ohack_cache_misses_total" if cached_result is None else "ohack_cache_hits_total",
+                        cache_labels)
+
+            if not coordinated:
+                if cached_result is not None:
+                    return cached_result
+                return compute_and_store(key, args, kwargs)
+
             if cached_result is not None:
-                return cached_result
-            
-            # Call the function
-            result = func(*args, **kwargs)
-            
-            # Cache the result
-            set_cached(key, result, ttl)
-            
-            return result
+                if not (isinstance(cached_result, dict) and cached_result.get(_ENVELOPE_MARKER)):
+                    # Written before this function opted into coordination
+                    return cached_result
+                if time.time() >= cached_result["fresh_until"]:
+                    _incr_stat("stale_served")
+                    refresh_in_background(key, args, kwargs)
+                elif _should_refresh_early(cached_result["fresh_until"], cached_result["delta"], early_expiration):
+                    _incr_stat("early_refreshes")
+                    refresh_in_background(key, args, kwargs)
+                return cached_result["value"]
+
+            if single_flight:
+                return compute_single_flight(key, args, kwargs)
+            return compute_and_store(key, args, kwargs)
         
         # Add method to clear cache for this function
         wrapper.cache_clear = lambda: clear_pattern(f"{prefix}:*")
         
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
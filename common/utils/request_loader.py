@@ -0,0 +1,169 @@
+"""
+Request-scoped batching loader for Firestore documents.
+
+Within one request the same documents are often resolved one at a time: a
+hackathon by event_id from several helpers, badge and event refs with a
+``ref.get()`` each. ``get_loader()`` returns a loader stored on ``flask.g``
+that dedupes those lookups and memoizes them for the rest of the request.
+
+Lookups can be queued and then resolved together; each ``dispatch()`` (a
+"tick") issues a single ``db.get_all()`` for everything queued that has not
+been loaded yet. ``load_many()`` queues and dispatches in one call.
+
+Outside a request (scripts, background threads) ``get_loader()`` returns a
+fresh loader, so batching still applies within the call but nothing is
+memoized across calls.
+
+Memoized values may be stale by the request's own writes; only opt in where
+a request reads the documents it does not modify.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import g, has_app_context
+
+from common.log import get_logger, debug, info
+from common.utils.hackathon_catalog import get_catalog
+
+logger = get_logger("request_loader")
+
+# Firestore "in" filters accept at most 30 values
+IN_QUERY_LIMIT = 30
+
+
+def _path(ref) -> str:
+    # mockfirestore references only carry the private _path list
+    return getattr(ref, "path", None) or "/".join(getattr(ref, "_path", ()))
+
+
+class DocumentLoader:
+    """Dedupes and memoizes document lookups for one request."""
+
+    def __init__(self, db=None):
+        self._db = db
+        self._snapshots = {}  # doc path -> DocumentSnapshot
+        self._pending = {}  # doc path -> DocumentReference
+        self._hackathons = {}  # event_id -> hackathon dict or None
+        self.requested = 0
+        self.fetched = 0
+        self.round_trips = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            from common.utils.firebase import get_db
+            self._db = get_db()
+        return self._db
+
+    def queue(self, refs: Iterable[Any]) -> None:
+        """Register refs to be fetched by the next dispatch()."""
+        for ref in refs:
+            if ref is None:
+                continue
+            path = _path(ref)
+            if path not in self._snapshots:
+                self._pending[path] = ref
+
+    def dispatch(self) -> None:
+        """Resolve every queued ref with one get_all()."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        self.round_trips += 1
+        self.fetched += len(pending)
+        for snapshot in self.db.get_all(list(pending.values())):
+            self._snapshots[_path(snapshot.reference)] = snapshot
+
+    def load_many(self, refs: Iterable[Any]) -> List[Any]:
+        """Snapshots for refs, in order; missing docs have exists == False."""
+        refs = [ref for ref in refs if ref is not None]
+        self.requested += len(refs)
+        self.queue(refs)
+        self.dispatch()
+        return [self._snapshots.get(_path(ref)) for ref in refs]
+
+    def load(self, ref) -> Any:
+        """Snapshot for a single ref, dispatching anything else queued with it."""
+        return self.load_many([ref])[0]
+
+    def prime(self, snapshot) -> None:
+        """Memoize a snapshot read some other way (e.g. by a query)."""
+        self._snapshots[_path(snapshot.reference)] = snapshot
+
+    def prime_hackathon(self, event_id: str, hackathon: Optional[Dict[str, Any]]) -> None:
+        """Memoize a hackathon dict that was loaded some other way."""
+        self._hackathons[event_id] = dict(hackathon) if hackathon else None
+
+    def hackathons_by_event_ids(self, event_ids: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Hackathon dicts (with "id") keyed by event_id, None where none exists.
+
+        Uncached ids come from the hackathon catalog when it is enabled, else
+        from "in" queries of up to IN_QUERY_LIMIT ids. Each caller gets its
+        own shallow copy.
+        """
+        event_ids = list(dict.fromkeys(e for e in event_ids if e))
+        self.requested += len(event_ids)
+        missing = [e for e in event_ids if e not in self._hackathons]
+        catalog = get_catalog() if missing else None
+        if catalog is not None:
+            # Served from memory; the catalog does its own fallback queries
+            for e in missing:
+                self._hackathons[e] = catalog.by_event_id(e)
+            missing = []
+        for start in range(0, len(missing), IN_QUERY_LIMIT):
+            chunk = missing[start:start + IN_QUERY_LIMIT]
+            self.round_trips += 1
+            self.fetched += len(chunk)
+            for e in chunk:
+                self._hackathons[e] = None
+            for doc in self.db.collection("hackathons").where("event_id", "in", chunk).stream():
+                data = doc.to_dict() or {}
+                if self._hackathons.get(data.get("event_id")) is None:
+                    self._hackathons[data.get("event_id")] = {**data, "id": doc.id}
+        return {e: dict(self._hackathons[e]) if self._hackathons[e] else None for e in event_ids}
+
+    def hackathon_by_event_id(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Same as common.utils.firebase.get_hackathon_by_event_id, memoized."""
+        return self.hackathons_by_event_ids([event_id]).get(event_id)
+
+    @property
+    def coalesced(self) -> int:
+        """Lookups answered without a document read of their own."""
+        return max(self.requested - self.fetched, 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requested": self.requested,
+            "fetched": self.fetched,
+            "round_trips": self.round_trips,
+            "coalesced": self.coalesced,
+        }
+
+
+def get_loader(db=None) -> DocumentLoader:
+    """
+    The current request's loader, or a fresh one outside a request.
+
+    db is only used when the loader is created; it defaults to get_db().
+    """
+    if not has_app_context():
+        return DocumentLoader(db)
+    if "document_loader" not in g:
+        g.document_loader = DocumentLoader(db)
+    return g.document_loader
+
+
+def _report(exc=None) -> None:
+    loader = g.pop("document_loader", None)
+    if loader is None or not loader.requested:
+        return
+    stats = loader.stats()
+    if stats["coalesced"]:
+        info(logger, "Request document loads coalesced", **stats)
+    else:
+        debug(logger, "Request document loads", **stats)
+
+
+def init_app(app) -> None:
+    """Log each request's loader stats when its app context ends."""
+    app.teardown_appcontext(_report)
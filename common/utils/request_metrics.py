@@ -0,0 +1,340 @@
+"""
+Per-request performance counters.
+
+Every request gets a RequestMetrics in a context variable (so background
+threads are never charged to a request) that counts:
+
+  - Firestore RPCs: documents read, documents written and queries run, with
+    the time spent waiting on them. Clients are instrumented where get_db()
+    hands them out (instrument_firestore), by wrapping the methods of the
+    client's GAPIC API object; the client, its references and queries stay
+    the library's own types.
+  - Cache lookups, reported by common/utils/redis_cache.py through count().
+  - Outbound HTTP calls by service (Slack, PropelAuth, GitHub, Resend,
+    OpenAI), from wrappers around requests, urllib (used by slack_sdk) and
+    httpx (used by openai), installed once by init_app().
+
+init_app() logs the counters once per request and, when SERVER_TIMING is
+set, also returns them in a Server-Timing header (off by default: the
+header shows every caller the backend's Firestore and upstream usage). It
+keeps the last ROUTE_SAMPLES requests of every route for route_stats()
+(p50/p95 latency, mean reads/writes/queries per request).
+Request, route and upstream (Firestore and HTTP) latency and error counts
+also go to common/utils/metrics.py for /metrics, including calls made
+outside a request.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from common.log import get_logger, info
+from common.utils import metrics as process_metrics
+
+logger = get_logger("request_metrics")
+
+ROUTE_SAMPLES = 500
+
+# Outbound hosts by service; matched as host suffixes
+HTTP_SERVICES = {
+    "slack.com": "slack",
+    "propelauth.com": "propelauth",
+    "propelauthtest.com": "propelauth",
+    "propelauth-api.com": "propelauth",
+    "github.com": "github",
+    "githubusercontent.com": "github",
+    "resend.com": "resend",
+    "openai.com": "openai",
+}
+
+# GAPIC methods that stream documents back
+_STREAMED_READS = {"batch_get_documents", "run_query"}
+_QUERY_METHODS = {"run_query", "run_aggregation_query", "list_documents", "partition_query"}
+
+_current: contextvars.ContextVar = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Counters for one request."""
+
+    __slots__ = ("started", "counts", "seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.counts: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_time(self, category: str, seconds: float) -> None:
+        self.seconds[category] = self.seconds.get(category, 0.0) + seconds
+
+    def summary(self) -> Dict[str, Any]:
+        counts = self.counts
+        http = {name[5:]: n for name, n in counts.items() if name.startswith("http.")}
+        return {
+            "ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "firestore_reads": counts.get("firestore.reads", 0),
+            "firestore_writes": counts.get("firestore.writes", 0),
+            "firestore_queries": counts.get("firestore.queries", 0),
+            "firestore_calls": counts.get("firestore.calls", 0),
+            "firestore_ms": round(self.seconds.get("firestore", 0.0) * 1000, 1),
+            "cache_hits": sum(n for name, n in counts.items() if name.startswith("cache.") and name.endswith("_hits")),
+            "cache_misses": counts.get("cache.l2_misses", 0) + counts.get("cache.local_misses", 0),
+            "http_calls": sum(http.values()),
+            "http": http,
+            "http_ms": round(self.seconds.get("http", 0.0) * 1000, 1),
+        }
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def start() -> RequestMetrics:
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def finish() -> None:
+    # Threads are reused across requests; nothing may carry over
+    _current.set(None)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add to a counter of the current request, if there is one."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(name, n)
+
+
+# -- Firestore ---------------------------------------------------------------
+
+def _count_stream(stream, metrics: Optional[RequestMetrics], started: float, field: str):
+    """Pass a server stream through, counting the documents in it."""
+    failed = True
+    try:
+        for response in stream:
+            if metrics is not None and getattr(response, field, None):
+                metrics.add("firestore.reads")
+            yield response
+        failed = False
+    finally:
+        elapsed = time.perf_counter() - started
+        if metrics is not None:
+            metrics.add_time("firestore", elapsed)
+        process_metrics.observe_upstream("firestore", elapsed, failed)
+
+
+def _instrument_method(api, name: str) -> None:
+    original = getattr(api, name)
+
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        started = time.perf_counter()
+        if name in _STREAMED_READS:
+            # batch_get_documents responses carry "found"; run_query ones "document"
+            field = "found" if name == "batch_get_documents" else "document"
+            if metrics is not None:
+                metrics.add("firestore.calls")
+                if name in _QUERY_METHODS:
+                    metrics.add("firestore.queries")
+            return _count_stream(original(*args, **kwargs), metrics, started, field)
+        failed = True
+        try:
+            result = original(*args, **kwargs)
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - started
+            process_metrics.observe_upstream("firestore", elapsed, failed)
+            if metrics is not None:
+                metrics.add_time("firestore", elapsed)
+        if metrics is None:
+            return result
+        metrics.add("firestore.calls")
+        if name in _QUERY_METHODS:
+            metrics.add("firestore.queries")
+        if name in ("commit", "batch_write"):
+            request = kwargs.get("request") or (args[0] if args else None) or {}
+            writes = request.get("writes") if isinstance(request, dict) else getattr(request, "writes", ())
+            metrics.add("firestore.writes", len(writes or ()))
+        elif name == "run_aggregation_query":
+            metrics.add("firestore.reads")
+        return result
+
+    setattr(api, name, wrapper)
+
+
+def instrument_firestore(client):
+    """Count the RPCs of a Firestore client; a no-op for MockFirestore and repeat calls."""
+    if getattr(client, "_request_metrics", False) or not hasattr(client, "_firestore_api_helper"):
+        return client
+    api = client._firestore_api
+    for name in ("batch_get_documents", "run_query", "run_aggregation_query", "list_documents",
+                 "partition_query", "commit", "batch_write", "begin_transaction", "rollback"):
+        if hasattr(api, name):
+            _instrument_method(api, name)
+    client._request_metrics = True
+    return client
+
+
+# -- outbound HTTP -----------------------------------------------------------
+
+def service_for(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    for suffix, service in HTTP_SERVICES.items():
+        if host == suffix or host.endswith("." + suffix):
+            return service
+    return "other"
+
+
+def _timed_http(url_of: Callable[..., str], original: Callable) -> Callable:
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        service = service_for(url_of(*args, **kwargs))
+        if metrics is not None:
+            metrics.add("http." + service)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = original(*args, **kwargs)
+            # requests/httpx responses carry status_code; urllib ones status
+            failed = (getattr(response, "status_code", None) or getattr(response, "status", 0) or 0) >= 400
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            process_metrics.observe_upstream(service, elapsed, failed)
+            if metrics is not None:
+                metrics.add_time("http", elapsed)
+    wrapper._request_metrics = True
+    return wrapper
+
+
+def _patch(owner, name: str, url_of: Callable[..., str]) -> None:
+    original = getattr(owner, name)
+    if not getattr(original, "_request_metrics", False):
+        setattr(owner, name, _timed_http(url_of, original))
+
+
+def instrument_http() -> None:
+    """Wrap requests, urllib and httpx so outbound calls are counted per request."""
+    import requests
+    import urllib.request
+
+    _patch(requests.Session, "send", lambda self, request, **kwargs: request.url)
+    _patch(urllib.request.OpenerDirector, "open",
+           lambda self, fullurl, *args, **kwargs: fullurl if isinstance(fullurl, str) else fullurl.full_url)
+    try:
+        import httpx
+    except ImportError:
+        return
+    _patch(httpx.Client, "send", lambda self, request, **kwargs: str(request.url))
+
+
+# -- rolling per-route stats -------------------------------------------------
+
+_routes_lock = threading.Lock()
+_routes: Dict[str, deque] = {}
+
+
+def record_route(route: str, status: int, summary: Dict[str, Any]) -> None:
+    sample = (summary["ms"], summary["firestore_reads"], summary["firestore_writes"],
+              summary["firestore_queries"], summary["http_calls"], status >= 500)
+    with _routes_lock:
+        samples = _routes.get(route)
+        if samples is None:
+            samples = _routes[route] = deque(maxlen=ROUTE_SAMPLES)
+        samples.append(sample)
+
+
+def _percentile(ordered, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def route_stats() -> Dict[str, Dict[str, Any]]:
+    """Latency percentiles and mean Firestore work per route over its last ROUTE_SAMPLES requests."""
+    with _routes_lock:
+        snapshot = {route: list(samples) for route, samples in _routes.items()}
+    stats = {}
+    for route, samples in snapshot.items():
+        n = len(samples)
+        durations = sorted(sample[0] for sample in samples)
+        stats[route] = {
+            "requests": n,
+            "p50_ms": _percentile(durations, 0.5),
+            "p95_ms": _percentile(durations, 0.95),
+            "max_ms": durations[-1],
+            "mean_reads": round(sum(sample[1] for sample in samples) / n, 2),
+            "mean_writes": round(sum(sample[2] for sample in samples) / n, 2),
+            "mean_queries": round(sum(sample[3] for sample in samples) / n, 2),
+            "mean_http_calls": round(sum(sample[4] for sample in samples) / n, 2),
+            "errors": sum(1 for sample in samples if sample[5]),
+        }
+    return stats
+
+
+def reset_route_stats() -> None:
+    with _routes_lock:
+        _routes.clear()
+
+
+# -- Flask -------------------------------------------------------------------
+
+def server_timing(summary: Dict[str, Any]) -> str:
+    parts = [
+        f'app;dur={summary["ms"]}',
+        f'firestore;dur={summary["firestore_ms"]};desc="reads={summary["firestore_reads"]} '
+        f'writes={summary["firestore_writes"]} queries={summary["firestore_queries"]}"',
+        f'cache;desc="hits={summary["cache_hits"]} misses={summary["cache_misses"]}"',
+    ]
+    if summary["http_calls"]:
+        calls = " ".join(f"{service}={n}" for service, n in sorted(summary["http"].items()))
+        parts.append(f'http;dur={summary["http_ms"]};desc="{calls}"')
+    return ", ".join(parts)
+
+
+def _server_timing_enabled() -> bool:
+    return os.environ.get("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+
+def init_app(app) -> None:
+    """Measure every request: a log line, route_stats() and, if enabled, a Server-Timing header."""
+    from flask import request
+
+    instrument_http()
+
+    @app.before_request
+    def _start_request_metrics():
+        process_metrics.ensure_publisher()
+        process_metrics.request_started()
+        start()
+
+    @app.after_request
+    def _report_request_metrics(response):
+        metrics = current()
+        if metrics is None:
+            return response
+        summary = metrics.summary()
+        rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+        route = f"{request.method} {rule}"
+        if _server_timing_enabled():
+            response.headers["Server-Timing"] = server_timing(summary)
+        record_route(route, response.status_code, summary)
+        labels = {"blueprint": request.blueprint or "app", "route": rule, "method": request.method}
+        process_metrics.observe("ohack_http_request_duration_seconds", labels, summary["ms"] / 1000)
+        process_metrics.inc("ohack_http_requests_total", {**labels, "status": response.status_code})
+        fields = {key: value for key, value in summary.items() if key != "http"}
+        fields.update({f"http_{service}": n for service, n in summary["http"].items()})
+        info(logger, "Request metrics", route=route, status=response.status_code, **fields)
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc=None):
+        if current() is not None:
+            process_metrics.request_finished()
+        finish()
@@ -3,6 +3,7 @@ from . import safe_get_env_var
 import datetime, json
 from ratelimiter import RateLimiter
 from slack_sdk import WebClient
+from slack_sdk.http_retry.builtin_handlers import RateLimitErrorRetryHandler
 from slack_sdk.models.blocks import SectionBlock
 from slack_sdk.errors import SlackApiError
 from dotenv import load_dotenv
@@ -10,6 +11,11 @@ from requests.exceptions import ConnectionError
 from cachetools import TTLCache, cached
 from ratelimit import limits, sleep_and_retry
 import threading
+import atexit
+from .slack_directory import SlackDirectory
+from .slack_presence import PresenceTracker
+from .slack_queue import RetryAfter, SlackOutbox, make_message
+from . import metrics
 
 load_dotenv()
 
@@ -25,13 +31,12 @@ logger.setLevel(logging.INFO)
 
 
 def send_slack_audit(action="", message="", payload=None):
+    """Queue an audit line for the webhook channel; never blocks the request."""
     if not SLACK_URL or SLACK_URL == "":
         logger.warning("SLACK_URL not set, returning")
         return
 
-    json = {
-        "text": f"[{action}] {message}"
-    }
+    text = f"[{action}] {message}"
 
     if payload:
         # Create a copy to avoid mutating the original payload
@@ -40,14 +45,19 @@ def send_slack_audit(action="", message="", payload=None):
         if "recaptchaToken" in payload_copy:
             del payload_copy["recaptchaToken"]
 
-        json = {
-            "text": f"[{action}] {message}\n{payload_copy}"
-        }
+        text = f"[{action}] {message}\n{payload_copy}"
+
+    _OUTBOX.enqueue(make_message("webhook", "audit", text))
 
-    try: 
-        requests.post(json=json, url=SLACK_URL)
-    except ConnectionError:
-        pass #Eat this error. The request from the frontend should not fail if we can't contact slack
+
+def _post_webhook(text):
+    response = requests.post(json={"text": text}, url=SLACK_URL, timeout=10)
+    if response.status_code == 429:
+        raise RetryAfter(float(response.headers.get("Retry-After", 1)))
+    if response.status_code >= 500:
+        response.raise_for_status()
+    if response.status_code >= 400:
+        logger.warning(f"Slack webhook rejected audit message: {response.status_code} {response.text}")
 
 
 @RateLimiter(max_calls=40, period=60)
@@ -57,28 +67,17 @@ def presence(user_id=None):
     client = get_client()
     return client.users_getPresence(user=user_id)
 
-@RateLimiter(max_calls=20, period=60)
 def userlist():
-    client = get_client()
-    users = []
-    next_cursor = None
-    
-    while True:
-        response = client.users_list(limit=1000, cursor=next_cursor)
-        users.extend(response["members"])
-        
-        # Check if there are more pages
-        next_cursor = response.get("response_metadata", {}).get("next_cursor")
-        if not next_cursor:
-            break
-    
-    return {"members": users}
+    """Workspace members from the shared Slack directory (see slack_directory.py)."""
+    return {"members": get_slack_directory().member_list()}
 
 
 def get_active_users():
     aresult = []
     counter = 0
-    for member in userlist()["members"]:
+    members = userlist()["members"]
+    presences = get_presence_tracker().get_many(m["id"] for m in members if not m.get("deleted"))
+    for member in members:
         # get updated time in seconds and print as date
         updated = datetime.datetime.fromtimestamp(
             member["updated"]).strftime('%Y-%m-%d %H:%M:%S')
@@ -89,7 +88,7 @@ def get_active_users():
 
         deleted = True if ("deleted" in member and member["deleted"]) else False            
         if not deleted:            
-            here = presence(user_id=member["id"])["presence"] != "away"
+            here = presences[member["id"]] == "active"
         
         
         is_email_confirmed = member["is_email_confirmed"] if "is_email_confirmed" in member else ""
@@ -121,11 +120,39 @@ def slack_id_from_user_id(user_id):
         # Example user_id = oauth2|slack|T2Q7222BH-U012127EYAQ
         return user_id.split("|")[2].split("-")[1]
 
+_CLIENT = None
+_CLIENT_TOKEN = None
+_CLIENT_LOCK = threading.Lock()
+
+
 def get_client():
+    """
+    The process-wide WebClient. Building one per call threw away its HTTP
+    connection; the shared client is rebuilt only when the token changes and
+    waits out 429s (Retry-After) instead of failing.
+    """
+    global _CLIENT, _CLIENT_TOKEN
     token = get_slack_token()
-    # logger.info(f"Creating new client, token: {token}")
-    client = WebClient(token=token)
-    return client
+    with _CLIENT_LOCK:
+        if _CLIENT is None or token != _CLIENT_TOKEN:
+            _CLIENT = WebClient(token=token)
+            _CLIENT.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=2))
+            _CLIENT_TOKEN = token
+        return _CLIENT
+
+
+_DIRECTORY = SlackDirectory(get_client)
+
+
+def get_slack_directory():
+    return _DIRECTORY
+
+
+_PRESENCE = PresenceTracker(lambda user_id: presence(user_id=user_id), lambda: _DIRECTORY.member_list())
+
+
+def get_presence_tracker():
+    return _PRESENCE
 
 _EMAIL_USER_CACHE = TTLCache(maxsize=500, ttl=86400)  # 24h — email→user rarely changes
 _EMAIL_USER_MISS_CACHE = TTLCache(maxsize=500, ttl=3600)  # 1h negative cache
@@ -161,63 +188,43 @@ def get_slack_user_by_email(email):
         return None
 
 
-@cached(cache=TTLCache(maxsize=100, ttl=60), lock=threading.Lock())  # Cache for 1 minute
-@sleep_and_retry
-@limits(calls=20, period=60)  # Rate limiting
 def get_channel_id_from_channel_name(channel_name):
     """
-    Get channel ID from channel name with caching and pagination support.
-    
+    Get channel ID from channel name (with or without '#').
+
+    Served from the shared Slack directory; a name that is not there yet
+    refreshes the channel map at most once a minute.
+
     :param channel_name: Name of the channel to find
     :return: Channel ID if found, None otherwise
     """
-    client = get_client()
-    
-    logger.info(f"Looking for slack channel {channel_name}...")
-    
-    try:
-        cursor = None
-        while True:
-            # Use pagination to handle workspaces with many channels
-            result = client.conversations_list(
-                exclude_archived=True, 
-                limit=999999,
-                types="private_channel,public_channel"  # Specify channel types
-            )
-            
-            logger.debug(f"Found {len(result['channels'])} channels in this batch")
-            
-            # Search through current batch
-            for channel in result["channels"]:
-                if channel["name"] == channel_name:
-                    logger.info(f"Found Channel! {channel_name} -> {channel['id']}")
-                    return channel["id"]
-            
-            # Check if there are more pages
-            cursor = result.get("response_metadata", {}).get("next_cursor")
-            if not cursor:
-                break
-                
-        logger.warning(f"Channel {channel_name} not found")
-        return None
-        
-    except SlackApiError as e:
-        logger.error(f"Error fetching channels: {e}")
-        return None
+    channel_id = get_slack_directory().channel_id(channel_name)
+    if channel_id is None:
+        logger.debug(f"Channel {channel_name} not found")
+    return channel_id
 
 
 @cached(cache=TTLCache(maxsize=50, ttl=60), lock=threading.Lock())  # Cache for 1 minute
-def is_channel_id(channel_id):
-    # Use conversation_info to check if channel_id is valid
+def _conversation_exists(channel_id):
     client = get_client()
     try:
-        result = client.conversations_info(channel=channel_id)
+        client.conversations_info(channel=channel_id)
         return True
     except SlackApiError as e:
         logger.debug(f"is_channel_id: conversations.info failed for {channel_id}: {e}")
         return False
 
 
+def is_channel_id(channel_id):
+    # Known channels answer from the directory; only ids that look like
+    # channels but are not in it (DMs, channels the bot cannot list) hit the API
+    if get_slack_directory().channel_name(channel_id) is not None:
+        return True
+    if not channel_id or channel_id[0] not in "CGD":
+        return False
+    return _conversation_exists(channel_id)
+
+
 def add_bot_to_channel(channel_id):
     logger.info("add_bot_to_channel start")
     client = get_client()       
@@ -314,53 +321,66 @@ def create_slack_channel(channel_name):
 
     try:
         result = client.conversations_create(name=channel_name)
-        logger.info(f"Created channel {channel_name} with id {result['channel']['id']}")
-        return result["channel"]["id"]
+        channel_id = result["channel"]["id"]
+        logger.info(f"Created channel {channel_name} with id {channel_id}")
+        get_slack_directory().channel_created(channel_name, channel_id)
+        return channel_id
+    except SlackApiError as e:
+        if e.response.get("error") == "name_taken":
+            # Created elsewhere (or archived) since the map was walked
+            get_slack_directory().channels.refresh()
+            return get_slack_directory().channel_id(channel_name)
+        logger.error(f"Error creating channel {channel_name}: {e}")
     except Exception as e:
         logger.error("Caught exception")
         logger.error(e)
     logger.debug("create_slack_channel end")
 
 
-def send_slack(message="", channel="", icon_emoji=None, username="Hackathon Bot", blocks=None):
-    client = get_client()
+def _post_message(message="", channel="", icon_emoji=None, username="Hackathon Bot", blocks=None):
+    """chat.postMessage to a channel name or id (a user id for DMs); raises SlackApiError."""
     channel_id = get_channel_id_from_channel_name(channel)
-    logger.info(f"Got channel id {channel_id}")
+    logger.debug(f"Got channel id {channel_id}")
 
     if channel_id is None:
-        logger.warning("Unable to get channel id from name, might be a user?")
+        logger.debug("Unable to get channel id from name, might be a user?")
         channel_id = channel
 
+    kwargs = {
+        "channel": channel_id,
+        "text": message,
+        "blocks": blocks if blocks else [
+            SectionBlock(
+                text={
+                    "type": "mrkdwn",
+                    "text": message
+                }
+            )
+        ],
+        "username": username
+    }
+
+    if icon_emoji:
+        kwargs["icon_emoji"] = icon_emoji
+    else:
+        kwargs["icon_url"] = "https://cdn.ohack.dev/ohack.dev/logos/OpportunityHack_2Letter_Light_Blue.png"
+
+    get_client().chat_postMessage(**kwargs)
+
+
+def send_slack(message="", channel="", icon_emoji=None, username="Hackathon Bot", blocks=None):
     logger.info("Sending message...")
     try:
-        kwargs = {
-            "channel": channel_id,
-            "text": message,
-            "blocks": blocks if blocks else [
-                SectionBlock(
-                    text={
-                        "type": "mrkdwn",
-                        "text": message
-                    }
-                )
-            ],
-            "username": username
-        }
-        
-        if icon_emoji:
-            kwargs["icon_emoji"] = icon_emoji
-        else:
-            kwargs["icon_url"] = "https://cdn.ohack.dev/ohack.dev/logos/OpportunityHack_2Letter_Light_Blue.png"
-        
-        response = client.chat_postMessage(**kwargs)
+        _post_message(message=message, channel=channel, icon_emoji=icon_emoji, username=username, blocks=blocks)
     except SlackApiError as e:
-        logger.warning(f"send_slack failed for channel={channel_id}: {e.response.get('error', e)}")
+        logger.warning(f"send_slack failed for channel={channel}: {e.response.get('error', e)}")
 
 
 def async_send_slack(message="", channel="", icon_emoji=None, username="Hackathon Bot", blocks=None):
     """
-    Send a Slack message asynchronously using threading.
+    Queue a Slack message on the delivery queue (see slack_queue.py).
     This allows the calling function to return immediately without waiting for the Slack API call.
+    Messages to the same channel are rate limited and may be combined into one post.
 
     :param message: The message to send
     :param channel: The channel name or user ID to send to
@@ -368,17 +388,29 @@ def async_send_slack(message="", channel="", icon_emoji=None, username="Hackatho
     :param username: The username for the bot
     :param blocks: Optional Block Kit blocks for rich formatting
     """
-    def _send_slack_thread():
-        try:
-            send_slack(message=message, channel=channel, icon_emoji=icon_emoji, username=username, blocks=blocks)
-            logger.info(f"Async Slack message sent successfully to {channel}")
-        except Exception as e:
-            logger.error(f"Error sending async Slack message to {channel}: {e}")
-    
-    # Start the thread and let it run in background
-    thread = threading.Thread(target=_send_slack_thread, daemon=True)
-    thread.start()
-    logger.info(f"Started background thread to send Slack message to {channel}")
+    if _OUTBOX.enqueue(make_message("chat", channel, message, blocks=blocks, username=username,
+                                    icon_emoji=icon_emoji)):
+        logger.debug(f"Queued Slack message to {channel}")
+
+
+def _deliver(message):
+    if message["kind"] == "webhook":
+        _post_webhook(message["text"])
+    else:
+        _post_message(message=message["text"], channel=message["channel"], icon_emoji=message["icon_emoji"],
+                      username=message["username"], blocks=message["blocks"])
+
+
+_OUTBOX = SlackOutbox(_deliver)
+atexit.register(_OUTBOX.shutdown)
+metrics.register_collector(_OUTBOX.samples)
+metrics.describe("ohack_slack_queue_depth", "gauge", "Slack messages waiting in this worker's queue.")
+metrics.describe("ohack_slack_queue_messages_total", "counter", "Slack queue messages by outcome.")
+
+
+def get_slack_queue_stats():
+    """Depth, delivery counters and enqueue-to-post latency of this worker's Slack queue."""
+    return _OUTBOX.stats()
 
 
 
@@ -402,15 +434,18 @@ def get_user_info(user_ids):
     """
     Fetch user information for a list of Slack user IDs.
     
+    Members already in the Slack directory are answered from it; only the
+    rest are fetched with users.info.
+
     :param user_ids: List of Slack user IDs (e.g., ["U049S78NLCA", "U049S78NLCB"])
     :return: Dictionary of user information, keyed by user ID
     """
-    client = get_client()    
+    directory = get_slack_directory()
 
     # Fetch user info for all unique slack_ids
     users_info = {}
     for user_id in user_ids:
-        user_info = rate_limited_get_user_info(user_id)
+        user_info = directory.member(user_id) or rate_limited_get_user_info(user_id)
         if user_info:
             users_info[user_id] = {
                 "id": user_info["id"],
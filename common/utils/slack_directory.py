@@ -0,0 +1,228 @@
+"""
+Shared directory of Slack channels and workspace members.
+
+Resolving a channel name used to walk conversations.list for the whole
+workspace on every uncached send, and every member listing re-paged
+users.list. The directory keeps two maps, each loaded from Slack once with
+cursor pagination and shared by every worker through the cache:
+
+  slack_directory:channels           {"data": {name: id}, "built_at", "version"}
+  slack_directory:members            {"data": {id: member}, "built_at", "version"}
+  slack_directory:<map>:version      version of the shared copy
+
+Workers keep a local copy and reload it when the shared version changes, so
+a lookup is a dict hit. A map older than its max age is refreshed on the
+background pool while the old copy keeps serving. Channels created through
+create_slack_channel are written through; a name that is not in the map
+triggers at most one synchronous refresh per MISS_REFRESH_MIN_SECONDS.
+
+Members are stored with the fields callers read (see MEMBER_FIELDS), not
+Slack's full user objects.
+"""
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from slack_sdk.errors import SlackApiError
+
+from common.log import get_logger, info, warning
+from common.utils.redis_cache import delete_cached, get_cached, set_cached, submit_background
+
+logger = get_logger("slack_directory")
+
+CHANNELS_MAX_AGE_SECONDS = 15 * 60
+MEMBERS_MAX_AGE_SECONDS = 60 * 60
+MISS_REFRESH_MIN_SECONDS = 60
+STORE_TTL = 7 * 24 * 3600
+# Slack's recommended maximum page size for users.list and conversations.list
+PAGE_LIMIT = 1000
+CHANNEL_TYPES = "public_channel,private_channel"
+
+MEMBER_FIELDS = ["id", "name", "real_name", "deleted", "is_bot", "is_admin", "is_owner",
+                 "is_restricted", "is_ultra_restricted", "is_email_confirmed", "updated", "tz", "tz_offset"]
+PROFILE_FIELDS = ["display_name", "display_name_normalized", "real_name", "real_name_normalized",
+                  "email", "title", "phone", "image_192", "status_text", "status_emoji"]
+
+# Channel, group, DM and user ids; channel names are always lowercase
+_SLACK_ID = re.compile(r"^[CGDUW][A-Z0-9]{6,}$")
+
+
+def looks_like_slack_id(value: str) -> bool:
+    return bool(value) and bool(_SLACK_ID.match(value))
+
+
+def member_record(member: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored subset of a users.list member."""
+    record = {field: member[field] for field in MEMBER_FIELDS if field in member}
+    profile = member.get("profile") or {}
+    record["profile"] = {field: profile[field] for field in PROFILE_FIELDS if field in profile}
+    return record
+
+
+class _SharedMap:
+    """One map mirrored from Slack: local copy, shared copy in the cache, version key."""
+
+    def __init__(self, name: str, fetch: Callable[[], Dict[str, Any]], max_age_seconds: int):
+        self.name = name
+        self.data_key = f"slack_directory:{name}"
+        self.version_key = f"slack_directory:{name}:version"
+        self.max_age_seconds = max_age_seconds
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._version = None
+        self._built_at = 0.0  # wall-clock time of the Slack walk behind _data
+        self._attempted_at = float("-inf")  # monotonic time of this worker's last walk
+
+    def get(self) -> Dict[str, Any]:
+        """The current map. Treat it as read-only."""
+        if self._data is None or self._shared_changed():
+            self._load()
+        if time.time() - self._built_at > self.max_age_seconds and self._idle():
+            submit_background(self.data_key, self.refresh)
+        return self._data or {}
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self._attempted_at >= MISS_REFRESH_MIN_SECONDS
+
+    def _shared_changed(self) -> bool:
+        shared = get_cached(self.version_key)
+        return shared is not None and shared != self._version
+
+    def _load(self) -> None:
+        with self._lock:
+            stored = get_cached(self.data_key)
+            if stored is not None:
+                self._data, self._built_at, self._version = stored["data"], stored["built_at"], stored["version"]
+                return
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Walk Slack and replace the shared and local copies."""
+        with self._lock:
+            started = self._attempted_at = time.monotonic()
+            try:
+                data = self._fetch()
+            except SlackApiError as e:
+                # Keep serving what we have (an empty map at worst); the next
+                # attempt waits MISS_REFRESH_MIN_SECONDS
+                warning(logger, "Slack directory refresh failed", map=self.name, exc_info=e)
+                if self._data is None:
+                    self._data = {}
+                return
+            self._store(data, time.time())
+            info(logger, "Refreshed Slack directory", map=self.name, entries=len(data),
+                 elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+
+    def _store(self, data: Dict[str, Any], built_at: float) -> None:
+        # Callers hold self._lock
+        version = uuid.uuid4().hex
+        set_cached(self.data_key, {"data": data, "built_at": built_at, "version": version}, ttl=STORE_TTL)
+        set_cached(self.version_key, version, ttl=STORE_TTL)
+        self._data, self._built_at, self._version = data, built_at, version
+
+    def refresh_if_idle(self) -> bool:
+        """Refresh now unless this worker walked Slack in the last MISS_REFRESH_MIN_SECONDS."""
+        if not self._idle():
+            return False
+        self.refresh()
+        return True
+
+    def update(self, changes: Dict[str, Any]) -> None:
+        """Write entries through to the shared copy; a None value removes the entry."""
+        with self._lock:
+            stored = get_cached(self.data_key)
+            data = dict(stored["data"] if stored is not None else self._data or {})
+            built_at = stored["built_at"] if stored is not None else self._built_at
+            for key, value in changes.items():
+                if value is None:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+            self._store(data, built_at)
+
+    def invalidate(self) -> None:
+        """Drop the shared and local copies; the next lookup walks Slack again."""
+        with self._lock:
+            delete_cached(self.data_key)
+            delete_cached(self.version_key)
+            self._data, self._version, self._built_at = None, None, 0.0
+            self._attempted_at = float("-inf")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._data or {}),
+            "age_seconds": round(time.time() - self._built_at, 1) if self._built_at else None,
+        }
+
+
+class SlackDirectory:
+    """Channel name <-> id and member maps for the workspace."""
+
+    def __init__(self, client_factory: Callable[[], Any]):
+        self._client = client_factory
+        self.channels = _SharedMap("channels", self._fetch_channels, CHANNELS_MAX_AGE_SECONDS)
+        self.members = _SharedMap("members", self._fetch_members, MEMBERS_MAX_AGE_SECONDS)
+        # (channel map it was built from, {id: name})
+        self._channel_names = (None, {})
+
+    def _pages(self, method: str, items_key: str, **kwargs) -> Iterable[Dict[str, Any]]:
+        call = getattr(self._client(), method)
+        cursor = None
+        while True:
+            response = call(limit=PAGE_LIMIT, cursor=cursor, **kwargs)
+            yield from response[items_key]
+            cursor = (response.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return
+
+    def _fetch_channels(self) -> Dict[str, str]:
+        return {channel["name"]: channel["id"]
+                for channel in self._pages("conversations_list", "channels",
+                                           exclude_archived=True, types=CHANNEL_TYPES)}
+
+    def _fetch_members(self) -> Dict[str, Dict[str, Any]]:
+        return {member["id"]: member_record(member) for member in self._pages("users_list", "members")}
+
+    # -- channels ----------------------------------------------------------
+
+    def channel_id(self, channel_name: str) -> Optional[str]:
+        """The id of a channel (with or without '#'), or None."""
+        if not channel_name:
+            return None
+        name = channel_name.lstrip("#")
+        channel_id = self.channels.get().get(name)
+        # Ids (users for DMs, channels already resolved) are never names, so
+        # they do not trigger a refresh
+        if channel_id is None and not looks_like_slack_id(name) and self.channels.refresh_if_idle():
+            channel_id = self.channels.get().get(name)
+        return channel_id
+
+    def channel_name(self, channel_id: str) -> Optional[str]:
+        """The name of a known channel id, or None."""
+        channels = self.channels.get()
+        built_from, names = self._channel_names
+        if built_from is not channels:
+            names = {cid: name for name, cid in channels.items()}
+            self._channel_names = (channels, names)
+        return names.get(channel_id)
+
+    def channel_created(self, channel_name: str, channel_id: str) -> None:
+        self.channels.update({channel_name: channel_id})
+
+    # -- members -----------------------------------------------------------
+
+    def member_list(self) -> List[Dict[str, Any]]:
+        return list(self.members.get().values())
+
+    def member(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.members.get().get(user_id)
+
+    def invalidate(self) -> None:
+        self.channels.invalidate()
+        self.members.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"channels": self.channels.stats(), "members": self.members.stats()}
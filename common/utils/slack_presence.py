@@ -0,0 +1,188 @@
+"""
+Slack presence kept warm in the background.
+
+Slack has no bulk presence call: users.getPresence answers for one member
+and is rate limited, so asking for every member's presence while serving a
+request meant hundreds of sequential calls. The tracker keeps a presence map
+in the cache instead, shared by every worker:
+
+  slack_presence   {"data": {user_id: [presence, checked_at, active_at]}, "batch_at"}
+
+active_at is when the member was last seen active, which is the "recently
+active" signal (Slack's profile "updated" only moves on profile edits).
+
+Reads answer from the map and, at most once per BATCH_INTERVAL_SECONDS,
+schedule a background batch of BATCH_SIZE lookups (the budget presence()
+is rate limited to). One worker runs a batch at a time. A batch picks, in
+order: members a reader asked about that have no entry yet, members seen
+active in the last RECENT_DAYS whose entry is older than
+RECENT_MAX_AGE_SECONDS, and everyone else older than IDLE_MAX_AGE_SECONDS.
+Presence known from elsewhere (an events consumer, a single-user lookup)
+goes in with record(). Every write to the map is a read-modify-write under
+MERGE_LOCK_NAME, so a record() racing a batch does not drop either side.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from slack_sdk.errors import SlackApiError
+
+from common.log import get_logger, info, warning
+from common.utils.redis_cache import acquire_lock, get_cached, release_lock, set_cached, submit_background
+
+logger = get_logger("slack_presence")
+
+CACHE_KEY = "slack_presence"
+LOCK_NAME = "lock:slack_presence"
+LOCK_TTL = 120
+MERGE_LOCK_NAME = "lock:slack_presence:merge"
+MERGE_LOCK_TTL = 5
+MERGE_WAIT_SECONDS = 2
+MERGE_POLL_SECONDS = 0.02
+STORE_TTL = 24 * 3600
+BATCH_SIZE = 40
+BATCH_INTERVAL_SECONDS = 60
+RECENT_DAYS = 7
+RECENT_MAX_AGE_SECONDS = 5 * 60
+IDLE_MAX_AGE_SECONDS = 60 * 60
+UNKNOWN = "unknown"
+ACTIVE = "active"
+# Requested ids remembered per process until a batch looks them up
+MAX_WANTED = 500
+
+
+def trackable(member: Dict[str, Any]) -> bool:
+    return not (member.get("deleted") or member.get("is_bot") or member.get("id") == "USLACKBOT")
+
+
+class PresenceTracker:
+    """Shared member presence map, refreshed in rate-limited background batches."""
+
+    def __init__(self, fetch_presence: Callable[[str], Dict[str, Any]],
+                 members: Callable[[], List[Dict[str, Any]]]):
+        self._fetch = fetch_presence
+        self._members = members
+        self._lock = threading.Lock()
+        self._wanted = set()
+        self._scheduled_at = float("-inf")
+
+    def _stored(self) -> Dict[str, Any]:
+        return get_cached(CACHE_KEY) or {"data": {}, "batch_at": 0}
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, str]:
+        """Presence per user id from the map ("unknown" until first looked up)."""
+        data = self._stored()["data"]
+        result = {}
+        missing = []
+        for user_id in user_ids:
+            entry = data.get(user_id)
+            result[user_id] = entry[0] if entry else UNKNOWN
+            if not entry:
+                missing.append(user_id)
+        if missing:
+            with self._lock:
+                self._wanted.update(missing[:max(0, MAX_WANTED - len(self._wanted))])
+        self._schedule()
+        return result
+
+    def get(self, user_id: str) -> str:
+        """One member's presence: from the map when fresh, otherwise looked up now."""
+        entry = self._stored()["data"].get(user_id)
+        if entry and time.time() - entry[1] < RECENT_MAX_AGE_SECONDS:
+            return entry[0]
+        value = self._fetch(user_id).get("presence", UNKNOWN)
+        self.record({user_id: value})
+        return value
+
+    def record(self, presences: Dict[str, str]) -> None:
+        """Merge presence learned elsewhere (events, single lookups) into the map."""
+        self._merge({user_id: [value, time.time()] for user_id, value in presences.items()})
+
+    def _merge(self, entries: Dict[str, list], batch_at: Optional[float] = None,
+               keep: Optional[set] = None) -> None:
+        deadline = time.monotonic() + MERGE_WAIT_SECONDS
+        token = acquire_lock(MERGE_LOCK_NAME, MERGE_LOCK_TTL)
+        while token is None and time.monotonic() < deadline:
+            time.sleep(MERGE_POLL_SECONDS)
+            token = acquire_lock(MERGE_LOCK_NAME, MERGE_LOCK_TTL)
+        if token is None:
+            warning(logger, "Presence merge lock still held; writing without it", entries=len(entries))
+        try:
+            stored = self._stored()
+            data = dict(stored["data"])
+            if keep is not None:
+                data = {user_id: entry for user_id, entry in data.items() if user_id in keep}
+            for user_id, (value, checked_at) in entries.items():
+                previous = data.get(user_id)
+                active_at = previous[2] if previous and len(previous) > 2 else 0
+                if value == ACTIVE:
+                    active_at = checked_at
+                data[user_id] = [value, checked_at, active_at]
+            set_cached(CACHE_KEY, {"data": data, "batch_at": batch_at or stored["batch_at"]}, ttl=STORE_TTL)
+        finally:
+            release_lock(MERGE_LOCK_NAME, token)
+
+    def _schedule(self) -> None:
+        now = time.monotonic()
+        if now - self._scheduled_at < BATCH_INTERVAL_SECONDS:
+            return
+        self._scheduled_at = now
+        submit_background(CACHE_KEY, self.refresh_batch)
+
+    def due(self, data: Dict[str, list], now: float) -> List[str]:
+        """Member ids to look up next, most wanted first."""
+        with self._lock:
+            wanted = set(self._wanted)
+        recent_cutoff = now - RECENT_DAYS * 86400
+        candidates = []
+        for member in self._members():
+            if not trackable(member):
+                continue
+            user_id = member["id"]
+            entry = data.get(user_id)
+            checked_at = entry[1] if entry else 0
+            recent = bool(entry) and len(entry) > 2 and entry[2] >= recent_cutoff
+            if now - checked_at < (RECENT_MAX_AGE_SECONDS if recent else IDLE_MAX_AGE_SECONDS):
+                continue
+            candidates.append((user_id not in wanted, not recent, checked_at, user_id))
+        candidates.sort()
+        return [user_id for _, _, _, user_id in candidates]
+
+    def refresh_batch(self) -> int:
+        """Look up the next BATCH_SIZE due members; returns how many were updated."""
+        token = acquire_lock(LOCK_NAME, LOCK_TTL)
+        if token is None:
+            return 0
+        try:
+            now = time.time()
+            stored = self._stored()
+            if now - stored["batch_at"] < BATCH_INTERVAL_SECONDS:
+                # Another worker ran this interval's batch
+                return 0
+            members = {member["id"] for member in self._members() if trackable(member)}
+            updates = {}
+            for user_id in self.due(stored["data"], now)[:BATCH_SIZE]:
+                try:
+                    updates[user_id] = [self._fetch(user_id).get("presence", UNKNOWN), time.time()]
+                except SlackApiError as e:
+                    warning(logger, "Presence lookup failed; ending batch early", user_id=user_id, exc_info=e)
+                    break
+            self._merge(updates, batch_at=now, keep=members)
+            with self._lock:
+                self._wanted.difference_update(updates)
+            info(logger, "Refreshed Slack presence", updated=len(updates), tracked=len(members),
+                 elapsed_ms=round((time.time() - now) * 1000, 1))
+            return len(updates)
+        finally:
+            release_lock(LOCK_NAME, token)
+
+    def stats(self) -> Dict[str, Any]:
+        stored = self._stored()
+        now = time.time()
+        ages = [now - entry[1] for entry in stored["data"].values()]
+        return {
+            "tracked": len(ages),
+            "oldest_seconds": round(max(ages), 1) if ages else None,
+            "last_batch_seconds_ago": round(now - stored["batch_at"], 1) if stored["batch_at"] else None,
+            "wanted": len(self._wanted),
+        }
@@ -0,0 +1,492 @@
+"""
+Outbound Slack delivery queue.
+
+async_send_slack used to start a thread per message and send_slack_audit
+posted to the webhook inline, so a burst of notifications became a burst
+of concurrent Slack calls with no ordering and no retry. Messages now go
+through one outbox per process:
+
+  - enqueue() puts a message on the backlog: a Redis list shared by all
+    workers when Redis is available (so a restart does not lose what has
+    not been picked up), otherwise an in-process buffer. Both are bounded
+    by QUEUE_MAXSIZE. Workers take at most SHARED_HOLD_MAX messages off the
+    shared list at a time, so the backlog (and the bound) stays in Redis.
+  - A dispatcher thread groups messages by channel and sender identity.
+    A channel is posted to at most once per CHANNEL_MIN_INTERVAL_SECONDS
+    (Slack's chat.postMessage and webhook limit), and messages that arrive
+    within COALESCE_SECONDS of each other are joined into one post. With
+    Redis the interval is a per-channel key shared by all workers, so
+    workers pace each other; coalescing stays per worker.
+  - SEND_WORKERS threads deliver. A 429 pauses the channel for Retry-After
+    seconds; other transient failures back off and retry up to
+    MAX_ATTEMPTS; permanent ones (unknown channel, bad auth) are dropped.
+
+Messages are plain dicts so they survive the trip through Redis:
+{"kind": "chat" | "webhook", "channel", "text", "blocks", "username",
+"icon_emoji", "enqueued_at", "attempts"}.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from slack_sdk.errors import SlackApiError
+
+from common.log import get_logger, info, warning
+from common.utils.fork_safety import OncePerProcess
+from common.utils.redis_cache import get_redis_client
+
+logger = get_logger("slack_queue")
+
+SHARED_QUEUE_KEY = "slack:outbox"
+QUEUE_MAXSIZE = 1000
+SEND_WORKERS = 2
+COALESCE_SECONDS = 1.0
+CHANNEL_MIN_INTERVAL_SECONDS = 1.0
+MAX_ATTEMPTS = 4
+RETRY_BACKOFF_SECONDS = 2.0
+# A mrkdwn section holds at most 3000 characters and a message 50 blocks
+MAX_COALESCED_TEXT = 3000
+MAX_COALESCED_BLOCKS = 50
+# Messages a worker holds from the shared queue at once
+SHARED_HOLD_MAX = 100
+# Per-channel pacing keys shared by all workers
+CHANNEL_RATE_KEY_PREFIX = "slack:outbox:rate:"
+LATENCY_SAMPLES = 1000
+FLUSH_TIMEOUT_SECONDS = 5.0
+
+# chat.postMessage errors that retrying will not fix
+PERMANENT_ERRORS = {
+    "channel_not_found", "not_in_channel", "is_archived", "invalid_auth", "not_authed",
+    "account_inactive", "token_revoked", "invalid_blocks", "msg_too_long", "no_text",
+    "restricted_action", "user_not_found",
+}
+
+
+class RetryAfter(Exception):
+    """Raised by a delivery function when Slack answered 429."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"rate limited, retry after {seconds}s")
+        self.seconds = seconds
+
+
+def make_message(kind: str, channel: str, text: str, blocks: Optional[List[Any]] = None,
+                 username: Optional[str] = None, icon_emoji: Optional[str] = None) -> Dict[str, Any]:
+    if blocks:
+        # Block Kit objects to plain dicts so the message can be stored in Redis
+        blocks = [block.to_dict() if hasattr(block, "to_dict") else block for block in blocks]
+    return {
+        "kind": kind,
+        "channel": channel,
+        "text": text,
+        "blocks": blocks or None,
+        "username": username,
+        "icon_emoji": icon_emoji,
+        "enqueued_at": time.time(),
+        "attempts": 0,
+    }
+
+
+def _group_key(message: Dict[str, Any]) -> str:
+    return "|".join([message["kind"], message["channel"] or "", message.get("username") or "",
+                     message.get("icon_emoji") or ""])
+
+
+def _rate_key(message: Dict[str, Any]) -> str:
+    return f"{message['kind']}|{message['channel'] or ''}"
+
+
+def _section(text: str) -> Dict[str, Any]:
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def coalesce(batch: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One message carrying every message of the batch, in order."""
+    if len(batch) == 1:
+        return batch[0]
+    combined = dict(batch[0])
+    combined["text"] = "\n".join(message["text"] or "" for message in batch)
+    if any(message.get("blocks") for message in batch):
+        combined["blocks"] = [block for message in batch
+                              for block in (message.get("blocks") or [_section(message["text"] or "")])]
+    return combined
+
+
+def _block_count(message: Dict[str, Any]) -> int:
+    return len(message.get("blocks") or ()) or 1
+
+
+def take_batch(pending: Deque[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Pop the messages that fit in one post (at least one)."""
+    batch = [pending.popleft()]
+    text, blocks = len(batch[0]["text"] or ""), _block_count(batch[0])
+    while pending:
+        message = pending[0]
+        text += len(message["text"] or "") + 1
+        blocks += _block_count(message)
+        if text > MAX_COALESCED_TEXT or blocks > MAX_COALESCED_BLOCKS:
+            break
+        batch.append(pending.popleft())
+    return batch
+
+
+class SlackOutbox:
+    """
+    Per-process dispatcher for queued Slack messages.
+
+    deliver(message) posts one (possibly coalesced) message. It raises
+    RetryAfter or SlackApiError on a 429, SlackApiError or any other
+    exception for failures worth retrying, and returns normally otherwise.
+    """
+
+    def __init__(self, deliver: Callable[[Dict[str, Any]], None], workers: int = SEND_WORKERS,
+                 coalesce_seconds: float = COALESCE_SECONDS,
+                 min_interval_seconds: float = CHANNEL_MIN_INTERVAL_SECONDS,
+                 maxsize: int = QUEUE_MAXSIZE, shared: bool = True):
+        self._deliver = deliver
+        self._workers = workers
+        self._coalesce_seconds = coalesce_seconds
+        self._min_interval_seconds = min_interval_seconds
+        self._maxsize = maxsize
+        self._shared = shared
+        self._cond = threading.Condition()
+        self._reset()
+        self._started = OncePerProcess(self._start, after_fork=self._after_fork)
+
+    def _reset(self) -> None:
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._ready_at: Dict[str, float] = {}  # group key -> monotonic time its window closes
+        self._next_send_at: Dict[str, float] = {}  # rate key -> monotonic time
+        self._busy = set()
+        self._depth = 0
+        self._pool = None
+        self._thread = None
+        self._draining = False
+        self._stopping = False
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self._stats = {"enqueued": 0, "delivered": 0, "posts": 0, "coalesced": 0, "retries": 0,
+                       "rate_limited": 0, "dropped": 0, "failed": 0}
+
+    def _redis(self):
+        return get_redis_client() if self._shared else None
+
+    def _ensure_started(self) -> None:
+        self._started.ensure()
+
+    def _start(self) -> None:
+        with self._cond:
+            self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="slack-send")
+            self._thread = threading.Thread(target=self._run, name="slack-dispatch", daemon=True)
+            self._thread.start()
+
+    def _after_fork(self) -> None:
+        # A forked worker holds none of the parent's messages or threads
+        self._cond = threading.Condition()
+        self._reset()
+
+    # -- producers ---------------------------------------------------------
+
+    def enqueue(self, message: Dict[str, Any]) -> bool:
+        """Queue a message built with make_message(). False if the queue is full."""
+        self._ensure_started()
+        client = self._redis()
+        if client is not None:
+            try:
+                if client.llen(SHARED_QUEUE_KEY) >= self._maxsize:
+                    return self._drop(message)
+                client.rpush(SHARED_QUEUE_KEY, json.dumps(message))
+                self._count("enqueued")
+                return True
+            except Exception as e:
+                warning(logger, "Shared Slack queue unavailable; queueing locally", exc_info=e)
+        with self._cond:
+            if self._depth >= self._maxsize:
+                return self._drop(message)
+            self._add(message)
+            self._stats["enqueued"] += 1
+            self._cond.notify()
+        return True
+
+    def _drop(self, message: Dict[str, Any]) -> bool:
+        warning(logger, "Slack queue full; dropping message", channel=message["channel"], kind=message["kind"])
+        self._count("dropped")
+        return False
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._cond:
+            self._stats[name] += n
+
+    def _add(self, message: Dict[str, Any], front: bool = False) -> None:
+        # Callers hold self._cond
+        key = _group_key(message)
+        pending = self._pending.setdefault(key, deque())
+        if not pending and key not in self._busy:
+            self._ready_at[key] = time.monotonic() + self._coalesce_seconds
+        if front:
+            pending.appendleft(message)
+        else:
+            pending.append(message)
+        self._depth += 1
+
+    # -- dispatcher --------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stopping:
+            try:
+                wait = self._dispatch()
+                self._pull_shared(wait)
+            except Exception as e:
+                warning(logger, "Slack dispatcher error", exc_info=e)
+                time.sleep(1)
+
+    def _due(self, key: str, pending: Deque[Dict[str, Any]]) -> float:
+        ready_at = 0.0 if self._draining else self._ready_at.get(key, 0.0)
+        return max(ready_at, self._next_send_at.get(_rate_key(pending[0]), 0.0))
+
+    def _dispatch(self) -> float:
+        """Hand every due group to the send pool; returns seconds until the next one is due."""
+        with self._cond:
+            now = time.monotonic()
+            wait = 1.0
+            for key, pending in self._pending.items():
+                if not pending or key in self._busy:
+                    continue
+                due = self._due(key, pending)
+                if due > now:
+                    wait = min(wait, due - now)
+                    continue
+                batch = take_batch(pending)
+                self._depth -= len(batch)
+                self._busy.add(key)
+                self._pool.submit(self._send, key, batch)
+            for key in [key for key, pending in self._pending.items() if not pending and key not in self._busy]:
+                del self._pending[key]
+                self._ready_at.pop(key, None)
+            return max(wait, 0.01)
+
+    def _pull_shared(self, wait: float) -> None:
+        client = self._redis()
+        with self._cond:
+            room = min(self._maxsize, SHARED_HOLD_MAX) - self._depth
+            if client is None or room <= 0:
+                # Leave the backlog in Redis until what is held has been sent
+                self._cond.wait(wait)
+                return
+        try:
+            first = client.blpop(SHARED_QUEUE_KEY, timeout=wait)
+            if first is None:
+                return
+            raw = [first[1]] + ((client.lpop(SHARED_QUEUE_KEY, room - 1) if room > 1 else None) or [])
+        except Exception as e:
+            warning(logger, "Could not read the shared Slack queue", exc_info=e)
+            with self._cond:
+                self._cond.wait(wait)
+            return
+        with self._cond:
+            if not self._stopping:
+                for item in raw:
+                    self._add(json.loads(item))
+                return
+        # shutdown() may already have returned what it held; put these back too
+        try:
+            client.lpush(SHARED_QUEUE_KEY, *reversed(raw))
+        except Exception as e:
+            warning(logger, "Could not return Slack messages to the shared queue", count=len(raw), exc_info=e)
+
+    # -- delivery ----------------------------------------------------------
+
+    def _claim_channel(self, rate_key: str) -> float:
+        """Take the channel's shared send slot; returns 0, or seconds until another worker's slot ends."""
+        client = self._redis()
+        if client is None:
+            return 0.0
+        name = CHANNEL_RATE_KEY_PREFIX + rate_key
+        try:
+            if client.set(name, os.getpid(), nx=True, px=max(1, int(self._min_interval_seconds * 1000))):
+                return 0.0
+            return max(client.pttl(name), 1) / 1000
+        except Exception:
+            # Pace locally only while Redis is unreachable
+            return 0.0
+
+    def _pause_channel(self, rate_key: str, seconds: float) -> None:
+        """Tell every worker a channel is rate limited for seconds."""
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.set(CHANNEL_RATE_KEY_PREFIX + rate_key, os.getpid(), px=max(1, int(seconds * 1000)))
+        except Exception:
+            pass
+
+    def _send(self, key: str, batch: List[Dict[str, Any]]) -> None:
+        message = coalesce(batch)
+        rate_key = _rate_key(message)
+        retry_in = None
+        deferred = self._claim_channel(rate_key)
+        if deferred:
+            with self._cond:
+                for m in reversed(batch):
+                    self._add(m, front=True)
+                self._next_send_at[rate_key] = time.monotonic() + deferred
+                self._busy.discard(key)
+                self._cond.notify_all()
+            return
+        try:
+            self._deliver(message)
+            delivered_at = time.time()
+            with self._cond:
+                self._stats["delivered"] += len(batch)
+                self._stats["posts"] += 1
+                self._stats["coalesced"] += len(batch) - 1
+                self._latencies.extend(delivered_at - m["enqueued_at"] for m in batch)
+        except RetryAfter as e:
+            retry_in = e.seconds
+        except SlackApiError as e:
+            error = e.response.get("error") if e.response is not None else None
+            if e.response is not None and e.response.status_code == 429:
+                retry_in = float(e.response.headers.get("Retry-After", 1))
+            elif error in PERMANENT_ERRORS:
+                warning(logger, "Dropping Slack message", channel=message["channel"], error=error)
+                self._count("failed", len(batch))
+            else:
+                self._retry(batch, e)
+        except Exception as e:
+            self._retry(batch, e)
+        finally:
+            if retry_in is not None:
+                self._pause_channel(rate_key, retry_in)
+            with self._cond:
+                if retry_in is not None:
+                    self._stats["rate_limited"] += 1
+                    for m in reversed(batch):
+                        self._add(m, front=True)
+                    self._next_send_at[rate_key] = time.monotonic() + retry_in
+                else:
+                    self._next_send_at[rate_key] = max(self._next_send_at.get(rate_key, 0.0),
+                                                       time.monotonic() + self._min_interval_seconds)
+                self._busy.discard(key)
+                self._cond.notify_all()
+
+    def _retry(self, batch: List[Dict[str, Any]], exc: Exception) -> None:
+        retry = [m for m in batch if m["attempts"] + 1 < MAX_ATTEMPTS]
+        failed = len(batch) - len(retry)
+        if failed:
+            warning(logger, "Giving up on Slack message", channel=batch[0]["channel"],
+                    attempts=MAX_ATTEMPTS, exc_info=exc)
+        with self._cond:
+            self._stats["failed"] += failed
+            self._stats["retries"] += len(retry)
+            for m in reversed(retry):
+                m["attempts"] += 1
+                self._add(m, front=True)
+            if retry:
+                backoff = RETRY_BACKOFF_SECONDS * 2 ** (retry[0]["attempts"] - 1)
+                self._next_send_at[_rate_key(batch[0])] = time.monotonic() + backoff
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> bool:
+        """
+        Send what this process holds, ignoring the coalescing window.
+        True if nothing is left (retries that back off past the timeout are not).
+        """
+        if self._thread is None:
+            return True
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._draining = True
+            try:
+                self._cond.notify_all()
+                while self._depth or self._busy:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(min(remaining, 0.1))
+                return True
+            finally:
+                self._draining = False
+
+    def shutdown(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> None:
+        """
+        At exit: stop the dispatcher, then hand held messages back to the
+        shared queue, or send them from the calling thread (the send pool no
+        longer accepts work).
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        # It wakes within a second (BLPOP and condition waits are capped by _dispatch)
+        self._thread.join(timeout)
+        with self._cond:
+            held = list(self._pending.values())
+            self._pending.clear()
+            self._depth = 0
+        if not any(held):
+            return
+        client = self._redis()
+        if client is not None:
+            messages = [m for pending in held for m in pending]
+            try:
+                client.lpush(SHARED_QUEUE_KEY, *[json.dumps(m) for m in reversed(messages)])
+                info(logger, "Returned Slack messages to the shared queue", count=len(messages))
+                return
+            except Exception as e:
+                warning(logger, "Could not return Slack messages to the shared queue", exc_info=e)
+        deadline = time.monotonic() + timeout
+        unsent = 0
+        for pending in held:
+            while pending:
+                batch = take_batch(pending)
+                if time.monotonic() > deadline:
+                    unsent += len(batch)
+                    continue
+                try:
+                    self._deliver(coalesce(batch))
+                except Exception as e:
+                    unsent += len(batch)
+                    warning(logger, "Could not send Slack message at exit", channel=batch[0]["channel"], exc_info=e)
+        if unsent:
+            warning(logger, "Slack messages left unsent at exit", count=unsent)
+
+    def samples(self):
+        """Metrics collector (see common/utils/metrics.py); local counters only, no Redis calls."""
+        with self._cond:
+            stats = dict(self._stats)
+            depth, in_flight = self._depth, len(self._busy)
+        yield "ohack_slack_queue_depth", {}, depth
+        yield "ohack_thread_pool_active", {"pool": "slack_send"}, in_flight
+        yield "ohack_thread_pool_max", {"pool": "slack_send"}, self._workers
+        for outcome in ("delivered", "failed", "dropped", "rate_limited", "retries"):
+            yield "ohack_slack_queue_messages_total", {"outcome": outcome}, stats[outcome]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["depth"] = self._depth
+            stats["in_flight"] = len(self._busy)
+            latencies = sorted(self._latencies)
+        client = self._redis()
+        stats["backend"] = "redis" if client is not None else "local"
+        if client is not None:
+            try:
+                stats["shared_depth"] = client.llen(SHARED_QUEUE_KEY)
+            except Exception:
+                stats["shared_depth"] = None
+        if latencies:
+            stats["latency_ms"] = {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+                "samples": len(latencies),
+            }
+        else:
+            stats["latency_ms"] = None
+        return stats
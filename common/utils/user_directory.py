@@ -0,0 +1,438 @@
+"""
+Shared, incrementally maintained directory of users.
+
+Several endpoints used to stream and deserialize the whole users collection
+per request just to read a handful of fields. The directory keeps one
+compact record per user (ids, name, nickname, email, image, hearts total,
+volunteering totals) and is shared by all of them.
+
+Storage:
+  user_directory/meta        {built_at, records, shards, bytes, rebuild_seconds}
+  user_directory/shard_NN    {records: {user_doc_id: record}}
+
+Records are spread over shard docs, so a worker loads the directory in a
+handful of reads instead of one per user. rebuild() picks the shard count
+(at least USER_DIRECTORY_SHARDS) so shards average SHARD_TARGET_BYTES, far
+below Firestore's 1 MiB document limit, and records it in the meta doc. A
+shard that still cannot be written is logged and skipped; the rebuild goes on.
+
+Freshness:
+  - insert_user/update_user/upsert_profile_metadata and the hearts writers call
+    refresh_user_in_directory(), which rewrites that user's record and
+    broadcasts it (redis_cache.publish_event); other workers patch that one
+    record in memory. It reads the meta doc first, so the record lands in the
+    current shard layout even if another worker rebuilt it, and a worker that
+    sees a newer build reloads on its next lookup.
+  - rebuild() bumps a version in Redis; other workers reload every shard on
+    their next lookup. Workers also reload after max_age_seconds, which
+    repairs broadcasts missed while their listener was reconnecting.
+  - Writers that are not hooked (scripts, team membership) are caught up by a
+    full rebuild once the meta doc is older than REBUILD_MAX_AGE_SECONDS.
+"""
+import json
+import math
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from google.cloud import firestore
+
+from common.log import get_logger, info, warning
+from common.utils.redis_cache import (
+    acquire_lock,
+    get_cached,
+    publish_event,
+    release_lock,
+    set_cached,
+    submit_background,
+    subscribe_events,
+)
+
+logger = get_logger("user_directory")
+
+COLLECTION = "user_directory"
+META_DOC = "meta"
+USERS_COLLECTION = "users"
+NUM_SHARDS = int(os.environ.get("USER_DIRECTORY_SHARDS", "16"))
+SHARD_TARGET_BYTES = 384 * 1024
+SHARD_WARN_BYTES = 768 * 1024
+EVENT_TOPIC = "user_directory"
+REBUILD_MAX_AGE_SECONDS = 24 * 3600
+REBUILD_LOCK = "user_directory:rebuild"
+REBUILD_LOCK_TTL = 600
+
+# Kept on user docs by the hearts writers; ordered queries use HEARTS_TOTAL_FIELD
+HEARTS_TOTAL_FIELD = "hearts_total"
+HEARTS_BY_CATEGORY_FIELD = "hearts_by_category"
+
+# Fields read from user docs; everything else (history details, sessions,
+# references) stays out of the directory.
+SOURCE_FIELDS = ["user_id", "propel_id", "name", "nickname", "email_address",
+                 "profile_image", "last_login", "history", "volunteering"]
+MAX_TEXT_LEN = 200
+MAX_URL_LEN = 1000
+
+
+def _text(value, limit=MAX_TEXT_LEN) -> str:
+    return value[:limit] if isinstance(value, str) else ""
+
+
+def hearts_by_category(history: Any) -> Dict[str, float]:
+    """Hearts per history category ("how", "what"); certificates are not hearts."""
+    totals = {}
+    if not isinstance(history, dict):
+        return totals
+    for key, values in history.items():
+        if "certificates" in key or not isinstance(values, dict):
+            continue
+        totals[key] = sum(amount for amount in values.values() if isinstance(amount, (int, float)))
+    return totals
+
+
+def hearts_total(history: Any) -> float:
+    """Sum of every heart category in a user's history."""
+    return sum(hearts_by_category(history).values())
+
+
+def hearts_fields(history: Any) -> Dict[str, Any]:
+    """Denormalized totals stored on the user doc next to its history."""
+    by_category = hearts_by_category(history)
+    return {
+        HEARTS_TOTAL_FIELD: sum(by_category.values()),
+        HEARTS_BY_CATEGORY_FIELD: by_category,
+    }
+
+
+def user_record(doc_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Compact directory record for a user doc, or None for docs without a user_id."""
+    if not data or not data.get("user_id"):
+        return None
+    history = data.get("history") or {}
+    sessions = [v for v in (data.get("volunteering") or []) if isinstance(v, dict)]
+    return {
+        "id": doc_id,
+        "user_id": data["user_id"],
+        "propel_id": data.get("propel_id") or None,
+        "name": _text(data.get("name")),
+        "nickname": _text(data.get("nickname")),
+        "email": _text(data.get("email_address")),
+        "image": _text(data.get("profile_image"), MAX_URL_LEN),
+        "last_login": _text(data.get("last_login")),
+        "hearts": hearts_total(history),
+        "has_history": bool(history),
+        "vol_sessions": len(sessions),
+        "vol_final_hours": round(sum(float(v.get("finalHours") or 0) for v in sessions), 2),
+        "vol_commitment_hours": round(sum(float(v.get("commitmentHours") or 0) for v in sessions), 2),
+    }
+
+
+def shard_for(doc_id: str, num_shards: int = NUM_SHARDS) -> str:
+    return f"shard_{zlib.crc32(doc_id.encode('utf-8')) % num_shards:02d}"
+
+
+class UserDirectory:
+    """Process-local view of the shared directory."""
+
+    VERSION_CACHE_KEY = "user_directory:version"
+    VERSION_TTL = 7 * 24 * 3600
+
+    def __init__(self, max_age_seconds: int = 3600):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._by_user_id: Dict[str, str] = {}
+        self._version = None
+        self._loaded_at = None
+        self._meta: Dict[str, Any] = {}
+        self._reload_pending = False
+        self._listeners: List[Callable[[Optional[Dict[str, Any]]], None]] = []
+        self._load_lock = threading.Lock()
+        # Tags this instance's broadcasts; the pid tells forked workers apart
+        self._instance = uuid.uuid4().hex
+        subscribe_events(EVENT_TOPIC, self._apply_event)
+
+    @staticmethod
+    def _get_db():
+        from common.utils.firebase import get_db
+        return get_db()
+
+    # -- building ----------------------------------------------------------
+
+    def rebuild(self, db=None) -> Dict[str, Any]:
+        """Scan the users collection once and rewrite every shard. Returns build stats."""
+        db = db or self._get_db()
+        started = time.monotonic()
+        query = db.collection(USERS_COLLECTION)
+        if hasattr(query, "select"):
+            query = query.select(SOURCE_FIELDS)
+        records = {}
+        total_bytes = 0
+        for doc in query.stream():
+            record = user_record(doc.id, doc.to_dict() or {})
+            if record is not None:
+                records[doc.id] = record
+                total_bytes += len(json.dumps(record, separators=(",", ":")))
+
+        num_shards = max(NUM_SHARDS, math.ceil(total_bytes / SHARD_TARGET_BYTES))
+        shards: Dict[str, Dict[str, Any]] = {}
+        for doc_id, record in records.items():
+            shards.setdefault(shard_for(doc_id, num_shards), {})[doc_id] = record
+
+        shard_bytes, failed = {}, []
+        for i in range(num_shards):
+            name = f"shard_{i:02d}"
+            shard_records = shards.get(name, {})
+            shard_bytes[name] = len(json.dumps(shard_records, separators=(",", ":")))
+            try:
+                db.collection(COLLECTION).document(name).set({"records": shard_records})
+            except Exception as e:
+                # Readers of that shard keep its previous contents until the next rebuild
+                failed.append(name)
+                warning(logger, "Could not write user directory shard", shard=name,
+                        bytes=shard_bytes[name], exc_info=e)
+
+        stats = {
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "records": len(records),
+            "shards": num_shards,
+            "bytes": sum(shard_bytes.values()),
+            "largest_shard_bytes": max(shard_bytes.values() or [0]),
+            "failed_shards": failed,
+            "rebuild_seconds": round(time.monotonic() - started, 2),
+        }
+        db.collection(COLLECTION).document(META_DOC).set(stats)
+        self._warn_oversized(shard_bytes)
+        self._install(records, stats, self._publish_version())
+        info(logger, "Rebuilt user directory", **stats)
+        return stats
+
+    def _warn_oversized(self, shard_bytes: Dict[str, int]) -> None:
+        for name, size in shard_bytes.items():
+            if size > SHARD_WARN_BYTES:
+                warning(logger, "User directory shard near the document size limit",
+                        shard=name, bytes=size, shards=len(shard_bytes))
+
+    def _install(self, records: Dict[str, Dict[str, Any]], meta: Dict[str, Any], version: Optional[str]) -> None:
+        by_user_id = {r["user_id"]: doc_id for doc_id, r in records.items()}
+        with self._lock:
+            previous, had_records = self._records, self._loaded_at is not None
+            self._records, self._by_user_id = records, by_user_id
+            self._meta = meta
+            self._version = version
+            self._loaded_at = time.monotonic()
+            self._reload_pending = False
+        if not had_records:
+            self._notify(None)
+            return
+        changed = {}
+        for doc_id in previous.keys() | records.keys():
+            old, new = previous.get(doc_id), records.get(doc_id)
+            if old != new:
+                changed[doc_id] = new
+            else:
+                # Reuse the existing object so listeners do not pin the old copy
+                records[doc_id] = old
+        if changed:
+            self._notify(changed)
+
+    def add_listener(self, callback: Callable[[Optional[Dict[str, Any]]], None]) -> None:
+        """
+        Call callback after the directory changes.
+
+        It receives {doc_id: record or None (removed)} for the records that
+        changed, or None when the whole directory was replaced.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, changed: Optional[Dict[str, Any]]) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                warning(logger, "User directory listener failed", error=str(e))
+
+    def load(self) -> None:
+        """Read the meta doc and every shard; builds the directory on first use."""
+        db = self._get_db()
+        started = time.monotonic()
+        meta_snap = db.collection(COLLECTION).document(META_DOC).get()
+        if not meta_snap.exists:
+            self._build_or_scan(db)
+            return
+
+        meta = meta_snap.to_dict() or {}
+        refs = [db.collection(COLLECTION).document(f"shard_{i:02d}") for i in range(meta.get("shards") or NUM_SHARDS)]
+        records, shard_bytes = {}, {}
+        for snap in db.get_all(refs):
+            shard_records = (snap.to_dict() or {}).get("records") or {} if snap.exists else {}
+            records.update(shard_records)
+            shard_bytes[snap.id] = len(json.dumps(shard_records, separators=(",", ":")))
+        self._warn_oversized(shard_bytes)
+        self._install(records, meta, get_cached(self.VERSION_CACHE_KEY) or self._publish_version())
+        info(logger, "Loaded user directory", records=len(records), bytes=sum(shard_bytes.values()),
+             elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+        if self._meta_age_seconds() > REBUILD_MAX_AGE_SECONDS:
+            submit_background(REBUILD_LOCK, self._rebuild_locked)
+
+    def _build_or_scan(self, db) -> None:
+        token = acquire_lock(REBUILD_LOCK, REBUILD_LOCK_TTL)
+        if token:
+            try:
+                self.rebuild(db)
+            finally:
+                release_lock(REBUILD_LOCK, token)
+            return
+        # Another worker is building; scan privately and pick up the shared
+        # shards once that build publishes its version
+        records = {}
+        for doc in db.collection(USERS_COLLECTION).stream():
+            record = user_record(doc.id, doc.to_dict() or {})
+            if record is not None:
+                records[doc.id] = record
+        self._install(records, {}, get_cached(self.VERSION_CACHE_KEY))
+
+    def _rebuild_locked(self) -> None:
+        token = acquire_lock(REBUILD_LOCK, REBUILD_LOCK_TTL)
+        if not token:
+            return
+        try:
+            self.rebuild()
+        finally:
+            release_lock(REBUILD_LOCK, token)
+
+    def _meta_age_seconds(self) -> float:
+        built_at = self._meta.get("built_at")
+        if not built_at:
+            return float("inf")
+        try:
+            return (datetime.now(timezone.utc) - datetime.fromisoformat(built_at)).total_seconds()
+        except ValueError:
+            return float("inf")
+
+    def _publish_version(self) -> str:
+        version = uuid.uuid4().hex
+        set_cached(self.VERSION_CACHE_KEY, version, ttl=self.VERSION_TTL)
+        return version
+
+    def _is_stale(self) -> bool:
+        if self._loaded_at is None or self._reload_pending:
+            return True
+        if time.monotonic() - self._loaded_at > self.max_age_seconds:
+            return True
+        shared = get_cached(self.VERSION_CACHE_KEY)
+        return shared is not None and shared != self._version
+
+    def ensure_loaded(self) -> None:
+        if not self._is_stale():
+            return
+        # One reload per worker; concurrent requests wait for it instead of repeating it
+        with self._load_lock:
+            if self._is_stale():
+                self.load()
+
+    # -- write-path hooks --------------------------------------------------
+
+    def _shard_count(self, db) -> int:
+        """Shard count of the stored directory, read fresh since another worker may have rebuilt it."""
+        snap = db.collection(COLLECTION).document(META_DOC).get()
+        meta = (snap.to_dict() or {}) if snap.exists else {}
+        if self._loaded_at is not None and (meta.get("built_at"), meta.get("shards")) != \
+                (self._meta.get("built_at"), self._meta.get("shards")):
+            # Our records come from another build; reload them on the next lookup
+            self._reload_pending = True
+        return meta.get("shards") or NUM_SHARDS
+
+    def refresh_user(self, doc_id: str) -> None:
+        """Re-read one user doc, rewrite its record (or drop it if the doc is gone) and tell the other workers."""
+        db = self._get_db()
+        snap = db.collection(USERS_COLLECTION).document(doc_id).get()
+        record = user_record(doc_id, snap.to_dict() or {}) if snap.exists else None
+        # merge=True merges nested maps, so only records.<doc_id> is replaced
+        value = firestore.DELETE_FIELD if record is None else record
+        shard = shard_for(doc_id, self._shard_count(db))
+        db.collection(COLLECTION).document(shard).set({"records": {doc_id: value}}, merge=True)
+        self._apply(doc_id, record)
+        publish_event(EVENT_TOPIC, {"origin": self._origin(), "doc_id": doc_id, "record": record})
+
+    def _origin(self) -> str:
+        return f"{self._instance}:{os.getpid()}"
+
+    def _apply_event(self, payload: Dict[str, Any]) -> None:
+        if payload.get("origin") != self._origin() and payload.get("doc_id"):
+            self._apply(payload["doc_id"], payload.get("record"))
+
+    def _apply(self, doc_id: str, record: Optional[Dict[str, Any]]) -> None:
+        """Patch one record into the loaded directory; a no-op before the first load."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            previous = self._records.pop(doc_id, None)
+            if previous:
+                self._by_user_id.pop(previous["user_id"], None)
+            if record is not None:
+                self._records[doc_id] = record
+                self._by_user_id[record["user_id"]] = doc_id
+        self._notify({doc_id: record})
+
+    # -- lookups -----------------------------------------------------------
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every record. Treat them as read-only."""
+        self.ensure_loaded()
+        return list(self._records.values())
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        return self._records.get(doc_id)
+
+    def by_user_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        doc_id = self._by_user_id.get(user_id)
+        return self._records.get(doc_id) if doc_id else None
+
+    def ids_where(self, predicate) -> List[str]:
+        """Doc ids of the records matching predicate."""
+        self.ensure_loaded()
+        return [doc_id for doc_id, record in list(self._records.items()) if predicate(record)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Size of the loaded directory plus the meta of the last rebuild."""
+        self.ensure_loaded()
+        records = list(self._records.values())
+        return {
+            "records": len(records),
+            "bytes": len(json.dumps(records, separators=(",", ":"))),
+            "last_rebuild": dict(self._meta),
+        }
+
+
+directory = UserDirectory()
+
+
+def get_user_directory() -> UserDirectory:
+    return directory
+
+
+def refresh_user_in_directory(doc_id: Optional[str]) -> None:
+    """Best-effort write-path hook; the periodic rebuild repairs anything missed."""
+    if not doc_id:
+        return
+    try:
+        directory.refresh_user(doc_id)
+    except Exception as e:
+        warning(logger, "Failed to update user directory", user_doc_id=doc_id, error=str(e))
+
+
+def load_user_docs(doc_ids: Iterable[str], field_paths: List[str], db=None) -> List[Any]:
+    """Snapshots for a subset of users (only field_paths), chunked get_all."""
+    db = db or UserDirectory._get_db()
+    doc_ids = list(doc_ids)
+    snaps = []
+    for start in range(0, len(doc_ids), 300):
+        refs = [db.collection(USERS_COLLECTION).document(i) for i in doc_ids[start:start + 300]]
+        snaps.extend(s for s in db.get_all(refs, field_paths=field_paths) if s.exists)
+    return snaps
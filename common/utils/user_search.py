@@ -0,0 +1,287 @@
+"""
+In-process typeahead index over the user directory.
+
+Names, nicknames and emails are folded (case and diacritics) and indexed by
+trigram. Words are also indexed with a leading space, so " ja" marks a word
+starting with "ja" (two-character queries are a single posting-list read)
+and " jan" one starting with "jan".
+
+Ranking: word-prefix matches first, then other substring matches; within
+each group the most recently logged-in users first. Every user gets a rank
+id ordered by last_login and posting lists are kept sorted by it, so a query
+walks its shortest posting list from the end and stops after `limit` hits
+instead of scoring every candidate.
+
+The index follows the user directory: it is built on first use and updated
+per user from the directory's change notifications (write-path hooks and
+reloads after other workers' writes).
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from common.log import get_logger, info
+from common.utils.redis_cache import submit_background
+from common.utils.user_directory import UserDirectory, get_user_directory
+
+logger = get_logger("user_search")
+
+MIN_QUERY_LEN = 2
+FIELD_SEPARATOR = "\x1f"
+EMAIL_GRAM_PREFIX = "@"
+_WORD_SPLIT = re.compile(r"[^0-9a-z]+")
+
+# Bigger directories build on the background pool; queries scan meanwhile
+INLINE_BUILD_MAX_USERS = 5000
+BUILD_TASK_KEY = "user_search:build"
+
+# Compact when this share of posting entries belongs to superseded rank ids
+COMPACT_DEAD_RATIO = 0.5
+
+
+def fold(text: Optional[str]) -> str:
+    """Lowercase and strip diacritics: "Zoë Ångström" -> "zoe angstrom"."""
+    if not text:
+        return ""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _word_starts(words: str) -> set:
+    # " abc" keys: users with a word starting "abc", so a prefix query does
+    # not have to walk every word containing " ab"
+    return {" " + w[:3] for w in words.split() if len(w) >= 3}
+
+
+class _Entry:
+    """Folded search text for one user."""
+
+    __slots__ = ("record", "public", "email", "public_words", "email_words", "last_login")
+
+    def __init__(self, record: Dict[str, Any]):
+        self.record = record
+        name, nickname, email = fold(record["name"]), fold(record["nickname"]), fold(record["email"])
+        self.public = f"{name}{FIELD_SEPARATOR}{nickname}"
+        self.email = email
+        # " word1 word2 " so that " "+q tests for a word prefix; the original
+        # words ("o'brien", "jane.doe@x.org") are kept next to the split ones
+        split = " ".join(w for w in _WORD_SPLIT.split(f"{name} {nickname}") if w)
+        self.public_words = f" {name} {nickname} {split} "
+        self.email_words = f" {email} " + " ".join(w for w in _WORD_SPLIT.split(email) if w) + " "
+        self.last_login = record.get("last_login") or ""
+
+    def grams(self) -> set:
+        # Email grams live under their own keys so name-only searches never
+        # walk candidates that matched on an email
+        public = _trigrams(self.public) | _trigrams(self.public_words) | _word_starts(self.public_words)
+        email = _trigrams(self.email) | _trigrams(self.email_words) | _word_starts(self.email_words)
+        return public | {EMAIL_GRAM_PREFIX + gram for gram in email}
+
+
+class UserSearchIndex:
+    """Trigram index over name, nickname and email with recency ranking."""
+
+    def __init__(self, directory: Optional[UserDirectory] = None):
+        self._directory = directory or get_user_directory()
+        self._lock = threading.Lock()
+        self._postings: Dict[str, List[int]] = {}  # gram -> rank ids, ascending
+        self._entries: Dict[int, _Entry] = {}  # live rank id -> entry
+        self._rank_of: Dict[str, int] = {}  # doc id -> live rank id
+        self._next_rank = 0
+        self._size = 0  # posting entries, live and dead
+        self._dead = 0
+        self._built = False
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}  # changes seen while unbuilt
+        self._directory.add_listener(self._on_directory_change)
+
+    # -- maintenance -------------------------------------------------------
+
+    def build(self, records: List[Dict[str, Any]]) -> None:
+        """Replace the index with records, ranked by last_login."""
+        started = time.monotonic()
+        postings: Dict[str, List[int]] = {}
+        entries, rank_of = {}, {}
+        ordered = sorted(records, key=lambda r: r.get("last_login") or "")
+        for rank, record in enumerate(ordered):
+            entry = _Entry(record)
+            entries[rank], rank_of[record["id"]] = entry, rank
+            for gram in entry.grams():
+                postings.setdefault(gram, []).append(rank)
+        with self._lock:
+            self._postings, self._entries, self._rank_of = postings, entries, rank_of
+            self._next_rank, self._dead = len(ordered), 0
+            self._size = sum(len(p) for p in postings.values())
+            self._built = True
+            pending, self._pending = self._pending, {}
+        if pending:
+            self._on_directory_change(pending)
+        info(logger, "Built user search index", users=len(entries), grams=len(postings), postings=self._size,
+             elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+
+    def _on_directory_change(self, changed: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if changed is None:
+                self._built = False
+                self._pending = {}
+                return
+            if not self._built:
+                # Replayed once the build in progress (if any) is installed
+                self._pending.update(changed)
+                return
+        # Apply logins in order so the newest ends up with the highest rank
+        for doc_id, record in sorted(changed.items(), key=lambda kv: (kv[1] or {}).get("last_login") or ""):
+            self.update(doc_id, record)
+
+    def update(self, doc_id: str, record: Optional[Dict[str, Any]]) -> None:
+        """Index a changed user; record None removes the user."""
+        with self._lock:
+            if not self._built:
+                return
+            old_rank = self._rank_of.pop(doc_id, None)
+            old = self._entries.pop(old_rank, None) if old_rank is not None else None
+            entry = _Entry(record) if record is not None else None
+            old_grams = old.grams() if old is not None else set()
+
+            if entry is None:
+                self._dead += len(old_grams)
+            elif old is not None and entry.last_login <= old.last_login:
+                # Same recency: keep the rank, add only the new grams in place
+                rank = old_rank
+                grams = entry.grams()
+                self._dead += len(old_grams - grams)
+                for gram in grams - old_grams:
+                    bisect.insort(self._postings.setdefault(gram, []), rank)
+                    self._size += 1
+                self._entries[rank], self._rank_of[doc_id] = entry, rank
+            else:
+                rank = self._next_rank
+                self._next_rank += 1
+                self._dead += len(old_grams)
+                for gram in entry.grams():
+                    self._postings.setdefault(gram, []).append(rank)
+                    self._size += 1
+                self._entries[rank], self._rank_of[doc_id] = entry, rank
+
+            if self._dead > COMPACT_DEAD_RATIO * self._size:
+                self._compact()
+
+    def _compact(self) -> None:
+        # Callers hold self._lock. Re-create the postings from the live entries.
+        postings: Dict[str, List[int]] = {}
+        for rank in sorted(self._entries):
+            for gram in self._entries[rank].grams():
+                postings.setdefault(gram, []).append(rank)
+        self._postings = postings
+        self._size = sum(len(p) for p in postings.values())
+        self._dead = 0
+
+    def _ensure_built(self) -> bool:
+        """True when the index can answer; large builds run in the background."""
+        self._directory.ensure_loaded()
+        if self._built:
+            return True
+        records = self._directory.records()
+        if len(records) <= INLINE_BUILD_MAX_USERS:
+            self.build(records)
+            return True
+        submit_background(BUILD_TASK_KEY, lambda: self.build(self._directory.records()))
+        return False
+
+    def _scan(self, q: str, limit: int, include_email: bool) -> List[Dict[str, Any]]:
+        # Linear fallback while the index builds
+        prefix = " " + q
+        ranked = []
+        for record in self._directory.records():
+            entry = _Entry(record)
+            if prefix in entry.public_words or (include_email and prefix in entry.email_words):
+                ranked.append((0, entry.last_login, record))
+            elif q in entry.public or (include_email and q in entry.email):
+                ranked.append((1, entry.last_login, record))
+        ranked.sort(key=lambda r: r[1], reverse=True)
+        ranked.sort(key=lambda r: r[0])
+        return [record for _, _, record in ranked[:limit]]
+
+    # -- queries -----------------------------------------------------------
+
+    def _candidates(self, text: str, include_email: bool) -> Iterable[int]:
+        """Rank ids that may contain text, newest first, from the shortest posting lists."""
+        grams = _trigrams(text)
+        if not grams:
+            return ()
+        if text.startswith(" ") and len(text) >= 4:
+            grams.add(text[:4])
+        lists = [min((self._postings.get(gram, ()) for gram in grams), key=len)]
+        if include_email:
+            lists.append(min((self._postings.get(EMAIL_GRAM_PREFIX + gram, ()) for gram in grams), key=len))
+        return heapq.merge(*(reversed(posting) for posting in lists), reverse=True)
+
+    def search(self, q: str, limit: int = 10, include_email: bool = False) -> List[Dict[str, Any]]:
+        """
+        Directory records matching q, best first.
+
+        Queries of two characters only match word prefixes. Emails are
+        matched only with include_email, so callers that do not show them
+        cannot be used to probe for them.
+        """
+        q = fold(q).strip()
+        if len(q) < MIN_QUERY_LEN or limit <= 0:
+            return []
+        if not self._ensure_built():
+            return self._scan(q, limit, include_email)
+        prefix = " " + q
+        with self._lock:
+            entries = self._entries
+
+            def is_prefix(entry):
+                return prefix in entry.public_words or (include_email and prefix in entry.email_words)
+
+            def is_substring(entry):
+                return q in entry.public or (include_email and q in entry.email)
+
+            hits, seen = [], set()
+            phases = [(prefix, is_prefix)]
+            if len(q) >= 3:
+                phases.append((q, is_substring))
+            for text, matches in phases:
+                for rank in self._candidates(text, include_email):
+                    entry = entries.get(rank)
+                    if entry is None or rank in seen or not matches(entry):
+                        continue
+                    seen.add(rank)
+                    hits.append(entry.record)
+                    if len(hits) >= limit:
+                        return hits
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "grams": len(self._postings),
+                "postings": self._size,
+                "dead_postings": self._dead,
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_user_search_index() -> UserSearchIndex:
+    """The process-wide index over the shared user directory."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = UserSearchIndex()
+    return _index
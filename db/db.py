@@ -139,6 +139,9 @@ def fetch_judge_assignment(panel_id, event_id, judge_id, round_name, team_id):
 def insert_judge_assignment(assignment: JudgeAssignment):
     return db.insert_judge_assignment(assignment)
 
+def insert_judge_assignments(assignments):
+    return db.insert_judge_assignments(assignments)
+
 def update_judge_assignment(assignment: JudgeAssignment):
     return db.update_judge_assignment(assignment)
 
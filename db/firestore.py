@@ -17,6 +17,11 @@ import logging
 import uuid
 import logging
 from common.log import get_logger, info, debug, warning, error, exception
+from common.utils.request_loader import get_loader
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
+from common.utils.user_directory import refresh_user_in_directory
+from common.utils.bulk_writer import BulkWriter
+from common.utils.request_metrics import instrument_firestore
 
 logger = get_logger("firestore")
 
@@ -43,10 +48,18 @@ def convert_to_entity(doc: firestore.firestore.DocumentSnapshot, cls):
     d = doc.to_dict() or {}
     d['id'] = doc.id
     if 'events' in d:
-        event_refs = d['events']
-        d['events'] = [convert_document_reference_to_entity(ref, Hackathon) for ref in event_refs]        
+        # One get_all for every event ref, memoized for the rest of the request
+        snapshots = get_loader().load_many(d['events'])
+        d['events'] = [convert_snapshot_to_entity(snap, Hackathon) for snap in snapshots]
     return cls.deserialize(d)
 
+def convert_snapshot_to_entity(snap, cls):
+    d = snap.to_dict() if snap is not None else None
+    if d is not None:
+        d['id'] = snap.id
+        return cls.deserialize(d)
+    return None
+
 def convert_document_reference_to_entity(doc: firestore.firestore.DocumentReference, cls):
     d = doc.get().to_dict()
     if d is not None:
@@ -70,7 +83,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
                 _firestore_client = mockfirestore
                 debug(logger, "Created MockFirestore client")
             else:
-                _firestore_client = firestore.client()
+                _firestore_client = instrument_firestore(firestore.client())
                 debug(logger, "Created Firestore client")
                 
         return _firestore_client
@@ -180,6 +193,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
         
         if insert_res is not None:
             info(logger, "Successfully inserted user", user_id=user.id, email=user.email_address)
+            refresh_user_in_directory(user.id)
         else:
             error(logger, "Failed to insert user", email=user.email_address)
             
@@ -203,6 +217,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
                     "nickname": user.nickname,
                     "propel_id": user.propel_id,
                 })
+            refresh_user_in_directory(doc.id)
             
         return user if update_res is not None else None
 
@@ -295,6 +310,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
         data = user.serialize_profile_metadata()
         update_res = db.collection("users").document(user.id).set( data, merge=True)        
         logger.info(f"Update Result: {update_res}")
+        refresh_user_in_directory(user.id)
                 
         return
     
@@ -314,6 +330,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
 
         # Delete user
         db.collection("users").document(user_id).delete()
+        refresh_user_in_directory(user.id)
 
     def delete_user_by_user_id(self, user_id):
         db = self.get_db()  # this connects to our Firestore database
@@ -603,6 +620,7 @@ class FirestoreDatabaseInterface(DatabaseInterface):
             "end_date": h.end_date,
             "type": h.type
         })
+        invalidate_hackathon_catalog(h.id)
 
         return h if insert_res is not None else None
        
@@ -786,6 +804,26 @@ class FirestoreDatabaseInterface(DatabaseInterface):
         doc_ref.set(assignment.serialize())
         return assignment
 
+    def insert_judge_assignments(self, assignments):
+        """
+        Insert many judge assignments in batched writes.
+
+        Each batch of up to 500 assignments commits atomically. Returns the
+        writer stats; stats["failed"] counts assignments that were not written.
+        """
+        db = self.get_db()
+        now = datetime.now()
+        with BulkWriter(db, label="judge_assignments") as writer:
+            for assignment in assignments:
+                assignment.created_at = now
+                assignment.updated_at = now
+                doc_ref = db.collection('judge_assignments').document()
+                assignment.id = doc_ref.id
+                writer.set(doc_ref, assignment.serialize())
+        stats = writer.stats()
+        stats["errors"] = list(writer.errors)
+        return stats
+
     def update_judge_assignment(self, assignment: JudgeAssignment):
         db = self.get_db()
         from datetime import datetime
@@ -1,3 +1,5 @@
+import os
+
 import gunicorn.http.wsgi
 from functools import wraps
 
@@ -18,3 +20,14 @@ def wrap_default_headers(func):
     return default_headers
 
 gunicorn.http.wsgi.Response.default_headers = wrap_default_headers(gunicorn.http.wsgi.Response.default_headers)
+
+
+def post_worker_init(worker):
+    # Reported as the request thread pool size on /metrics
+    os.environ["GUNICORN_THREADS"] = str(worker.cfg.threads)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's snapshot so /metrics stops summing it
+    from common.utils import metrics
+    metrics.remove_worker(worker.pid)
@@ -21,6 +21,10 @@ That's a SUBCOLLECTION called `funnel` with a single document `summary`. The
 hackathon doc itself stays small; the funnel doc is public-safe (counts only,
 no emails or names).
 
+After writing, the event's materialized rollup (funnel/rollup) and the global
+rollup behind the all-hackathons aggregate are refreshed; see
+services/funnel_rollup_service.py.
+
 Shape (counts only - no PII)
 ----------------------------
   {
@@ -92,7 +96,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+from common.utils.bulk_writer import BulkWriter
 from common.utils.firebase import get_db
+from services.funnel_rollup_service import refresh_event_rollup
 
 
 # --------------------------- CSV parsers ---------------------------
@@ -230,17 +236,19 @@ def find_hackathon_doc(db, event_id):
     return docs[0]
 
 
-def write_summary(db, hackathon_doc_id, summary):
-    db.collection("hackathons").document(hackathon_doc_id) \
-        .collection("funnel").document("summary").set(summary)
+def summary_ref(db, hackathon_doc_id):
+    return db.collection("hackathons").document(hackathon_doc_id) \
+        .collection("funnel").document("summary")
 
 
-def read_existing_summary(db, hackathon_doc_id):
-    snap = db.collection("hackathons").document(hackathon_doc_id) \
-        .collection("funnel").document("summary").get()
-    if snap.exists:
-        return snap.to_dict()
-    return None
+def write_summary(db, hackathon_doc_id, summary, apply, event_id=None):
+    """Write (or, in a dry run, diff) the summary doc; returns the BulkWriter."""
+    with BulkWriter(db, dry_run=not apply, label="funnel summary") as writer:
+        writer.set(summary_ref(db, hackathon_doc_id), summary)
+    # Fold the new counts into the materialized funnel rollups
+    if apply and event_id and not writer.stats()["failed"]:
+        refresh_event_rollup(event_id)
+    return writer
 
 
 # --------------------------- main ---------------------------
@@ -286,7 +294,6 @@ def main():
     db = get_db()
     hackathon_doc = find_hackathon_doc(db, args.event_id)
     hackathon_doc_id = hackathon_doc.id
-    existing = read_existing_summary(db, hackathon_doc_id)
 
     print()
     print("=" * 60)
@@ -295,22 +302,18 @@ def main():
     print(f"Target: hackathons/{hackathon_doc_id}/funnel/summary")
     print(f"  (event_id={args.event_id})")
     print()
-    if existing:
-        print("Existing summary doc:")
-        print(json.dumps(existing, indent=2, default=str))
-        print()
-    else:
-        print("No existing summary doc - this would create a new one.\n")
-
     print("Summary that would be written:")
     print(json.dumps(summary, indent=2, default=str))
     print()
 
-    if args.apply:
-        write_summary(db, hackathon_doc_id, summary)
-        print(f"WROTE hackathons/{hackathon_doc_id}/funnel/summary")
-    else:
+    writer = write_summary(db, hackathon_doc_id, summary, args.apply, event_id=args.event_id)
+    writer.report(limit=1)
+    if not args.apply:
         print("DRY-RUN complete. No data was written. Re-run with --apply to execute.")
+    elif writer.stats()["failed"]:
+        raise SystemExit(f"FAILED to write hackathons/{hackathon_doc_id}/funnel/summary")
+    else:
+        print(f"WROTE hackathons/{hackathon_doc_id}/funnel/summary")
 
 
 if __name__ == "__main__":
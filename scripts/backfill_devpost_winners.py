@@ -95,7 +95,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+from common.utils.bulk_writer import BulkWriter, resolve_users_by_email
 from common.utils.firebase import get_db
+from services.funnel_rollup_service import refresh_event_rollup
 
 
 HTTP_HEADERS = {"User-Agent": "Mozilla/5.0 ohack-backfill-script"}
@@ -328,30 +330,7 @@ def load_hackathon_and_teams(db, event_id):
 
 def load_users_by_emails(db, emails):
     """Return {email_lower: user_doc_id} for any users found in the users/ collection."""
-    from google.cloud.firestore import FieldFilter
-    out = {}
-    unique = sorted({e for e in emails if e})
-    if not unique:
-        return out
-    CHUNK = 30
-    for i in range(0, len(unique), CHUNK):
-        chunk = unique[i:i + CHUNK]
-        try:
-            docs = db.collection("users").where(
-                filter=FieldFilter("email_address", "in", chunk)
-            ).stream()
-            for d in docs:
-                ea = norm_email((d.to_dict() or {}).get("email_address"))
-                if ea:
-                    out[ea] = d.id
-        except Exception:
-            for e in chunk:
-                docs = list(db.collection("users").where(
-                    filter=FieldFilter("email_address", "==", e)
-                ).stream())
-                if docs:
-                    out[e] = docs[0].id
-    return out
+    return {email: user["id"] for email, user in resolve_users_by_email(db, emails).items()}
 
 
 # --------------------------- Matching ---------------------------
@@ -579,26 +558,35 @@ def main():
 
     print("\nApplying writes ...")
     now_iso = datetime.now(timezone.utc).isoformat()
-    for p in winner_plans:
-        t = p["team"]
-        update = {
-            "status": p["new_status"],
-            "awards": p["awards"],
-            "winners_backfilled_at": now_iso,
-            "winners_backfilled_source": "scripts/backfill_devpost_winners.py",
-        }
-        if not (t["data"].get("devpost_link") or "").strip():
-            update["devpost_link"] = p["project"]["project_url"]
-        db.collection("teams").document(t["id"]).set(update, merge=True)
-        print(f"  wrote teams/{t['id']}  status={p['new_status']!r}  awards={len(p['awards'])}")
+    with BulkWriter(db, label="team writes") as writer:
+        for p in winner_plans:
+            t = p["team"]
+            update = {
+                "status": p["new_status"],
+                "awards": p["awards"],
+                "winners_backfilled_at": now_iso,
+                "winners_backfilled_source": "scripts/backfill_devpost_winners.py",
+            }
+            if not (t["data"].get("devpost_link") or "").strip():
+                update["devpost_link"] = p["project"]["project_url"]
+            writer.set(db.collection("teams").document(t["id"]), update, merge=True)
+            print(f"  queued teams/{t['id']}  status={p['new_status']!r}  awards={len(p['awards'])}")
+        # Two projects can match the same team; keep the link-only writes last
+        writer.flush()
+
+        for p in link_only_plans:
+            t = p["team"]
+            writer.set(
+                db.collection("teams").document(t["id"]),
+                {"devpost_link": p["project"]["project_url"]},
+                merge=True,
+            )
+            print(f"  queued teams/{t['id']}  devpost_link={p['project']['project_url']}")
+    writer.report()
 
-    for p in link_only_plans:
-        t = p["team"]
-        db.collection("teams").document(t["id"]).set(
-            {"devpost_link": p["project"]["project_url"]},
-            merge=True,
-        )
-        print(f"  wrote teams/{t['id']}  devpost_link={p['project']['project_url']}")
+    if winner_plans:
+        refresh_event_rollup(args.event_id)
+        print(f"  refreshed funnel rollup for {args.event_id}")
 
     if unmatched_winners:
         print(f"\nWARNING: {len(unmatched_winners)} unmatched winner(s) - see list above.")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Backfill the denormalized hearts totals on user docs.
+
+DRY-RUN BY DEFAULT. Pass --apply to write to Firestore.
+
+add_hearts_for_user and add_certificate keep hearts_total and
+hearts_by_category current on every write. Run this once for users whose
+history predates those fields, and again after editing histories by hand;
+the hearts leaderboard and /api/hearts only list users that have a total.
+
+Usage examples:
+    # Count the users a backfill would update
+    python scripts/backfill_hearts_totals.py
+
+    # Write the totals, 400 users per batch
+    python scripts/backfill_hearts_totals.py --apply
+"""
+
+import sys
+import os
+import argparse
+import json
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Add parent directory to path to import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hearts_service import BACKFILL_BATCH_SIZE, backfill_hearts_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Backfill hearts_total and hearts_by_category on user docs.',
+    )
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE,
+                        help=f'Users per write batch (max 500, default {BACKFILL_BATCH_SIZE})')
+    parser.add_argument('--apply', action='store_true',
+                        help='ACTUALLY WRITE to Firestore. Default is dry-run.')
+    args = parser.parse_args()
+
+    if not 0 < args.batch_size <= 500:
+        raise SystemExit("--batch-size must be between 1 and 500")
+
+    stats = backfill_hearts_totals(dry_run=not args.apply, batch_size=args.batch_size)
+    print(json.dumps(stats, indent=2, sort_keys=True))
+    if args.apply:
+        print(f"WROTE hearts totals for {stats['updated']} user(s)")
+    else:
+        print("DRY-RUN complete. No data was written. Re-run with --apply to execute.")
+
+
+if __name__ == '__main__':
+    main()
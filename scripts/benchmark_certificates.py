@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark certificate rendering offline.
+
+Renders N certificates with the bundled backup background (no OpenAI, CDN or
+Firestore needed) and prints the time per certificate for:
+
+  - uncached: the template re-loaded for every certificate, as before,
+  - cached: one decoded template, rendered in this process,
+  - batch: one template, rendered across worker processes.
+
+Usage examples:
+    # 100 certificates, the default
+    python scripts/benchmark_certificates.py
+
+    # Write them out to look at
+    python scripts/benchmark_certificates.py --count 10 --out /tmp/certs
+"""
+
+import sys
+import os
+import argparse
+import random
+import time
+
+# Add parent directory to path to import from project modules
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Asset paths are relative to the repository root
+os.chdir(ROOT)
+
+from api.certificates.certificate import CertificateContent, load_template, render_certificate, render_certificates
+
+NAMES = ["Gabe Jimenez", "aitzeng", "David Tran", "Maximus Chen", "John Novakowski", "Zoë Ångström", "Priya Patel"]
+
+
+def synthetic_contents(n, rng):
+    contents = []
+    for i in range(n):
+        file_id = "%064x" % rng.getrandbits(256)
+        contents.append(CertificateContent(
+            username=f"{rng.choice(NAMES)} {i}",
+            stats=[
+                ["Hours", f"{rng.uniform(1, 40):.1f}"],
+                ["Commits", f"{rng.randint(1, 200)}"],
+                ["Lines of Code", f"{rng.randint(10, 50000)}"],
+                ["Files", f"{rng.randint(1, 300)}"],
+            ],
+            teamTotals="∑ Team Totals | Hours: 40.0 Commits: 172 LOC: 79788 Files: 146",
+            verifyUrl=f"https://ohack.dev/cert/{file_id}",
+            date="2024-10-06T18:00:00-07:00",
+        ))
+    return contents
+
+
+def report(label, seconds, count):
+    print(f"{label}: {seconds:.2f}s total, {seconds / count * 1000:.0f}ms/certificate, "
+          f"{count / seconds:.1f} certificates/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline certificate rendering.')
+    parser.add_argument('--count', type=int, default=100, help='Certificates to render (default 100)')
+    parser.add_argument('--uncached', type=int, default=10,
+                        help='Certificates to render the old way, re-loading the template each time (default 10)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--out', help='Directory to write the rendered PNGs to')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    contents = synthetic_contents(args.count, random.Random(args.seed))
+
+    if args.uncached:
+        started = time.perf_counter()
+        for content in contents[:args.uncached]:
+            render_certificate(content, load_template(offline=True))
+        report(f"uncached ({args.uncached})", time.perf_counter() - started, args.uncached)
+
+    started = time.perf_counter()
+    template = load_template(offline=True)
+    print(f"template load: {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    started = time.perf_counter()
+    images = [render_certificate(content, template) for content in contents]
+    report(f"cached ({args.count})", time.perf_counter() - started, args.count)
+
+    started = time.perf_counter()
+    images = render_certificates(contents, template, maxWorkers=args.workers)
+    report(f"batch ({args.count}, {args.workers or os.cpu_count()} workers)", time.perf_counter() - started, args.count)
+    print(f"average PNG size: {sum(len(image) for image in images) / len(images) / 1024:.0f} KiB")
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        for i, image in enumerate(images):
+            with open(os.path.join(args.out, f"certificate_{i}.png"), "wb") as f:
+                f.write(image)
+        print(f"wrote {len(images)} certificates to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark the user typeahead index on synthetic users.
+
+Builds common.utils.user_search.UserSearchIndex over N generated directory
+records (no Firestore or Redis needed) and prints build time, index size and
+per-query latency percentiles for typical typeahead input.
+
+Usage examples:
+    # 100k users, the default
+    python scripts/benchmark_user_search.py
+
+    # A bigger directory, more queries
+    python scripts/benchmark_user_search.py --users 250000 --queries 5000
+"""
+
+import sys
+import os
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+# Add parent directory to path to import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.utils.user_search import UserSearchIndex
+
+FIRST_NAMES = ["James", "Mary", "Jose", "Zoë", "Ana", "Benjamin", "Chloé", "Dmitri", "Emily", "Fatima",
+               "Greg", "Hiroshi", "Ingrid", "Jamal", "Kateřina", "Liam", "Mei", "Noah", "Olivia", "Priya",
+               "Quentin", "Rosa", "Søren", "Tariq", "Uma", "Victor", "Wei", "Ximena", "Yusuf", "Zara"]
+LAST_NAMES = ["Smith", "García", "Nguyen", "Müller", "Okafor", "Patel", "Kowalski", "Johansson", "Kim",
+              "Rossi", "Dubois", "Haddad", "Novak", "Silva", "Tanaka", "Ivanov", "O'Brien", "Schmidt"]
+DOMAINS = ["gmail.com", "asu.edu", "ohack.org", "example.com", "outlook.com"]
+
+
+class _StaticDirectory:
+    """Stands in for UserDirectory with a fixed record list."""
+
+    def __init__(self, records):
+        self._records = records
+
+    def add_listener(self, callback):
+        pass
+
+    def ensure_loaded(self):
+        pass
+
+    def records(self):
+        return self._records
+
+
+def synthetic_records(n, rng):
+    records = []
+    for i in range(n):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        suffix = "".join(rng.choices(string.ascii_lowercase, k=3))
+        records.append({
+            "id": f"u{i}",
+            "user_id": f"oauth2|slack|T1-U{i}",
+            "name": f"{first} {last}{suffix}",
+            "nickname": f"{first[:3].lower()}{suffix}",
+            "email": f"{first.lower()}.{last.lower()}{i}@{rng.choice(DOMAINS)}",
+            "image": "",
+            "last_login": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00",
+        })
+    return records
+
+
+def typeahead_queries(records, count, rng):
+    """Growing prefixes of real names plus substrings and misses, like keystrokes."""
+    queries = []
+    while len(queries) < count:
+        record = rng.choice(records)
+        word = rng.choice(record["name"].split())
+        for end in range(2, min(len(word), 7) + 1):
+            queries.append(word[:end])
+        queries.append(word[1:4])
+        queries.append(record["email"][:rng.randint(3, 12)])
+        queries.append("".join(rng.choices(string.ascii_lowercase, k=4)))
+    return queries[:count]
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the user typeahead index.')
+    parser.add_argument('--users', type=int, default=100_000, help='Synthetic users (default 100000)')
+    parser.add_argument('--queries', type=int, default=2000, help='Queries to time (default 2000)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    records = synthetic_records(args.users, rng)
+
+    started = time.perf_counter()
+    index = UserSearchIndex(_StaticDirectory(records))
+    index.build(records)
+    build_seconds = time.perf_counter() - started
+
+    # Measured on a second build; tracemalloc slows the first one down
+    tracemalloc.start()
+    sized = UserSearchIndex(_StaticDirectory(records))
+    sized.build(records)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sized
+
+    stats = index.stats()
+    print(f"users={stats['users']} grams={stats['grams']} postings={stats['postings']}")
+    print(f"build: {build_seconds:.2f}s, index memory ~{current / 2**20:.0f} MiB (peak {peak / 2**20:.0f} MiB)")
+
+    for include_email, limit in ((False, 10), (True, 25)):
+        timings = []
+        for q in typeahead_queries(records, args.queries, rng):
+            started = time.perf_counter()
+            index.search(q, limit=limit, include_email=include_email)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        label = "editor picker (email, 25)" if include_email else "mention (10)"
+        print(f"{label}: p50={percentile(timings, 0.5):.3f}ms p99={percentile(timings, 0.99):.3f}ms "
+              f"max={timings[-1]:.3f}ms")
+
+    timings = []
+    for i in range(1000):
+        record = dict(rng.choice(records), last_login=f"2026-01-01T00:00:{i % 60:02d}")
+        started = time.perf_counter()
+        index.update(record["id"], record)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"update (login): p50={percentile(timings, 0.5):.3f}ms p99={percentile(timings, 0.99):.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
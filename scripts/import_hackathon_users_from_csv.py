@@ -61,6 +61,9 @@ Safe to re-run. Existing users (by email) are reused. Existing team members
 (by user-doc reference identity) are skipped. The script writes only when a
 change is needed, so re-runs against unchanged data produce zero writes.
 
+Writes are queued on common.utils.bulk_writer.BulkWriter and committed in
+batches; the dry-run prints the per-document diff, --apply the throughput.
+
 Usage
 -----
   cd backend-ohack.dev
@@ -99,7 +102,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+from common.utils.bulk_writer import BulkWriter, get_snapshots, resolve_users_by_email
 from common.utils.firebase import get_db
+from services.funnel_rollup_service import refresh_event_rollup
 
 
 # --------------------------- helpers ---------------------------
@@ -298,7 +303,7 @@ def parse_roster(csv_path):
 # --------------------------- Firestore ops ---------------------------
 
 class Plan:
-    """Accumulator for actions. In dry-run mode we collect; in apply we execute."""
+    """Accumulator for planned actions; the writes themselves go through plan.writer."""
 
     def __init__(self, db, apply: bool, source: str, event_id: str):
         self.db = db
@@ -312,6 +317,7 @@ class Plan:
         self.team_link_to_hackathon = []  # list of (team_name, doc_id)
         self.memberships_add = []   # list of (team_name, user_email, user_doc_id)
         self.memberships_skip = []  # list of (team_name, user_email) already a member
+        self.writer = None          # BulkWriter holding the writes (or dry-run diff)
 
     def summary(self):
         return {
@@ -326,58 +332,12 @@ class Plan:
 
 
 def load_existing_users_by_email(db, emails):
-    """Batch-load existing user docs keyed by lowercase email."""
-    out = {}
-    if not emails:
-        return out
-    # we stored emails as written; do a streaming exact-match by lowercase first,
-    # then a fallback streaming pass for case variants we didn't hit.
-    from google.cloud.firestore import FieldFilter
-    unique = list({e for e in emails if e})
-
-    # First pass: try the lowercase email exactly.
-    CHUNK = 30
-    for i in range(0, len(unique), CHUNK):
-        chunk = unique[i:i + CHUNK]
-        docs = db.collection("users").where(
-            filter=FieldFilter("email_address", "in", chunk)
-        ).stream()
-        for d in docs:
-            data = d.to_dict() or {}
-            ea = norm_email(data.get("email_address"))
-            if ea:
-                out[ea] = {"id": d.id, **data}
-
-    # Second pass for emails we didn't find: stream all users and bucket by lower(email).
-    # Only do this if we have a non-trivial number of misses, to avoid full scans for
-    # tiny imports.
-    misses = [e for e in unique if e not in out]
-    if misses and len(misses) > 0:
-        # Heuristic: only do the full scan if more than 0 misses AND
-        # importing more than a handful of users (otherwise per-miss queries are fine).
-        if len(misses) >= 5:
-            # one full scan, build a lookup, fill remaining misses
-            all_users = db.collection("users").stream()
-            lookup = {}
-            for d in all_users:
-                data = d.to_dict() or {}
-                ea = norm_email(data.get("email_address"))
-                if ea:
-                    lookup.setdefault(ea, {"id": d.id, **data})
-            for e in misses:
-                if e in lookup:
-                    out[e] = lookup[e]
-        else:
-            for e in misses:
-                docs = list(
-                    db.collection("users")
-                    .where(filter=FieldFilter("email_address", "==", e))
-                    .stream()
-                )
-                if docs:
-                    data = docs[0].to_dict() or {}
-                    out[e] = {"id": docs[0].id, **data}
-    return out
+    """Batch-load existing user docs keyed by lowercase email.
+
+    Chunked `in` queries on the lowercase email first; user docs keep emails
+    as typed, so with 5+ misses one streaming pass picks up case variants.
+    """
+    return resolve_users_by_email(db, emails, scan_threshold=5)
 
 
 def load_existing_teams_in_event(db, event_id):
@@ -404,12 +364,11 @@ def load_existing_teams_in_event(db, event_id):
     return out, hackathon_ref, list(team_refs)
 
 
-def create_user_doc(db, member, source, event_id):
-    doc_id = uuid.uuid1().hex
+def user_doc_payload(member, source, event_id):
     name = member.get("name") or display_name(
         member.get("first_name", ""), member.get("last_name", "")
     )
-    payload = {
+    return {
         "email_address": member["email"],
         "first_name": member.get("first_name", ""),
         "last_name":  member.get("last_name", ""),
@@ -423,106 +382,70 @@ def create_user_doc(db, member, source, event_id):
         "import_event_id": event_id,
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
-    db.collection("users").document(doc_id).set(payload)
-    return doc_id
 
 
-def create_team_doc(db, team_name, event_id):
-    doc_id = uuid.uuid1().hex
-    db.collection("teams").document(doc_id).set({
+def team_doc_payload(team_name, event_id, user_refs):
+    return {
         "name": team_name,
-        "users": [],
+        "users": list(user_refs),
         "hackathon_event_id": event_id,
         "active": True,
         "status": "IMPORTED",
         "created": datetime.now(timezone.utc).isoformat(),
         "imported": True,
-    })
-    return doc_id
-
-
-def link_team_to_hackathon(db, hackathon_ref, team_ref, existing_team_refs):
-    if any(r.id == team_ref.id for r in existing_team_refs):
-        return False
-    new_refs = list(existing_team_refs) + [team_ref]
-    hackathon_ref.set({"teams": new_refs}, merge=True)
-    return True
-
-
-def add_user_refs_to_team(db, team_id, team_data, user_refs_to_add):
-    """Add user refs to team.users, deduped by ref.id. Returns # added."""
-    existing = team_data.get("users") or []
-    existing_ids = {r.id for r in existing if hasattr(r, "id")}
-    to_append = [r for r in user_refs_to_add if r.id not in existing_ids]
-    if not to_append:
-        return 0
-    new_users = list(existing) + to_append
-    db.collection("teams").document(team_id).set({"users": new_users}, merge=True)
-    return len(to_append)
+    }
 
 
 # --------------------------- main flow ---------------------------
 
 def plan_and_execute(db, csv_type, parsed, event_id, source, apply):
+    """Plan every change, then queue it on a BulkWriter (dry-run: diff only).
+
+    Each document is written once: new teams are created with their members,
+    existing teams get one users[] update and the hackathon one teams[] update,
+    so the writer's batches can commit in any order.
+    """
     plan = Plan(db=db, apply=apply, source=source, event_id=event_id)
+    writer = BulkWriter(db, dry_run=not apply, label="import writes")
+    plan.writer = writer
 
-    # Collect every email we touch, batch-fetch existing user docs once.
-    all_emails = set()
+    # Collect every email we touch (first row wins for name fields),
+    # batch-fetch existing user docs once.
     if csv_type == "registrants":
-        for u in parsed:
-            all_emails.add(u["email"])
+        member_rows = parsed
     else:
-        for t in parsed:
-            for m in t["members"]:
-                all_emails.add(m["email"])
+        member_rows = [m for t in parsed for m in t["members"]]
+    templates = {}
+    for m in member_rows:
+        if m["email"]:
+            templates.setdefault(m["email"], m)
 
-    print(f"Looking up {len(all_emails)} unique emails in users/ ...")
-    existing_users = load_existing_users_by_email(db, all_emails) if all_emails else {}
-    print(f"  -> {len(existing_users)} already exist, {len(all_emails) - len(existing_users)} new")
+    print(f"Looking up {len(templates)} unique emails in users/ ...")
+    existing_users = load_existing_users_by_email(db, templates)
+    print(f"  -> {len(existing_users)} already exist, {len(templates) - len(existing_users)} new")
 
-    # Resolve/create user docs. In dry-run we just plan; in apply we write.
     email_to_doc_id = {}  # email -> user_doc_id
-    for email in sorted(all_emails):
-        if not email:
-            continue
+    for email in sorted(templates):
         existing = existing_users.get(email)
         if existing:
             email_to_doc_id[email] = existing["id"]
             plan.users_reuse.append((email, existing["id"], existing.get("name") or ""))
-        else:
-            # find the first member dict for this email so we have name fields
-            member_template = None
-            if csv_type == "registrants":
-                for u in parsed:
-                    if u["email"] == email:
-                        member_template = u
-                        break
-            else:
-                for t in parsed:
-                    for m in t["members"]:
-                        if m["email"] == email:
-                            member_template = m
-                            break
-                    if member_template:
-                        break
-            member_template = member_template or {"email": email}
-            plan.users_create.append({
-                "email": email,
-                "first_name": member_template.get("first_name", ""),
-                "last_name":  member_template.get("last_name", ""),
-                "name":       member_template.get("name") or display_name(
-                    member_template.get("first_name", ""),
-                    member_template.get("last_name", ""),
-                ),
-            })
-            if apply:
-                doc_id = create_user_doc(db, member_template, source, event_id)
-                email_to_doc_id[email] = doc_id
-            else:
-                email_to_doc_id[email] = f"(would-create:{email})"
+            continue
+        member_template = templates[email]
+        payload = user_doc_payload(member_template, source, event_id)
+        doc_id = uuid.uuid1().hex
+        writer.set(db.collection("users").document(doc_id), payload)
+        email_to_doc_id[email] = doc_id
+        plan.users_create.append({
+            "email": email,
+            "first_name": payload["first_name"],
+            "last_name":  payload["last_name"],
+            "name":       payload["name"],
+        })
 
     # If we're just importing registrants, we're done.
     if csv_type == "registrants":
+        writer.close()
         return plan
 
     # Otherwise, resolve teams.
@@ -530,8 +453,8 @@ def plan_and_execute(db, csv_type, parsed, event_id, source, apply):
     existing_teams, hackathon_ref, hackathon_team_refs = load_existing_teams_in_event(db, event_id)
     print(f"  -> {len(existing_teams)} existing teams already linked to this hackathon")
 
-    team_ref_cache = {}  # team_doc_id -> DocumentReference
-
+    new_teams = {}    # key -> {"id", "name", "ref", "data"}
+    additions = {}    # team_doc_id -> [user refs to append]
     for team_entry in parsed:
         team_name = team_entry["team_name"].strip()
         key = norm_team_name(team_name)
@@ -540,59 +463,59 @@ def plan_and_execute(db, csv_type, parsed, event_id, source, apply):
 
         if key in existing_teams:
             team_info = existing_teams[key]
-            team_doc_id = team_info["id"]
-            team_data = team_info["data"]
-            team_ref_cache[team_doc_id] = team_info["ref"]
-            plan.teams_reuse.append((team_name, team_doc_id))
+            plan.teams_reuse.append((team_name, team_info["id"]))
+        elif key in new_teams:
+            team_info = new_teams[key]
         else:
+            team_doc_id = uuid.uuid1().hex
+            team_info = {
+                "id": team_doc_id,
+                "name": team_name,
+                "ref": db.collection("teams").document(team_doc_id),
+                "data": {"users": []},
+            }
+            new_teams[key] = team_info
             plan.teams_create.append(team_name)
-            if apply:
-                team_doc_id = create_team_doc(db, team_name, event_id)
-                team_ref = db.collection("teams").document(team_doc_id)
-                team_data = team_ref.get().to_dict() or {}
-                team_ref_cache[team_doc_id] = team_ref
-                # link to hackathon
-                if link_team_to_hackathon(db, hackathon_ref, team_ref, hackathon_team_refs):
-                    hackathon_team_refs.append(team_ref)
-                    plan.team_link_to_hackathon.append((team_name, team_doc_id))
-            else:
-                team_doc_id = f"(would-create:{team_name})"
-                team_data = {"users": []}
-                plan.team_link_to_hackathon.append((team_name, team_doc_id))
-
-        # plan memberships
-        existing_member_ref_ids = (
-            {r.id for r in (team_data.get("users") or []) if hasattr(r, "id")}
-            if apply or key in existing_teams
-            else set()
-        )
-        member_refs_to_add = []
+            plan.team_link_to_hackathon.append((team_name, team_doc_id))
+
+        # plan memberships; already-on-team check is by user doc id
+        pending = additions.setdefault(team_info["id"], [])
+        member_ids = {r.id for r in (team_info["data"].get("users") or []) if hasattr(r, "id")}
+        member_ids |= {r.id for r in pending}
         for m in team_entry["members"]:
             user_doc_id = email_to_doc_id.get(m["email"])
             if not user_doc_id:
                 continue
-            if apply:
-                # already-on-team check is by doc id
-                if user_doc_id in existing_member_ref_ids:
-                    plan.memberships_skip.append((team_name, m["email"]))
-                    continue
-                ref = db.collection("users").document(user_doc_id)
-                member_refs_to_add.append(ref)
-                plan.memberships_add.append((team_name, m["email"], user_doc_id))
-            else:
-                # dry-run: don't know real doc id for would-create users
-                if user_doc_id.startswith("(would-create:"):
-                    plan.memberships_add.append((team_name, m["email"], user_doc_id))
-                elif user_doc_id in existing_member_ref_ids:
-                    plan.memberships_skip.append((team_name, m["email"]))
-                else:
-                    plan.memberships_add.append((team_name, m["email"], user_doc_id))
-
-        if apply and member_refs_to_add:
-            # re-read latest team data so we don't clobber concurrent writes
-            latest = db.collection("teams").document(team_doc_id).get().to_dict() or {}
-            add_user_refs_to_team(db, team_doc_id, latest, member_refs_to_add)
-
+            if user_doc_id in member_ids:
+                plan.memberships_skip.append((team_name, m["email"]))
+                continue
+            member_ids.add(user_doc_id)
+            pending.append(db.collection("users").document(user_doc_id))
+            plan.memberships_add.append((team_name, m["email"], user_doc_id))
+
+    for team_info in new_teams.values():
+        writer.set(team_info["ref"], team_doc_payload(
+            team_info["name"], event_id, additions.get(team_info["id"], [])
+        ))
+
+    # re-read the existing teams we touch so we don't clobber concurrent writes
+    touched = [db.collection("teams").document(t["id"])
+               for t in existing_teams.values() if additions.get(t["id"])]
+    for team_ref, snap in zip(touched, get_snapshots(db, touched)):
+        latest = (snap.to_dict() or {}).get("users") or []
+        latest_ids = {r.id for r in latest if hasattr(r, "id")}
+        to_append = [r for r in additions[team_ref.id] if r.id not in latest_ids]
+        if to_append:
+            writer.set(team_ref, {"users": list(latest) + to_append}, merge=True)
+
+    if new_teams:
+        linked = list(hackathon_team_refs) + [t["ref"] for t in new_teams.values()]
+        writer.set(hackathon_ref, {"teams": linked}, merge=True)
+
+    writer.close()
+    # teams_total and formed_team changed; recount the event's funnel rollup
+    if apply and (new_teams or plan.memberships_add):
+        refresh_event_rollup(event_id)
     return plan
 
 
@@ -623,6 +546,9 @@ def print_plan(plan, apply):
     show("memberships to ADD",
          [f"{t}  <-  {e}" for (t, e, _id) in plan.memberships_add])
 
+    print()
+    plan.writer.report(limit=10)
+
     if not apply:
         print()
         print("DRY-RUN complete. No data was written. Re-run with --apply to execute.")
@@ -25,7 +25,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
+from common.utils.bulk_writer import BulkWriter
 from common.utils.firebase import get_db
+from services.funnel_rollup_service import refresh_event_rollup
 import logging
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -155,20 +157,14 @@ def main():
     if args.dry_run or not to_create:
         return
 
-    # Batch write
-    created = 0
-    for batch_start in range(0, len(to_create), BATCH_LIMIT):
-        batch = db.batch()
-        batch_slice = to_create[batch_start:batch_start + BATCH_LIMIT]
-
-        for m in batch_slice:
+    with BulkWriter(db, batch_size=BATCH_LIMIT, label="volunteers") as writer:
+        for m in to_create:
             doc = build_volunteer_doc(m, args.event_id)
-            ref = db.collection('volunteers').document(doc['id'])
-            batch.set(ref, doc)
-
-        batch.commit()
-        created += len(batch_slice)
-        print(f"  Batch committed: {created}/{len(to_create)}")
+            writer.set(db.collection('volunteers').document(doc['id']), doc)
+    writer.report()
+    created = writer.stats()['written']
+    if created:
+        refresh_event_rollup(args.event_id)
 
     print(f"\nDone. Created {created} volunteer records.")
 
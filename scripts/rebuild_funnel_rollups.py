@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Rebuild the materialized hacker-funnel rollups from source data.
+
+DRY-RUN BY DEFAULT. Pass --apply to write to Firestore.
+
+The rollups (hackathons/{id}/funnel/rollup and funnel_rollups/global) are kept
+current incrementally by services/funnel_rollup_service. Run this to repair
+drift, after bulk imports that bypass the services, or to build them the
+first time.
+
+Usage examples:
+    # Print the totals a rebuild would write
+    python scripts/rebuild_funnel_rollups.py
+
+    # Rewrite every event rollup and the global rollup
+    python scripts/rebuild_funnel_rollups.py --apply
+
+    # Refresh a single event and fold the change into the global rollup
+    python scripts/rebuild_funnel_rollups.py --event-id 2026_spring_wics_asu --apply
+"""
+
+import sys
+import os
+import argparse
+import json
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Add parent directory to path to import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.funnel_rollup_service import rebuild_funnel_rollups, refresh_event_rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild the materialized hacker-funnel rollups.',
+    )
+    parser.add_argument('--event-id', help='Only refresh this hackathon event_id (always writes)')
+    parser.add_argument('--apply', action='store_true',
+                        help='ACTUALLY WRITE to Firestore. Default is dry-run.')
+    args = parser.parse_args()
+
+    if args.event_id:
+        if not args.apply:
+            raise SystemExit("--event-id refreshes in place; re-run with --apply")
+        rollup = refresh_event_rollup(args.event_id)
+        if rollup is None:
+            raise SystemExit(f"Could not refresh rollup for event_id={args.event_id}")
+        print(json.dumps(rollup["counters"], indent=2, sort_keys=True))
+        print(f"Refreshed rollup for {args.event_id}")
+        return
+
+    rollup = rebuild_funnel_rollups(dry_run=not args.apply)
+    print(json.dumps(rollup["counters"], indent=2, sort_keys=True))
+    if args.apply:
+        print("WROTE funnel_rollups/global and every hackathons/{id}/funnel/rollup")
+    else:
+        print("DRY-RUN complete. No data was written. Re-run with --apply to execute.")
+
+
+if __name__ == '__main__':
+    main()
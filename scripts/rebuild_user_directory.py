@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Rebuild the shared user directory (user_directory/*) from the users collection.
+
+PRINTS STATS BY DEFAULT. Pass --apply to rescan users and rewrite every shard.
+
+The directory is kept current by the user write paths and rebuilt in the
+background once a day. Run this to repair drift after bulk imports or scripts
+that write users directly, or after changing USER_DIRECTORY_SHARDS.
+
+Usage examples:
+    # Print record count, size and the last rebuild's stats
+    python scripts/rebuild_user_directory.py
+
+    # Rescan users and rewrite the directory
+    python scripts/rebuild_user_directory.py --apply
+"""
+
+import sys
+import os
+import argparse
+import json
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Add parent directory to path to import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.utils.user_directory import get_user_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Rebuild the shared user directory.',
+    )
+    parser.add_argument('--apply', action='store_true',
+                        help='ACTUALLY REWRITE the directory. Default only prints stats.')
+    args = parser.parse_args()
+
+    directory = get_user_directory()
+    if args.apply:
+        print(json.dumps(directory.rebuild(), indent=2, sort_keys=True))
+        print("WROTE user_directory/meta and every user_directory/shard_NN")
+    else:
+        print(json.dumps(directory.stats(), indent=2, sort_keys=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Scan every repository of a GitHub org for certificate stats.
+
+Scans are cached by repository and HEAD commit (see
+api/certificates/scan_repo.py), so running this after a hackathon's
+submission deadline makes the certificate generations that follow skip the
+clone and git-fame runs. Repositories that were already scanned at their
+current HEAD are not cloned again.
+
+Usage examples:
+    # Scan an event's org, four clones at a time
+    python scripts/scan_org_repos.py --org 2024-fall-global-hackathon
+
+    # Specific repositories only
+    python scripts/scan_org_repos.py --repo https://github.com/org/a --repo https://github.com/org/b
+"""
+
+import sys
+import os
+import argparse
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Add parent directory to path to import from project modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.certificates.scan_repo import SCAN_WORKERS, getGitFameDataForRepos
+from common.utils.github import get_all_repos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan (and cache) the repositories of a GitHub org.')
+    parser.add_argument('--org', help='GitHub organization whose repositories to scan')
+    parser.add_argument('--repo', action='append', default=[], help='Repository URL (repeatable)')
+    parser.add_argument('--workers', type=int, default=SCAN_WORKERS,
+                        help=f'Repositories scanned at once (default {SCAN_WORKERS})')
+    args = parser.parse_args()
+
+    urls = list(args.repo)
+    if args.org:
+        urls += [repo["full_url"] for repo in get_all_repos(args.org)]
+    if not urls:
+        parser.error("pass --org and/or --repo")
+
+    started = time.perf_counter()
+    results = getGitFameDataForRepos(urls, maxWorkers=args.workers)
+    for url, table in results.items():
+        if table is None:
+            print(f"FAILED  {url}")
+        else:
+            print(f"ok      {url}: {len(table.authors)} authors, {table.totalCommits} commits, "
+                  f"{table.totalHours}h")
+    failed = sum(1 for table in results.values() if table is None)
+    print(f"scanned {len(results)} repositories in {time.perf_counter() - started:.1f}s, {failed} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -29,6 +29,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from dotenv import load_dotenv
 load_dotenv()
 
+from common.utils.bulk_writer import BulkWriter, get_snapshots  # noqa: E402
 from common.utils.firebase import get_db  # noqa: E402
 from google.cloud.firestore import DocumentReference  # noqa: E402
 
@@ -180,16 +181,25 @@ def main():
 
     coll = db.collection(COLLECTION)
 
+    # Read every target doc up front in a few get_all calls
+    targets = []
+    seen = set()
     for i, row in enumerate(rows, start=1):
         doc_id = (row.get("__id__") or "").strip()
         if not doc_id:
             print(f"[{i:02d}] SKIP: row has no __id__")
             continue
+        if doc_id in seen:
+            print(f"[{i:02d}] SKIP: duplicate __id__ {doc_id}")
+            continue
+        seen.add(doc_id)
+        targets.append((i, row, doc_id, coll.document(doc_id)))
+    snaps = get_snapshots(db, [ref for _, _, _, ref in targets])
 
+    writer = BulkWriter(db, label="hackathon writes") if apply else None
+    for (i, row, doc_id, ref), snap in zip(targets, snaps):
         title = row.get("title", "")
         event_id = row.get("event_id", "")
-        ref = coll.document(doc_id)
-        snap = ref.get()
 
         try:
             incoming = row_to_doc(row, db)
@@ -201,7 +211,7 @@ def main():
             inserts.append((doc_id, title, event_id, incoming))
             print(f"[{i:02d}] INSERT  id={doc_id}  event_id={event_id!r}  title={title!r}")
             if apply:
-                ref.set(incoming)
+                writer.set(ref, incoming)
             continue
 
         existing = snap.to_dict() or {}
@@ -218,8 +228,11 @@ def main():
             old_repr = "<missing>" if old is _MISSING else short(old)
             print(f"        - {k}: {old_repr}  ->  {short(v)}")
         if apply:
-            ref.set(delta, merge=True)
+            writer.set(ref, delta, merge=True)
 
+    if writer is not None:
+        writer.close()
+        writer.report()
     print("=" * 80)
     print(f"Summary: {len(inserts)} insert(s), {len(updates)} update(s), {len(unchanged)} unchanged")
     if dry_run:
@@ -0,0 +1,352 @@
+"""
+Incremental, parallel embedding pipeline used by llm_service.populate_embedding_map.
+
+Each item is hashed together with the embedding model, and items whose map
+doc already carries the same hash are skipped. That hash is also the resume
+state: if a job dies halfway, everything it wrote is skipped by the next run.
+Progress is recorded in embedding_jobs/{job_id}.
+
+Remaining items are packed into embedding requests by token count. Texts
+longer than the model's context are embedded in chunks and averaged, the
+same way llm_service embeds a query, so map and query vectors agree. Requests
+run on a bounded thread pool, and each worker commits its own Firestore
+writes, so embedding calls overlap with commits.
+
+The embeddings client is passed in. StubEmbeddingClient stands in for
+openai.OpenAI() offline.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from firebase_admin import firestore
+
+from common.log import get_logger, info, warning, exception
+
+logger = get_logger("embedding_pipeline")
+
+JOB_COLLECTION = "embedding_jobs"
+
+# The embeddings API accepts up to 300k tokens and 2048 inputs per request;
+# staying well under keeps each call short enough to retry cheaply.
+MAX_REQUEST_TOKENS = 100_000
+MAX_REQUEST_INPUTS = 512
+# Map docs carry ~1.5k floats each; small commits stay far below Firestore's
+# 10MiB transaction limit
+WRITE_BATCH_SIZE = 20
+READ_CHUNK_SIZE = 300
+DEFAULT_MAX_WORKERS = 4
+EMBED_ATTEMPTS = 3
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_COMPLETED_WITH_ERRORS = "completed_with_errors"
+STATUS_FAILED = "failed"
+STATUS_INTERRUPTED = "interrupted"
+
+
+def content_hash(model: str, text: str) -> str:
+    """Hash of what an embedding was computed from; changes when either side does."""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class StubEmbeddingClient:
+    """
+    Offline stand-in for openai.OpenAI() embeddings.
+
+    Returns deterministic unit vectors seeded from each input, so identical
+    inputs embed identically and runs are repeatable. Inputs of every request
+    are kept in ``calls``.
+    """
+
+    def __init__(self, dimensions: int = 1536):
+        self.dimensions = dimensions
+        self.calls = []
+        self.embeddings = self
+
+    def _vector(self, value) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(str(value).encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def create(self, input, model):
+        self.calls.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=self._vector(v)) for i, v in enumerate(input)]
+        return SimpleNamespace(data=data, model=model)
+
+
+def pack_by_token_budget(items: Iterable[Dict[str, Any]], encoding, ctx_length: int,
+                         max_tokens: int = MAX_REQUEST_TOKENS,
+                         max_inputs: int = MAX_REQUEST_INPUTS):
+    """
+    Group items into embedding requests of at most max_tokens tokens.
+
+    Each item's ``inputs`` is set to ``[text]``, or, when the text is longer
+    than the model accepts, to its ctx_length-token chunks (with their sizes
+    in ``chunk_lens``) so item_vectors() can average them like
+    llm_service.len_safe_get_embedding does. An item's chunks always share a
+    request; one longer than max_tokens is sent on its own.
+    """
+    batch, batch_tokens, batch_inputs = [], 0, 0
+    for item in items:
+        tokens = encoding.encode(item["text"])
+        if len(tokens) > ctx_length:
+            chunks = [tokens[start:start + ctx_length] for start in range(0, len(tokens), ctx_length)]
+            item["inputs"] = chunks
+            item["chunk_lens"] = [len(chunk) for chunk in chunks]
+        else:
+            item["inputs"] = [item["text"]]
+            item.pop("chunk_lens", None)
+        n_inputs = len(item["inputs"])
+        if batch and (batch_tokens + len(tokens) > max_tokens or batch_inputs + n_inputs > max_inputs):
+            yield batch
+            batch, batch_tokens, batch_inputs = [], 0, 0
+        batch.append(item)
+        batch_tokens += len(tokens)
+        batch_inputs += n_inputs
+    if batch:
+        yield batch
+
+
+def average_chunk_embeddings(vectors: List[List[float]], chunk_lens: List[int]) -> List[float]:
+    """Length-weighted, re-normalized mean of the embeddings of one text's chunks."""
+    mean = np.average(vectors, axis=0, weights=chunk_lens)
+    return (mean / np.linalg.norm(mean)).tolist()
+
+
+def request_inputs(batch: List[Dict[str, Any]]) -> List[Any]:
+    """Flatten a packed batch into the ``input`` list of one embeddings request."""
+    return [value for item in batch for value in item["inputs"]]
+
+
+def item_vectors(batch: List[Dict[str, Any]], vectors: List[List[float]]) -> List[List[float]]:
+    """One embedding per item of a packed batch, given the request's embeddings in order."""
+    result, position = [], 0
+    for item in batch:
+        n = len(item["inputs"])
+        chunk_vectors = vectors[position:position + n]
+        position += n
+        result.append(average_chunk_embeddings(chunk_vectors, item["chunk_lens"])
+                      if "chunk_lens" in item else chunk_vectors[0])
+    return result
+
+
+def get_latest_job(db) -> Optional[Dict[str, Any]]:
+    """Return the most recently started embedding job, or None."""
+    docs = list(
+        db.collection(JOB_COLLECTION)
+        .order_by("started_at", direction=firestore.Query.DESCENDING)
+        .limit(1)
+        .stream()
+    )
+    if not docs:
+        return None
+    return {"id": docs[0].id, **(docs[0].to_dict() or {})}
+
+
+class EmbeddingJob:
+    """
+    One run of the pipeline over a list of items.
+
+    Items are dicts with ``id`` and ``text`` plus any fields to copy into the
+    map doc (``title``, ``description``, ``is_approved``).
+    """
+
+    def __init__(self, db, client, model: str, encoding, collection: str, ctx_length: int,
+                 on_written: Optional[Callable[[List[Tuple[str, Dict[str, Any]]]], None]] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_request_tokens: int = MAX_REQUEST_TOKENS,
+                 job_id: Optional[str] = None):
+        self.db = db
+        self.client = client
+        self.model = model
+        self.encoding = encoding
+        self.collection = collection
+        self.ctx_length = ctx_length
+        self.on_written = on_written
+        self.max_workers = max_workers
+        self.max_request_tokens = max_request_tokens
+        self.job_id = job_id or uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.requests = 0
+        self.total = 0
+        self.last_error = None
+
+    @property
+    def _job_ref(self):
+        return self.db.collection(JOB_COLLECTION).document(self.job_id)
+
+    def _start(self, total: int) -> None:
+        self.total = total
+        resumed_from = None
+        try:
+            latest = get_latest_job(self.db)
+            if latest and latest.get("status") == STATUS_RUNNING and latest["id"] != self.job_id:
+                # Callers hold the populate lock, so a running job we can see has died
+                resumed_from = latest["id"]
+                self.db.collection(JOB_COLLECTION).document(resumed_from).set(
+                    {"status": STATUS_INTERRUPTED, "updated_at": datetime.now().isoformat()}, merge=True
+                )
+        except Exception as e:
+            warning(logger, "Could not look up previous embedding job", error=str(e))
+
+        now = datetime.now().isoformat()
+        self._job_ref.set({
+            "status": STATUS_RUNNING,
+            "model": self.model,
+            "total": total,
+            "processed": 0,
+            "skipped": 0,
+            "failed": 0,
+            "requests": 0,
+            "resumed_from": resumed_from,
+            "started_at": now,
+            "updated_at": now,
+        })
+        info(logger, "Embedding job started", job_id=self.job_id, total=total, resumed_from=resumed_from)
+
+    def _existing_hashes(self, ids: List[str]) -> Dict[str, str]:
+        """content_hash of every approved map doc among ids, without reading vectors."""
+        hashes = {}
+        for start in range(0, len(ids), READ_CHUNK_SIZE):
+            refs = [self.db.collection(self.collection).document(i) for i in ids[start:start + READ_CHUNK_SIZE]]
+            for snap in self.db.get_all(refs, field_paths=["content_hash", "is_approved"]):
+                if not snap.exists:
+                    continue
+                data = snap.to_dict() or {}
+                if data.get("content_hash") and data.get("is_approved"):
+                    hashes[snap.id] = data["content_hash"]
+        return hashes
+
+    def _embed(self, inputs: List[Any]) -> List[List[float]]:
+        for attempt in range(EMBED_ATTEMPTS):
+            try:
+                response = self.client.embeddings.create(input=inputs, model=self.model)
+                ordered = sorted(response.data, key=lambda d: getattr(d, "index", 0))
+                return [d.embedding for d in ordered]
+            except Exception:
+                if attempt == EMBED_ATTEMPTS - 1:
+                    raise
+                time.sleep(2 ** attempt)
+
+    def _process(self, batch: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """Embed one request's worth of items and commit them. Returns (written, failed)."""
+        try:
+            vectors = item_vectors(batch, self._embed(request_inputs(batch)))
+        except Exception as e:
+            exception(logger, "Embedding request failed", exc_info=e, job_id=self.job_id,
+                      ids=[item["id"] for item in batch])
+            self.last_error = str(e)
+            return 0, len(batch)
+
+        written, failed = 0, 0
+        for start in range(0, len(batch), WRITE_BATCH_SIZE):
+            chunk = list(zip(batch[start:start + WRITE_BATCH_SIZE], vectors[start:start + WRITE_BATCH_SIZE]))
+            entries = []
+            firestore_batch = self.db.batch()
+            for item, vector in chunk:
+                entry = {
+                    "embedding_vector": vector,
+                    "title": item.get("title"),
+                    "description": item.get("description"),
+                    "is_approved": item.get("is_approved", True),
+                    "content_hash": item["hash"],
+                    "embedding_model": self.model,
+                }
+                firestore_batch.set(self.db.collection(self.collection).document(item["id"]), entry)
+                entries.append((item["id"], entry))
+            try:
+                firestore_batch.commit()
+            except Exception as e:
+                exception(logger, "Embedding map commit failed", exc_info=e, job_id=self.job_id,
+                          ids=[item_id for item_id, _ in entries])
+                self.last_error = str(e)
+                failed += len(entries)
+                continue
+            written += len(entries)
+            if self.on_written:
+                self.on_written(entries)
+        return written, failed
+
+    def _record(self, written: int, failed: int) -> None:
+        with self._lock:
+            self.processed += written
+            self.failed += failed
+            self.requests += 1
+        try:
+            self._job_ref.set({
+                "processed": firestore.Increment(written),
+                "failed": firestore.Increment(failed),
+                "requests": firestore.Increment(1),
+                "last_error": self.last_error,
+                "updated_at": datetime.now().isoformat(),
+            }, merge=True)
+        except Exception as e:
+            warning(logger, "Could not record embedding job progress", job_id=self.job_id, error=str(e))
+
+    def run(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Embed every changed item and return the job summary."""
+        started = time.monotonic()
+        self._start(len(items))
+        try:
+            for item in items:
+                item["hash"] = content_hash(self.model, item["text"])
+            existing = self._existing_hashes([item["id"] for item in items])
+            pending_items = [item for item in items if existing.get(item["id"]) != item["hash"]]
+            self.skipped = len(items) - len(pending_items)
+            self._job_ref.set({"skipped": self.skipped}, merge=True)
+
+            batches = pack_by_token_budget(pending_items, self.encoding, self.ctx_length,
+                                           max_tokens=self.max_request_tokens)
+            with ThreadPoolExecutor(max_workers=self.max_workers,
+                                    thread_name_prefix="embedding-job") as pool:
+                in_flight = set()
+                for batch in batches:
+                    # Bound queued requests so packing stays just ahead of the workers
+                    if len(in_flight) >= self.max_workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._record(*future.result())
+                    in_flight.add(pool.submit(self._process, batch))
+                for future in wait(in_flight).done:
+                    self._record(*future.result())
+        except Exception as e:
+            exception(logger, "Embedding job failed", exc_info=e, job_id=self.job_id)
+            self._finish(STATUS_FAILED, started, error=str(e))
+            raise
+
+        status = STATUS_COMPLETED_WITH_ERRORS if self.failed else STATUS_COMPLETED
+        return self._finish(status, started)
+
+    def _finish(self, status: str, started: float, error: Optional[str] = None) -> Dict[str, Any]:
+        summary = {
+            "job_id": self.job_id,
+            "status": status,
+            "total": self.total,
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "requests": self.requests,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+        }
+        try:
+            self._job_ref.set({
+                "status": status,
+                "error": error,
+                "elapsed_seconds": summary["elapsed_seconds"],
+                "finished_at": datetime.now().isoformat(),
+                "updated_at": datetime.now().isoformat(),
+            }, merge=True)
+        except Exception as e:
+            warning(logger, "Could not record embedding job result", job_id=self.job_id, error=str(e))
+        info(logger, "Embedding job finished", **summary)
+        return summary
@@ -0,0 +1,398 @@
+"""
+Materialized hacker-funnel rollups.
+
+The all-time funnel on the /hack page used to be recomputed from every
+hackathon, funnel summary, hacker volunteer and team on each cache miss. It
+is now served from persisted rollups that are kept current as the underlying
+data changes:
+
+  hackathons/{hackathon_doc_id}/funnel/rollup   one per event
+  funnel_rollups/global                         sum of every event rollup
+
+Each rollup holds flat numeric ``counters`` plus nested ``breakdowns`` (the
+Devpost label -> count maps). Refreshing an event recomputes only that event,
+swaps its rollup in a transaction and applies the difference to the global doc
+with Firestore Increments, so concurrent refreshes never double count.
+
+rebuild_funnel_rollups() recomputes everything from scratch for repair; see
+scripts/rebuild_funnel_rollups.py.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from firebase_admin import firestore
+
+from common.log import get_logger, info, warning, exception
+from common.utils.redis_cache import delete_cached
+
+logger = get_logger("funnel_rollup_service")
+
+ROLLUP_COLLECTION = "funnel_rollups"
+GLOBAL_ROLLUP_DOC = "global"
+EVENT_ROLLUP_DOC = "rollup"
+
+# Redis key the aggregate endpoint caches the shaped global rollup under.
+# Dropped whenever a rollup changes.
+FUNNEL_AGGREGATE_CACHE_KEY = "funnel_aggregate:v2"
+
+SUMMARY_KEYS = (
+    "registered", "started_project", "submitted_project", "submitted_gallery_visible",
+    "started_project_teams", "submitted_project_teams", "submitted_gallery_visible_teams",
+)
+BREAKDOWN_KEYS = (
+    "status_breakdown", "step_breakdown", "referral_breakdown",
+    "teammate_intent_breakdown", "country_breakdown",
+)
+WINNER_KEYS = (
+    "won_prize", "founding_engineers", "completion_support", "category_winner",
+    "won_prize_teams", "founding_engineers_teams", "completion_support_teams",
+    "category_winner_teams",
+)
+EVENT_KEYS = ("events_total", "events_with_summary", "events_with_winners")
+COUNTER_KEYS = (
+    SUMMARY_KEYS + WINNER_KEYS + EVENT_KEYS
+    + ("applied_as_hacker", "formed_team", "teams_total")
+)
+
+# Team status -> winner counter prefix
+_WINNING_STATUSES = {
+    "FOUNDING_ENGINEERS": "founding_engineers",
+    "COMPLETION_SUPPORT": "completion_support",
+    "CATEGORY_WINNER": "category_winner",
+}
+
+
+def _get_db():
+    from db.db import get_db
+    return get_db()
+
+
+def _global_ref(db):
+    return db.collection(ROLLUP_COLLECTION).document(GLOBAL_ROLLUP_DOC)
+
+
+def _event_ref(db, hackathon_doc_id: str):
+    return (
+        db.collection("hackathons").document(hackathon_doc_id)
+        .collection("funnel").document(EVENT_ROLLUP_DOC)
+    )
+
+
+def _summary_ref(db, hackathon_doc_id: str):
+    return (
+        db.collection("hackathons").document(hackathon_doc_id)
+        .collection("funnel").document("summary")
+    )
+
+
+def _find_hackathon(db, event_id: str):
+    docs = list(
+        db.collection("hackathons")
+        .where(filter=firestore.FieldFilter("event_id", "==", event_id))
+        .limit(1)
+        .stream()
+    )
+    return docs[0] if docs else None
+
+
+def _count_hackers(db, event_id: str) -> int:
+    return sum(
+        1
+        for _ in db.collection("volunteers")
+        .where(filter=firestore.FieldFilter("event_id", "==", event_id))
+        .where(filter=firestore.FieldFilter("volunteer_type", "==", "hacker"))
+        .select(["event_id"])
+        .stream()
+    )
+
+
+def compute_event_rollup(db, hackathon_snap, summary: Optional[Dict[str, Any]],
+                         applied_as_hacker: int) -> Dict[str, Any]:
+    """
+    Build the rollup for one hackathon from its already-fetched summary doc
+    and hacker count. Team docs are read here with a single get_all.
+
+    Winner people counts are summed per team (not deduped across teams),
+    matching how the aggregate has always been reported.
+    """
+    h_data = hackathon_snap.to_dict() or {}
+    counters = {k: 0 for k in COUNTER_KEYS}
+    breakdowns = {k: {} for k in BREAKDOWN_KEYS}
+    counters["events_total"] = 1
+
+    if summary is not None:
+        counters["events_with_summary"] = 1
+        for k in SUMMARY_KEYS:
+            v = summary.get(k)
+            if isinstance(v, (int, float)):
+                counters[k] = int(v)
+        for k in BREAKDOWN_KEYS:
+            bd = summary.get(k) or {}
+            if isinstance(bd, dict):
+                breakdowns[k] = {
+                    label: int(count) for label, count in bd.items()
+                    if isinstance(count, (int, float))
+                }
+
+    team_refs = h_data.get("teams") or []
+    if team_refs:
+        unique_member_ids = set()
+        for td in db.get_all(team_refs):
+            if not td.exists:
+                continue
+            td_dict = td.to_dict() or {}
+            user_ids = {
+                u.id for u in (td_dict.get("users") or [])
+                if hasattr(u, "id") and u.id
+            }
+            unique_member_ids.update(user_ids)
+            prefix = _WINNING_STATUSES.get(td_dict.get("status") or "")
+            if prefix:
+                counters[f"{prefix}_teams"] += 1
+                counters["won_prize_teams"] += 1
+                counters[prefix] += len(user_ids)
+                counters["won_prize"] += len(user_ids)
+        counters["formed_team"] = len(unique_member_ids)
+        counters["teams_total"] = len(team_refs)
+    if counters["won_prize_teams"]:
+        counters["events_with_winners"] = 1
+
+    counters["applied_as_hacker"] = applied_as_hacker
+
+    return {
+        "event_id": h_data.get("event_id"),
+        "hackathon_id": hackathon_snap.id,
+        "counters": counters,
+        "breakdowns": breakdowns,
+        "updated_at": datetime.now().isoformat(),
+    }
+
+
+def _rollup_delta(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]):
+    """Return (counter_deltas, breakdown_deltas) with zero entries dropped."""
+    old = old or {}
+    new = new or {}
+    old_counters = old.get("counters") or {}
+    new_counters = new.get("counters") or {}
+    counter_deltas = {}
+    for k in set(old_counters) | set(new_counters):
+        d = int(new_counters.get(k, 0) or 0) - int(old_counters.get(k, 0) or 0)
+        if d:
+            counter_deltas[k] = d
+
+    old_bds = old.get("breakdowns") or {}
+    new_bds = new.get("breakdowns") or {}
+    breakdown_deltas = {}
+    for k in set(old_bds) | set(new_bds):
+        o = old_bds.get(k) or {}
+        n = new_bds.get(k) or {}
+        diff = {}
+        for label in set(o) | set(n):
+            d = int(n.get(label, 0) or 0) - int(o.get(label, 0) or 0)
+            if d:
+                diff[label] = d
+        if diff:
+            breakdown_deltas[k] = diff
+    return counter_deltas, breakdown_deltas
+
+
+def _apply_global_delta(db, counter_deltas: Dict[str, int],
+                        breakdown_deltas: Dict[str, Dict[str, int]]) -> None:
+    if not counter_deltas and not breakdown_deltas:
+        return
+    update = {"updated_at": datetime.now().isoformat()}
+    if counter_deltas:
+        update["counters"] = {k: firestore.Increment(d) for k, d in counter_deltas.items()}
+    if breakdown_deltas:
+        update["breakdowns"] = {
+            k: {label: firestore.Increment(d) for label, d in diff.items()}
+            for k, diff in breakdown_deltas.items()
+        }
+    _global_ref(db).set(update, merge=True)
+    delete_cached(FUNNEL_AGGREGATE_CACHE_KEY)
+
+
+def _swap_event_rollup(db, ref, new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Replace an event rollup atomically and return the previous one."""
+    transaction = db.transaction()
+
+    @firestore.transactional
+    def _swap(transaction):
+        snaps = list(transaction.get_all([ref]))
+        old = snaps[0].to_dict() if snaps and snaps[0].exists else None
+        transaction.set(ref, new)
+        return old
+
+    return _swap(transaction)
+
+
+def refresh_event_rollup(event_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Recompute one hackathon's rollup and fold the change into the global doc.
+
+    Called after writes to an event's teams, team members, hacker volunteers
+    and funnel summary. Every counter is recounted from source, so the same
+    change can never be counted twice. Costs one event's worth of reads,
+    independent of how many hackathons exist.
+    Failures are logged and swallowed so they never break the write that
+    triggered them; rebuild_funnel_rollups() repairs any drift.
+    """
+    if not event_id:
+        return None
+    try:
+        db = _get_db()
+        hackathon_snap = _find_hackathon(db, event_id)
+        if hackathon_snap is None:
+            warning(logger, "Funnel rollup refresh skipped, hackathon not found", event_id=event_id)
+            return None
+
+        summary_snap = _summary_ref(db, hackathon_snap.id).get()
+        summary = summary_snap.to_dict() if summary_snap.exists else None
+        new = compute_event_rollup(db, hackathon_snap, summary, _count_hackers(db, event_id))
+
+        old = _swap_event_rollup(db, _event_ref(db, hackathon_snap.id), new)
+        counter_deltas, breakdown_deltas = _rollup_delta(old, new)
+        _apply_global_delta(db, counter_deltas, breakdown_deltas)
+        info(logger, "Refreshed funnel rollup", event_id=event_id,
+             changed_counters=len(counter_deltas), changed_breakdowns=len(breakdown_deltas))
+        return new
+    except Exception as e:
+        exception(logger, "Failed to refresh funnel rollup", exc_info=e, event_id=event_id)
+        return None
+
+
+def refresh_team_rollups(team_id: str) -> None:
+    """
+    Refresh the rollup of every hackathon that lists a team, for writes that
+    only touch the team doc (members joining or leaving).
+    """
+    if not team_id:
+        return
+    try:
+        db = _get_db()
+        team_ref = db.collection("teams").document(team_id)
+        event_ids = [
+            (snap.to_dict() or {}).get("event_id")
+            for snap in db.collection("hackathons")
+            .where(filter=firestore.FieldFilter("teams", "array_contains", team_ref))
+            .select(["event_id"])
+            .stream()
+        ]
+    except Exception as e:
+        exception(logger, "Failed to find hackathons for team rollup refresh", exc_info=e, team_id=team_id)
+        return
+    for event_id in event_ids:
+        refresh_event_rollup(event_id)
+
+
+def rebuild_funnel_rollups(dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Recompute every event rollup and the global rollup from source data.
+
+    Uses the same batched reads the aggregate endpoint used before rollups
+    existed: one hackathons scan, one get_all for all summary docs, one
+    global hacker query and one team get_all per event. With dry_run the
+    rollups are computed and returned but nothing is written.
+
+    Returns:
+        The global rollup doc
+    """
+    db = _get_db()
+    started = datetime.now()
+
+    hackathon_docs = list(db.collection("hackathons").stream())
+    summary_refs = [_summary_ref(db, h.id) for h in hackathon_docs]
+    summaries = {}
+    for snap in (db.get_all(summary_refs) if summary_refs else []):
+        if snap is not None and snap.exists:
+            summaries[snap.reference.parent.parent.id] = snap.to_dict() or {}
+
+    hacker_counts = Counter(
+        doc.to_dict().get("event_id")
+        for doc in db.collection("volunteers")
+        .where(filter=firestore.FieldFilter("volunteer_type", "==", "hacker"))
+        .select(["event_id"])
+        .stream()
+        if doc.to_dict().get("event_id")
+    )
+
+    global_counters = {k: 0 for k in COUNTER_KEYS}
+    global_breakdowns = {k: Counter() for k in BREAKDOWN_KEYS}
+    batch = None if dry_run else db.batch()
+    pending = 0
+    for hackathon_doc in hackathon_docs:
+        event_id = (hackathon_doc.to_dict() or {}).get("event_id")
+        rollup = compute_event_rollup(
+            db, hackathon_doc, summaries.get(hackathon_doc.id),
+            hacker_counts.get(event_id, 0) if event_id else 0,
+        )
+        for k, v in rollup["counters"].items():
+            global_counters[k] += v
+        for k, bd in rollup["breakdowns"].items():
+            global_breakdowns[k].update(bd)
+
+        if batch is not None:
+            batch.set(_event_ref(db, hackathon_doc.id), rollup)
+            pending += 1
+            # Firestore caps a batch at 500 writes
+            if pending == 400:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+
+    now = datetime.now().isoformat()
+    global_rollup = {
+        "counters": global_counters,
+        "breakdowns": {k: dict(v) for k, v in global_breakdowns.items()},
+        "built_at": now,
+        "updated_at": now,
+    }
+    if batch is not None:
+        batch.set(_global_ref(db), global_rollup)
+        batch.commit()
+        delete_cached(FUNNEL_AGGREGATE_CACHE_KEY)
+
+    info(logger, "Rebuilt funnel rollups", events=len(hackathon_docs), dry_run=dry_run,
+         elapsed_seconds=round((datetime.now() - started).total_seconds(), 2))
+    return global_rollup
+
+
+def get_global_rollup() -> Optional[Dict[str, Any]]:
+    """Read the global rollup doc (a single Firestore read). None until built."""
+    snap = _global_ref(_get_db()).get()
+    if not snap.exists:
+        return None
+    data = snap.to_dict() or {}
+    # Increments that land before the first rebuild leave a partial doc
+    return data if data.get("built_at") else None
+
+
+def rollup_to_funnel(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a global rollup like get_hackathon_funnel_aggregate() has always returned."""
+    counters = {k: 0 for k in COUNTER_KEYS}
+    counters.update(rollup.get("counters") or {})
+    breakdowns = rollup.get("breakdowns") or {}
+
+    summary = {k: counters[k] for k in SUMMARY_KEYS}
+    summary.update({k: dict(breakdowns.get(k) or {}) for k in BREAKDOWN_KEYS})
+    summary.update({
+        "source": "aggregate",
+        "source_files": [],
+        "last_updated": rollup.get("updated_at"),
+        "last_updated_by": "services/funnel_rollup_service",
+    })
+
+    return {
+        "event_id": "__aggregate__",
+        "summary": summary,
+        "participation": {
+            "applied_as_hacker": counters["applied_as_hacker"],
+            "formed_team": counters["formed_team"],
+        },
+        "winners": {k: counters[k] for k in WINNER_KEYS},
+        "teams_total": counters["teams_total"],
+        "events_total": counters["events_total"],
+        "events_with_summary": counters["events_with_summary"],
+        "events_with_winners": counters["events_with_winners"],
+    }
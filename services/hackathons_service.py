@@ -2,7 +2,6 @@ import uuid
 import os
 import random
 import threading
-from collections import Counter
 from datetime import datetime, timedelta
 
 from cachetools import cached, TTLCache
@@ -18,6 +17,7 @@ from common.utils.firebase import (
     get_volunteer_from_db_by_event,
     get_volunteer_checked_in_from_db_by_event,
 )
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
 from common.utils.redis_cache import get_cached, set_cached
 from common.utils.validators import validate_hackathon_data_partial
 from common.utils.firestore_helpers import (
@@ -29,6 +29,13 @@ from common.utils.firestore_helpers import (
     register_cache,
 )
 from api.messages.message import Message
+from services.funnel_rollup_service import (
+    FUNNEL_AGGREGATE_CACHE_KEY,
+    get_global_rollup,
+    rebuild_funnel_rollups,
+    refresh_event_rollup,
+    rollup_to_funnel,
+)
 from services.users_service import get_propel_user_details_by_id
 
 logger = get_logger("hackathons_service")
@@ -46,11 +53,12 @@ def clear_cache():
     """Clear all hackathon-related caches (in-process + Redis)."""
     from common.utils.redis_cache import delete_cached
     clear_all_caches()
+    invalidate_hackathon_catalog()
     get_single_hackathon_event.cache_clear()
     get_single_hackathon_id.cache_clear()
     get_hackathon_list.cache_clear()
     get_hackathon_funnel.cache_clear()
-    delete_cached(_FUNNEL_AGG_CACHE_KEY)
+    delete_cached(FUNNEL_AGGREGATE_CACHE_KEY)
 
 
 def add_nonprofit_to_hackathon(json):
@@ -338,8 +346,7 @@ def get_hackathon_funnel(event_id):
     return result
 
 
-_FUNNEL_AGG_CACHE_KEY = "funnel_aggregate:v1"
-_FUNNEL_AGG_REDIS_TTL = 6 * 3600  # 6 hours — historical data rarely changes
+_FUNNEL_AGG_REDIS_TTL = 300  # rollup writes drop the key, so this only bounds staleness
 
 
 @limits(calls=200, period=ONE_MINUTE)
@@ -350,187 +357,32 @@ def get_hackathon_funnel_aggregate():
     "all-time" view.
 
     Returns the same shape as get_hackathon_funnel(), plus:
-      - events_total: int           total hackathons iterated
+      - events_total: int           total hackathons
       - events_with_summary: int    how many have a funnel/summary doc
       - events_with_winners: int    how many have at least one winning team
 
-    Performance: caches in Redis (6h TTL) with in-process TTLCache fallback.
-    On a cache miss, batches all funnel/summary sub-doc reads in one
-    db.get_all() call and replaces per-event volunteers queries with a single
-    global query + Counter.
+    Served from the materialized global rollup (funnel_rollups/global), so a
+    cache miss costs one document read however many hackathons exist. The
+    rollup is maintained incrementally by services/funnel_rollup_service; if
+    it has never been built, it is built here once.
     """
-    cached_result = get_cached(_FUNNEL_AGG_CACHE_KEY)
+    cached_result = get_cached(FUNNEL_AGGREGATE_CACHE_KEY)
     if cached_result is not None:
         logger.debug("get_hackathon_funnel_aggregate: Redis/local cache hit")
         return cached_result
 
-    import time as _time
-    _t0 = _time.time()
-    logger.info("get_hackathon_funnel_aggregate: cache miss — recomputing")
-
-    db = _get_db()
+    rollup = get_global_rollup()
+    if rollup is None:
+        logger.warning("get_hackathon_funnel_aggregate: no global rollup yet — rebuilding")
+        rollup = rebuild_funnel_rollups()
 
-    agg_summary_keys = (
-        "registered", "started_project", "submitted_project", "submitted_gallery_visible",
-        "started_project_teams", "submitted_project_teams", "submitted_gallery_visible_teams",
-    )
-    agg_breakdown_keys = (
-        "status_breakdown", "step_breakdown", "referral_breakdown",
-        "teammate_intent_breakdown", "country_breakdown",
-    )
-
-    summed = {k: 0 for k in agg_summary_keys}
-    breakdowns = {k: Counter() for k in agg_breakdown_keys}
-
-    applied_as_hacker_total = 0
-    formed_team_total = 0
-    won_prize_total = 0
-    founding_engineers_total = 0
-    completion_support_total = 0
-    category_winner_total = 0
-    won_prize_teams_total = 0
-    founding_engineers_teams_total = 0
-    completion_support_teams_total = 0
-    category_winner_teams_total = 0
-    teams_total = 0
-
-    events_total = 0
-    events_with_summary = 0
-    events_with_winners = 0
-
-    # Step 1: Fetch all hackathon docs in one scan.
-    hackathon_docs = list(db.collection("hackathons").stream())
-    events_total = len(hackathon_docs)
-
-    # Step 2: Batch-fetch all funnel/summary sub-docs in ONE round-trip.
-    summary_refs = [
-        db.collection("hackathons").document(h.id).collection("funnel").document("summary")
-        for h in hackathon_docs
-    ]
-    summary_snaps = list(db.get_all(summary_refs)) if summary_refs else []
-    summary_by_hackathon_id = {
-        snap.reference.parent.parent.id: snap
-        for snap in summary_snaps
-        if snap is not None
-    }
-
-    # Step 3: One global hacker query → Counter by event_id (replaces N per-event queries).
-    try:
-        hacker_counts = Counter(
-            doc.to_dict().get("event_id")
-            for doc in db.collection("volunteers")
-            .where(filter=firestore.FieldFilter("volunteer_type", "==", "hacker"))
-            .select(["event_id"])
-            .stream()
-            if doc.to_dict().get("event_id")
-        )
-    except Exception as e:
-        logger.warning(f"get_hackathon_funnel_aggregate: global hacker count failed: {e}")
-        hacker_counts = Counter()
-
-    # Step 4: Process each hackathon with pre-fetched data.
-    for hackathon_doc in hackathon_docs:
-        h_data = hackathon_doc.to_dict() or {}
-        event_id = h_data.get("event_id")
-
-        summary_snap = summary_by_hackathon_id.get(hackathon_doc.id)
-        if summary_snap and summary_snap.exists:
-            events_with_summary += 1
-            s = summary_snap.to_dict() or {}
-            for k in agg_summary_keys:
-                v = s.get(k)
-                if isinstance(v, (int, float)):
-                    summed[k] += int(v)
-            for k in agg_breakdown_keys:
-                bd = s.get(k) or {}
-                if isinstance(bd, dict):
-                    for label, count in bd.items():
-                        if isinstance(count, (int, float)):
-                            breakdowns[k][label] += int(count)
-
-        # Team membership + winner counts (live, like per-event endpoint).
-        team_refs = h_data.get("teams") or []
-        if team_refs:
-            team_docs = db.get_all(team_refs)
-            event_winners = 0
-            unique_member_ids = set()
-            for td in team_docs:
-                if not td.exists:
-                    continue
-                td_dict = td.to_dict() or {}
-                status = td_dict.get("status") or ""
-                user_ids = [
-                    u.id for u in (td_dict.get("users") or [])
-                    if hasattr(u, "id") and u.id
-                ]
-                unique_member_ids.update(user_ids)
-                if status == "FOUNDING_ENGINEERS":
-                    founding_engineers_teams_total += 1
-                    won_prize_teams_total += 1
-                    founding_engineers_total += len(set(user_ids))
-                    won_prize_total += len(set(user_ids))
-                    event_winners += 1
-                elif status == "COMPLETION_SUPPORT":
-                    completion_support_teams_total += 1
-                    won_prize_teams_total += 1
-                    completion_support_total += len(set(user_ids))
-                    won_prize_total += len(set(user_ids))
-                    event_winners += 1
-                elif status == "CATEGORY_WINNER":
-                    category_winner_teams_total += 1
-                    won_prize_teams_total += 1
-                    category_winner_total += len(set(user_ids))
-                    won_prize_total += len(set(user_ids))
-                    event_winners += 1
-            formed_team_total += len(unique_member_ids)
-            teams_total += len(team_refs)
-            if event_winners:
-                events_with_winners += 1
-
-        if event_id:
-            applied_as_hacker_total += hacker_counts.get(event_id, 0)
-
-    aggregated_summary = {
-        **summed,
-        **{k: dict(v) for k, v in breakdowns.items()},
-        "source": "aggregate",
-        "source_files": [],
-        "last_updated": datetime.now().isoformat(),
-        "last_updated_by": "services/hackathons_service.get_hackathon_funnel_aggregate",
-    }
-
-    result = {
-        "event_id": "__aggregate__",
-        "summary": aggregated_summary,
-        "participation": {
-            "applied_as_hacker": applied_as_hacker_total,
-            "formed_team": formed_team_total,
-        },
-        "winners": {
-            "won_prize": won_prize_total,
-            "founding_engineers": founding_engineers_total,
-            "completion_support": completion_support_total,
-            "category_winner": category_winner_total,
-            "won_prize_teams": won_prize_teams_total,
-            "founding_engineers_teams": founding_engineers_teams_total,
-            "completion_support_teams": completion_support_teams_total,
-            "category_winner_teams": category_winner_teams_total,
-        },
-        "teams_total": teams_total,
-        "events_total": events_total,
-        "events_with_summary": events_with_summary,
-        "events_with_winners": events_with_winners,
-    }
-
-    elapsed = _time.time() - _t0
+    result = rollup_to_funnel(rollup)
     logger.info(
-        f"get_hackathon_funnel_aggregate computed in {elapsed:.2f}s: "
-        f"events={events_total} with_summary={events_with_summary} "
-        f"with_winners={events_with_winners} won={won_prize_total}p "
-        f"founding={founding_engineers_total}p teams={teams_total}"
+        f"get_hackathon_funnel_aggregate from rollup: "
+        f"events={result['events_total']} with_summary={result['events_with_summary']} "
+        f"with_winners={result['events_with_winners']} teams={result['teams_total']}"
     )
-
-    set_cached(_FUNNEL_AGG_CACHE_KEY, result, ttl=_FUNNEL_AGG_REDIS_TTL)
+    set_cached(FUNNEL_AGGREGATE_CACHE_KEY, result, ttl=_FUNNEL_AGG_REDIS_TTL)
     return result
 
 
@@ -746,6 +598,11 @@ def update_hackathon_volunteers(event_id, volunteer_type, json, propel_id):
 
     doc_ref.update(json)
 
+    # Changing a hacker's type or event moves them between applied_as_hacker counts
+    if "hacker" in (doc_volunteer_type, json.get("volunteer_type")):
+        for rollup_event_id in {doc_dict.get("event_id"), json.get("event_id")} - {None}:
+            refresh_event_rollup(rollup_event_id)
+
     slack_user_id = doc.to_dict().get('slack_user_id') if doc_dict else None
 
     if not slack_user_id:
@@ -1078,6 +935,7 @@ def save_hackathon(json_data, propel_id):
         update_hackathon(transaction)
 
         clear_cache()
+        refresh_event_rollup(data["event_id"])
 
         logger.info(f"Hackathon {'updated' if is_update else 'created'} successfully. ID: {doc_id}")
         msg = Message("Saved Hackathon")
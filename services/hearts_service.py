@@ -1,4 +1,4 @@
-from db.db import fetch_users
+from common.utils.user_directory import HEARTS_TOTAL_FIELD, hearts_fields
 from common.log import get_logger, info, debug, warning, error, exception
 from google.cloud import storage
 from PIL import ImageFont
@@ -26,71 +26,114 @@ client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 # Initialize logger
 logger = get_logger("hearts_service")
 #
-from common.utils.firebase import add_hearts_for_user, get_user_by_user_id, get_user_by_email, add_certificate
+from common.utils.firebase import add_hearts_for_user, get_user_by_user_id, get_user_by_email, add_certificate, get_db
 from common.utils.slack import send_slack, async_send_slack, invite_user_to_channel, rate_limited_get_user_info
 from common.utils.oauth_providers import normalize_slack_user_id
 from services.users_service import save_user
 
 
-def get_hearts_for_all_users():    
-    users = fetch_users()
+HEARTS_PAGE_SIZE = 200
+# Firestore caps a batch at 500 writes
+BACKFILL_BATCH_SIZE = 400
 
+
+def _users_by_hearts(db):
+    return db.collection("users").order_by(HEARTS_TOTAL_FIELD, direction="DESCENDING")
+
+
+def get_hearts_for_all_users(page_size: int = HEARTS_PAGE_SIZE):    
+    """Every user with a hearts history, highest total first, read a page at a time."""
+    db = get_db()
     result = []    
 
     # Result should have slackUsername, totalHearts, heartTypes (how or what) and heartCount
-    # This is all within the "history" key for each user
-    # User is type model.user.User
-    for user in users:                
-        total_hearts = 0
-
-        if user.history:
-            debug(logger, "User history", history=user.history)
+    # Users without a history have no hearts_total and are not returned
+    last = None
+    while True:
+        query = _users_by_hearts(db).limit(page_size)
+        if last is not None:
+            query = query.start_after(last)
+        docs = list(query.stream())
+
+        for doc in docs:
+            user = doc.to_dict() or {}
+            history = user.get("history")
+            if not history:
+                continue
+            debug(logger, "User history", history=history)
             '''
             Example of user history:
              {'what': {'unit_test_coverage': 0, 'documentation': 0.5, 'productionalized_projects': 0.5, 'unit_test_writing': 0, 'observability': 0, 'code_quality': 0.5, 'requirements_gathering': 0.5, 'design_architecture': 0.5}, 'how': {'iterations_of_code_pushed_to_production': 1.5, 'code_reliability': 2, 'standups_completed': 2.5, 'customer_driven_innovation_and_design_thinking': 1}}
             '''
-            # Result should have slackUsername, totalHearts, heartTypes (how or what) and heartCount
-            # Count the total hearts
-            for key in user.history:
-                if "certificates"  in key:
-                    continue
-
-                for subkey in user.history[key]:
-                    total_hearts += user.history[key][subkey]
-            
             result.append({
-                "slackUsername": user.name,
-                "totalHearts": total_hearts,
-                "heartTypes": list(user.history.keys()),
-                "history": user.history
+                "slackUsername": user.get("name"),
+                "totalHearts": user.get(HEARTS_TOTAL_FIELD, 0),
+                "heartTypes": list(history.keys()),
+                "history": history
             })                        
-    return result
+
+        if len(docs) < page_size:
+            return result
+        last = docs[-1]
 
 
 def get_hearts_leaderboard(limit: int = 10) -> list:
-    users = fetch_users()
+    """Top users by the hearts_total kept on each user doc; one ordered query."""
+    query = _users_by_hearts(get_db()).where(HEARTS_TOTAL_FIELD, ">", 0).limit(limit)
+
     result = []
+    for doc in query.stream():
+        user = doc.to_dict() or {}
+        result.append({
+            "name": user.get("name"),
+            "totalHearts": user.get(HEARTS_TOTAL_FIELD),
+            "userId": doc.id,
+            "profileImage": user.get("profile_image"),
+        })
+    return result
+
 
-    for user in users:
-        total_hearts = 0
+def backfill_hearts_totals(dry_run: bool = True, batch_size: int = BACKFILL_BATCH_SIZE) -> dict:
+    """
+    Compute hearts_total and hearts_by_category for every user with a history.
 
-        if user.history:
-            for key in user.history:
-                if "certificates" in key:
-                    continue
-                for subkey in user.history[key]:
-                    total_hearts += user.history[key][subkey]
+    Only users whose stored totals differ are written, batch_size per batch.
+    With dry_run nothing is written.
 
-        if total_hearts > 0:
-            result.append({
-                "name": user.name,
-                "totalHearts": total_hearts,
-                "userId": user.id,
-                "profileImage": user.profile_image,
-            })
-
-    result.sort(key=lambda x: x["totalHearts"], reverse=True)
-    return result[:limit]
+    Returns:
+        Counts of users scanned, with a history, and updated
+    """
+    db = get_db()
+    stats = {"scanned": 0, "with_history": 0, "updated": 0}
+    batch, pending = None, 0
+
+    for doc in db.collection("users").stream():
+        stats["scanned"] += 1
+        user = doc.to_dict() or {}
+        if not user.get("history"):
+            continue
+        stats["with_history"] += 1
+
+        fields = hearts_fields(user["history"])
+        if all(user.get(k) == v for k, v in fields.items()):
+            continue
+        stats["updated"] += 1
+        if dry_run:
+            continue
+
+        if batch is None:
+            batch = db.batch()
+        batch.set(doc.reference, fields, merge=True)
+        pending += 1
+        if pending == batch_size:
+            batch.commit()
+            info(logger, "Committed hearts totals batch", updated=stats["updated"])
+            batch, pending = None, 0
+
+    if batch is not None:
+        batch.commit()
+    info(logger, "Backfilled hearts totals", dry_run=dry_run, **stats)
+    return stats
 
 
 
@@ -1,14 +1,40 @@
 import os
+import threading
+import time
+import uuid
 import openai
 import numpy as np
 import tiktoken
 from itertools import islice
 from services.problem_statements_service import get_problem_statements
 from common.utils.firebase import get_db
+from common.utils.redis_cache import get_cached, set_cached, acquire_lock, release_lock
+from common.log import get_logger, info, warning
+from services.embedding_pipeline import (
+    DEFAULT_MAX_WORKERS,
+    EmbeddingJob,
+    StubEmbeddingClient,
+    average_chunk_embeddings,
+    get_latest_job,
+    item_vectors,
+    pack_by_token_budget,
+    request_inputs,
+)
+
+logger = get_logger("llm_service")
 
 # Initialize the OpenAI client.
 client = openai.OpenAI()
 
+# Embeddings go through their own client so they can run offline against
+# StubEmbeddingClient (EMBEDDING_CLIENT=stub, or set_embedding_client()).
+embedding_client = StubEmbeddingClient() if os.getenv("EMBEDDING_CLIENT", "").lower() == "stub" else client
+
+def set_embedding_client(new_client):
+    """Swap the client used for embeddings, e.g. for a StubEmbeddingClient in tests."""
+    global embedding_client
+    embedding_client = new_client
+
 # Constants for the embedding model
 EMBEDDING_MODEL = 'text-embedding-3-small'
 EMBEDDING_CTX_LENGTH = 8191
@@ -32,7 +58,7 @@ def chunked_tokens(text, encoding_name, chunk_length):
 
 def get_single_embedding(text_or_tokens, model=EMBEDDING_MODEL):
     """Get embedding for a single text or token sequence."""
-    response = client.embeddings.create(input=[text_or_tokens], model=model)
+    response = embedding_client.embeddings.create(input=[text_or_tokens], model=model)
     return response.data[0].embedding
 
 def len_safe_get_embedding(text, model=EMBEDDING_MODEL, max_tokens=EMBEDDING_CTX_LENGTH, encoding_name=EMBEDDING_ENCODING, average=True):
@@ -45,9 +71,7 @@ def len_safe_get_embedding(text, model=EMBEDDING_MODEL, max_tokens=EMBEDDING_CTX
         chunk_lens.append(len(chunk))
 
     if average:
-        chunk_embeddings = np.average(chunk_embeddings, axis=0, weights=chunk_lens)
-        chunk_embeddings = chunk_embeddings / np.linalg.norm(chunk_embeddings)
-        chunk_embeddings = chunk_embeddings.tolist()
+        chunk_embeddings = average_chunk_embeddings(chunk_embeddings, chunk_lens)
     
     return chunk_embeddings
 
@@ -55,10 +79,240 @@ def cosine_similarity(vec_a, vec_b):
     """Calculates cosine similarity between two vectors."""
     return np.dot(vec_a, vec_b) / (np.linalg.norm(vec_a) * np.linalg.norm(vec_b))
 
-def populate_embedding_map():
+class ApprovedEmbeddingIndex:
+    """
+    Process-wide, versioned NumPy index of approved-project embeddings.
+
+    Rows are L2-normalized float32 vectors in one C-contiguous buffer, so a
+    top-N query is a single matrix-vector product plus argpartition. Writes
+    made in this process overwrite changed rows in place and append new ones
+    into spare capacity; only removals copy the buffer. Each write (or each
+    populate job, via publish()) bumps a shared version in Redis; other
+    workers see the new version and reload the collection once. A max age
+    bounds staleness when Redis is unavailable.
+    """
+
+    VERSION_CACHE_KEY = "llm:approved_embedding_index:version"
+    VERSION_TTL = 7 * 24 * 3600
+
+    def __init__(self, max_age_seconds=3600):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._ids = []
+        self._titles = []
+        self._descriptions = []
+        self._position = {}
+        self._buffer = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._version = None
+        self._loaded_at = None
+        self._unpublished = False
+
+    @property
+    def _matrix(self):
+        return self._buffer[:self._size]
+
+    @staticmethod
+    def _normalize(vectors):
+        matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _publish_version(self):
+        version = uuid.uuid4().hex
+        set_cached(self.VERSION_CACHE_KEY, version, ttl=self.VERSION_TTL)
+        return version
+
+    def _is_stale(self):
+        if self._loaded_at is None:
+            return True
+        if time.monotonic() - self._loaded_at > self.max_age_seconds:
+            return True
+        shared = get_cached(self.VERSION_CACHE_KEY)
+        return shared is not None and shared != self._version
+
+    def load(self, db=None):
+        """Rebuild the matrix from every approved doc in the embedding map."""
+        db = db or get_db()
+        started = time.monotonic()
+        # Read the version first: a bump that lands mid-stream must leave this
+        # load looking stale, not be recorded as already applied
+        shared = get_cached(self.VERSION_CACHE_KEY) or self._publish_version()
+        ids, titles, descriptions, vectors = [], [], [], []
+        dim = None
+        query = db.collection(EMBEDDING_MAP_COLLECTION).where('is_approved', '==', True).stream()
+        for doc in query:
+            data = doc.to_dict() or {}
+            vector = data.get('embedding_vector')
+            if not vector:
+                continue
+            if dim is None:
+                dim = len(vector)
+            elif len(vector) != dim:
+                warning(logger, "Skipping embedding with mismatched dimension",
+                        project_id=doc.id, expected=dim, actual=len(vector))
+                continue
+            ids.append(doc.id)
+            titles.append(data.get('title', 'Untitled'))
+            descriptions.append(data.get('description', 'No description.'))
+            vectors.append(vector)
+
+        matrix = self._normalize(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            self._ids, self._titles, self._descriptions = ids, titles, descriptions
+            self._position = {doc_id: i for i, doc_id in enumerate(ids)}
+            self._buffer = matrix
+            self._size = len(ids)
+            self._version = shared
+            self._loaded_at = time.monotonic()
+            self._unpublished = False
+        info(logger, "Loaded approved embedding index", rows=len(ids),
+             elapsed_ms=round((time.monotonic() - started) * 1000, 1))
+
+    def ensure_loaded(self):
+        if self._is_stale():
+            self.load()
+
+    def publish(self):
+        """Publish one version for upsert_many(publish=False) writes made since the last publish."""
+        with self._lock:
+            if not self._unpublished:
+                return
+            self._unpublished = False
+            version = self._publish_version()
+            if self._loaded_at is not None:
+                self._version = version
+
+    def _append(self, row):
+        """Write row at self._size, doubling the buffer when it is full. Caller holds the lock."""
+        if self._size == len(self._buffer):
+            grown = np.zeros((max(16, 2 * self._size), len(row)), dtype=np.float32)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size] = row
+        self._size += 1
+
+    def _compact(self, removed):
+        """Drop rows in removed into fresh lists and buffer, so readers' snapshots stay valid."""
+        keep = [i for i in range(self._size) if i not in removed]
+        self._ids = [self._ids[i] for i in keep]
+        self._titles = [self._titles[i] for i in keep]
+        self._descriptions = [self._descriptions[i] for i in keep]
+        self._position = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._buffer = np.ascontiguousarray(self._buffer[keep], dtype=np.float32)
+        self._size = len(keep)
+
+    def upsert_many(self, entries, publish=True):
+        """
+        Apply embedding-map writes to a loaded index without rereading the collection.
+
+        Args:
+            entries: iterable of (doc_id, map_entry) where map_entry is the dict
+                written to the embedding map. Unapproved entries are removed.
+            publish: bump the shared version now. Batch writers pass False
+                and call publish() once when they are done.
+        """
+        entries = list(entries)
+        if not entries:
+            return
+        with self._lock:
+            if self._loaded_at is not None:
+                removed = set()
+                for doc_id, entry in entries:
+                    vector = entry.get('embedding_vector')
+                    i = self._position.get(doc_id)
+                    if not entry.get('is_approved') or not vector:
+                        if i is not None:
+                            removed.add(i)
+                        continue
+                    if self._size and len(vector) != self._buffer.shape[1]:
+                        continue
+                    row = self._normalize(vector)
+                    title = entry.get('title', 'Untitled')
+                    description = entry.get('description', 'No description.')
+                    if i is None:
+                        self._position[doc_id] = self._size
+                        self._ids.append(doc_id)
+                        self._titles.append(title)
+                        self._descriptions.append(description)
+                        self._append(row)
+                    else:
+                        removed.discard(i)
+                        self._titles[i] = title
+                        self._descriptions[i] = description
+                        self._buffer[i] = row
+                if removed:
+                    self._compact(removed)
+            # Nothing to patch when unloaded, but other workers must still reload
+            self._unpublished = True
+        if publish:
+            self.publish()
+
+    def _rank(self, scores, top_n, ids, titles, descriptions):
+        k = min(top_n, len(scores))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [
+            {
+                'id': ids[i],
+                'title': titles[i],
+                'description': descriptions[i],
+                'similarity': float(scores[i]),
+            }
+            for i in candidates
+            if np.isfinite(scores[i])
+        ]
+
+    def search_many(self, embeddings, top_n=3, exclude_ids=None):
+        """
+        Top-N approved projects for each embedding, via one matrix product.
+
+        Args:
+            embeddings: list of query vectors
+            top_n: results per query
+            exclude_ids: optional list (parallel to embeddings) of a project ID
+                to leave out of that query's results, e.g. the query itself
+
+        Returns:
+            One result list per query, best match first
+        """
+        self.ensure_loaded()
+        with self._lock:
+            # The lists only grow and rows below _size are overwritten in place,
+            # so this snapshot stays consistent after the lock is released
+            ids, titles, descriptions = self._ids, self._titles, self._descriptions
+            matrix = self._matrix
+            excluded = [self._position.get(doc_id) for doc_id in (exclude_ids or ())]
+        if not len(matrix) or not len(embeddings):
+            return [[] for _ in embeddings]
+
+        queries = self._normalize(embeddings)
+        scores = queries @ matrix.T
+        for row, i in enumerate(excluded):
+            if i is not None and i < len(matrix):
+                scores[row, i] = -np.inf
+        return [self._rank(scores[row], top_n, ids, titles, descriptions) for row in range(len(scores))]
+
+    def search(self, embedding, top_n=3, exclude_id=None):
+        return self.search_many([embedding], top_n=top_n, exclude_ids=[exclude_id])[0]
+
+
+approved_index = ApprovedEmbeddingIndex()
+
+POPULATE_LOCK_NAME = "llm:populate_embedding_map"
+POPULATE_LOCK_TTL = 2 * 3600
+
+def populate_embedding_map(job_id=None, max_workers=DEFAULT_MAX_WORKERS):
     """
     Generates embeddings for all approved NPO applications (problem statements)
     and populates the 'npo_applications_embedding_maps' collection.
+
+    Projects whose embedding text is unchanged since the last run are skipped,
+    so re-running after a crash picks up where the previous job stopped.
+    Progress is recorded in embedding_jobs/{job_id}.
     """
     db = get_db()
     
@@ -95,43 +349,74 @@ def populate_embedding_map():
             print(f"ERROR: Failed to process project with ID '{getattr(project, 'id', 'UNKNOWN')}'. Reason: {e}")
             continue # Skip this project and continue with the next one
 
-    # FIX: Reduce the batch size to prevent Firestore 'Transaction too big' errors.
-    # A smaller batch size ensures the total payload of each transaction is under the 10MiB limit.
-    BATCH_SIZE = 20
-    total_processed = 0
-    for app_batch in batched(apps_to_embed, BATCH_SIZE):
-        texts_in_batch = [app['text'] for app in app_batch]
-        batch_ids = [app['id'] for app in app_batch]
-        
+    job = EmbeddingJob(
+        db,
+        embedding_client,
+        EMBEDDING_MODEL,
+        tiktoken.get_encoding(EMBEDDING_ENCODING),
+        EMBEDDING_MAP_COLLECTION,
+        ctx_length=EMBEDDING_CTX_LENGTH,
+        # Patch this worker per chunk but publish one version for the whole job
+        on_written=lambda entries: approved_index.upsert_many(entries, publish=False),
+        max_workers=max_workers,
+        job_id=job_id,
+    )
+    try:
+        summary = job.run(apps_to_embed)
+    except Exception as e:
+        print(f"ERROR: Embedding job {job.job_id} failed. Reason: {e}")
+        return {"status": "error", "message": "Embedding job failed.", "job_id": job.job_id}
+    finally:
+        approved_index.publish()
+
+    return {
+        "status": "success",
+        "message": f"Processed {summary['processed']} of {len(approved_projects)} applications ({summary['skipped']} unchanged, {summary['failed']} failed).",
+        "processed_count": summary['processed'],
+        "skipped_count": summary['skipped'],
+        "failed_count": summary['failed'],
+        "job_id": job.job_id,
+    }
+
+def start_populate_embedding_map():
+    """
+    Run populate_embedding_map on a background thread unless a run is already
+    in progress on any worker.
+
+    Returns:
+        The new job ID, or None if another run holds the lock
+    """
+    token = acquire_lock(POPULATE_LOCK_NAME, POPULATE_LOCK_TTL)
+    if token is None:
+        return None
+    job_id = uuid.uuid4().hex
+
+    def run():
         try:
-            response = client.embeddings.create(input=texts_in_batch, model=EMBEDDING_MODEL)
-            embeddings_in_batch = [item.embedding for item in response.data]
+            populate_embedding_map(job_id=job_id)
+        finally:
+            release_lock(POPULATE_LOCK_NAME, token)
+
+    threading.Thread(target=run, name="populate-embedding-map", daemon=True).start()
+    return job_id
+
+def get_embedding_job_status():
+    """Return the most recent embedding job doc, or None if none has run."""
+    return get_latest_job(get_db())
+
+def _application_text(application_data: dict):
+    """Return (title, text) for an NPO application; the text is both embedded and stored as its description."""
+    title = application_data.get('charityName', 'Untitled Project')
+    problem = application_data.get('technicalProblem', '')
+    solution = application_data.get('solutionBenefits', '')
+    idea = application_data.get('idea', '')
+    return title, f"Title: {title}. Problem: {problem}. Solution: {solution}. Idea: {idea}"
 
-            firestore_batch = db.batch()
-            for i, app_data in enumerate(app_batch):
-                # --- LOGGING ADDED HERE ---
-                # Log the title and the first 5 values of the embedding vector before setting it.
-                embedding_vector = embeddings_in_batch[i]                
-                map_ref = db.collection(EMBEDDING_MAP_COLLECTION).document(app_data['id'])
-                firestore_batch.set(map_ref, {
-                    'embedding_vector': embedding_vector,
-                    'title': app_data['title'],
-                    'description': app_data['description'],
-                    'is_approved': app_data['is_approved']
-                })
-            
-            firestore_batch.commit()
-            total_processed += len(app_batch)
-        except Exception as e:
-            print(f"ERROR: An error occurred during a batch update for IDs {batch_ids}. Reason: {e}")
-            continue
-            
-    return {"status": "success", "message": f"Processed {total_processed} of {len(approved_projects)} applications.", "processed_count": total_processed}
 
 def find_similar_projects(application_data: dict, top_n=3):
     """
     Finds the top N most similar APPROVED projects for a new application by querying
-    the pre-populated embedding map. It caches the new application's embedding if not present.
+    the in-process approved embedding index. It caches the new application's embedding if not present.
     """
     db = get_db()
     application_id = application_data.get('id')
@@ -153,13 +438,8 @@ def find_similar_projects(application_data: dict, top_n=3):
 
     # 2. If no embedding is cached, generate and persist it
     if not app_embedding:        
-        title = application_data.get('charityName', 'Untitled Project')
-        problem = application_data.get('technicalProblem', '')
-        solution = application_data.get('solutionBenefits', '')
-        idea = application_data.get('idea', '')
-        description = f"Title: {title}. Problem: {problem}. Solution: {solution}. Idea: {idea}"
-
-        app_text = f"Title: {title}. Problem: {problem}. Solution: {solution}. Idea: {idea}"
+        title, app_text = _application_text(application_data)
+        description = app_text
         
         try:
             app_embedding = len_safe_get_embedding(app_text)
@@ -177,38 +457,103 @@ def find_similar_projects(application_data: dict, top_n=3):
             print(f"ERROR: OpenAI API embedding failed for new application {application_id}: {e}")
             return [{'id': 'error', 'title': 'Failed to generate embedding for this application.'}]
 
-    # 3. Fetch all APPROVED projects from the embedding map
+    # 3. Score against every approved project, skipping the application itself
     try:
-        # Query the map for approved projects only
-        map_query = db.collection(EMBEDDING_MAP_COLLECTION).where('is_approved', '==', True).stream()
-        approved_projects_map = {doc.id: doc.to_dict() for doc in map_query}
-        if not approved_projects_map:
-            return []
+        return approved_index.search(app_embedding, top_n=top_n, exclude_id=application_id)
     except Exception as e:
-        print(f"ERROR: Failed to fetch from embedding map: {e}")
+        print(f"ERROR: Failed to search the approved embedding index: {e}")
         return []
 
-    # 4. Compute similarities against approved projects
-    similarities = []
-    for project_id, project_data in approved_projects_map.items():
-        # Ensure we don't compare the application with itself if it happens to be in the approved list
-        if project_id == application_id:
+
+def find_similar_projects_batch(applications: list, top_n=3):
+    """
+    Scores many applications against the approved projects at once.
+
+    Cached embeddings are fetched with one get_all, missing ones are generated
+    in embeddings requests packed under the per-request token budget (long
+    texts are embedded in chunks and averaged) and persisted in one batch, and
+    all applications are ranked with a single matrix product.
+
+    Returns:
+        dict of application ID -> list of similar projects (or an error entry)
+    """
+    db = get_db()
+    results = {}
+    apps = []
+    for application_data in applications:
+        application_id = (application_data or {}).get('id')
+        if not application_id:
             continue
-            
-        vector = project_data.get('embedding_vector')
-        if vector:
-            similarity = cosine_similarity(np.array(app_embedding), np.array(vector))
-            similarities.append({
-                'id': project_id,
-                'title': project_data.get('title', 'Untitled'),
-                'description': project_data.get('description', 'No description.'),
-                'similarity': similarity
-            })
+        if application_id in results:
+            continue
+        results[application_id] = []
+        apps.append(application_data)
+    if not apps:
+        return results
+
+    refs = [db.collection(EMBEDDING_MAP_COLLECTION).document(a['id']) for a in apps]
+    embeddings = {}
+    try:
+        for snap in db.get_all(refs):
+            if snap.exists:
+                vector = (snap.to_dict() or {}).get('embedding_vector')
+                if vector:
+                    embeddings[snap.id] = vector
+    except Exception as e:
+        print(f"WARN: Could not read cached embeddings for batch. Reason: {e}")
+
+    missing = [a for a in apps if a['id'] not in embeddings]
+    if missing:
+        encoding = tiktoken.get_encoding(EMBEDDING_ENCODING)
+        entries = {}
+        items = []
+        for application_data in missing:
+            title, app_text = _application_text(application_data)
+            entries[application_data['id']] = (title, app_text)
+            items.append({'id': application_data['id'], 'text': app_text})
+        # Stay under the per-request token cap; a failed request only loses its own chunk.
+        # Long texts are chunked and averaged, as len_safe_get_embedding does.
+        for batch in pack_by_token_budget(items, encoding, EMBEDDING_CTX_LENGTH):
+            try:
+                response = embedding_client.embeddings.create(input=request_inputs(batch), model=EMBEDDING_MODEL)
+                vectors = [data.embedding for data in response.data]
+                for item, vector in zip(batch, item_vectors(batch, vectors)):
+                    embeddings[item['id']] = vector
+            except Exception as e:
+                print(f"ERROR: OpenAI API batch embedding failed for {[item['id'] for item in batch]}: {e}")
+
+        try:
+            firestore_batch = db.batch()
+            for application_id, (title, description) in entries.items():
+                if application_id in embeddings:
+                    firestore_batch.set(db.collection(EMBEDDING_MAP_COLLECTION).document(application_id), {
+                        'embedding_vector': embeddings[application_id],
+                        'title': title,
+                        'description': description,
+                        'is_approved': False
+                    })
+            firestore_batch.commit()
+        except Exception as e:
+            print(f"ERROR: Failed to persist batch embeddings. Reason: {e}")
+
+    scored_ids = [a['id'] for a in apps if a['id'] in embeddings]
+    for application_id in results:
+        if application_id not in embeddings:
+            results[application_id] = [{'id': 'error', 'title': 'Failed to generate embedding for this application.'}]
+    if not scored_ids:
+        return results
+
+    try:
+        ranked = approved_index.search_many(
+            [embeddings[i] for i in scored_ids], top_n=top_n, exclude_ids=scored_ids
+        )
+    except Exception as e:
+        print(f"ERROR: Failed to search the approved embedding index: {e}")
+        return results
+    for application_id, similar in zip(scored_ids, ranked):
+        results[application_id] = similar
+    return results
 
-    # 5. Sort and return the top N results
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    top_similarities = similarities[:top_n]
-    return top_similarities
 
 def refresh_embedding_and_find_similar(application_data: dict, top_n=3):
     """
@@ -222,17 +567,9 @@ def refresh_embedding_and_find_similar(application_data: dict, top_n=3):
 
     # 1. Generate a new embedding from the full application data.
     try:
-        # FIX: Use the correct fields from the application document.
-        # 'charityName' will serve as the title.
-        # 'technicalProblem' and 'solutionBenefits' will form the description.
-        title = application_data.get('charityName', 'Untitled Project')
-        problem = application_data.get('technicalProblem', '')
-        solution = application_data.get('solutionBenefits', '')
-        idea = application_data.get('idea', '')
-        description = f"Title: {title}. Problem: {problem}. Solution: {solution}. Idea: {idea}"
-
-        app_text = f"Title: {title}. Problem: {problem}. Solution: {solution}. Idea: {idea}"
-        
+        # 'charityName' serves as the title; problem, solution and idea form the description.
+        title, app_text = _application_text(application_data)
+        description = app_text
         new_embedding = len_safe_get_embedding(app_text)
 
     except Exception as e:
@@ -249,36 +586,18 @@ def refresh_embedding_and_find_similar(application_data: dict, top_n=3):
             'is_approved': False  # This is for an unapproved application
         }
         map_ref.set(map_entry_data)
+        approved_index.upsert_many([(application_id, map_entry_data)])
     except Exception as e:
         print(f"ERROR: Failed to save refreshed embedding for {application_id}. Reason: {e}")
         # We can still proceed, but the cache won't be fixed.
 
     # 3. Now, find similar projects using the newly generated embedding.
-    # This re-uses the logic from the find_similar_projects function.
     try:
-        map_query = db.collection(EMBEDDING_MAP_COLLECTION).where('is_approved', '==', True).stream()
-        approved_projects_map = {doc.id: doc.to_dict() for doc in map_query}
+        return approved_index.search(new_embedding, top_n=top_n)
     except Exception as e:
-        print(f"ERROR: Failed to fetch from embedding map: {e}")
+        print(f"ERROR: Failed to search the approved embedding index: {e}")
         return []
 
-    similarities = []
-    for project_id, project_data in approved_projects_map.items():
-        vector = project_data.get('embedding_vector')
-        if vector:
-            similarity = cosine_similarity(np.array(new_embedding), np.array(vector))
-            similarities.append({
-                'id': project_id,
-                'title': project_data.get('title', 'Untitled'),
-                'description': project_data.get('description', 'No description.'),
-                'similarity': similarity
-            })
-
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    top_results = similarities[:top_n]
-    
-    return top_results
-
 
 def refresh_single_embedding(application_id: str):
     """
@@ -327,6 +646,7 @@ def refresh_single_embedding(application_id: str):
     try:
         map_ref = db.collection(EMBEDDING_MAP_COLLECTION).document(application_id)
         map_ref.set(map_entry_data)
+        approved_index.upsert_many([(application_id, map_entry_data)])
         return {"status": "success", "message": f"Successfully refreshed embedding for {title}."}
     except Exception as e:
         print(f"ERROR: Failed to save new embedding for {application_id}. Reason: {e}")
@@ -0,0 +1,195 @@
+"""Push channel for planning board changes.
+
+Mutations publish small JSON events per board; GET /api/planning/<event_id>/stream
+relays them to connected clients over SSE or long-poll.
+
+Across gunicorn workers events travel over Redis pub/sub. Each worker runs
+one pattern subscription for every board and fans messages out to its local
+subscribers, so the number of Redis connections does not grow with the number
+of streams. Without Redis the same broker delivers in-process only, which is
+correct for a single worker.
+
+Events are hints, not a log. A client that reconnects or sees a revision gap
+catches up with GET /api/planning/<event_id>?since=<revision>.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Optional
+
+from common.utils.fork_safety import OncePerProcess
+from common.utils.redis_cache import get_redis_client
+
+logger = logging.getLogger("planning_board_events")
+
+CHANNEL_PREFIX = "planning:board:"
+
+# Events buffered per subscriber before the slowest ones are dropped; the
+# client recovers through ?since= on its next revision gap.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Every open stream holds a gunicorn thread (2 workers x 8 threads); keep
+# most of them free for ordinary requests.
+MAX_SUBSCRIBERS_PER_WORKER = int(os.environ.get("PLANNING_STREAM_MAX_PER_WORKER", "4"))
+
+EVENT_CHANGE = "change"
+EVENT_COMMENT = "comment"
+EVENT_PRESENCE = "presence"
+
+
+def _channel(event_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{event_id}"
+
+
+def json_safe(data: dict) -> dict:
+    """Drop values that cannot be serialized, e.g. Firestore Increment sentinels."""
+    safe = {}
+    for key, value in (data or {}).items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+class BoardSubscription:
+    """Queue of events for one board, fed by the worker's broker."""
+
+    def __init__(self, broker: "BoardEventBroker", event_id: str):
+        self._broker = broker
+        self.event_id = event_id
+        self._queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def put(self, event: dict) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            logger.warning("Dropping planning event for slow subscriber on %s", self.event_id)
+
+    def get(self, timeout: float) -> Optional[dict]:
+        """Next event, or None after timeout seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> list:
+        """Events already queued, without waiting."""
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BoardEventBroker:
+    """Per-process fan-out of board events to local subscribers."""
+
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS_PER_WORKER):
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # event_id -> set of BoardSubscription
+        self._count = 0
+        self._lock = threading.Lock()
+        self._listener = OncePerProcess(self._start_listener)
+
+    def subscribe(self, event_id: str) -> Optional[BoardSubscription]:
+        """Register a subscriber, or None when this worker is at capacity."""
+        self._ensure_listener()
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = BoardSubscription(self, event_id)
+            self._subscribers.setdefault(event_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: BoardSubscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.event_id)
+            if not subscribers or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscription.event_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return self._count
+
+    def deliver(self, event_id: str, event: dict) -> None:
+        """Hand an event to this worker's subscribers of event_id."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def publish(self, event_id: str, event: dict) -> None:
+        """Send an event to every worker's subscribers; best-effort."""
+        client = get_redis_client()
+        if client is not None:
+            try:
+                client.publish(_channel(event_id), json.dumps(event))
+                return
+            except Exception:
+                logger.exception("Redis publish failed for planning board %s; delivering locally", event_id)
+        self.deliver(event_id, event)
+
+    def _ensure_listener(self) -> None:
+        self._listener.ensure()
+
+    def _start_listener(self) -> bool:
+        client = get_redis_client()
+        if client is None:
+            return False
+        threading.Thread(
+            target=self._listen,
+            args=(client,),
+            name="planning-board-events",
+            daemon=True,
+        ).start()
+        return True
+
+    def _listen(self, client) -> None:
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                channel = message.get("channel")
+                if isinstance(channel, bytes):
+                    channel = channel.decode()
+                try:
+                    event = json.loads(message.get("data"))
+                except (TypeError, ValueError):
+                    continue
+                self.deliver(channel[len(CHANNEL_PREFIX):], event)
+        except Exception:
+            logger.exception("Planning board event listener stopped; streams fall back to polling")
+        finally:
+            self._listener.reset()
+
+
+broker = BoardEventBroker()
+
+
+def publish_board_event(event_id: str, event: dict) -> None:
+    """Publish a board event; never raises, the mutation has already committed."""
+    try:
+        broker.publish(event_id, event)
+    except Exception:
+        logger.exception("Failed to publish planning board event for %s", event_id)
@@ -0,0 +1,121 @@
+"""Planning board revisions for delta sync.
+
+Every board mutation bumps a monotonically increasing revision kept in a small
+per-board metadata doc, and stamps the lists/cards/labels it writes with that
+revision in the same transaction:
+
+  planning_board_meta/{event_id}
+      revision:     int    last committed board revision
+      hackathon_id: str
+      enabled:      bool   mirrors planning.enabled
+      updated_at:   ISO
+
+The doc is keyed by event_id (not under hackathons/{hid}) so a poll whose
+cursor is already current can be answered with a 304 after reading only this
+doc. Clients holding cursor N fetch docs with ``revision > N``. Because the
+stamp and the bump commit together, a reader never sees a revision whose docs
+are not yet readable.
+
+Each commit is then announced on the board's push channel (see
+planning_board_events) with the new revision and the fields it wrote.
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Tuple
+
+from google.cloud import firestore
+
+from common.utils.firebase import get_db
+from model.planning import PLANNING_FIELD
+from services.planning_board_events import EVENT_CHANGE, json_safe, publish_board_event
+
+logger = logging.getLogger("planning_board_sync")
+
+META_COLLECTION = "planning_board_meta"
+REVISION_FIELD = "revision"
+
+# Firestore caps a transaction at 500 writes; one is the meta doc
+MAX_WRITES_PER_COMMIT = 499
+
+OP_SET = "set"
+OP_UPDATE = "update"
+
+
+def _meta_ref(db, event_id: str):
+    return db.collection(META_COLLECTION).document(event_id)
+
+
+def get_board_meta(event_id: str) -> Optional[dict]:
+    """Read the board's metadata doc (one document read); None if never written."""
+    snap = _meta_ref(get_db(), event_id).get()
+    if not snap.exists:
+        return None
+    return snap.to_dict() or {}
+
+
+def commit_board_writes(hackathon_doc: dict, writes: Iterable[Tuple[str, object, dict]] = (),
+                        enabled: Optional[bool] = None) -> int:
+    """Apply board writes and bump the board revision atomically.
+
+    Args:
+        hackathon_doc: hackathon dict (needs "id" and "event_id")
+        writes: (op, ref, data) tuples, op being "set" or "update". Each data
+            dict is stamped with the new revision.
+        enabled: planning.enabled to mirror on the meta doc; defaults to the
+            hackathon doc's current value
+
+    Returns:
+        The new board revision
+    """
+    writes = list(writes)
+    if len(writes) > MAX_WRITES_PER_COMMIT:
+        raise ValueError(f"At most {MAX_WRITES_PER_COMMIT} board writes per commit")
+    if enabled is None:
+        enabled = bool((hackathon_doc.get(PLANNING_FIELD) or {}).get("enabled"))
+
+    db = get_db()
+    meta_ref = _meta_ref(db, hackathon_doc["event_id"])
+
+    @firestore.transactional
+    def _commit(transaction):
+        snaps = list(transaction.get_all([meta_ref]))
+        current = 0
+        if snaps and snaps[0].exists:
+            current = int((snaps[0].to_dict() or {}).get(REVISION_FIELD) or 0)
+        revision = current + 1
+        for op, ref, data in writes:
+            stamped = {**data, REVISION_FIELD: revision}
+            if op == OP_SET:
+                transaction.set(ref, stamped)
+            else:
+                transaction.update(ref, stamped)
+        transaction.set(meta_ref, {
+            REVISION_FIELD: revision,
+            "hackathon_id": hackathon_doc["id"],
+            "enabled": enabled,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+        return revision
+
+    revision = _commit(db.transaction())
+    publish_board_event(hackathon_doc["event_id"], {
+        "type": EVENT_CHANGE,
+        "revision": revision,
+        "changes": [
+            {"collection": getattr(ref.parent, "id", None), "id": ref.id, "op": op, "data": json_safe(data)}
+            for op, ref, data in writes
+        ],
+    })
+    return revision
+
+
+def bump_board_revision(hackathon_doc: dict, enabled: Optional[bool] = None) -> Optional[int]:
+    """Bump the revision for a change outside the board subcollections (planning config, editors).
+
+    Best-effort: a failure only delays delta clients until the next mutation.
+    """
+    try:
+        return commit_board_writes(hackathon_doc, (), enabled=enabled)
+    except Exception:
+        logger.exception("Failed to bump planning board revision for %s", hackathon_doc.get("event_id"))
+        return None
@@ -49,8 +49,8 @@ def _get_oauth_user_cached(propel_id):
         if result:
             # Self-heal: a successful resolve means this user CAN be looked
             # up. Drop any stale negative cache in planning_views and seed
-            # a Firestore record so future board snapshots get them via
-            # the fast fetch_users() path instead of repeating PropelAuth.
+            # a Firestore record so future board snapshots find them in the
+            # user directory instead of repeating PropelAuth.
             try:
                 from api.planning.planning_views import (
                     invalidate_user_profile_cache,
@@ -7,6 +7,7 @@ import logging
 from datetime import datetime, timezone
 
 from common.utils.firebase import get_db
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
 
 logger = logging.getLogger("planning_ros_service")
 
@@ -87,6 +88,7 @@ def sync_ros_to_countdowns(hackathon_doc: dict, actor_id: str) -> dict:
     db = get_db()
     href = db.collection("hackathons").document(hackathon_doc["id"])
     href.update({"countdowns": merged})
+    invalidate_hackathon_catalog(hackathon_doc["id"])
 
     logger.info(
         "RoS sync: %d planning + %d preserved = %d total for %s (by %s)",
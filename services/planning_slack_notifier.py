@@ -12,6 +12,7 @@ from datetime import datetime, timezone, timedelta
 from typing import Optional
 
 from common.utils.firebase import get_db
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
 
 logger = logging.getLogger("planning_slack_notifier")
 
@@ -66,6 +67,7 @@ def _get_or_set_deadline(hackathon_doc: dict) -> Optional[datetime]:
 
     deadline = _now() + timedelta(seconds=DIGEST_WINDOW_SECONDS)
     href.update({DIGEST_DEADLINE_FIELD: deadline.isoformat()})
+    invalidate_hackathon_catalog(hid)
     return deadline
 
 
@@ -80,6 +82,7 @@ def _clear_deadline(hackathon_doc: dict) -> None:
         pass
     db = get_db()
     db.collection("hackathons").document(hid).update({DIGEST_DEADLINE_FIELD: None})
+    invalidate_hackathon_catalog(hid)
 
 
 def _collect_and_clear_events(hackathon_doc: dict) -> list:
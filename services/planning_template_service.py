@@ -3,6 +3,7 @@ import logging
 from datetime import datetime, timezone
 
 from common.utils.firebase import get_db
+from services.planning_board_sync import OP_SET, commit_board_writes
 
 logger = logging.getLogger("planning_template_service")
 
@@ -94,28 +95,33 @@ OHACK_PLANNING_TEMPLATE = [
 
 
 def apply_ohack_template(hackathon_doc: dict) -> None:
-    """Write the default template lists/cards into the given hackathon's subcollections."""
+    """Write the default template lists/cards into the given hackathon's subcollections.
+
+    All docs commit in one board revision so delta-sync clients pick up the
+    whole template at once.
+    """
     db = get_db()
     href = db.collection("hackathons").document(hackathon_doc["id"])
 
     now = datetime.now(timezone.utc).isoformat()
+    writes = []
 
     for list_position, list_template in enumerate(OHACK_PLANNING_TEMPLATE):
         position = f"p{list_position:04d}"
         list_ref = href.collection("planning_lists").document()
-        list_ref.set({
+        writes.append((OP_SET, list_ref, {
             "title": list_template["title"],
             "position": position,
             "archived": False,
             "is_run_of_show": list_template.get("is_run_of_show", False),
             "created_at": now,
             "updated_at": now,
-        })
+        }))
 
         for card_position, card_template in enumerate(list_template.get("cards", [])):
             card_position_str = f"p{card_position:04d}"
             card_ref = href.collection("planning_cards").document()
-            card_ref.set({
+            writes.append((OP_SET, card_ref, {
                 "list_id": list_ref.id,
                 "title": card_template["title"],
                 "description": "",
@@ -138,6 +144,7 @@ def apply_ohack_template(hackathon_doc: dict) -> None:
                 "budget": None,
                 "target_count": card_template.get("target_count"),
                 "sponsor": None,
-            })
+            }))
 
+    commit_board_writes(hackathon_doc, writes)
     logger.info("Applied OHack default template to hackathon %s", hackathon_doc.get("event_id"))
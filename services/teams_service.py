@@ -1,15 +1,16 @@
 import uuid
 from datetime import datetime
 
-from cachetools import cached, TTLCache
+from cachetools import cached
 from ratelimit import limits
 from firebase_admin import firestore
 
 from common.log import get_logger
-from common.utils.firestore_helpers import doc_to_json, log_execution_time, register_cache
+from common.utils.firestore_helpers import CountingTTLCache, doc_to_json, log_execution_time, register_cache
 from common.utils.slack import send_slack_audit, send_slack, create_slack_channel, invite_user_to_channel
 from common.utils.github import create_github_repo, validate_github_username, get_all_repos
 from common.utils.firebase import get_hackathon_by_event_id
+from common.utils.hackathon_catalog import invalidate_hackathon_catalog
 from common.utils.oauth_providers import extract_slack_user_id, is_slack_user_id
 from db.db import get_db, get_user_doc_reference
 from services.users_service import (
@@ -18,6 +19,7 @@ from services.users_service import (
     get_user_from_slack_id,
 )
 from services.nonprofits_service import get_single_npo
+from services.funnel_rollup_service import refresh_event_rollup, refresh_team_rollups
 from api.messages.message import Message
 
 logger = get_logger("teams_service")
@@ -104,8 +106,8 @@ def _enrich_team_users(team_data, db):
     return team_data
 
 
-_GET_TEAM_CACHE = TTLCache(maxsize=100, ttl=600)
-register_cache(_GET_TEAM_CACHE)
+_GET_TEAM_CACHE = CountingTTLCache(maxsize=100, ttl=600)
+register_cache(_GET_TEAM_CACHE, name="get_team")
 
 
 @limits(calls=2000, period=THIRTY_SECONDS)
@@ -142,6 +144,26 @@ def get_team(id):
         logger.debug(f"get_team operation completed for id={id}")
 
 
+def _team_mentor_ids(team_data):
+    """Propel ids of everyone who mentored the team (checklist, notes, flags, ratings)."""
+    ids = set()
+    for entry in (team_data.get("mentor_checklist") or {}).values():
+        if not isinstance(entry, dict):
+            continue
+        checks = entry.get("checks")
+        if isinstance(checks, dict):
+            ids.update(checks)
+        if entry.get("checked_by_propel_id"):
+            ids.add(entry["checked_by_propel_id"])
+    for field, keys in (("mentor_notes", ("author_propel_id",)),
+                        ("mentor_flags", ("raised_by_propel_id", "owner_propel_id")),
+                        ("mentor_ratings", ("rated_by_propel_id",))):
+        for entry in team_data.get(field) or []:
+            if isinstance(entry, dict):
+                ids.update(entry[key] for key in keys if entry.get(key))
+    return sorted(ids)
+
+
 def get_teams_by_event_id(event_id):
     """Get teams for a specific hackathon event (for admin judging assignment)"""
     logger.debug(f"Getting teams for event_id={event_id}")
@@ -158,6 +180,7 @@ def get_teams_by_event_id(event_id):
                 "id": team_data.get("id"),
                 "name": team_data.get("name", ""),
                 "members": team_data.get("members", []),
+                "mentor_ids": _team_mentor_ids(team_data),
                 "problem_statement": {
                     "title": team_data.get("problem_statement", {}).get("title", ""),
                     "nonprofit": team_data.get("problem_statement", {}).get("nonprofit", "")
@@ -184,13 +207,15 @@ def get_teams_batch(json):
         logger.warning("get_teams_batch end (no team_ids provided)")
         return []
     try:
-        docs = db.collection('teams').where(
-            '__name__', 'in', [db.collection('teams').document(team_id) for team_id in team_ids]).stream()
-
         results = []
-        for doc in docs:
-            team_data = doc_to_json(docid=doc.id, doc=doc)
-            results.append(team_data)
+        # Firestore allows at most 30 values in an `in` filter
+        for start in range(0, len(team_ids), 30):
+            chunk = team_ids[start:start + 30]
+            docs = db.collection('teams').where(
+                '__name__', 'in', [db.collection('teams').document(team_id) for team_id in chunk]).stream()
+            for doc in docs:
+                team_data = doc_to_json(docid=doc.id, doc=doc)
+                results.append(team_data)
 
         logger.debug(f"get_teams_batch end (with {len(results)} results)")
         return results
@@ -373,6 +398,8 @@ Let's make a difference! :muscle: :heart:
     event_collection.set({
         "teams" : new_teams
     }, merge=True)
+    invalidate_hackathon_catalog(hackathon_db_id)
+    refresh_event_rollup(hackathon_event_id)
 
     logger.info(f"Clearing cache for event_id={hackathon_db_id} problem_statement_id={problem_statement_id} user_doc.id={user_doc.id} doc_id={doc_id}")
     _clear_cache()
@@ -476,6 +503,8 @@ def join_team(propel_user_id, json):
         logger.error(f"Error in join_team: {str(e)}")
         return Message(f"Error: {str(e)}")
 
+    if success:
+        refresh_team_rollups(team_id)
     _clear_cache()
 
     logger.debug("Join Team End")
@@ -551,6 +580,8 @@ def unjoin_team(propel_user_id, json):
         logger.error(f"Error in unjoin_team: {str(e)}")
         return Message(f"Error: {str(e)}")
 
+    if success:
+        refresh_team_rollups(team_id)
     _clear_cache()
 
     logger.debug("Unjoin Team End")
@@ -4,6 +4,7 @@ import threading
 from ratelimit import limits
 import requests
 from common.utils.slack import send_slack_audit
+from common.utils.user_directory import get_user_directory, load_user_docs
 from model.user import User
 from db.db import delete_user_by_db_id, delete_user_by_user_id, fetch_user_by_user_id, fetch_user_by_db_id, fetch_user_by_propel_id, fetch_user_by_email, fetch_users, insert_user, update_user, get_user_profile_by_db_id, upsert_profile_metadata
 import pytz
@@ -611,23 +612,24 @@ def get_volunteering_time(propel_id, start_date, end_date):
 def get_all_volunteering_time(start_date=None, end_date=None):
     logger.info(f"Get All Volunteering Time for start: {start_date} end: {end_date}")
 
-    # Get all users
-    users = fetch_users()
+    # Only users who have logged volunteering time are read
+    user_ids = get_user_directory().ids_where(lambda record: record["vol_sessions"] > 0)
 
     all_volunteering = []
     total_active_hours = 0
     total_commitment_hours = 0
 
-    for user in users:
+    for doc in load_user_docs(user_ids, ["name", "email_address", "volunteering"]):
+        user = doc.to_dict() or {}
         # Filter the volunteering data
-        for v in user.volunteering:
+        for v in user.get("volunteering") or []:
             # Create a copy of the volunteering record to add user information
             session_copy = v.copy() if isinstance(v, dict) else dict(v)
             
             # Add user information to each volunteering record
-            session_copy["userName"] = user.name if hasattr(user, 'name') else "Unknown User"
-            session_copy["userId"] = user.id 
-            session_copy["email"] = user.email_address if hasattr(user, 'email_address') else "N/A"
+            session_copy["userName"] = user.get("name", "Unknown User")
+            session_copy["userId"] = doc.id 
+            session_copy["email"] = user.get("email_address", "N/A")
             
             # Track hours based on session type
             if "finalHours" in session_copy:
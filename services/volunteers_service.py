@@ -1,7 +1,6 @@
 from typing import Dict, List, Optional, Union, Any, Tuple
 import uuid
 import time
-import threading
 from datetime import datetime, timedelta
 import pytz
 from functools import lru_cache
@@ -11,8 +10,13 @@ from google.cloud import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
 from common.utils.slack import get_slack_user_by_email, send_slack
 from common.utils.firebase import get_user_by_user_id, get_user_by_email
+from common.utils.request_loader import get_loader
 from common.log import get_logger, info, debug, warning, error, exception
-from common.utils.redis_cache import redis_cached, delete_cached, clear_pattern, get_cached, set_cached
+from common.utils.redis_cache import (
+    redis_cached, delete_many, clear_namespace, set_cached,
+    get_many, set_many, acquire_lock, release_lock, is_locked, submit_background,
+)
+from services.funnel_rollup_service import refresh_event_rollup
 from common.utils.oauth_providers import SLACK_PREFIX, normalize_slack_user_id, is_oauth_user_id, is_slack_user_id, extract_slack_user_id
 import os
 import requests
@@ -89,33 +93,32 @@ def get_volunteer_by_email(email: str, event_id: str, volunteer_type: str) -> Op
         return volunteer.to_dict()
     return None
 
+def _volunteers_by_event_namespace(event_id: str, volunteer_type: str, *args, **kwargs) -> str:
+    """Cache namespace grouping every page/filter of get_volunteers_by_event."""
+    return f"volunteer:by_event:{event_id}:{volunteer_type}"
+
 # Function to clear all caches related to a volunteer
 def _clear_volunteer_caches(user_id: str, email: str, event_id: str, volunteer_type: str):
     """Clear all caches related to a specific volunteer."""
+    # Clear the specific user and email lookups in one round-trip
+    user_key = f"volunteer:by_user_id:{user_id}:{event_id}:{volunteer_type}"
+    email_key = f"volunteer:by_email:{email}:{event_id}:{volunteer_type}"
     try:
-        # Clear cache for specific user lookup
-        user_key = f"volunteer:by_user_id:{user_id}:{event_id}:{volunteer_type}"
-        delete_cached(user_key)
-    except Exception as e:
-        warning(logger, "Failed to clear user cache", user_key=user_key, exc_info=e)
-    
-    try:
-        # Clear cache for specific email lookup
-        email_key = f"volunteer:by_email:{email}:{event_id}:{volunteer_type}"
-        delete_cached(email_key)
+        delete_many([user_key, email_key])
     except Exception as e:
-        warning(logger, "Failed to clear email cache", email_key=email_key, exc_info=e)
+        warning(logger, "Failed to clear user/email caches", user_key=user_key, email_key=email_key, exc_info=e)
     
     try:
-        # Clear event-based volunteer caches
-        event_key = f"volunteer:by_event:{event_id}:{volunteer_type}"
-        clear_pattern(f"{event_key}*")
+        # Clear every cached page/filter of this event's volunteer list
+        event_namespace = _volunteers_by_event_namespace(event_id, volunteer_type)
+        clear_namespace(event_namespace)
     except Exception as e:
-        warning(logger, "Failed to clear event cache pattern", event_key=event_key, exc_info=e)
+        warning(logger, "Failed to clear event cache namespace", event_namespace=event_namespace, exc_info=e)
     
     debug(logger, f"Attempted to clear volunteer caches for user_id={user_id}, email={email}, event_id={event_id}, volunteer_type={volunteer_type}")
 
-@redis_cached(prefix="volunteer:by_event", ttl=2)
+@redis_cached(prefix="volunteer:by_event", ttl=2, namespace=_volunteers_by_event_namespace,
+              stale_ttl=30, single_flight=True)
 def get_volunteers_by_event(
     event_id: str, 
     volunteer_type: str, 
@@ -1017,6 +1020,9 @@ def create_or_update_volunteer(
         # Clear all related caches 
         _clear_volunteer_caches(user_id, email, event_id, volunteer_type)
 
+        if volunteer_type == 'hacker':
+            refresh_event_rollup(event_id)
+
         calendar_attachments = get_calendar_email_attachment_from_availability(
             volunteer_data.get('availability', ''),
             email,  # Pass volunteer email for proper ATTENDEE field
@@ -1533,40 +1539,27 @@ def _did_volunteer_attend(vol: Dict[str, Any]) -> bool:
     return False
 
 
-def _enrich_with_hackathon(db, event_id: str) -> Optional[Dict[str, Any]]:
-    """Look up the hackathon doc for an event_id and trim it to display-friendly fields."""
-    try:
-        docs = db.collection('hackathons').where('event_id', '==', event_id).limit(1).stream()
-    except Exception as e:
-        warning(logger, "Failed to query hackathon for event_id", event_id=event_id, exc_info=e)
-        return None
-
-    for doc in docs:
-        rec = doc.to_dict() or {}
-        rec['id'] = doc.id
-
-        # Resolve nonprofit Firestore refs into plain dicts (best-effort)
-        nonprofit_refs = rec.get('nonprofits') or []
-        resolved = []
-        if nonprofit_refs:
-            try:
-                npo_docs = db.get_all(nonprofit_refs)
-                for npo_doc in npo_docs:
-                    if not getattr(npo_doc, 'exists', True):
-                        continue
-                    npo = npo_doc.to_dict() or {}
-                    npo['id'] = getattr(npo_doc, 'id', npo.get('id'))
-                    npo.pop('problem_statements', None)
-                    resolved.append(npo)
-            except Exception as e:
-                warning(logger, "Failed to resolve nonprofit refs", event_id=event_id, exc_info=e)
-        rec['nonprofits'] = resolved
+def _enrich_with_hackathon(loader, rec: Dict[str, Any]) -> Dict[str, Any]:
+    """Trim a hackathon doc to display-friendly fields, resolving its nonprofit refs via loader."""
+    nonprofit_refs = rec.get('nonprofits') or []
+    resolved = []
+    if nonprofit_refs:
+        try:
+            for npo_doc in loader.load_many(nonprofit_refs):
+                if npo_doc is None or not getattr(npo_doc, 'exists', True):
+                    continue
+                npo = npo_doc.to_dict() or {}
+                npo['id'] = getattr(npo_doc, 'id', npo.get('id'))
+                npo.pop('problem_statements', None)
+                resolved.append(npo)
+        except Exception as e:
+            warning(logger, "Failed to resolve nonprofit refs", event_id=rec.get('event_id'), exc_info=e)
+    rec['nonprofits'] = resolved
 
-        # Strip heavy fields the profile UI doesn't render.
-        for k in ('teams', 'donation_current', 'donation_goals'):
-            rec.pop(k, None)
-        return rec
-    return None
+    # Strip heavy fields the profile UI doesn't render.
+    for k in ('teams', 'donation_current', 'donation_goals'):
+        rec.pop(k, None)
+    return rec
 
 
 def get_user_hackathon_attendance(
@@ -1631,12 +1624,22 @@ def get_user_hackathon_attendance(
         if label not in roles:
             roles.append(label)
 
+    # Resolve every attended hackathon, then all of their nonprofit refs, in
+    # one round trip each rather than per event
+    loader = get_loader(db)
+    try:
+        hackathons = loader.hackathons_by_event_ids(by_event)
+    except Exception as e:
+        warning(logger, "Failed to query hackathons for attendance", exc_info=e)
+        hackathons = {}
+    loader.queue(ref for h in hackathons.values() if h for ref in (h.get('nonprofits') or []))
+
     # Enrich and shape the response
     results: List[Dict[str, Any]] = []
     for event_id, roles in by_event.items():
-        hackathon = _enrich_with_hackathon(db, event_id)
-        if not hackathon:
+        if not hackathons.get(event_id):
             continue
+        hackathon = _enrich_with_hackathon(loader, hackathons[event_id])
         results.append({
             "event_id": event_id,
             "title": hackathon.get('title') or hackathon.get('name') or '',
@@ -2529,8 +2532,7 @@ def send_volunteer_message(
 
         # Invalidate Resend email list cache so next fetch picks up the new email
         if delivery_status['email_sent']:
-            delete_cached(_RESEND_INDEX_KEY)
-            delete_cached(_RESEND_FRESH_KEY)
+            delete_many([_RESEND_INDEX_KEY, _RESEND_FRESH_KEY])
 
         result = {
             'success': success,
@@ -2700,8 +2702,7 @@ def send_email_to_address(
 
         # Invalidate Resend email list cache so next fetch picks up the new email
         if email_success:
-            delete_cached(_RESEND_INDEX_KEY)
-            delete_cached(_RESEND_FRESH_KEY)
+            delete_many([_RESEND_INDEX_KEY, _RESEND_FRESH_KEY])
 
         result = {
             'success': email_success,
@@ -2740,13 +2741,18 @@ def get_resend_email_statuses(email_ids: list) -> Dict[str, Any]:
         statuses = {}
         ids_to_fetch = []
 
+        # One round-trip for every cached status
+        cached_statuses = get_many(f"resend:status:{eid}" for eid in email_ids[:100])
         for eid in email_ids[:100]:
-            cached = get_cached(f"resend:status:{eid}")
+            cached = cached_statuses.get(f"resend:status:{eid}")
             if cached is not None:
                 statuses[eid] = cached
             else:
                 ids_to_fetch.append(eid)
 
+        # Newly fetched statuses grouped by TTL, written back in one batch per TTL
+        to_cache: Dict[int, Dict[str, Any]] = {}
+
         first_call = True
         for eid in ids_to_fetch:
             if not first_call:
@@ -2767,7 +2773,7 @@ def get_resend_email_statuses(email_ids: list) -> Dict[str, Any]:
                         'last_event': last_event,
                     }
                     ttl = _RESEND_STATUS_TERMINAL_TTL if last_event in _RESEND_STATUS_TERMINAL_EVENTS else _RESEND_STATUS_TRANSIENT_TTL
-                    set_cached(f"resend:status:{eid}", result, ttl=ttl)
+                    to_cache.setdefault(ttl, {})[f"resend:status:{eid}"] = result
                     break
                 except Exception as fetch_error:
                     retries += 1
@@ -2780,6 +2786,9 @@ def get_resend_email_statuses(email_ids: list) -> Dict[str, Any]:
 
             statuses[eid] = result
 
+        for ttl, mapping in to_cache.items():
+            set_many(mapping, ttl=ttl)
+
         return {'success': True, 'statuses': statuses}
 
     except Exception as e:
@@ -2880,8 +2889,7 @@ def _fetch_and_cache_resend_emails(since_days: int = 90) -> Optional[Dict[str, A
 
     if page_error_occurred:
         if not all_emails:
-            # No data at all — release lock so the next request can retry
-            delete_cached(_RESEND_LOCK_KEY)
+            # No data at all — the caller releases the lock so the next request can retry
             return None
         # We have partial data from earlier pages — use it rather than discarding
         warning(logger, "Returning partial Resend email data due to fetch error",
@@ -2929,18 +2937,18 @@ def _fetch_and_cache_resend_emails(since_days: int = 90) -> Optional[Dict[str, A
     # Store data with long TTL; store freshness flag with short TTL
     set_cached(_RESEND_INDEX_KEY, payload, ttl=_RESEND_STALE_TTL)
     set_cached(_RESEND_FRESH_KEY, True, ttl=_RESEND_FRESH_TTL)
-    delete_cached(_RESEND_LOCK_KEY)
     return payload
 
 
-def _background_refresh_resend_emails() -> None:
-    """Fire-and-forget background refresh wrapped in try/except."""
+def _background_refresh_resend_emails(lock_token: str) -> None:
+    """Background refresh wrapped in try/except; always releases the refresh lock."""
     try:
         _fetch_and_cache_resend_emails()
         info(logger, "Background Resend email cache refresh completed")
     except Exception as bg_err:
         error(logger, "Background Resend email cache refresh failed", exc_info=bg_err)
-        delete_cached(_RESEND_LOCK_KEY)
+    finally:
+        release_lock(_RESEND_LOCK_KEY, lock_token)
 
 
 def list_all_resend_emails(filter_emails=None, force: bool = False):
@@ -2965,14 +2973,18 @@ def list_all_resend_emails(filter_emails=None, force: bool = False):
         if not resend.api_key:
             return {'success': False, 'error': 'Resend API key not configured'}
 
-        is_fresh = get_cached(_RESEND_FRESH_KEY) is not None
-        cached = get_cached(_RESEND_INDEX_KEY)
+        cached_entries = get_many([_RESEND_FRESH_KEY, _RESEND_INDEX_KEY])
+        is_fresh = _RESEND_FRESH_KEY in cached_entries
+        cached = cached_entries.get(_RESEND_INDEX_KEY)
 
         def _maybe_start_background():
-            if get_cached(_RESEND_LOCK_KEY) is None:
-                set_cached(_RESEND_LOCK_KEY, True, ttl=_RESEND_LOCK_TTL)
-                threading.Thread(target=_background_refresh_resend_emails, daemon=True).start()
+            # Shared lock: only one worker crawls Resend at a time
+            token = acquire_lock(_RESEND_LOCK_KEY, ttl=_RESEND_LOCK_TTL)
+            if token is None:
+                return False
+            if submit_background(_RESEND_LOCK_KEY, lambda: _background_refresh_resend_emails(token)):
                 return True
+            release_lock(_RESEND_LOCK_KEY, token)
             return False
 
         syncing = False
@@ -2980,7 +2992,7 @@ def list_all_resend_emails(filter_emails=None, force: bool = False):
         if force:
             started = _maybe_start_background()
             # Report syncing=True even if lock was already held (another admin's sync is running)
-            syncing = started or (get_cached(_RESEND_LOCK_KEY) is not None)
+            syncing = started or is_locked(_RESEND_LOCK_KEY)
             info(logger, "Force-sync requested for Resend email cache",
                  started_new=started, syncing=syncing)
         elif cached is None:
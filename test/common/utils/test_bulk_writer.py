@@ -0,0 +1,146 @@
+"""
+Unit tests for the bulk Firestore writer
+"""
+from unittest.mock import patch
+
+import pytest
+from google.api_core import exceptions as gexc
+from mockfirestore import MockFirestore
+
+from common.utils.bulk_writer import BulkWriter, get_snapshots, resolve_users_by_email
+
+
+class _Batch:
+    def __init__(self, commits):
+        self._ops = []
+        self._commits = commits
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref.update(data))
+
+    def delete(self, ref):
+        self._ops.append(ref.delete)
+
+    def commit(self):
+        for op in self._ops:
+            op()
+        self._commits.append(len(self._ops))
+
+
+class _BatchingFirestore(MockFirestore):
+    """MockFirestore plus the batch() API, recording the size of every commit."""
+
+    def __init__(self):
+        super().__init__()
+        self.commits = []
+
+    def batch(self):
+        return _Batch(self.commits)
+
+
+@pytest.fixture
+def db():
+    db = MockFirestore()
+    db.collection("teams").document("t1").set({"name": "Alpha", "meta": {"a": 1, "b": 2}})
+    db.collection("teams").document("t2").set({"name": "Beta"})
+    return db
+
+
+def test_commits_in_chunks_of_at_most_500():
+    db = _BatchingFirestore()
+    with BulkWriter(db, batch_size=1000, max_workers=3) as writer:
+        for i in range(1201):
+            writer.set(db.collection("volunteers").document(f"v{i}"), {"n": i})
+
+    assert sorted(db.commits) == [201, 500, 500]
+    stats = writer.stats()
+    assert (stats["written"], stats["batches"], stats["failed"]) == (1201, 3, 0)
+    assert db.collection("volunteers").document("v1200").get().to_dict() == {"n": 1200}
+
+
+def test_clients_without_batch_write_one_document_at_a_time(db):
+    with BulkWriter(db) as writer:
+        writer.set(db.collection("teams").document("t1"), {"meta": {"b": 3}}, merge=True)
+        writer.update(db.collection("teams").document("t2"), {"name": "Bravo"})
+        writer.delete(db.collection("teams").document("t1"))
+
+    assert not db.collection("teams").document("t1").get().exists
+    assert db.collection("teams").document("t2").get().to_dict() == {"name": "Bravo"}
+
+
+def test_dry_run_diffs_without_writing(db):
+    writer = BulkWriter(db, dry_run=True)
+    writer.set(db.collection("teams").document("t1"), {"meta": {"b": 3}}, merge=True)
+    writer.set(db.collection("teams").document("t2"), {"name": "Beta"}, merge=True)
+    writer.set(db.collection("teams").document("t3"), {"name": "Gamma"})
+    writer.set(db.collection("teams").document("t3"), {"users": []}, merge=True)
+    writer.close()
+
+    changes = {(c["path"], c["action"]): c["fields"] for c in writer.changes}
+    assert changes[("teams/t1", "update")] == {"meta": ({"a": 1, "b": 2}, {"a": 1, "b": 3})}
+    assert ("teams/t2", "unchanged") in changes
+    assert changes[("teams/t3", "create")] == {"name": (None, "Gamma")}
+    # The second write to t3 is diffed against the first, not the database
+    assert changes[("teams/t3", "update")] == {"users": (None, [])}
+    assert writer.stats()["create"] == 1
+    assert db.collection("teams").document("t1").get().to_dict()["meta"]["b"] == 2
+    assert not db.collection("teams").document("t3").get().exists
+
+
+def test_transient_errors_are_retried_with_backoff(db):
+    writer = BulkWriter(db, max_attempts=3)
+    commit = writer._commit
+    calls = []
+
+    def flaky(ops):
+        calls.append(len(ops))
+        if len(calls) == 1:
+            raise gexc.ServiceUnavailable("try again")
+        commit(ops)
+
+    with patch.object(writer, "_commit", side_effect=flaky), \
+         patch("common.utils.bulk_writer.time.sleep") as sleep:
+        writer.set(db.collection("teams").document("t4"), {"name": "Delta"})
+        writer.close()
+
+    assert calls == [1, 1]
+    assert sleep.call_count == 1
+    stats = writer.stats()
+    assert (stats["written"], stats["retries"], stats["failed"]) == (1, 1, 0)
+
+
+def test_permanent_errors_fail_the_batch_without_retrying(db):
+    writer = BulkWriter(db)
+    with patch.object(writer, "_commit", side_effect=gexc.InvalidArgument("bad")) as commit:
+        writer.set(db.collection("teams").document("t4"), {"name": "Delta"})
+        writer.close()
+
+    assert commit.call_count == 1
+    stats = writer.stats()
+    assert (stats["written"], stats["failed"]) == (0, 1)
+    assert "teams/t4" in writer.errors[0]
+
+
+def test_get_snapshots_keeps_request_order(db):
+    refs = [db.collection("teams").document(i) for i in ("t2", "missing", "t1")]
+    assert [s.exists for s in get_snapshots(db, refs)] == [True, False, True]
+
+
+def test_resolve_users_by_email_chunks_and_scans_for_case_variants():
+    db = MockFirestore()
+    for i in range(45):
+        db.collection("users").document(f"u{i}").set({"email_address": f"user{i}@example.com", "name": f"U{i}"})
+    db.collection("users").document("mixed").set({"email_address": "Mixed.Case@Example.com"})
+
+    emails = [f"USER{i}@example.com " for i in range(45)] + ["mixed.case@example.com", "nobody@example.com", ""]
+    found = resolve_users_by_email(db, emails)
+    assert len(found) == 45
+    assert found["user44@example.com"]["id"] == "u44"
+    assert found["user44@example.com"]["name"] == "U44"
+
+    found = resolve_users_by_email(db, emails, scan_threshold=1)
+    assert found["mixed.case@example.com"]["id"] == "mixed"
+    assert "nobody@example.com" not in found
@@ -0,0 +1,83 @@
+"""
+Unit tests for the Redis cache value codec
+"""
+import json
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from common.utils import cache_codec
+import common.utils.redis_cache as redis_cache
+
+
+CODECS = [cache_codec.CODEC_MSGPACK, cache_codec.CODEC_JSON]
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip(codec):
+    value = {"eventName": "Fall 2025", "rows": [{"login": "a", "commits": 3}], "ok": True, "score": 1.5}
+    assert cache_codec.decode(cache_codec.encode(value, codec)) == value
+
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_large_payload_is_compressed(codec):
+    index = {f"user{i}@example.com": [{"id": f"e{i}", "last_event": "delivered"}] for i in range(500)}
+
+    raw = cache_codec.encode({"emails_by_recipient": index}, codec)
+
+    assert cache_codec.is_compressed(raw)
+    assert len(raw) < len(json.dumps(index))
+    assert cache_codec.decode(raw) == {"emails_by_recipient": index}
+
+
+def test_small_payload_is_not_compressed():
+    assert not cache_codec.is_compressed(cache_codec.encode({"a": 1}))
+
+
+def test_legacy_json_entries_still_decode():
+    legacy = json.dumps({"total_fetched": 3, "truncated": False}).encode()
+    assert cache_codec.decode(legacy) == {"total_fetched": 3, "truncated": False}
+    assert cache_codec.decode(b"true") is True
+    assert cache_codec.decode('["a"]') == ["a"]
+
+
+def test_msgpack_round_trips_datetimes():
+    value = {
+        "aware": datetime(2025, 10, 4, 9, 30, tzinfo=timezone.utc),
+        "naive": datetime(2025, 10, 4, 9, 30),
+        "day": date(2025, 10, 4),
+    }
+    assert cache_codec.decode(cache_codec.encode(value, cache_codec.CODEC_MSGPACK)) == value
+
+
+def test_json_codec_stores_datetimes_as_iso_strings():
+    raw = cache_codec.encode({"at": datetime(2025, 10, 4, 9, 30)}, cache_codec.CODEC_JSON)
+    assert cache_codec.decode(raw) == {"at": "2025-10-04T09:30:00"}
+
+
+def test_document_references_are_stored_by_path():
+    ref = MagicMock()
+    ref.path = "hackathons/abc123"
+    value = {"hackathon": ref, "tags": {"python"}}
+
+    assert cache_codec.decode(cache_codec.encode(value)) == {"hackathon": "hackathons/abc123", "tags": ["python"]}
+
+
+def test_unsupported_values_raise():
+    with pytest.raises(TypeError):
+        cache_codec.encode({"x": object()})
+
+
+def test_codec_stats_are_grouped_by_key_prefix(monkeypatch):
+    monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+    redis_cache._codec_stats.clear()
+
+    redis_cache.set_cached("resend:status:abc", {"last_event": "delivered"})
+    redis_cache.set_cached("resend:status:def", {"last_event": "sent"})
+    redis_cache.set_cached("leaderboard:2025_fall", {"rows": []})
+
+    stats = redis_cache.get_codec_stats()["prefixes"]
+    assert stats["resend:status"]["encodes"] == 2
+    assert stats["leaderboard"]["encodes"] == 1
+    assert stats["leaderboard"]["avg_encoded_bytes"] > 0
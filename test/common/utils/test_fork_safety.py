@@ -0,0 +1,51 @@
+"""
+Unit tests for the per-process start helper
+"""
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from common.utils.fork_safety import OncePerProcess
+
+
+def test_starts_once_until_reset():
+    start = MagicMock(return_value=None)
+    once = OncePerProcess(start)
+
+    once.ensure()
+    once.ensure()
+    assert once.started
+    start.assert_called_once()
+
+    once.reset()
+    once.ensure()
+    assert start.call_count == 2
+
+
+def test_false_means_not_started_and_retries():
+    start = MagicMock(side_effect=[False, True])
+    once = OncePerProcess(start)
+
+    once.ensure()
+    assert not once.started
+    once.ensure()
+    assert once.started
+    assert start.call_count == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_starts_its_own():
+    after_fork = MagicMock()
+    once = OncePerProcess(lambda: None, after_fork=after_fork)
+    once.ensure()
+
+    pid = os.fork()
+    if pid == 0:
+        # Child: report through the exit code, never return into pytest
+        ok = not once.started and after_fork.call_count == 1
+        os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert once.started
+    after_fork.assert_not_called()
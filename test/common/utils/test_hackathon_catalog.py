@@ -0,0 +1,121 @@
+"""
+Unit tests for the in-memory hackathon catalog
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from common.utils.hackathon_catalog import HackathonCatalog
+
+
+def _doc(doc_id, data):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = data
+    return doc
+
+
+@pytest.fixture
+def shared_version(fake_cache):
+    return fake_cache("common.utils.hackathon_catalog")
+
+
+@pytest.fixture
+def db():
+    db = MagicMock()
+    db.collection.return_value.stream.return_value = [
+        _doc("h1", {"event_id": "2025_fall", "title": "Fall 2025"}),
+        _doc("h2", {"event_id": "2024_fall", "title": "Fall 2024"}),
+    ]
+    db.collection.return_value.where.return_value.stream.return_value = []
+    with patch.object(HackathonCatalog, "_get_db", return_value=db):
+        yield db
+
+
+def test_lookups_are_served_from_memory(db, shared_version):
+    catalog = HackathonCatalog()
+
+    first = catalog.by_event_id("2025_fall")
+    first["title"] = "mutated by caller"
+
+    assert catalog.by_event_id("2025_fall") == {"event_id": "2025_fall", "title": "Fall 2025", "id": "h1"}
+    assert catalog.by_title("Fall 2024")["id"] == "h2"
+    assert catalog.by_id("h2")["event_id"] == "2024_fall"
+    db.collection.return_value.stream.assert_called_once()
+
+
+def test_unknown_event_id_queries_once(db, shared_version):
+    catalog = HackathonCatalog()
+
+    assert catalog.by_event_id("nope") is None
+    assert catalog.by_event_id("nope") is None
+    db.collection.return_value.where.assert_called_once_with("event_id", "==", "nope")
+
+
+def test_version_bump_from_another_worker_reloads(db, shared_version):
+    catalog = HackathonCatalog()
+    catalog.by_event_id("2025_fall")
+
+    shared_version[HackathonCatalog.VERSION_CACHE_KEY] = "bumped-elsewhere"
+    catalog.by_event_id("2025_fall")
+
+    assert db.collection.return_value.stream.call_count == 2
+
+
+def test_invalidate_with_doc_id_rereads_only_that_doc(db, shared_version):
+    catalog = HackathonCatalog()
+    catalog.by_event_id("2025_fall")
+    version = shared_version[HackathonCatalog.VERSION_CACHE_KEY]
+    snap = MagicMock(exists=True)
+    snap.to_dict.return_value = {"event_id": "2025_fall", "title": "Renamed"}
+    db.collection.return_value.document.return_value.get.return_value = snap
+
+    catalog.invalidate("h1")
+
+    assert shared_version[HackathonCatalog.VERSION_CACHE_KEY] != version
+    assert catalog.by_event_id("2025_fall")["title"] == "Renamed"
+    db.collection.return_value.stream.assert_called_once()
+
+
+def test_listener_changes_are_applied():
+    catalog = HackathonCatalog()
+    catalog._on_snapshot([_doc("h1", {"event_id": "a", "title": "A"})], [], None)
+
+    removed = MagicMock(document=_doc("h1", {}))
+    removed.type.name = "REMOVED"
+    added = MagicMock(document=_doc("h3", {"event_id": "c", "title": "C"}))
+    added.type.name = "ADDED"
+    catalog._on_snapshot([], [removed, added], None)
+
+    assert catalog._by_event_id == {"c": "h3"}
+
+
+def test_nested_values_are_copied(db, shared_version):
+    db.collection.return_value.stream.return_value = [
+        _doc("h1", {"event_id": "e", "planning": {"editors": ["a"]}}),
+    ]
+    catalog = HackathonCatalog()
+
+    catalog.by_event_id("e")["planning"]["editors"].append("b")
+
+    assert catalog.by_event_id("e")["planning"]["editors"] == ["a"]
+
+
+def test_concurrent_first_lookups_load_once(db, shared_version):
+    docs = db.collection.return_value.stream.return_value
+
+    def slow_stream():
+        time.sleep(0.05)
+        return docs
+
+    db.collection.return_value.stream.side_effect = slow_stream
+    catalog = HackathonCatalog()
+    threads = [threading.Thread(target=catalog.by_event_id, args=("2025_fall",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    db.collection.return_value.stream.assert_called_once()
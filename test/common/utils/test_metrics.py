@@ -0,0 +1,116 @@
+"""
+Unit tests for the Prometheus metrics aggregated across workers
+"""
+import json
+import os
+import time
+
+import pytest
+from flask import Flask
+
+from api.perf import metrics_views
+from common.utils import metrics, request_metrics
+from common.utils.firestore_helpers import CountingTTLCache, register_cache
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_histograms", {})
+    return tmp_path
+
+
+def write_worker(directory, pid, counters=(), histograms=(), samples=(), age=0):
+    path = os.path.join(directory, f"{pid}.json")
+    with open(path, "w") as f:
+        json.dump({"pid": pid, "at": time.time(), "counters": list(counters),
+                   "histograms": list(histograms), "samples": list(samples)}, f)
+    if age:
+        os.utime(path, (time.time() - age, time.time() - age))
+    return path
+
+
+def test_counters_and_histograms_render_in_text_format():
+    metrics.inc("ohack_http_requests_total", {"route": "/api/x", "status": 200})
+    metrics.inc("ohack_http_requests_total", {"route": "/api/x", "status": 200})
+    metrics.observe("ohack_http_request_duration_seconds", {"route": "/api/x"}, 0.03)
+    metrics.observe("ohack_http_request_duration_seconds", {"route": "/api/x"}, 20)
+
+    text = metrics.render()
+    assert "# TYPE ohack_http_requests_total counter" in text
+    assert 'ohack_http_requests_total{route="/api/x",status="200"} 2' in text
+    assert 'ohack_http_request_duration_seconds_bucket{route="/api/x",le="0.025"} 0' in text
+    assert 'ohack_http_request_duration_seconds_bucket{route="/api/x",le="0.05"} 1' in text
+    assert 'ohack_http_request_duration_seconds_bucket{route="/api/x",le="+Inf"} 2' in text
+    assert 'ohack_http_request_duration_seconds_count{route="/api/x"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_label_values_are_escaped():
+    metrics.inc("ohack_test_total", {"name": 'a"b\\c'})
+    assert 'ohack_test_total{name="a\\"b\\\\c"} 1' in metrics.render()
+
+
+def test_workers_are_summed_and_stale_ones_removed(metrics_dir):
+    metrics.inc("ohack_cache_hits_total", {"cache": "get_team"}, 3)
+    write_worker(metrics_dir, 1, counters=[["ohack_cache_hits_total", [["cache", "get_team"]], 1],
+                                           ["ohack_cache_misses_total", [["cache", "get_team"]], 4]])
+    stale = write_worker(metrics_dir, 2, counters=[["ohack_cache_hits_total", [["cache", "get_team"]], 100]],
+                         age=metrics.WORKER_STALE_SECONDS + 10)
+
+    text = metrics.render()
+    assert "ohack_workers 2" in text
+    assert 'ohack_cache_hits_total{cache="get_team"} 4' in text
+    assert 'ohack_cache_hit_ratio{cache="get_team"} 0.5' in text
+    assert not os.path.exists(stale)
+
+
+def test_publish_and_remove_worker(metrics_dir):
+    metrics.inc("ohack_test_total", {})
+    metrics.publish()
+    path = metrics_dir / f"{os.getpid()}.json"
+    assert json.loads(path.read_text())["counters"] == [["ohack_test_total", [], 1]]
+
+    metrics.remove_worker(os.getpid())
+    assert not path.exists()
+
+
+def test_counting_ttl_cache_reports_hits_and_misses():
+    cache = CountingTTLCache(maxsize=10, ttl=60)
+    register_cache(cache, name="test_counting_cache")
+    cache["a"] = 1
+    assert cache["a"] == 1
+    assert cache.get("b") is None
+    with pytest.raises(KeyError):
+        cache["c"]
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    text = metrics.render()
+    assert 'ohack_cache_hits_total{cache="test_counting_cache"} 1' in text
+    assert 'ohack_cache_entries{cache="test_counting_cache"} 1' in text
+
+
+def test_endpoint_counts_routes_and_guards_public_requests(monkeypatch):
+    app = Flask(__name__)
+    app.register_blueprint(metrics_views.bp)
+    request_metrics.init_app(app)
+
+    @app.route("/api/things/<thing_id>")
+    def thing(thing_id):
+        return {"id": thing_id}
+
+    with app.test_client() as client:
+        client.get("/api/things/1")
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        text = response.get_data(as_text=True)
+        assert ('ohack_http_requests_total{blueprint="app",method="GET",route="/api/things/<thing_id>",'
+                'status="200"} 1') in text
+        assert "ohack_http_requests_in_flight 1" in text
+
+        assert client.get("/metrics", headers={"Fly-Client-IP": "1.2.3.4"}).status_code == 403
+        monkeypatch.setenv("METRICS_TOKEN", "secret")
+        assert client.get("/metrics", headers={"Fly-Client-IP": "1.2.3.4",
+                                               "Authorization": "Bearer secret"}).status_code == 200
@@ -0,0 +1,501 @@
+"""
+Unit tests for the two-tier (L1 in-process + Redis) cache
+"""
+import fnmatch
+import json
+import threading
+import time
+
+import pytest
+
+from common.utils import cache_codec
+import common.utils.redis_cache as redis_cache
+
+
+class FakePipeline:
+    """Queues commands and replays them against FakeRedis on execute()."""
+
+    def __init__(self, client):
+        self._client = client
+        self._ops = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._ops.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        ops, self._ops = self._ops, []
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in ops]
+
+
+class FakeRedis:
+    """Just enough of redis-py for the cache module, with a call counter."""
+
+    def __init__(self):
+        self.store = {}
+        self.expiry = {}
+        self.published = []
+        self.calls = 0
+
+    def _alive(self, key):
+        exp = self.expiry.get(key)
+        if exp is not None and exp <= time.monotonic():
+            self.store.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.store
+
+    def pipeline(self, transaction=True):
+        self.calls += 1
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.store.get(key) if self._alive(key) else None
+
+    def mget(self, keys):
+        return [self.get(k) for k in keys]
+
+    def pttl(self, key):
+        if not self._alive(key):
+            return -2
+        exp = self.expiry.get(key)
+        return -1 if exp is None else int((exp - time.monotonic()) * 1000)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value.encode() if isinstance(value, str) else value
+        self.expiry[key] = time.monotonic() + ttl
+        return True
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            key = key.decode() if isinstance(key, bytes) else key
+            if self.store.pop(key, None) is not None:
+                removed += 1
+            self.expiry.pop(key, None)
+        return removed
+
+    def keys(self, pattern):
+        self.keys_called = True
+        return [k.encode() for k in list(self.store) if self._alive(k) and fnmatch.fnmatchcase(k, pattern)]
+
+    def scan_iter(self, match="*", count=None):
+        self.calls += 1
+        for k in list(self.store):
+            if self._alive(k) and fnmatch.fnmatchcase(k, match):
+                yield k.encode()
+
+    def sadd(self, key, *members):
+        self.store.setdefault(key, set()).update(members)
+        return len(members)
+
+    def smembers(self, key):
+        return {m.encode() for m in self.store.get(key, set())} if self._alive(key) else set()
+
+    def expire(self, key, ttl):
+        if key in self.store:
+            self.expiry[key] = time.monotonic() + ttl
+        return True
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self._alive(key):
+            return None
+        self.store[key] = value.encode() if isinstance(value, str) else value
+        if ex is not None:
+            self.expiry[key] = time.monotonic() + ex
+        return True
+
+    def exists(self, key):
+        return int(self._alive(key))
+
+    def eval(self, script, numkeys, key, token):
+        if self.get(key) == token.encode():
+            return self.delete(key)
+        return 0
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return 1
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(redis_cache, "REDIS_ENABLED", True)
+    monkeypatch.setattr(redis_cache, "REDIS_CLIENT", client)
+    monkeypatch.setattr(redis_cache, "_ensure_invalidation_listener", lambda: None)
+    redis_cache._l1_cache.clear()
+    redis_cache.local_cache.clear()
+    for name in redis_cache._cache_stats:
+        redis_cache._cache_stats[name] = 0
+    yield client
+    redis_cache._l1_cache.clear()
+
+
+class TestTwoTierCache:
+    """L1 serves hot keys without a Redis round-trip"""
+
+    def test_second_read_is_served_from_l1(self, fake_redis):
+        redis_cache.set_cached("leaderboard:2025_fall", {"rows": [1, 2, 3]}, ttl=300)
+
+        assert redis_cache.get_cached("leaderboard:2025_fall") == {"rows": [1, 2, 3]}
+        calls_after_first_read = fake_redis.calls
+        assert redis_cache.get_cached("leaderboard:2025_fall") == {"rows": [1, 2, 3]}
+
+        assert fake_redis.calls == calls_after_first_read
+        stats = redis_cache.get_cache_stats()
+        assert stats["l1_hits"] == 1
+        assert stats["l2_hits"] == 1
+
+    def test_l1_hits_are_independent_copies(self, fake_redis):
+        redis_cache.set_cached("leaderboard:2025_fall", {"rows": [1, 2, 3]}, ttl=300)
+        redis_cache.get_cached("leaderboard:2025_fall")["rows"].append(4)
+
+        assert redis_cache.get_cached("leaderboard:2025_fall") == {"rows": [1, 2, 3]}
+        redis_cache.get_many(["leaderboard:2025_fall"])["leaderboard:2025_fall"]["annotated"] = True
+        assert redis_cache.get_cached("leaderboard:2025_fall") == {"rows": [1, 2, 3]}
+
+    def test_miss_in_both_tiers_returns_default(self, fake_redis):
+        assert redis_cache.get_cached("missing", default="fallback") == "fallback"
+        stats = redis_cache.get_cache_stats()
+        assert stats["l1_misses"] == 1
+        assert stats["l2_misses"] == 1
+
+    def test_l1_never_outlives_short_redis_ttl(self, fake_redis):
+        redis_cache.set_cached("volunteer:by_event:e1:mentor", [1], ttl=1)
+        assert redis_cache.get_cached("volunteer:by_event:e1:mentor") == [1]
+
+        expires_at, _ = redis_cache._l1_cache["volunteer:by_event:e1:mentor"]
+        assert expires_at - time.monotonic() <= 1
+
+    def test_delete_evicts_l1_and_publishes(self, fake_redis):
+        redis_cache.set_cached("funnel_aggregate:v1", {"total": 5})
+        redis_cache.get_cached("funnel_aggregate:v1")
+        assert "funnel_aggregate:v1" in redis_cache._l1_cache
+
+        redis_cache.delete_cached("funnel_aggregate:v1")
+
+        assert "funnel_aggregate:v1" not in redis_cache._l1_cache
+        assert redis_cache.get_cached("funnel_aggregate:v1") is None
+        channel, message = fake_redis.published[-1]
+        assert channel == redis_cache.INVALIDATION_CHANNEL
+        assert json.loads(message)["key"] == "funnel_aggregate:v1"
+
+    def test_invalidation_message_from_another_worker_evicts_l1(self, fake_redis):
+        redis_cache.set_cached("slack:active_users:30", ["u1"])
+        redis_cache.set_cached("slack:user_details:U1", {"id": "U1"})
+        redis_cache.get_cached("slack:active_users:30")
+        redis_cache.get_cached("slack:user_details:U1")
+
+        redis_cache._handle_invalidation(json.dumps({"key": None, "pattern": "slack:active_users:*"}))
+
+        assert "slack:active_users:30" not in redis_cache._l1_cache
+        assert "slack:user_details:U1" in redis_cache._l1_cache
+        assert redis_cache.get_cache_stats()["invalidations_received"] == 1
+
+    def test_keys_are_versioned_so_older_releases_never_read_them(self, fake_redis):
+        redis_cache.set_cached("leaderboard:2025_fall", {"rows": [1]})
+        redis_cache.set_many({"team:t1": 1}, namespace="team")
+
+        assert redis_cache.KEY_PREFIX + "leaderboard:2025_fall" in fake_redis.store
+        assert "leaderboard:2025_fall" not in fake_redis.store
+        assert all(k.startswith(redis_cache.KEY_PREFIX) for k in fake_redis.store)
+
+        redis_cache.clear_namespace("team")
+        assert json.loads(fake_redis.published[-1][1])["keys"] == ["team:t1"]
+
+    def test_undecodable_entry_is_a_miss_not_an_outage(self, fake_redis):
+        fake_redis.store[redis_cache._redis_key("team:t1")] = b"\x7fnot a cache value"
+
+        assert redis_cache.get_cached("team:t1", default="fallback") == "fallback"
+        assert redis_cache.get_many(["team:t1"]) == {}
+        assert redis_cache.REDIS_ENABLED is True
+        assert redis_cache.get_cache_stats()["decode_errors"] == 2
+
+    def test_local_fallback_counts_local_tier(self, monkeypatch):
+        monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+        redis_cache.local_cache.clear()
+        before = redis_cache.get_cache_stats()
+
+        redis_cache.set_cached("k", "v")
+        assert redis_cache.get_cached("k") == "v"
+        assert redis_cache.get_cached("nope") is None
+
+        after = redis_cache.get_cache_stats()
+        assert after["local_hits"] - before["local_hits"] == 1
+        assert after["local_misses"] - before["local_misses"] == 1
+        assert after["backend"] == "local_ttl"
+
+
+class TestNamespacesAndPatterns:
+    """Namespace invalidation is O(members); pattern invalidation uses SCAN"""
+
+    def test_clear_namespace_only_drops_its_members(self, fake_redis):
+        ns = "volunteer:by_event:e1:mentor"
+        redis_cache.set_cached(f"{ns}:1:20:None", ["page1"], ttl=60, namespace=ns)
+        redis_cache.set_cached(f"{ns}:2:20:None", ["page2"], ttl=60, namespace=ns)
+        redis_cache.set_cached("volunteer:by_event:e2:mentor:1:20:None", ["other"], ttl=60,
+                               namespace="volunteer:by_event:e2:mentor")
+        redis_cache.get_cached(f"{ns}:1:20:None")
+
+        assert redis_cache.clear_namespace(ns) is True
+
+        assert redis_cache.get_cached(f"{ns}:1:20:None") is None
+        assert redis_cache.get_cached(f"{ns}:2:20:None") is None
+        assert redis_cache.get_cached("volunteer:by_event:e2:mentor:1:20:None") == ["other"]
+        assert not hasattr(fake_redis, "keys_called")
+        assert sorted(json.loads(fake_redis.published[-1][1])["keys"]) == [f"{ns}:1:20:None", f"{ns}:2:20:None"]
+
+    def test_clear_pattern_uses_scan_not_keys(self, fake_redis):
+        redis_cache.set_cached("slack:active_users:30", ["u1"])
+        redis_cache.set_cached("slack:user_details:U1", {"id": "U1"})
+
+        redis_cache.clear_pattern("slack:active_users:*")
+
+        assert not hasattr(fake_redis, "keys_called")
+        assert redis_cache.get_cached("slack:active_users:30") is None
+        assert redis_cache.get_cached("slack:user_details:U1") == {"id": "U1"}
+
+    def test_redis_cached_registers_results_under_namespace(self, fake_redis):
+        calls = []
+
+        @redis_cache.redis_cached(prefix="volunteer:by_event", ttl=60,
+                                  namespace=lambda event_id, vtype, *a, **kw: f"volunteer:by_event:{event_id}:{vtype}")
+        def lookup(event_id, vtype, page=1):
+            calls.append(page)
+            return [event_id, vtype, page]
+
+        lookup("e1", "judge", 1)
+        lookup("e1", "judge", 2)
+        lookup("e1", "judge", 1)
+        assert calls == [1, 2]
+
+        redis_cache.clear_namespace("volunteer:by_event:e1:judge")
+        lookup("e1", "judge", 2)
+        assert calls == [1, 2, 2]
+
+    def test_redis_cached_without_namespace_registers_nothing(self, fake_redis):
+        calls = []
+
+        @redis_cache.redis_cached(prefix="slack:user_details", ttl=60)
+        def details(user_id):
+            calls.append(user_id)
+            return {"id": user_id}
+
+        details("U1")
+        details("U2")
+        assert not [k for k in fake_redis.store if "cache:ns:" in k]
+
+        details.cache_clear()
+        details("U1")
+        assert calls == ["U1", "U2", "U1"]
+
+
+class TestLocalBackendGlobSemantics:
+    """The local fallback matches globs exactly like Redis MATCH"""
+
+    @pytest.fixture(autouse=True)
+    def local_only(self, monkeypatch):
+        monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+        redis_cache.local_cache.clear()
+        redis_cache._local_namespaces.clear()
+
+    def test_star_pattern_matches(self):
+        redis_cache.set_cached("volunteer:by_user_id:u1:e1:mentor", {"a": 1})
+        redis_cache.set_cached("volunteer:by_email:x@y.z:e1:mentor", {"b": 2})
+        redis_cache.set_cached("leaderboard:e1", {"c": 3})
+
+        redis_cache.clear_pattern("volunteer:*")
+
+        assert redis_cache.get_cached("volunteer:by_user_id:u1:e1:mentor") is None
+        assert redis_cache.get_cached("volunteer:by_email:x@y.z:e1:mentor") is None
+        assert redis_cache.get_cached("leaderboard:e1") == {"c": 3}
+
+    def test_pattern_without_wildcard_is_exact(self):
+        redis_cache.set_cached("leaderboard:e1", 1)
+        redis_cache.set_cached("leaderboard:e10", 10)
+
+        redis_cache.clear_pattern("leaderboard:e1")
+
+        assert redis_cache.get_cached("leaderboard:e1") is None
+        assert redis_cache.get_cached("leaderboard:e10") == 10
+
+    def test_clear_namespace(self):
+        redis_cache.set_cached("a:1", 1, namespace="a")
+        redis_cache.set_cached("a:2", 2, namespace="a")
+        redis_cache.set_cached("b:1", 3, namespace="b")
+
+        redis_cache.clear_namespace("a")
+
+        assert redis_cache.get_cached("a:1") is None
+        assert redis_cache.get_cached("a:2") is None
+        assert redis_cache.get_cached("b:1") == 3
+
+
+def _expire_envelope(client, key):
+    """Mark a redis_cached entry as past its fresh TTL but still within stale_ttl."""
+    redis_key = redis_cache._redis_key(key)
+    envelope = cache_codec.decode(client.store[redis_key])
+    envelope["fresh_until"] = time.time() - 1
+    client.store[redis_key] = cache_codec.encode(envelope)
+    redis_cache._l1_cache.clear()
+
+
+def _wait_for_refreshes(timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while redis_cache._refresh_inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestStampedeProtection:
+    """Single-flight, stale-while-revalidate and early expiration in redis_cached"""
+
+    @pytest.fixture(autouse=True)
+    def clean_locks(self):
+        redis_cache._local_locks.clear()
+        yield
+        _wait_for_refreshes()
+
+    def test_single_flight_computes_once_under_concurrency(self, fake_redis):
+        calls = []
+        gate = threading.Event()
+
+        @redis_cache.redis_cached(prefix="sf", ttl=60, single_flight=True)
+        def slow(x):
+            calls.append(x)
+            gate.wait(1)
+            return {"x": x}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(slow(1))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join(5)
+
+        assert calls == [1]
+        assert results == [{"x": 1}] * 8
+        assert not fake_redis._alive("lock:sf:1")
+
+    def test_stale_value_is_served_while_refreshing(self, fake_redis):
+        values = iter(["v1", "v2"])
+
+        @redis_cache.redis_cached(prefix="swr", ttl=60, stale_ttl=300)
+        def lookup():
+            return next(values)
+
+        assert lookup() == "v1"
+        _expire_envelope(fake_redis, "swr:")
+
+        assert lookup() == "v1"
+        _wait_for_refreshes()
+        redis_cache._l1_cache.clear()
+        assert lookup() == "v2"
+        assert redis_cache.get_cache_stats()["stale_served"] == 1
+
+    def test_refresh_skipped_when_another_worker_holds_lock(self, fake_redis):
+        calls = []
+
+        @redis_cache.redis_cached(prefix="held", ttl=60, stale_ttl=300)
+        def lookup():
+            calls.append(1)
+            return len(calls)
+
+        lookup()
+        _expire_envelope(fake_redis, "held:")
+        fake_redis.set("lock:held:", "other-worker", nx=True, ex=30)
+
+        assert lookup() == 1
+        _wait_for_refreshes()
+        assert calls == [1]
+
+    def test_early_expiration_refreshes_before_ttl(self, fake_redis):
+        calls = []
+
+        @redis_cache.redis_cached(prefix="xfetch", ttl=60, early_expiration=1e9)
+        def lookup():
+            calls.append(1)
+            time.sleep(0.01)
+            return "value"
+
+        assert lookup() == "value"
+        redis_cache._l1_cache.clear()
+        assert lookup() == "value"
+        _wait_for_refreshes()
+
+        assert len(calls) == 2
+        assert redis_cache.get_cache_stats()["early_refreshes"] == 1
+
+    def test_plain_values_written_before_opt_in_are_still_served(self, fake_redis):
+        redis_cache.set_cached("legacy:", ["old"], ttl=60)
+
+        @redis_cache.redis_cached(prefix="legacy", ttl=60, stale_ttl=60)
+        def lookup():
+            raise AssertionError("should not recompute")
+
+        assert lookup() == ["old"]
+
+    def test_local_lock_fallback(self, monkeypatch):
+        monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+        redis_cache._local_locks.clear()
+
+        token = redis_cache.acquire_lock("resend:all_emails_refreshing", ttl=30)
+        assert token is not None
+        assert redis_cache.acquire_lock("resend:all_emails_refreshing", ttl=30) is None
+        assert redis_cache.is_locked("resend:all_emails_refreshing")
+
+        redis_cache.release_lock("resend:all_emails_refreshing", "not-the-owner")
+        assert redis_cache.is_locked("resend:all_emails_refreshing")
+        redis_cache.release_lock("resend:all_emails_refreshing", token)
+        assert not redis_cache.is_locked("resend:all_emails_refreshing")
+
+
+class TestBatchOperations:
+    """get_many / set_many / delete_many cost one round-trip each"""
+
+    def test_get_many_is_one_round_trip(self, fake_redis):
+        redis_cache.set_many({f"resend:status:{i}": {"id": i} for i in range(100)}, ttl=120)
+        fake_redis.calls = 0
+
+        found = redis_cache.get_many([f"resend:status:{i}" for i in range(100)] + ["resend:status:missing"])
+
+        assert fake_redis.calls == 1
+        assert len(found) == 100
+        assert found["resend:status:42"] == {"id": 42}
+        assert "resend:status:missing" not in found
+
+    def test_get_many_serves_l1_hits_without_redis(self, fake_redis):
+        redis_cache.set_many({"a": 1, "b": 2}, ttl=60)
+        redis_cache.get_many(["a", "b"])
+        fake_redis.calls = 0
+
+        assert redis_cache.get_many(["a", "b"]) == {"a": 1, "b": 2}
+        assert fake_redis.calls == 0
+
+    def test_set_many_registers_namespace_and_invalidates_l1(self, fake_redis):
+        redis_cache.set_many({"ns:1": "x", "ns:2": "y"}, ttl=60, namespace="ns")
+
+        assert json.loads(fake_redis.published[-1][1])["keys"] == ["ns:1", "ns:2"]
+        redis_cache.clear_namespace("ns")
+        assert redis_cache.get_many(["ns:1", "ns:2"]) == {}
+
+    def test_delete_many(self, fake_redis):
+        redis_cache.set_many({"a": 1, "b": 2, "c": 3}, ttl=60)
+        redis_cache.get_many(["a", "b", "c"])
+
+        assert redis_cache.delete_many(["a", "b"]) is True
+
+        assert redis_cache.get_many(["a", "b", "c"]) == {"c": 3}
+        assert "a" not in redis_cache._l1_cache
+
+    def test_local_fallback(self, monkeypatch):
+        monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+        redis_cache.local_cache.clear()
+
+        redis_cache.set_many({"a": 1, "b": 2}, ttl=60)
+        assert redis_cache.get_many(["a", "b", "z"]) == {"a": 1, "b": 2}
+        redis_cache.delete_many(["a"])
+        assert redis_cache.get_many(["a", "b"]) == {"b": 2}
@@ -0,0 +1,95 @@
+"""
+Unit tests for the request-scoped document loader
+"""
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from common.utils.request_loader import DocumentLoader, get_loader
+
+
+def _ref(path):
+    ref = MagicMock()
+    ref.path = path
+    ref.id = path.split("/")[-1]
+    return ref
+
+
+def _snap(ref, data):
+    snap = MagicMock()
+    snap.reference = ref
+    snap.id = ref.id
+    snap.exists = data is not None
+    snap.to_dict.return_value = data
+    return snap
+
+
+def _db(docs):
+    db = MagicMock()
+    db.get_all.side_effect = lambda refs: [_snap(r, docs.get(r.path)) for r in refs]
+    return db
+
+
+def test_load_many_dedupes_and_memoizes():
+    db = _db({"badges/a": {"name": "A"}, "badges/b": {"name": "B"}})
+    loader = DocumentLoader(db)
+
+    first = loader.load_many([_ref("badges/a"), _ref("badges/b"), _ref("badges/a")])
+    second = loader.load(_ref("badges/b"))
+
+    assert [s.to_dict()["name"] for s in first] == ["A", "B", "A"]
+    assert second.to_dict() == {"name": "B"}
+    db.get_all.assert_called_once()
+    assert len(db.get_all.call_args[0][0]) == 2
+    assert loader.stats() == {"requested": 4, "fetched": 2, "round_trips": 1, "coalesced": 2}
+
+
+def test_queued_refs_resolve_in_one_tick():
+    db = _db({"nonprofits/x": {"name": "X"}})
+    loader = DocumentLoader(db)
+
+    loader.queue([_ref("nonprofits/x"), _ref("nonprofits/missing")])
+    loader.load(_ref("nonprofits/x"))
+    missing = loader.load(_ref("nonprofits/missing"))
+
+    assert db.get_all.call_count == 1
+    assert missing.exists is False
+
+
+@patch("common.utils.request_loader.get_catalog", return_value=None)
+def test_hackathons_by_event_ids_chunks_and_copies(mock_catalog):
+    db = MagicMock()
+    hackathon = MagicMock(id="h1")
+    hackathon.to_dict.return_value = {"event_id": "e1", "title": "Hack"}
+    db.collection.return_value.where.return_value.stream.return_value = [hackathon]
+    loader = DocumentLoader(db)
+
+    found = loader.hackathons_by_event_ids(["e1", "e2", "e1"])
+    found["e1"]["title"] = "mutated"
+    again = loader.hackathon_by_event_id("e1")
+
+    assert found["e2"] is None
+    assert again == {"event_id": "e1", "title": "Hack", "id": "h1"}
+    db.collection.return_value.where.assert_called_once_with("event_id", "in", ["e1", "e2"])
+
+
+def test_get_loader_is_per_request():
+    app = Flask(__name__)
+    with app.app_context():
+        assert get_loader() is get_loader()
+    with app.app_context():
+        fresh = get_loader()
+    assert get_loader() is not get_loader()
+    assert fresh is not None
+
+
+def test_hackathons_come_from_the_catalog_when_enabled():
+    db, catalog = MagicMock(), MagicMock()
+    catalog.by_event_id.side_effect = lambda e: {"event_id": e, "id": "h-" + e}
+    loader = DocumentLoader(db)
+
+    with patch("common.utils.request_loader.get_catalog", return_value=catalog):
+        found = loader.hackathons_by_event_ids(["e1", "e2"])
+
+    assert found["e2"] == {"event_id": "e2", "id": "h-e2"}
+    db.collection.assert_not_called()
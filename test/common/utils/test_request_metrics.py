@@ -0,0 +1,137 @@
+"""
+Unit tests for per-request performance counters
+"""
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from common.utils import redis_cache, request_metrics
+from common.utils.request_metrics import instrument_firestore, route_stats, server_timing, service_for
+
+
+class FakeApi:
+    """Stands in for the GAPIC Firestore client."""
+
+    def batch_get_documents(self, request=None, **kwargs):
+        return iter([SimpleNamespace(found="doc"), SimpleNamespace(found=None)])
+
+    def run_query(self, request=None, **kwargs):
+        return iter([SimpleNamespace(document="a"), SimpleNamespace(document="b"), SimpleNamespace(document=None)])
+
+    def commit(self, request=None, **kwargs):
+        return SimpleNamespace(write_results=request["writes"])
+
+
+class FakeClient:
+    def __init__(self):
+        self._firestore_api = FakeApi()
+
+    def _firestore_api_helper(self):
+        pass
+
+
+@pytest.fixture
+def client():
+    return instrument_firestore(FakeClient())
+
+
+@pytest.fixture(autouse=True)
+def clean():
+    request_metrics.reset_route_stats()
+    yield
+    request_metrics.finish()
+
+
+def test_firestore_rpcs_are_counted_within_a_request(client):
+    metrics = request_metrics.start()
+    list(client._firestore_api.batch_get_documents(request={}))
+    list(client._firestore_api.run_query(request={}))
+    client._firestore_api.commit(request={"writes": [1, 2, 3]})
+
+    summary = metrics.summary()
+    assert (summary["firestore_reads"], summary["firestore_queries"], summary["firestore_writes"]) == (3, 1, 3)
+    assert summary["firestore_calls"] == 3
+
+
+def test_nothing_is_counted_outside_a_request(client):
+    assert list(client._firestore_api.run_query(request={}))[0].document == "a"
+    metrics = request_metrics.start()
+    assert metrics.summary()["firestore_reads"] == 0
+
+
+def test_instrumenting_twice_and_mock_clients_are_no_ops(client):
+    api = client._firestore_api
+    wrapped = api.commit
+    instrument_firestore(client)
+    assert api.commit is wrapped
+
+    mock = object()
+    assert instrument_firestore(mock) is mock
+
+
+def test_cache_lookups_are_counted():
+    metrics = request_metrics.start()
+    redis_cache.set_cached("request_metrics_test", {"a": 1})
+    redis_cache.get_cached("request_metrics_test")
+    redis_cache.get_cached("request_metrics_test_missing")
+    summary = metrics.summary()
+    assert summary["cache_hits"] >= 1
+    assert summary["cache_misses"] == 1
+
+
+def test_http_services():
+    assert service_for("https://slack.com/api/chat.postMessage") == "slack"
+    assert service_for("https://hooks.slack.com/services/x") == "slack"
+    assert service_for("https://api.github.com/repos/a/b") == "github"
+    assert service_for("https://api.resend.com/emails") == "resend"
+    assert service_for("https://example.com/") == "other"
+
+
+def test_middleware_sets_server_timing_and_route_stats(client, monkeypatch):
+    monkeypatch.setenv("SERVER_TIMING", "true")
+    app = Flask(__name__)
+    request_metrics.init_app(app)
+
+    @app.route("/api/things/<thing_id>")
+    def thing(thing_id):
+        list(client._firestore_api.run_query(request={}))
+        request_metrics.count("http.slack")
+        return {"id": thing_id}
+
+    with app.test_client() as test_client:
+        for i in range(3):
+            response = test_client.get(f"/api/things/{i}")
+
+    header = response.headers["Server-Timing"]
+    assert header.startswith("app;dur=")
+    assert 'desc="reads=2 writes=0 queries=1"' in header
+    assert 'http;dur=' in header and 'desc="slack=1"' in header
+
+    stats = route_stats()["GET /api/things/<thing_id>"]
+    assert stats["requests"] == 3
+    assert stats["mean_reads"] == 2
+    assert stats["p50_ms"] <= stats["p95_ms"]
+    assert request_metrics.current() is None
+
+
+def test_server_timing_header_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("SERVER_TIMING", raising=False)
+    app = Flask(__name__)
+    request_metrics.init_app(app)
+
+    @app.route("/api/ping")
+    def ping():
+        return {}
+
+    with app.test_client() as test_client:
+        response = test_client.get("/api/ping")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert route_stats()["GET /api/ping"]["requests"] == 1
+
+
+def test_server_timing_without_http_calls():
+    summary = request_metrics.RequestMetrics().summary()
+    assert "http;" not in server_timing(summary)
@@ -0,0 +1,116 @@
+"""
+Unit tests for the shared Slack channel and member directory
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from common.utils.slack_directory import PAGE_LIMIT, SlackDirectory, member_record
+
+
+def paged(items_key, pages):
+    """A fake paged Slack method returning `pages` in order, chained by cursor."""
+    def call(limit=None, cursor=None, **kwargs):
+        index = int(cursor) if cursor else 0
+        next_cursor = str(index + 1) if index + 1 < len(pages) else ""
+        return {items_key: pages[index], "response_metadata": {"next_cursor": next_cursor}}
+    return MagicMock(side_effect=call)
+
+
+@pytest.fixture
+def shared_cache(fake_cache):
+    store = fake_cache("common.utils.slack_directory")
+    with patch("common.utils.slack_directory.submit_background"):
+        yield store
+
+
+@pytest.fixture
+def client():
+    client = MagicMock()
+    client.conversations_list = paged("channels", [
+        [{"id": "C1", "name": "general"}, {"id": "C2", "name": "random"}],
+        [{"id": "C3", "name": "npo-food-bank"}],
+    ])
+    client.users_list = paged("members", [
+        [{"id": "U1", "name": "alice", "real_name": "Alice", "is_bot": False, "color": "9f69e7",
+          "profile": {"email": "alice@example.com", "display_name": "al", "image_512": "big.png"}}],
+        [{"id": "U2", "name": "bot", "is_bot": True, "profile": {}}],
+    ])
+    return client
+
+
+def test_channels_follow_the_cursor_then_resolve_locally(shared_cache, client):
+    directory = SlackDirectory(lambda: client)
+
+    assert directory.channel_id("#npo-food-bank") == "C3"
+    assert directory.channel_id("general") == "C1"
+    assert directory.channel_name("C2") == "random"
+
+    cursors = [call.kwargs["cursor"] for call in client.conversations_list.call_args_list]
+    assert cursors == [None, "1"]
+    assert client.conversations_list.call_args.kwargs["limit"] == PAGE_LIMIT
+
+
+def test_missing_names_refresh_at_most_once_a_minute(shared_cache, client):
+    directory = SlackDirectory(lambda: client)
+    directory.channel_id("general")
+    calls = client.conversations_list.call_count
+
+    # Just walked: a miss does not walk again, and ids never do
+    assert directory.channel_id("brand-new") is None
+    assert directory.channel_id("U1234567") is None
+    assert client.conversations_list.call_count == calls
+
+    directory.channels._attempted_at -= 120
+    assert directory.channel_id("brand-new") is None
+    assert client.conversations_list.call_count == calls + 2
+
+
+def test_created_channels_are_shared_with_other_workers(shared_cache, client):
+    first = SlackDirectory(lambda: client)
+    second = SlackDirectory(lambda: client)
+    assert second.channel_id("general") == "C1"
+    walks = client.conversations_list.call_count
+
+    first.channel_created("npo-new", "C9")
+
+    # The second worker picks up the new version instead of walking Slack again
+    assert second.channel_id("npo-new") == "C9"
+    assert second.channel_name("C9") == "npo-new"
+    assert client.conversations_list.call_count == walks
+
+
+def test_members_are_slimmed_and_served_from_the_map(shared_cache, client):
+    directory = SlackDirectory(lambda: client)
+
+    assert [m["id"] for m in directory.member_list()] == ["U1", "U2"]
+    alice = directory.member("U1")
+    assert alice["profile"] == {"email": "alice@example.com", "display_name": "al"}
+    assert "color" not in alice
+    assert directory.member("U404") is None
+    assert client.users_list.call_count == 2
+
+
+def test_failed_refresh_serves_empty_map_without_retrying_each_lookup(shared_cache):
+    client = MagicMock()
+    client.conversations_list.side_effect = SlackApiError("ratelimited", {"error": "ratelimited"})
+    directory = SlackDirectory(lambda: client)
+
+    assert directory.channel_id("general") is None
+    assert directory.channel_id("general") is None
+    assert client.conversations_list.call_count == 1
+
+
+def test_invalidate_walks_slack_again(shared_cache, client):
+    directory = SlackDirectory(lambda: client)
+    directory.channel_id("general")
+    directory.invalidate()
+
+    assert "slack_directory:channels" not in shared_cache
+    assert directory.channel_id("general") == "C1"
+    assert client.conversations_list.call_count == 4
+
+
+def test_member_record_without_profile():
+    assert member_record({"id": "U1", "name": "x", "extra": 1}) == {"id": "U1", "name": "x", "profile": {}}
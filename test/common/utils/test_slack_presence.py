@@ -0,0 +1,142 @@
+"""
+Unit tests for the background Slack presence tracker
+"""
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+from common.utils import redis_cache, slack_presence
+from common.utils.slack_presence import BATCH_SIZE, CACHE_KEY, PresenceTracker
+
+NOW = time.time()
+
+
+def member(user_id, **kwargs):
+    return {"id": user_id, **kwargs}
+
+
+@pytest.fixture
+def shared_cache(fake_cache):
+    store = fake_cache("common.utils.slack_presence")
+    with patch("common.utils.slack_presence.acquire_lock", return_value="token"), \
+         patch("common.utils.slack_presence.release_lock"), \
+         patch("common.utils.slack_presence.submit_background") as submit:
+        store["submit"] = submit
+        yield store
+
+
+def tracker(members, presence="active"):
+    fetch = MagicMock(side_effect=lambda user_id: {"presence": presence})
+    return PresenceTracker(fetch, lambda: members), fetch
+
+
+def test_reads_answer_from_the_map_and_schedule_one_batch(shared_cache):
+    presences, fetch = tracker([member("U1"), member("U2")])
+
+    assert presences.get_many(["U1", "U2"]) == {"U1": "unknown", "U2": "unknown"}
+    assert presences.get_many(["U1"]) == {"U1": "unknown"}
+    shared_cache["submit"].assert_called_once_with(CACHE_KEY, presences.refresh_batch)
+    fetch.assert_not_called()
+
+    assert presences.refresh_batch() == 2
+    assert presences.get_many(["U1", "U2", "U404"]) == {"U1": "active", "U2": "active", "U404": "unknown"}
+
+
+def test_batches_are_bounded_and_once_per_interval(shared_cache):
+    presences, fetch = tracker([member(f"U{i}") for i in range(BATCH_SIZE + 10)])
+
+    assert presences.refresh_batch() == BATCH_SIZE
+    # Another worker asking within the interval does nothing
+    assert presences.refresh_batch() == 0
+    assert fetch.call_count == BATCH_SIZE
+
+    shared_cache[CACHE_KEY]["batch_at"] -= 120
+    assert presences.refresh_batch() == 10
+
+
+def test_wanted_then_recently_active_members_go_first(shared_cache):
+    # A fresh profile edit is not activity; only being seen active is
+    members = [member("UOLD", updated=NOW), member("URECENT"), member("UASKED"),
+               member("UBOT", is_bot=True), member("UGONE", deleted=True)]
+    presences, _ = tracker(members)
+    presences.get_many(["UASKED"])
+
+    data = {"URECENT": ["away", NOW - 4000, NOW - 86400], "UOLD": ["away", NOW - 4000, NOW - 30 * 86400]}
+    assert presences.due(data, NOW) == ["UASKED", "URECENT", "UOLD"]
+
+    # Fresh entries are not due: recent members after 5 minutes, others after an hour
+    data = {"URECENT": ["away", NOW - 400, NOW - 86400], "UOLD": ["away", NOW - 400, 0],
+            "UASKED": ["away", NOW - 10, 0]}
+    assert presences.due(data, NOW) == ["URECENT"]
+
+
+def test_last_active_time_survives_later_lookups(shared_cache):
+    presences, _ = tracker([member("U1")])
+    presences.record({"U1": "active"})
+    active_at = shared_cache[CACHE_KEY]["data"]["U1"][2]
+    assert active_at > 0
+
+    presences.record({"U1": "away"})
+    assert shared_cache[CACHE_KEY]["data"]["U1"][0] == "away"
+    assert shared_cache[CACHE_KEY]["data"]["U1"][2] == active_at
+
+
+def test_concurrent_merges_keep_both_sides(shared_cache, monkeypatch):
+    monkeypatch.setattr(redis_cache, "REDIS_ENABLED", False)
+    store = dict(shared_cache)
+
+    def slow_get(key):
+        value = store.get(key)
+        time.sleep(0.05)
+        return value
+
+    presences, _ = tracker([member("U1"), member("U2")])
+    with patch("common.utils.slack_presence.acquire_lock", side_effect=redis_cache.acquire_lock), \
+         patch("common.utils.slack_presence.release_lock", side_effect=redis_cache.release_lock), \
+         patch("common.utils.slack_presence.get_cached", side_effect=slow_get), \
+         patch("common.utils.slack_presence.set_cached",
+               side_effect=lambda key, value, ttl=None: store.__setitem__(key, value)):
+        threads = [threading.Thread(target=presences.record, args=({user_id: "active"},))
+                   for user_id in ("U1", "U2")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert set(store[CACHE_KEY]["data"]) == {"U1", "U2"}
+
+
+def test_rate_limited_batch_keeps_what_it_got(shared_cache):
+    responses = iter([{"presence": "away"}])
+
+    def fetch(user_id):
+        try:
+            return next(responses)
+        except StopIteration:
+            raise SlackApiError("ratelimited", {"error": "ratelimited"})
+
+    presences = PresenceTracker(fetch, lambda: [member("U1"), member("U2")])
+    assert presences.refresh_batch() == 1
+    assert sorted(v[0] for v in shared_cache[CACHE_KEY]["data"].values()) == ["away"]
+
+
+def test_single_lookup_uses_fresh_entry_or_records_new_one(shared_cache):
+    presences, fetch = tracker([member("U1")], presence="away")
+    presences.record({"U1": "active"})
+
+    assert presences.get("U1") == "active"
+    fetch.assert_not_called()
+
+    shared_cache[CACHE_KEY]["data"]["U1"][1] -= slack_presence.RECENT_MAX_AGE_SECONDS
+    assert presences.get("U1") == "away"
+    assert shared_cache[CACHE_KEY]["data"]["U1"][0] == "away"
+
+
+def test_members_who_left_are_pruned(shared_cache):
+    presences, _ = tracker([member("U1")])
+    presences.record({"UGONE": "active"})
+    presences.refresh_batch()
+    assert set(shared_cache[CACHE_KEY]["data"]) == {"U1"}
@@ -0,0 +1,256 @@
+"""
+Unit tests for the outbound Slack delivery queue
+"""
+import importlib
+import json
+import sys
+import time
+from collections import deque
+from types import ModuleType
+from unittest.mock import MagicMock, patch
+
+import pytest
+from slack_sdk.errors import SlackApiError
+
+import common.utils
+from common.utils.slack_queue import (
+    MAX_ATTEMPTS,
+    SHARED_QUEUE_KEY,
+    MAX_COALESCED_BLOCKS,
+    RetryAfter,
+    SlackOutbox,
+    coalesce,
+    make_message,
+    take_batch,
+)
+
+
+class Recorder:
+    """A deliver() that records posts and raises the queued failures first."""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.posts = []
+
+    def __call__(self, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.posts.append((time.monotonic(), message))
+
+
+def outbox(deliver, **kwargs):
+    kwargs.setdefault("coalesce_seconds", 0.05)
+    kwargs.setdefault("min_interval_seconds", 0.05)
+    return SlackOutbox(deliver, shared=False, **kwargs)
+
+
+def slack_error(status, error, headers=None):
+    response = MagicMock(status_code=status, headers=headers or {})
+    response.get.side_effect = lambda key, default=None: error if key == "error" else default
+    return SlackApiError(error, response)
+
+
+def test_messages_to_one_channel_within_the_window_are_one_post():
+    deliver = Recorder()
+    box = outbox(deliver)
+    box.enqueue(make_message("chat", "general", "first"))
+    box.enqueue(make_message("chat", "general", "second"))
+    box.enqueue(make_message("chat", "random", "other"))
+    assert box.flush(timeout=2)
+
+    texts = sorted(message["text"] for _, message in deliver.posts)
+    assert texts == ["first\nsecond", "other"]
+    stats = box.stats()
+    assert (stats["delivered"], stats["posts"], stats["coalesced"], stats["depth"]) == (3, 2, 1, 0)
+    assert stats["latency_ms"]["samples"] == 3
+
+
+def test_a_channel_is_not_posted_to_faster_than_the_minimum_interval():
+    deliver = Recorder()
+    box = outbox(deliver, coalesce_seconds=0, min_interval_seconds=0.3)
+    box.enqueue(make_message("chat", "general", "one"))
+    assert box.flush(timeout=2)
+    box.enqueue(make_message("chat", "general", "two"))
+    assert box.flush(timeout=2)
+
+    (first, _), (second, _) = deliver.posts
+    assert second - first >= 0.29
+
+
+def test_retry_after_pauses_the_channel():
+    deliver = Recorder(RetryAfter(0.3))
+    box = outbox(deliver)
+    started = time.monotonic()
+    box.enqueue(make_message("webhook", "audit", "hello"))
+    assert box.flush(timeout=2)
+
+    assert deliver.posts[0][0] - started >= 0.3
+    assert box.stats()["rate_limited"] == 1
+    assert box.stats()["delivered"] == 1
+
+
+def test_slack_429_uses_the_retry_after_header():
+    deliver = Recorder(slack_error(429, "ratelimited", {"Retry-After": "0"}))
+    box = outbox(deliver)
+    box.enqueue(make_message("chat", "general", "hello"))
+    assert box.flush(timeout=2)
+
+    assert [m["text"] for _, m in deliver.posts] == ["hello"]
+    assert box.stats()["retries"] == 0
+
+
+@patch("common.utils.slack_queue.RETRY_BACKOFF_SECONDS", 0.01)
+def test_transient_failures_retry_then_give_up():
+    deliver = Recorder(*[ConnectionError("down")] * MAX_ATTEMPTS)
+    box = outbox(deliver)
+    box.enqueue(make_message("chat", "general", "hello"))
+    assert box.flush(timeout=2)
+
+    assert deliver.posts == []
+    stats = box.stats()
+    assert (stats["retries"], stats["failed"]) == (MAX_ATTEMPTS - 1, 1)
+
+
+def test_permanent_errors_are_not_retried():
+    deliver = Recorder(slack_error(200, "channel_not_found"))
+    box = outbox(deliver)
+    box.enqueue(make_message("chat", "nope", "hello"))
+    assert box.flush(timeout=2)
+    assert (box.stats()["retries"], box.stats()["failed"]) == (0, 1)
+
+
+def test_queue_is_bounded():
+    box = outbox(Recorder(), coalesce_seconds=60, maxsize=2)
+    assert box.enqueue(make_message("chat", "general", "1"))
+    assert box.enqueue(make_message("chat", "general", "2"))
+    assert not box.enqueue(make_message("chat", "general", "3"))
+    assert box.stats()["dropped"] == 1
+
+
+def test_shutdown_sends_held_messages_inline():
+    deliver = Recorder()
+    box = outbox(deliver, coalesce_seconds=60)
+    box.enqueue(make_message("chat", "general", "a"))
+    box.enqueue(make_message("chat", "general", "b"))
+    box.shutdown()
+    assert [m["text"] for _, m in deliver.posts] == ["a\nb"]
+
+
+def test_coalesce_keeps_blocks_and_splits_oversized_batches():
+    block = {"type": "divider"}
+    with_blocks = make_message("chat", "general", "a", blocks=[block])
+    plain = make_message("chat", "general", "b")
+    combined = coalesce([with_blocks, plain])
+    assert combined["blocks"] == [block, {"type": "section", "text": {"type": "mrkdwn", "text": "b"}}]
+
+    pending = deque(make_message("chat", "general", str(i)) for i in range(MAX_COALESCED_BLOCKS + 5))
+    assert len(take_batch(pending)) == MAX_COALESCED_BLOCKS
+    assert len(pending) == 5
+
+
+@pytest.fixture
+def slack(monkeypatch):
+    """The real common.utils.slack, even when another test module left a mock in sys.modules."""
+    module = sys.modules.get("common.utils.slack")
+    if not isinstance(module, ModuleType):
+        monkeypatch.delitem(sys.modules, "common.utils.slack", raising=False)
+        monkeypatch.delattr(common.utils, "slack", raising=False)
+        module = importlib.import_module("common.utils.slack")
+    return module
+
+
+class FakeRedis:
+    """The list and key commands the outbox uses."""
+
+    def __init__(self):
+        self.lists = {}
+        self.keys = {}
+
+    def llen(self, name):
+        return len(self.lists.get(name, ()))
+
+    def rpush(self, name, *values):
+        self.lists.setdefault(name, []).extend(values)
+
+    def lpush(self, name, *values):
+        self.lists[name] = list(reversed(values)) + self.lists.get(name, [])
+
+    def blpop(self, name, timeout=0):
+        items = self.lists.get(name)
+        return (name, items.pop(0)) if items else None
+
+    def lpop(self, name, count):
+        items = self.lists.get(name, [])
+        taken, self.lists[name] = items[:count], items[count:]
+        return taken
+
+    def set(self, name, value, nx=False, px=None):
+        expires_at = self.keys.get(name, 0)
+        if nx and expires_at > time.monotonic():
+            return None
+        self.keys[name] = time.monotonic() + px / 1000
+        return True
+
+    def pttl(self, name):
+        return int((self.keys.get(name, 0) - time.monotonic()) * 1000)
+
+
+def test_workers_hold_a_bounded_share_of_the_shared_queue():
+    redis = FakeRedis()
+    redis.rpush(SHARED_QUEUE_KEY, *[f'{{"kind": "chat", "channel": "c{i}", "text": "{i}", "attempts": 0}}'
+                                    for i in range(10)])
+    box = SlackOutbox(Recorder())
+    with patch("common.utils.slack_queue.get_redis_client", return_value=redis), \
+         patch("common.utils.slack_queue.SHARED_HOLD_MAX", 3):
+        box._pull_shared(0.01)
+        box._pull_shared(0.01)
+    assert box.stats()["depth"] == 3
+    assert redis.llen(SHARED_QUEUE_KEY) == 7
+
+
+def test_channel_send_slot_is_shared_between_workers():
+    redis = FakeRedis()
+    first, second = SlackOutbox(Recorder()), SlackOutbox(Recorder())
+    with patch("common.utils.slack_queue.get_redis_client", return_value=redis):
+        assert first._claim_channel("chat|general") == 0
+        assert 0 < second._claim_channel("chat|general") <= 1
+        assert second._claim_channel("chat|random") == 0
+
+
+def test_async_send_slack_and_audit_go_through_the_queue(slack):
+    with patch.object(slack, "_OUTBOX") as box, patch.object(slack, "SLACK_URL", "https://hooks.example"):
+        slack.async_send_slack(message="hi", channel="general", icon_emoji=":wave:")
+        slack.send_slack_audit(action="SIGNUP", message="new user", payload={"a": 1, "recaptchaToken": "x"})
+
+    chat, audit = [call.args[0] for call in box.enqueue.call_args_list]
+    assert (chat["kind"], chat["channel"], chat["text"], chat["icon_emoji"]) == ("chat", "general", "hi", ":wave:")
+    assert audit["kind"] == "webhook"
+    assert audit["text"] == "[SIGNUP] new user\n{'a': 1}"
+
+
+def test_shutdown_stops_the_dispatcher_before_returning_held_messages():
+    redis = FakeRedis()
+    with patch("common.utils.slack_queue.get_redis_client", return_value=redis):
+        box = SlackOutbox(Recorder(), coalesce_seconds=60)
+        box.enqueue(make_message("chat", "general", "a"))
+        box.enqueue(make_message("chat", "general", "b"))
+        deadline = time.monotonic() + 2
+        while box.stats()["depth"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        box.shutdown()
+        time.sleep(0.1)
+    assert not box._thread.is_alive()
+    assert [json.loads(item)["text"] for item in redis.lists[SHARED_QUEUE_KEY]] == ["a", "b"]
+
+
+def test_messages_pulled_after_shutdown_go_back_to_the_shared_queue():
+    redis = FakeRedis()
+    redis.rpush(SHARED_QUEUE_KEY, '{"kind": "chat", "channel": "c1", "text": "1", "attempts": 0}',
+                '{"kind": "chat", "channel": "c2", "text": "2", "attempts": 0}')
+    box = SlackOutbox(Recorder())
+    box._stopping = True
+    with patch("common.utils.slack_queue.get_redis_client", return_value=redis):
+        box._pull_shared(0.01)
+    assert box.stats()["depth"] == 0
+    assert [json.loads(item)["text"] for item in redis.lists[SHARED_QUEUE_KEY]] == ["1", "2"]
@@ -0,0 +1,160 @@
+"""
+Unit tests for the shared user directory
+"""
+from unittest.mock import patch
+
+import pytest
+from mockfirestore import MockFirestore
+
+from common.utils import redis_cache
+from common.utils.user_directory import (
+    COLLECTION,
+    META_DOC,
+    UserDirectory,
+    hearts_total,
+    shard_for,
+    user_record,
+)
+
+
+@pytest.fixture
+def shared_version(fake_cache):
+    store = fake_cache("common.utils.user_directory")
+    # publish_event delivers straight to the subscribers, as the pub/sub listener would
+    with patch("common.utils.user_directory.publish_event", side_effect=redis_cache._dispatch_event):
+        yield store
+
+
+@pytest.fixture
+def db(shared_version):
+    db = MockFirestore()
+    users = db.collection("users")
+    users.document("u1").set({
+        "user_id": "oauth2|slack|T1-A", "name": "Alice", "nickname": "al",
+        "email_address": "alice@example.com", "profile_image": "a.png",
+        "history": {"how": {"code_reliability": 2}, "what": {"documentation": 1.5},
+                    "certificates": ["cert.png"]},
+        "volunteering": [{"finalHours": 2.5}, {"commitmentHours": 4}],
+    })
+    users.document("u2").set({"user_id": "oauth2|slack|T1-B", "name": "Bob"})
+    users.document("junk").set({"name": "No user id"})
+    with patch.object(UserDirectory, "_get_db", return_value=db), \
+         patch("common.utils.user_directory.acquire_lock", return_value="token"), \
+         patch("common.utils.user_directory.release_lock"), \
+         patch("common.utils.user_directory.submit_background"):
+        yield db
+
+
+def test_user_record_keeps_only_indexed_fields():
+    record = user_record("u1", {
+        "user_id": "oauth2|slack|T1-A", "name": "A" * 500,
+        "history": {"how": {"x": 1}, "certificates": ["c.png"]},
+        "volunteering": [{"finalHours": "1.5"}, {"commitmentHours": 3}, "bogus"],
+        "badges": ["ignored"],
+    })
+
+    assert record["name"] == "A" * 200
+    assert record["hearts"] == 1
+    assert record["has_history"] is True
+    assert (record["vol_sessions"], record["vol_final_hours"], record["vol_commitment_hours"]) == (2, 1.5, 3)
+    assert "badges" not in record
+    assert user_record("junk", {"name": "No user id"}) is None
+
+
+def test_hearts_total_skips_certificates():
+    assert hearts_total({"how": {"a": 2}, "what": {"b": 0.5}, "certificates": ["c"]}) == 2.5
+    assert hearts_total(None) == 0
+
+
+def test_first_load_builds_shards_and_meta(db):
+    directory = UserDirectory()
+
+    assert directory.by_user_id("oauth2|slack|T1-A")["hearts"] == 3.5
+    assert {r["id"] for r in directory.records()} == {"u1", "u2"}
+
+    meta = db.collection(COLLECTION).document(META_DOC).get().to_dict()
+    assert meta["records"] == 2
+    assert meta["bytes"] > 0
+    shard = db.collection(COLLECTION).document(shard_for("u1")).get().to_dict()
+    assert shard["records"]["u1"]["name"] == "Alice"
+
+
+def test_other_worker_loads_shards_without_scanning_users(db):
+    UserDirectory().ensure_loaded()
+
+    with patch.object(db, "collection", wraps=db.collection) as collection:
+        directory = UserDirectory()
+        assert directory.get("u2")["name"] == "Bob"
+    assert "users" not in [call.args[0] for call in collection.call_args_list]
+
+
+def test_refresh_user_patches_every_worker_without_a_reload(db, shared_version):
+    directory = UserDirectory()
+    other = UserDirectory()
+    directory.ensure_loaded()
+    other.ensure_loaded()
+    version = shared_version[UserDirectory.VERSION_CACHE_KEY]
+
+    db.collection("users").document("u2").update({"name": "Robert"})
+    with patch.object(UserDirectory, "load") as load:
+        directory.refresh_user("u2")
+        assert directory.get("u2")["name"] == "Robert"
+        # The other worker patched the broadcast record instead of reloading the shards
+        assert other.get("u2")["name"] == "Robert"
+    load.assert_not_called()
+    assert shared_version[UserDirectory.VERSION_CACHE_KEY] == version
+    shard = db.collection(COLLECTION).document(shard_for("u2")).get().to_dict()
+    assert shard["records"]["u2"]["name"] == "Robert"
+
+
+def test_rebuild_version_makes_other_workers_reload(db):
+    directory = UserDirectory()
+    other = UserDirectory()
+    other.ensure_loaded()
+
+    db.collection("users").document("u3").set({"user_id": "oauth2|slack|T1-C", "name": "Cy"})
+    directory.rebuild()
+    assert other.get("u3")["name"] == "Cy"
+
+
+def test_shard_count_grows_with_the_directory(db):
+    with patch("common.utils.user_directory.SHARD_TARGET_BYTES", 10):
+        stats = UserDirectory().rebuild()
+    assert stats["shards"] > 16
+
+    directory = UserDirectory()
+    assert {r["id"] for r in directory.records()} == {"u1", "u2"}
+    db.collection("users").document("u2").update({"name": "Robert"})
+    directory.refresh_user("u2")
+    shard = db.collection(COLLECTION).document(shard_for("u2", stats["shards"])).get().to_dict()
+    assert shard["records"]["u2"]["name"] == "Robert"
+
+
+def test_refresh_user_follows_a_rebuild_by_another_worker(db):
+    directory = UserDirectory()
+    directory.ensure_loaded()
+    with patch("common.utils.user_directory.SHARD_TARGET_BYTES", 10):
+        stats = UserDirectory().rebuild()
+    assert stats["shards"] > 16
+
+    db.collection("users").document("u2").update({"name": "Robert"})
+    with patch("common.utils.user_directory.get_cached", return_value=None):
+        directory.refresh_user("u2")
+        assert directory._is_stale()
+    shard = db.collection(COLLECTION).document(shard_for("u2", stats["shards"])).get().to_dict()
+    assert shard["records"]["u2"]["name"] == "Robert"
+
+
+def test_shard_write_failure_does_not_fail_the_rebuild(db):
+    shard_doc = db.collection(COLLECTION).document(shard_for("u1"))
+    original_set = type(shard_doc).set
+
+    def failing_set(doc, data, *args, **kwargs):
+        if doc.id == shard_for("u1"):
+            raise ValueError("document too large")
+        return original_set(doc, data, *args, **kwargs)
+
+    with patch.object(type(shard_doc), "set", failing_set):
+        stats = UserDirectory().rebuild()
+    assert stats["failed_shards"] == [shard_for("u1")]
+    assert stats["records"] == 2
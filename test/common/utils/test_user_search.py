@@ -0,0 +1,103 @@
+"""
+Unit tests for the user typeahead index
+"""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from common.utils.user_search import UserSearchIndex, fold
+
+
+def _record(doc_id, name, nickname="", email="", last_login=""):
+    return {"id": doc_id, "user_id": f"oauth2|slack|{doc_id}", "name": name, "nickname": nickname,
+            "email": email, "image": "", "last_login": last_login}
+
+
+RECORDS = [
+    _record("u1", "Jane Doe", "jd", "jane.doe@example.com", "2025-01-01"),
+    _record("u2", "Benjamin Janeway", "", "ben@example.com", "2025-06-01"),
+    _record("u3", "Zoë Ångström", "zo", "zoe@example.org", "2024-01-01"),
+    _record("u4", "Janet Park", "", "janet@example.com", "2024-06-01"),
+]
+
+
+@pytest.fixture
+def directory():
+    directory = MagicMock()
+    directory.records.return_value = list(RECORDS)
+    return directory
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+def test_fold_strips_case_and_diacritics():
+    assert fold("Zoë ÅNGSTRÖM") == "zoe angstrom"
+
+
+def test_prefix_matches_rank_before_substring_then_recency(directory):
+    index = UserSearchIndex(directory)
+
+    # Jane and Janet start a word; Janeway is a prefix too but logged in last
+    assert _ids(index.search("jan")) == ["u2", "u1", "u4"]
+    # "ane" starts no word: substring matches by recency
+    assert _ids(index.search("ane")) == ["u2", "u1", "u4"]
+    assert _ids(index.search("jane d")) == ["u1"]
+
+
+def test_two_character_queries_match_word_prefixes_only(directory):
+    index = UserSearchIndex(directory)
+
+    assert _ids(index.search("pa")) == ["u4"]
+    assert index.search("ar") == []
+
+
+def test_diacritics_and_limit(directory):
+    index = UserSearchIndex(directory)
+
+    assert _ids(index.search("ANGST")) == ["u3"]
+    assert len(index.search("ja", limit=2)) == 2
+
+
+def test_email_is_only_matched_when_requested(directory):
+    index = UserSearchIndex(directory)
+
+    assert index.search("example.org") == []
+    assert _ids(index.search("example.org", include_email=True)) == ["u3"]
+
+
+def test_directory_changes_update_the_index(directory):
+    index = UserSearchIndex(directory)
+    index.search("jan")
+    on_change = directory.add_listener.call_args.args[0]
+
+    on_change({"u3": _record("u3", "Janice Ng", "", "", "2026-01-01"), "u4": None})
+
+    assert _ids(index.search("jan")) == ["u3", "u2", "u1"]
+    assert index.search("angst") == []
+    assert index.search("park") == []
+
+    # Rename without a new login keeps the user's place
+    on_change({"u1": _record("u1", "Jane Smith", "jd", "", "2025-01-01")})
+    assert _ids(index.search("smi")) == ["u1"]
+    assert index.search("doe") == []
+
+    # A full reload rebuilds on the next query
+    on_change(None)
+    assert _ids(index.search("jan")) == ["u2", "u1", "u4"]
+
+
+def test_large_directory_scans_while_the_index_builds(directory):
+    index = UserSearchIndex(directory)
+
+    with patch("common.utils.user_search.INLINE_BUILD_MAX_USERS", 1), \
+         patch("common.utils.user_search.submit_background") as submit:
+        assert _ids(index.search("jan")) == ["u2", "u1", "u4"]
+        assert _ids(index.search("ane")) == ["u2", "u1", "u4"]
+        submit.assert_called()
+        # Changes arriving mid-build are applied once it is installed
+        directory.add_listener.call_args.args[0]({"u4": None})
+        submit.call_args.args[1]()
+
+    assert _ids(index.search("jan")) == ["u2", "u1"]
@@ -0,0 +1,26 @@
+import importlib
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def fake_cache():
+    """
+    Back a module's redis_cache helpers with one dict.
+
+    Returns a function taking the module path; it patches that module's
+    get_cached/set_cached (and delete_cached, when imported) and returns the
+    dict, which stands in for the Redis shared by every worker.
+    """
+    store = {}
+    with ExitStack() as stack:
+        def install(module):
+            stack.enter_context(patch(f"{module}.get_cached", side_effect=lambda key: store.get(key)))
+            stack.enter_context(patch(f"{module}.set_cached",
+                                      side_effect=lambda key, value, ttl=None: store.__setitem__(key, value)))
+            if hasattr(importlib.import_module(module), "delete_cached"):
+                stack.enter_context(patch(f"{module}.delete_cached", side_effect=lambda key: store.pop(key, None)))
+            return store
+        yield install
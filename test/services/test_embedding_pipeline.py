@@ -0,0 +1,181 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+from firebase_admin import firestore
+
+from services.embedding_pipeline import (
+    JOB_COLLECTION,
+    STATUS_COMPLETED,
+    STATUS_COMPLETED_WITH_ERRORS,
+    STATUS_INTERRUPTED,
+    EmbeddingJob,
+    StubEmbeddingClient,
+    content_hash,
+    item_vectors,
+    pack_by_token_budget,
+    request_inputs,
+)
+
+MODEL = "text-embedding-3-small"
+COLLECTION = "npo_applications_embedding_maps"
+
+
+class FakeDoc:
+    def __init__(self, db, collection, doc_id):
+        self.db, self.collection_name, self.id = db, collection, doc_id
+
+    def set(self, data, merge=False):
+        docs = self.db.data.setdefault(self.collection_name, {})
+        current = dict(docs.get(self.id, {})) if merge else {}
+        for key, value in data.items():
+            if isinstance(value, firestore.Increment):
+                value = current.get(key, 0) + value.value
+            current[key] = value
+        docs[self.id] = current
+
+
+class FakeSnap:
+    def __init__(self, doc_id, data):
+        self.id, self._data = doc_id, data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db, self.ops = db, []
+
+    def set(self, ref, data):
+        self.ops.append((ref, data))
+
+    def commit(self):
+        if self.db.fail_commits:
+            self.db.fail_commits -= 1
+            raise RuntimeError("commit failed")
+        for ref, data in self.ops:
+            ref.set(data)
+
+
+class FakeDB:
+    def __init__(self):
+        self.data = {}
+        self.fail_commits = 0
+
+    def collection(self, name):
+        db = self
+        collection = MagicMock()
+        collection.document.side_effect = lambda doc_id: FakeDoc(db, name, doc_id)
+
+        def stream():
+            docs = sorted(db.data.get(name, {}).items(), key=lambda kv: kv[1].get("started_at", ""), reverse=True)
+            return [FakeSnap(doc_id, data) for doc_id, data in docs[:1]]
+        collection.order_by.return_value.limit.return_value.stream.side_effect = stream
+        return collection
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs:
+            yield FakeSnap(ref.id, self.data.get(ref.collection_name, {}).get(ref.id))
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+class WordEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+def _items(n, words=3):
+    return [
+        {"id": f"p{i}", "text": " ".join([f"w{i}"] * words), "title": f"P{i}",
+         "description": "d", "is_approved": True}
+        for i in range(n)
+    ]
+
+
+def _job(db, client, **kwargs):
+    kwargs.setdefault("max_request_tokens", 10)
+    return EmbeddingJob(db, client, MODEL, WordEncoding(), COLLECTION, ctx_length=8, **kwargs)
+
+
+def test_pack_by_token_budget_respects_budget_and_chunks_long_texts():
+    items = [{"id": "a", "text": "x " * 4}, {"id": "b", "text": "y " * 5},
+             {"id": "c", "text": "z " * 20}]
+    batches = list(pack_by_token_budget(items, WordEncoding(), ctx_length=8, max_tokens=10))
+
+    assert [[i["id"] for i in b] for b in batches] == [["a", "b"], ["c"]]
+    assert batches[1][0]["inputs"] == [["z"] * 8, ["z"] * 8, ["z"] * 4]
+    assert batches[1][0]["chunk_lens"] == [8, 8, 4]
+    assert batches[0][0]["inputs"] == [items[0]["text"]]
+    assert request_inputs(batches[0]) == [items[0]["text"], items[1]["text"]]
+
+
+def test_long_texts_are_averaged_like_len_safe_get_embedding():
+    batch = [{"id": "a", "inputs": ["short"]},
+             {"id": "b", "inputs": [["t"] * 3, ["t"]], "chunk_lens": [3, 1]}]
+    vectors = item_vectors(batch, [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+
+    assert vectors[0] == [1.0, 0.0]
+    np.testing.assert_allclose(vectors[1], np.array([3.0, 1.0]) / np.linalg.norm([3.0, 1.0]))
+
+
+def test_run_embeds_everything_then_skips_unchanged():
+    db, client = FakeDB(), StubEmbeddingClient(dimensions=4)
+    written = []
+
+    summary = _job(db, client, on_written=written.extend).run(_items(7))
+
+    assert summary["status"] == STATUS_COMPLETED
+    assert summary["processed"] == 7 and summary["skipped"] == 0
+    # 3 tokens each under a 10 token budget -> 3 items per request
+    assert [len(c) for c in client.calls] == [3, 3, 1]
+    stored = db.data[COLLECTION]["p0"]
+    assert stored["content_hash"] == content_hash(MODEL, "w0 w0 w0")
+    assert len(stored["embedding_vector"]) == 4
+    assert len(written) == 7
+
+    items = _items(7)
+    items[2]["text"] = "changed text"
+    client.calls.clear()
+    summary = _job(db, client).run(items)
+
+    assert summary["processed"] == 1 and summary["skipped"] == 6
+    assert client.calls == [["changed text"]]
+
+
+def test_failed_commits_are_retried_by_the_next_run():
+    db, client = FakeDB(), StubEmbeddingClient(dimensions=4)
+    db.fail_commits = 1
+
+    first = _job(db, client, max_workers=1).run(_items(5))
+    assert first["status"] == STATUS_COMPLETED_WITH_ERRORS
+    assert first["processed"] == 2 and first["failed"] == 3
+
+    second = _job(db, client).run(_items(5))
+    assert second["processed"] == 3 and second["skipped"] == 2
+
+
+def test_job_progress_and_resume_state_are_recorded():
+    db, client = FakeDB(), StubEmbeddingClient(dimensions=4)
+    db.data[JOB_COLLECTION] = {"crashed": {"status": "running", "started_at": "2026-01-01T00:00:00"}}
+
+    summary = _job(db, client, job_id="next").run(_items(4))
+
+    jobs = db.data[JOB_COLLECTION]
+    assert jobs["crashed"]["status"] == STATUS_INTERRUPTED
+    assert jobs["next"]["resumed_from"] == "crashed"
+    assert jobs["next"]["status"] == STATUS_COMPLETED
+    assert jobs["next"]["processed"] == 4
+    assert jobs["next"]["requests"] == summary["requests"] == 2
+
+
+def test_stub_client_is_deterministic():
+    client = StubEmbeddingClient(dimensions=8)
+    a = client.embeddings.create(input=["same", "other"], model=MODEL).data
+    b = client.embeddings.create(input=["same"], model=MODEL).data
+    assert a[0].embedding == b[0].embedding
+    assert a[0].embedding != a[1].embedding
+    assert sum(v * v for v in a[0].embedding) == pytest.approx(1.0)
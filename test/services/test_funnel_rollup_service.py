@@ -0,0 +1,161 @@
+from unittest.mock import MagicMock, patch
+
+from services import funnel_rollup_service as rollups
+
+
+def _user(uid):
+    ref = MagicMock()
+    ref.id = uid
+    return ref
+
+
+def _team(status, user_ids, exists=True):
+    snap = MagicMock()
+    snap.exists = exists
+    snap.to_dict.return_value = {"status": status, "users": [_user(u) for u in user_ids]}
+    return snap
+
+
+def _hackathon(doc_id, event_id, teams=()):
+    snap = MagicMock()
+    snap.id = doc_id
+    snap.to_dict.return_value = {"event_id": event_id, "teams": list(teams)}
+    return snap
+
+
+def test_compute_event_rollup_counts_people_and_teams():
+    db = MagicMock()
+    db.get_all.return_value = [
+        _team("FOUNDING_ENGINEERS", ["a", "b"]),
+        _team("CATEGORY_WINNER", ["b", "c"]),
+        _team("IN_REVIEW", ["d"]),
+        _team("CATEGORY_WINNER", ["x"], exists=False),
+    ]
+    hackathon = _hackathon("h1", "evt1", teams=["t1", "t2", "t3", "t4"])
+    summary = {"registered": 40, "status_breakdown": {"Submitted": 3, "bogus": "n/a"}}
+
+    rollup = rollups.compute_event_rollup(db, hackathon, summary, applied_as_hacker=12)
+
+    counters = rollup["counters"]
+    assert counters["registered"] == 40
+    assert counters["applied_as_hacker"] == 12
+    assert counters["formed_team"] == 4
+    assert counters["teams_total"] == 4
+    assert counters["won_prize"] == 4
+    assert counters["won_prize_teams"] == 2
+    assert counters["founding_engineers"] == 2
+    assert counters["category_winner_teams"] == 1
+    assert counters["events_total"] == 1
+    assert counters["events_with_summary"] == 1
+    assert counters["events_with_winners"] == 1
+    assert rollup["breakdowns"]["status_breakdown"] == {"Submitted": 3}
+    assert rollup["hackathon_id"] == "h1"
+
+
+def test_rollup_delta_drops_unchanged_entries():
+    old = {"counters": {"registered": 10, "teams_total": 3},
+           "breakdowns": {"country_breakdown": {"US": 5, "IN": 2}}}
+    new = {"counters": {"registered": 12, "teams_total": 3, "formed_team": 4},
+           "breakdowns": {"country_breakdown": {"US": 5, "MX": 1}}}
+
+    counter_deltas, breakdown_deltas = rollups._rollup_delta(old, new)
+
+    assert counter_deltas == {"registered": 2, "formed_team": 4}
+    assert breakdown_deltas == {"country_breakdown": {"IN": -2, "MX": 1}}
+
+
+def test_rollup_delta_from_missing_rollup_is_the_full_rollup():
+    new = {"counters": {"events_total": 1, "registered": 0}, "breakdowns": {}}
+    assert rollups._rollup_delta(None, new) == ({"events_total": 1}, {})
+
+
+@patch("services.funnel_rollup_service.delete_cached")
+@patch("services.funnel_rollup_service._swap_event_rollup")
+@patch("services.funnel_rollup_service._count_hackers", return_value=3)
+@patch("services.funnel_rollup_service._find_hackathon")
+@patch("services.funnel_rollup_service._get_db")
+def test_refresh_event_rollup_applies_delta_to_global(mock_db, mock_find, mock_count,
+                                                      mock_swap, mock_delete):
+    db = mock_db.return_value
+    mock_find.return_value = _hackathon("h1", "evt1")
+    summary_snap = MagicMock(exists=False)
+    db.collection.return_value.document.return_value.collection.return_value \
+        .document.return_value.get.return_value = summary_snap
+    mock_swap.return_value = {"counters": {"events_total": 1, "applied_as_hacker": 1}}
+
+    rollups.refresh_event_rollup("evt1")
+
+    global_ref = db.collection.return_value.document.return_value
+    update = global_ref.set.call_args[0][0]
+    assert global_ref.set.call_args[1] == {"merge": True}
+    assert set(update["counters"]) == {"applied_as_hacker"}
+    assert update["counters"]["applied_as_hacker"].value == 2
+    mock_delete.assert_called_once_with(rollups.FUNNEL_AGGREGATE_CACHE_KEY)
+
+
+@patch("services.funnel_rollup_service._get_db", side_effect=RuntimeError("firestore down"))
+def test_refresh_event_rollup_never_raises(mock_db):
+    assert rollups.refresh_event_rollup("evt1") is None
+
+
+@patch("services.funnel_rollup_service.refresh_event_rollup")
+@patch("services.funnel_rollup_service._get_db")
+def test_refresh_team_rollups_refreshes_every_event_listing_the_team(mock_db, mock_refresh):
+    db = mock_db.return_value
+    query = db.collection.return_value.where.return_value.select.return_value
+    query.stream.return_value = [_hackathon("h1", "evt1"), _hackathon("h2", "evt2")]
+
+    rollups.refresh_team_rollups("team1")
+
+    assert [c[0][0] for c in mock_refresh.call_args_list] == ["evt1", "evt2"]
+
+
+def test_rollup_to_funnel_keeps_aggregate_shape():
+    rollup = {
+        "counters": {"registered": 100, "applied_as_hacker": 30, "formed_team": 20,
+                     "won_prize": 6, "teams_total": 5, "events_total": 2,
+                     "events_with_summary": 1, "events_with_winners": 1},
+        "breakdowns": {"country_breakdown": {"US": 90}},
+        "updated_at": "2026-06-01T00:00:00",
+        "built_at": "2026-06-01T00:00:00",
+    }
+
+    result = rollups.rollup_to_funnel(rollup)
+
+    assert result["event_id"] == "__aggregate__"
+    assert result["summary"]["registered"] == 100
+    assert result["summary"]["country_breakdown"] == {"US": 90}
+    assert result["summary"]["step_breakdown"] == {}
+    assert result["participation"] == {"applied_as_hacker": 30, "formed_team": 20}
+    assert result["winners"]["won_prize"] == 6
+    assert result["winners"]["category_winner_teams"] == 0
+    assert result["events_total"] == 2
+
+
+@patch("services.hackathons_service.set_cached")
+@patch("services.hackathons_service.get_cached", return_value=None)
+@patch("services.hackathons_service.rebuild_funnel_rollups")
+@patch("services.hackathons_service.get_global_rollup")
+def test_aggregate_reads_global_rollup(mock_get_rollup, mock_rebuild, mock_get_cached, mock_set_cached):
+    from services.hackathons_service import get_hackathon_funnel_aggregate
+
+    mock_get_rollup.return_value = {"counters": {"events_total": 7}, "built_at": "x"}
+
+    result = get_hackathon_funnel_aggregate()
+
+    assert result["events_total"] == 7
+    mock_rebuild.assert_not_called()
+    mock_set_cached.assert_called_once()
+
+
+@patch("services.hackathons_service.set_cached")
+@patch("services.hackathons_service.get_cached", return_value=None)
+@patch("services.hackathons_service.rebuild_funnel_rollups")
+@patch("services.hackathons_service.get_global_rollup", return_value=None)
+def test_aggregate_builds_missing_rollup(mock_get_rollup, mock_rebuild, mock_get_cached, mock_set_cached):
+    from services.hackathons_service import get_hackathon_funnel_aggregate
+
+    mock_rebuild.return_value = {"counters": {"events_total": 3}, "built_at": "x"}
+
+    assert get_hackathon_funnel_aggregate()["events_total"] == 3
+    mock_rebuild.assert_called_once_with()
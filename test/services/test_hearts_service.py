@@ -15,72 +15,105 @@ for mod_name in _mock_modules:
         sys.modules[mod_name] = MagicMock()
 
 # Now safe to import
-from services.hearts_service import get_hearts_leaderboard
+from mockfirestore import MockFirestore
 
+from common.utils.user_directory import hearts_fields
+from services.hearts_service import backfill_hearts_totals, get_hearts_for_all_users, get_hearts_leaderboard
 
-def _make_user(name, user_id, profile_image, history):
-    user = MagicMock()
-    user.name = name
-    user.id = user_id
-    user.profile_image = profile_image
-    user.history = history
-    return user
 
-
-USERS = [
-    _make_user("Alice", "u1", "img1.png", {
+USERS = {
+    "u1": ("Alice", "img1.png", {
         "how": {"code_reliability": 3, "standups_completed": 2},
         "what": {"documentation": 1},
     }),
-    _make_user("Bob", "u2", "img2.png", {
+    "u2": ("Bob", "img2.png", {
         "how": {"code_reliability": 1},
         "what": {"documentation": 0.5},
     }),
-    _make_user("Carol", "u3", "img3.png", {
+    "u3": ("Carol", "img3.png", {
         "how": {"code_reliability": 0},
         "what": {"documentation": 0},
     }),
-    _make_user("Dave", "u4", "img4.png", {
+    "u4": ("Dave", "img4.png", {
         "how": {"code_reliability": 10},
         "what": {"unit_test_writing": 5},
         "certificates": ["cert1.png"],
     }),
-    _make_user("Eve", "u5", None, {}),
-]
-
-
-@patch("services.hearts_service.fetch_users", return_value=USERS)
-def test_sort_order_descending(mock_fetch):
+    "u5": ("Eve", None, {}),
+}
+
+
+def _make_db(with_totals=True):
+    db = MockFirestore()
+    for user_id, (name, profile_image, history) in USERS.items():
+        data = {"name": name, "profile_image": profile_image, "history": history}
+        if with_totals:
+            # MockFirestore cannot order docs that lack the field
+            data.update(hearts_fields(history))
+        db.collection("users").document(user_id).set(data)
+    # MockFirestore has no batch(); apply each write directly
+    batch = MagicMock()
+    batch.set.side_effect = lambda ref, data, merge=False: ref.set(data, merge=merge)
+    db.batch = MagicMock(return_value=batch)
+    return db
+
+
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_sort_order_descending(mock_db):
     result = get_hearts_leaderboard(limit=50)
     hearts = [entry["totalHearts"] for entry in result]
     assert hearts == sorted(hearts, reverse=True)
 
 
-@patch("services.hearts_service.fetch_users", return_value=USERS)
-def test_zero_hearts_excluded(mock_fetch):
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_zero_hearts_excluded(mock_db):
     result = get_hearts_leaderboard(limit=50)
     names = [entry["name"] for entry in result]
     assert "Carol" not in names
     assert "Eve" not in names
 
 
-@patch("services.hearts_service.fetch_users", return_value=USERS)
-def test_certificates_excluded_from_count(mock_fetch):
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_certificates_excluded_from_count(mock_db):
     result = get_hearts_leaderboard(limit=50)
     dave = next(e for e in result if e["name"] == "Dave")
     # Only how + what should count: 10 + 5 = 15, not certificates
     assert dave["totalHearts"] == 15
 
 
-@patch("services.hearts_service.fetch_users", return_value=USERS)
-def test_limit_respected(mock_fetch):
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_limit_respected(mock_db):
     result = get_hearts_leaderboard(limit=2)
     assert len(result) == 2
 
 
-@patch("services.hearts_service.fetch_users", return_value=USERS)
-def test_correct_return_fields(mock_fetch):
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_correct_return_fields(mock_db):
     result = get_hearts_leaderboard(limit=50)
     expected_keys = {"name", "totalHearts", "userId", "profileImage"}
     for entry in result:
         assert set(entry.keys()) == expected_keys
+
+
+@patch("services.hearts_service.get_db", side_effect=_make_db)
+def test_all_users_paged_by_total(mock_db):
+    result = get_hearts_for_all_users(page_size=2)
+    assert [e["slackUsername"] for e in result] == ["Dave", "Alice", "Bob", "Carol"]
+    assert result[0]["heartTypes"] == ["how", "what", "certificates"]
+
+
+def test_backfill_writes_missing_totals():
+    db = _make_db(with_totals=False)
+    with patch("services.hearts_service.get_db", return_value=db):
+        assert backfill_hearts_totals(dry_run=True)["updated"] == 4
+        assert "hearts_total" not in db.collection("users").document("u1").get().to_dict()
+
+        stats = backfill_hearts_totals(dry_run=False, batch_size=3)
+        assert stats == {"scanned": 5, "with_history": 4, "updated": 4}
+        assert db.batch.return_value.commit.call_count == 2
+        alice = db.collection("users").document("u1").get().to_dict()
+        assert alice["hearts_total"] == 6
+        assert alice["hearts_by_category"] == {"how": 5, "what": 1}
+
+        # Already current: nothing to write
+        assert backfill_hearts_totals(dry_run=False)["updated"] == 0
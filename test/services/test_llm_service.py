@@ -0,0 +1,164 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from services import llm_service
+from services.llm_service import ApprovedEmbeddingIndex
+
+
+def _doc(doc_id, vector, title=None):
+    doc = MagicMock()
+    doc.id = doc_id
+    doc.to_dict.return_value = {
+        'embedding_vector': vector,
+        'title': title or doc_id,
+        'description': f"{doc_id} description",
+        'is_approved': True,
+    }
+    return doc
+
+
+@pytest.fixture
+def shared_version(fake_cache):
+    return fake_cache("services.llm_service")
+
+
+@pytest.fixture
+def index(shared_version):
+    db = MagicMock()
+    db.collection.return_value.where.return_value.stream.return_value = [
+        _doc("north", [0.0, 10.0]),
+        _doc("east", [3.0, 0.0]),
+        _doc("northeast", [1.0, 1.0]),
+        _doc("bad_dim", [1.0, 1.0, 1.0]),
+    ]
+    idx = ApprovedEmbeddingIndex()
+    idx.load(db)
+    return idx
+
+
+def test_load_normalizes_into_contiguous_float32(index):
+    assert index._ids == ["north", "east", "northeast"]
+    assert index._matrix.dtype == np.float32
+    assert index._matrix.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(np.linalg.norm(index._matrix, axis=1), 1.0, rtol=1e-6)
+
+
+def test_search_ranks_by_cosine_and_excludes(index):
+    results = index.search([0.1, 1.0], top_n=2)
+    assert [r['id'] for r in results] == ["north", "northeast"]
+    assert isinstance(results[0]['similarity'], float)
+
+    results = index.search([0.1, 1.0], top_n=5, exclude_id="north")
+    assert [r['id'] for r in results] == ["northeast", "east"]
+
+
+def test_search_many_matches_single_queries(index):
+    queries = [[0.1, 1.0], [1.0, 0.2], [1.0, 1.0]]
+    batched = index.search_many(queries, top_n=2)
+    assert batched == [index.search(q, top_n=2) for q in queries]
+
+
+def test_upsert_many_patches_without_reload(index, shared_version):
+    version = shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY]
+    index.upsert_many([
+        ("west", {'embedding_vector': [-2.0, 0.0], 'title': 'West', 'is_approved': True}),
+        ("north", {'embedding_vector': [0.0, 1.0], 'is_approved': False}),
+    ])
+
+    assert index._ids == ["east", "northeast", "west"]
+    assert index.search([-1.0, 0.0], top_n=1)[0]['title'] == "West"
+    assert shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY] != version
+    assert index._version == shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY]
+
+
+def test_upsert_many_writes_rows_in_place_and_publishes_once_per_job(index, shared_version):
+    version = shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY]
+    index.upsert_many([("west", {'embedding_vector': [-2.0, 0.0], 'is_approved': True})], publish=False)
+    buffer = index._buffer
+    index.upsert_many([
+        ("east", {'embedding_vector': [0.0, -1.0], 'title': 'South', 'is_approved': True}),
+        ("southwest", {'embedding_vector': [-1.0, -1.0], 'is_approved': True}),
+    ], publish=False)
+
+    assert index._buffer is buffer
+    assert index._ids == ["north", "east", "northeast", "west", "southwest"]
+    assert index.search([0.0, -1.0], top_n=1)[0]['title'] == "South"
+    assert shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY] == version
+
+    index.publish()
+    assert shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY] != version
+    assert index._version == shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY]
+
+
+def test_foreign_version_triggers_reload(index, shared_version):
+    shared_version[ApprovedEmbeddingIndex.VERSION_CACHE_KEY] = "written-by-another-worker"
+    with patch.object(index, "load") as mock_load:
+        index.ensure_loaded()
+    mock_load.assert_called_once_with()
+
+
+@patch("services.llm_service.get_db")
+def test_find_similar_projects_batch_embeds_missing_in_one_call(mock_get_db, index):
+    db = mock_get_db.return_value
+    cached = MagicMock(exists=True, id="app1")
+    cached.to_dict.return_value = {'embedding_vector': [0.0, 1.0]}
+    missing = MagicMock(exists=False, id="app2")
+    db.get_all.return_value = [cached, missing]
+
+    response = MagicMock()
+    response.data = [MagicMock(embedding=[1.0, 0.0])]
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text: text.split()
+    with patch.object(llm_service, "approved_index", index), \
+         patch("services.llm_service.tiktoken.get_encoding", return_value=encoding), \
+         patch.object(llm_service.client.embeddings, "create", return_value=response) as mock_create:
+        results = llm_service.find_similar_projects_batch(
+            [{'id': 'app1'}, {'id': 'app2', 'charityName': 'Food Bank'}, {'id': 'app1'}], top_n=1
+        )
+
+    mock_create.assert_called_once()
+    assert len(mock_create.call_args[1]['input']) == 1
+    db.batch.return_value.commit.assert_called_once()
+    assert results['app1'][0]['id'] == "north"
+    assert results['app2'][0]['id'] == "east"
+
+
+@patch("services.llm_service.get_db")
+def test_find_similar_projects_batch_splits_requests_by_token_budget(mock_get_db, index):
+    db = mock_get_db.return_value
+    db.get_all.return_value = [MagicMock(exists=False, id=f"app{i}") for i in range(13)]
+
+    def create(input, model):
+        return MagicMock(data=[MagicMock(embedding=[1.0, 0.0]) for _ in input])
+
+    # Every text is 8000 tokens, so 12 of them fill one 100k-token request
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text: [0] * 8000
+    with patch.object(llm_service, "approved_index", index), \
+         patch("services.llm_service.tiktoken.get_encoding", return_value=encoding), \
+         patch.object(llm_service.client.embeddings, "create", side_effect=create) as mock_create:
+        results = llm_service.find_similar_projects_batch(
+            [{'id': f"app{i}", 'charityName': f"Charity {i}"} for i in range(13)], top_n=1
+        )
+
+    assert [len(call[1]['input']) for call in mock_create.call_args_list] == [12, 1]
+    assert all(results[f"app{i}"][0]['id'] == "east" for i in range(13))
+
+
+def test_version_bumped_during_load_leaves_the_index_stale(shared_version):
+    key = ApprovedEmbeddingIndex.VERSION_CACHE_KEY
+    shared_version[key] = "before"
+
+    def stream():
+        shared_version[key] = "bumped-mid-stream"
+        yield _doc("north", [0.0, 1.0])
+
+    db = MagicMock()
+    db.collection.return_value.where.return_value.stream.side_effect = stream
+    idx = ApprovedEmbeddingIndex()
+    idx.load(db)
+
+    assert idx._version == "before"
+    assert idx._is_stale()
@@ -0,0 +1,59 @@
+import json
+from unittest.mock import MagicMock, patch
+
+from google.cloud.firestore import Increment
+
+from services.planning_board_events import BoardEventBroker, json_safe
+
+
+def test_local_delivery_reaches_only_that_board():
+    broker = BoardEventBroker(max_subscribers=4)
+    with patch("services.planning_board_events.get_redis_client", return_value=None):
+        a = broker.subscribe("evt1")
+        b = broker.subscribe("evt2")
+        broker.publish("evt1", {"type": "change", "revision": 3})
+
+    assert a.get(timeout=0) == {"type": "change", "revision": 3}
+    assert b.get(timeout=0) is None
+
+
+def test_capacity_is_released_on_close():
+    broker = BoardEventBroker(max_subscribers=1)
+    with patch("services.planning_board_events.get_redis_client", return_value=None):
+        first = broker.subscribe("evt1")
+        assert broker.subscribe("evt1") is None
+
+        first.close()
+        first.close()
+        assert broker.subscriber_count() == 0
+        assert broker.subscribe("evt1") is not None
+
+
+def test_redis_publish_goes_through_the_channel():
+    broker = BoardEventBroker()
+    client = MagicMock()
+    with patch("services.planning_board_events.get_redis_client", return_value=client):
+        broker.publish("evt1", {"type": "presence", "card_id": "c1"})
+
+    channel, payload = client.publish.call_args[0]
+    assert channel == "planning:board:evt1"
+    assert json.loads(payload) == {"type": "presence", "card_id": "c1"}
+
+
+def test_listener_fans_pattern_messages_out_locally():
+    broker = BoardEventBroker()
+    with patch("services.planning_board_events.get_redis_client", return_value=None):
+        subscription = broker.subscribe("evt1")
+    client = MagicMock()
+    client.pubsub.return_value.listen.return_value = [
+        {"type": "pmessage", "channel": b"planning:board:evt1", "data": b'{"type": "change", "revision": 5}'},
+        {"type": "pmessage", "channel": b"planning:board:evt2", "data": b'{"type": "change", "revision": 9}'},
+    ]
+
+    broker._listen(client)
+
+    assert subscription.drain() == [{"type": "change", "revision": 5}]
+
+
+def test_json_safe_drops_sentinels():
+    assert json_safe({"comment_count": Increment(1), "title": "x"}) == {"title": "x"}
@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services import planning_board_sync
+
+
+HACKATHON = {"id": "hid1", "event_id": "evt1", "planning": {"enabled": True, "editors": []}}
+
+
+def _snap(doc_id, data):
+    snap = MagicMock()
+    snap.id = doc_id
+    snap.exists = data is not None
+    snap.to_dict.return_value = data
+    return snap
+
+
+class TestCommitBoardWrites:
+
+    @patch("services.planning_board_sync.publish_board_event")
+    @patch("services.planning_board_sync.firestore.transactional", lambda fn: fn)
+    @patch("services.planning_board_sync.get_db")
+    def test_stamps_writes_and_bumps_revision(self, mock_get_db, mock_publish):
+        transaction = MagicMock()
+        transaction.get_all.return_value = [_snap("evt1", {"revision": 41})]
+        mock_get_db.return_value.transaction.return_value = transaction
+        card_ref, list_ref = MagicMock(), MagicMock()
+
+        revision = planning_board_sync.commit_board_writes(HACKATHON, [
+            (planning_board_sync.OP_SET, list_ref, {"title": "Todo"}),
+            (planning_board_sync.OP_UPDATE, card_ref, {"position": "p1"}),
+        ])
+
+        assert revision == 42
+        transaction.set.assert_any_call(list_ref, {"title": "Todo", "revision": 42})
+        transaction.update.assert_called_once_with(card_ref, {"position": "p1", "revision": 42})
+        meta = transaction.set.call_args_list[-1][0][1]
+        assert meta["revision"] == 42
+        assert meta["hackathon_id"] == "hid1"
+        assert meta["enabled"] is True
+        event_id, event = mock_publish.call_args[0]
+        assert event_id == "evt1"
+        assert event["revision"] == 42
+        assert [c["data"] for c in event["changes"]] == [{"title": "Todo"}, {"position": "p1"}]
+
+    @patch("services.planning_board_sync.publish_board_event")
+    @patch("services.planning_board_sync.firestore.transactional", lambda fn: fn)
+    @patch("services.planning_board_sync.get_db")
+    def test_first_write_starts_at_one(self, mock_get_db, mock_publish):
+        transaction = MagicMock()
+        transaction.get_all.return_value = [_snap("evt1", None)]
+        mock_get_db.return_value.transaction.return_value = transaction
+
+        assert planning_board_sync.commit_board_writes(HACKATHON) == 1
+
+    def test_rejects_oversized_commit(self):
+        with pytest.raises(ValueError):
+            planning_board_sync.commit_board_writes(HACKATHON, [("set", MagicMock(), {})] * 500)